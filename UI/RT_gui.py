@@ -5,16 +5,8 @@ import maya.OpenMayaUI as omui
 from PySide import QtCore, QtGui
 from shiboken import wrapInstance
 import os
-import xml.etree.ElementTree as et
-from xml.dom import minidom
-import json
-
-def prettyPrint(elem):
-    """Return a pretty-printed XML string for the Element.
-    """
-    rough_string = et.tostring(elem, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="  ")
+from rooftops.UI import pickerFile
+from rooftops.core import sceneIndex, controlRegistry, pose, mirror
 
 def maya_main_window():
     main_window_ptr = omui.MQtUtil.mainWindow()
@@ -256,11 +248,11 @@ class PickerEditor(QtGui.QWidget):
         Populates the defaults dictionary on selected buttons.
         Makes a dictionary key for each keyable attribute and stores the current value
         '''
+        nodes = [btn.sceneNode for btn in self.selected if btn.sceneNode]
+        defaults = pose.Pose.capture(nodes).asDefaults()
         for btn in self.selected:
             if btn.sceneNode:
-                btn.defaults = {}
-                for attr in cmds.listAttr(btn.sceneNode, k=1, u=1):
-                    btn.defaults[attr] = cmds.getAttr(btn.sceneNode + '.' + attr)
+                btn.defaults = defaults[pose.splitNamespace(btn.sceneNode)[1]]
 
             print btn.defaults
 
@@ -271,10 +263,10 @@ class PickerEditor(QtGui.QWidget):
 
         '''
         attrDict = {}
-        attrDict['xPos'] = str(button.x())
-        attrDict['yPos'] = str(button.y())
-        attrDict['width'] = str(button.size().width())
-        attrDict['height'] = str(button.size().height())
+        attrDict['xPos'] = button.x()
+        attrDict['yPos'] = button.y()
+        attrDict['width'] = button.size().width()
+        attrDict['height'] = button.size().height()
         attrDict['style'] = str(button.styleSheet())
         attrDict['text'] = button.text()
 
@@ -283,7 +275,7 @@ class PickerEditor(QtGui.QWidget):
             attrDict['parentNode'] = button.parentNode
             attrDict['mirrorNode'] = button.mirrorNode
             attrDict['rigPart'] = button.rigPart
-            attrDict['defaults'] = json.dumps(button.defaults)
+            attrDict['defaults'] = dict(button.defaults)
 
         return attrDict
 
@@ -298,30 +290,22 @@ class PickerEditor(QtGui.QWidget):
             button.parentNode = attrDict['parentNode']
             button.mirrorNode = attrDict['mirrorNode']
             button.rigPart = attrDict['rigPart']
-            button.defaults = json.loads(attrDict['defaults'])
+            button.defaults = dict(attrDict['defaults'])
 
     def save(self):
-        filename = QtGui.QFileDialog.getSaveFileName(self, "Save Picker")[0]
-
-        # Xml root element
-        root = et.Element('picker')
-        root.set('version', '1.0')
-
-        # Get Tabs
-        tabs = et.SubElement(parent=root, tag='tabs')
+        filename = QtGui.QFileDialog.getSaveFileName(self, "Save Picker", filter='Picker (*_picker.json)')[0]
+        if not filename:
+            return
+        # pickers are always saved in the compact format
+        if filename.endswith('.xml'):
+            filename = filename[:-4] + '.json'
+
+        tabs = []
         for i in range(self.canvas.count()):
-            t = et.SubElement(parent=tabs, tag='tab', label=self.canvas.tabText(i))
-
-            # Gather button info
-            buttons = et.SubElement(parent=t, tag='buttons')
-            for b in self.canvas.widget(i).children():
-                e = et.SubElement(parent=buttons, tag='btn', attrib=self.getButtonData(b, bindings=1))
+            buttons = [self.getButtonData(b, bindings=1) for b in self.canvas.widget(i).children()]
+            tabs.append({'label':self.canvas.tabText(i), 'buttons':buttons, 'bg':self.tabs[i]['bg']})
 
-            # BG image
-            bg = et.SubElement(parent=t, tag='bg', file=self.tabs[i]['bg'])
-
-        # Xml tree
-        open(filename, 'w').write(prettyPrint(root))
+        pickerFile.writePicker(filename, tabs)
         print 'saving: ' + filename
 
     def clearCanvas(self):
@@ -331,22 +315,19 @@ class PickerEditor(QtGui.QWidget):
         self.tabs = []
 
     def load(self):
-        filename = QtGui.QFileDialog.getOpenFileName(self, "Load Picker")[0]
-        tree = et.parse(filename)
-        if not tree:
+        filename = QtGui.QFileDialog.getOpenFileName(self, "Load Picker", filter='Picker (*_picker.json *_picker.xml)')[0]
+        data = pickerFile.readPicker(filename)
+        if not data:
             return showDialog('File Error', ('File not found: ' + filename))
 
         self.clearCanvas()
-        root = tree.getroot()
-        tabs = root.find('tabs')
-        for tab in tabs:
-            t = self.addNewTab(tab.get('label'))
+        for tab in data['tabs']:
+            t = self.addNewTab(tab['label'])
             self.canvas.setCurrentIndex(t)
-            buttons = tab.find('buttons')
-            for btn in buttons:
+            for attrDict in tab['buttons']:
                 b = self.addButton()
-                self.setButtonData(b, btn.attrib, bindings=1)
-            self.loadImage(image=tab.find('bg').get('file'))
+                self.setButtonData(b, attrDict, bindings=1)
+            self.loadImage(image=tab['bg'])
             print 'loading: ' + filename
 
     def build(self):
@@ -559,12 +540,13 @@ class Picker(QtGui.QWidget):
 
     def getScenePickers(self):
         self.pickerPath = os.path.join(os.path.dirname(__file__), 'pickers\\')
-        pickers = [f for f in os.listdir(self.pickerPath) if '_picker.xml' in f]
-        refPickers = [p for p in pickers if cmds.namespace(exists=(':' + p.replace('_picker.xml', '')))]
+        self.pickerFiles = pickerFile.findPickers(self.pickerPath)
+        self.sceneIndex = sceneIndex.SceneIndex()
+        pickers = sorted(self.pickerFiles.keys())
+        refPickers = [p for p in pickers if self.sceneIndex.hasNamespace(p)]
         refPickers.append('CAMERA')
-        localPickers = [p for p in pickers if ('|' + p.replace('_picker.xml', '')) in cmds.ls(long=1)]
-        scenePickers = refPickers + localPickers
-        return [p.replace('_picker.xml', '') for p in scenePickers]
+        localPickers = [p for p in pickers if self.sceneIndex.hasRoot(p)]
+        return refPickers + localPickers
 
     def setButtonData(self, button, attrDict):
         button.setText(attrDict['text'])
@@ -576,7 +558,7 @@ class Picker(QtGui.QWidget):
         button.parentNode = attrDict['parentNode']
         button.mirrorNode = attrDict['mirrorNode']
         button.rigPart = attrDict['rigPart']
-        button.defaults = json.loads(attrDict['defaults'])
+        button.defaults = dict(attrDict['defaults'])
 
     def selectionChanged(self):
         sender = self.sender()
@@ -621,26 +603,24 @@ class Picker(QtGui.QWidget):
 
     def load(self, filename, parent, asset):
         print filename
-        tree = et.parse(filename)
-        if not tree:
+        data = pickerFile.readPicker(filename)
+        if not data:
             return showDialog('File Error', ('File not found: ' + filename))
-        root = tree.getroot()
-        tabs = root.find('tabs')
+        inNamespace = cmds.namespace(exists=(':' + asset))
 
-        for tab in tabs:
-            t = self.addNewTab(parent = parent, tabName=tab.get('label'))
+        for tab in data['tabs']:
+            t = self.addNewTab(parent = parent, tabName=tab['label'])
             parent.setCurrentIndex(t)
             panel = parent.currentWidget()
-            buttons = tab.find('buttons')
-            for btn in buttons:
+            for attrDict in tab['buttons']:
                 b = self.addButton(panel)
-                self.setButtonData(b, btn.attrib)
+                self.setButtonData(b, attrDict)
 
                 # if the asset is in a namespace, add the asset name to the sceneNode
-                if cmds.namespace(exists=(':' + asset)):
+                if inNamespace:
                     b.sceneNode = asset + ':' + b.sceneNode
 
-            bg = tab.find('bg').get('file')
+            bg = tab['bg']
             if bg:
                 if os.path.exists(bg):
                     panel.setPixmap(QtGui.QPixmap(bg))
@@ -651,12 +631,138 @@ class Picker(QtGui.QWidget):
         '''
         resets keyable attributes on the sceneNodes of selected buttons to their stored default values
         '''
+        # buttons whose sceneNode has gone - a deleted or unloaded rig - are skipped
+        buttons = [b for b in self.selected if b.sceneNode and cmds.objExists(b.sceneNode)]
+
+        # buttons without stored defaults use those registered on their rig when it was built
+        registered = {}
+        roots = set()
+        for button in buttons:
+            if not button.defaults:
+                fullPath = (cmds.ls(button.sceneNode, l=1) or [''])[0]
+                if fullPath.startswith('|'):
+                    roots.add(fullPath.split('|')[1])
+        for root in roots:
+            rig = controlRegistry.findRig(root)
+            if rig:
+                registered.update(controlRegistry.getControlDefaults(rig))
+
+        # one pose per namespace, applied together as a single undoable step
+        namespaces = {}
+        for button in buttons:
+            namespace = pose.splitNamespace(button.sceneNode)[0]
+            namespaces.setdefault(namespace, {})[button.sceneNode] = button.defaults or registered.get(button.sceneNode, {})
+
         cmds.undoInfo(openChunk=1)
-        for button in self.selected:
-            if button.sceneNode:
-                for attr in button.defaults.keys():
-                    cmds.setAttr(button.sceneNode + '.' + attr, button.defaults[attr])
-        cmds.undoInfo(closeChunk=1)
+        try:
+            for namespace, defaults in namespaces.items():
+                pose.Pose.fromDefaults(defaults).apply(namespace)
+        finally:
+            cmds.undoInfo(closeChunk=1)
+
+    def getAsset(self):
+        '''
+        returns the asset shown in the picker, its namespace and its buttons
+        '''
+        asset = self.canvas.tabText(self.canvas.currentIndex())
+        namespace = asset if cmds.namespace(exists=(':' + asset)) else ''
+        assetTab = self.canvas.currentWidget()
+        buttons = []
+        for i in range(assetTab.count()):
+            buttons.extend([b for b in assetTab.widget(i).children() if isinstance(b, PickerButton)])
+        return asset, namespace, buttons
+
+    def getPoseLibrary(self, asset):
+        return pose.PoseLibrary(os.path.join(self.pickerPath, asset + '_poses.json'))
+
+    def refreshPoses(self):
+        self.pose_cmb.clear()
+        if self.canvas.count():
+            self.pose_cmb.addItems(self.getPoseLibrary(self.getAsset()[0]).names())
+
+    def savePose(self):
+        '''
+        stores the current values of every control in the picker's asset as a named pose
+        '''
+        asset, namespace, buttons = self.getAsset()
+        name, ok = QtGui.QInputDialog.getText(self.mainWindow, 'Save Pose', 'Pose name:')
+        if not ok or not name:
+            return
+        buttons = [b for b in buttons if b.sceneNode and cmds.objExists(b.sceneNode)]
+        parts = dict((b.sceneNode, b.rigPart) for b in buttons)
+        self.getPoseLibrary(asset).add(str(name), pose.Pose.capture([b.sceneNode for b in buttons], parts=parts))
+        self.refreshPoses()
+        self.pose_cmb.setCurrentIndex(self.pose_cmb.findText(name))
+
+    def applyPose(self):
+        '''
+        applies the chosen pose. With buttons selected, only the rig parts of those buttons are posed
+        '''
+        asset, namespace, buttons = self.getAsset()
+        storedPose = self.getPoseLibrary(asset).get(str(self.pose_cmb.currentText()))
+        if not storedPose:
+            return showDialog('Pose Error', 'Choose a pose to apply')
+        selected = [b for b in self.selected if b in buttons and b.sceneNode]
+        parts = set([b.rigPart for b in selected if b.rigPart]) or None
+        controls = [b.sceneNode for b in selected if not b.rigPart] or None
+        if selected and parts and controls:
+            # parts and loose controls together - pose each set in the same undo chunk
+            cmds.undoInfo(openChunk=1)
+            try:
+                storedPose.apply(namespace, parts=parts)
+                storedPose.apply(namespace, controls=controls)
+            finally:
+                cmds.undoInfo(closeChunk=1)
+        else:
+            storedPose.apply(namespace, parts=parts, controls=controls)
+
+    def getMirrorNode(self, button, namespace):
+        '''
+        returns the scene node paired with button's sceneNode - its mirrorNode, or the control with the other side's prefix
+        '''
+        if button.mirrorNode:
+            return namespace + ':' + button.mirrorNode if namespace else button.mirrorNode
+        return mirror.mirrorName(button.sceneNode)
+
+    def mirrorButtons(self, flip=False):
+        '''
+        mirrors the selected buttons' controls onto the other side. With flip, the two sides of the selected buttons are swapped,
+        or of the whole picker if none are selected. With Anim checked, every keyed frame of the sources in the playback range is mirrored
+        '''
+        asset, namespace, buttons = self.getAsset()
+        buttons = [b for b in buttons if b.sceneNode and cmds.objExists(b.sceneNode)]
+        selected = [b for b in self.selected if b in buttons] or (buttons if flip else [])
+        if not selected:
+            return showDialog('Selection Error', 'Select the controls to mirror')
+
+        pairs, centre = [], []
+        for b in selected:
+            other = self.getMirrorNode(b, namespace)
+            if other == b.sceneNode:
+                centre.append(b.sceneNode)
+            elif cmds.objExists(other) and (b.sceneNode, other) not in pairs:
+                pairs.append((b.sceneNode, other))
+        if flip:
+            pairs = mirror.flipPairs(pairs, centre)
+        else:
+            pairs += [(c, c) for c in centre]
+
+        # the controls' stored defaults are their rest pose
+        rest = dict((b.sceneNode, b.defaults) for b in buttons if b.defaults)
+        frames = None
+        if self.mirrorAnim_chk.isChecked():
+            start, end = cmds.playbackOptions(q=1, min=1), cmds.playbackOptions(q=1, max=1)
+            keys = cmds.keyframe([a for a, b in pairs], q=1, timeChange=1) or []
+            frames = sorted(set([k for k in keys if start <= k <= end]))
+            if not frames:
+                return showDialog('Mirror Error', 'No keys to mirror in the playback range')
+        mirror.mirror(pairs, frames=frames, rest=rest)
+
+    def mirrorPose(self):
+        self.mirrorButtons()
+
+    def flipPose(self):
+        self.mirrorButtons(flip=True)
 
     def selectAll(self):
         '''
@@ -682,18 +788,24 @@ class Picker(QtGui.QWidget):
         return root
 
     def getControls(self, root, stringID='CON'):
-        curves = cmds.listRelatives(root, ad=1, type='nurbsCurve')
-        controls = []
-        for curve in curves:
-            parent = cmds.listRelatives(curve, p=1, type='transform')[0]
-            #if cmds.attributeQuery('con_category', node=parent, exists=1):
-            if parent.endswith('_ctrl'):
-                if not cmds.listConnections(parent, type='constraint', d=0):
-                    controls.append(parent)
-        return controls
+        '''
+        returns the controls registered on root when it was built, or for older rigs, the constraint free *_ctrl transforms under root from the scene index
+        '''
+        rig = controlRegistry.findRig(root)
+        controls = controlRegistry.getControls(rig) if rig else []
+        if controls:
+            return controls
+        return self.sceneIndex.getControls(root)
 
     def selectRig(self):
-        cmds.select(self.getControls(root=self.getRoot()))
+        # the rig may have changed since the picker was opened - re-index just this root unless its controls are registered
+        root = self.getRoot()
+        rig = controlRegistry.findRig(root)
+        controls = controlRegistry.getControls(rig) if rig else []
+        if not controls:
+            self.sceneIndex.refresh(root)
+            controls = self.sceneIndex.getControls(root)
+        cmds.select(controls)
 
     def linkToBlank(self):
         '''
@@ -709,7 +821,7 @@ class Picker(QtGui.QWidget):
                 self.buttonList = [b for b in self.buttonList if not b in buttons]
                 panel.widget(index).deleteLater()
             self.canvas.setTabText(self.canvas.count() - 1, theNameSpace)
-            self.load(self.pickerPath + 'CAMERA_picker.xml', panel, theNameSpace)
+            self.load(self.pickerFiles.get('CAMERA', self.pickerPath + 'CAMERA' + pickerFile.XML_EXTENSION), panel, theNameSpace)
 
     def build(self):
     # get maya main window
@@ -719,8 +831,8 @@ class Picker(QtGui.QWidget):
         self.mainWindow = QtGui.QMainWindow(maya)
         self.mainWindow.setObjectName(self.uiName)
         self.mainWindow.setWindowTitle('Character Picker')
-        self.mainWindow.setMinimumSize(420, 620)
-        self.mainWindow.setMaximumSize(420, 620)
+        self.mainWindow.setMinimumSize(420, 690)
+        self.mainWindow.setMaximumSize(420, 690)
 
         # create central widget
         self.centralWidget = QtGui.QWidget()
@@ -740,7 +852,7 @@ class Picker(QtGui.QWidget):
             assetTab.setFixedSize(400, 520)
             t = self.canvas.addTab(assetTab, asset)
             self.canvas.setCurrentIndex(t)
-            self.load(self.pickerPath +asset+'_picker.xml', self.canvas.currentWidget(), asset)
+            self.load(self.pickerFiles.get(asset, self.pickerPath + asset + pickerFile.XML_EXTENSION), self.canvas.currentWidget(), asset)
 
         # Select All buttons
         self.selectAllHLayout = QtGui.QHBoxLayout()
@@ -762,4 +874,30 @@ class Picker(QtGui.QWidget):
         self.link_btn.clicked.connect(self.linkToBlank)
         self.zeroHLayout.addWidget(self.link_btn)
 
+        # Pose library
+        self.poseHLayout = QtGui.QHBoxLayout()
+        self.mainVLayout.addLayout(self.poseHLayout)
+        self.pose_cmb = QtGui.QComboBox()
+        self.poseHLayout.addWidget(self.pose_cmb)
+        self.applyPose_btn = QtGui.QPushButton('APPLY POSE')
+        self.applyPose_btn.clicked.connect(self.applyPose)
+        self.poseHLayout.addWidget(self.applyPose_btn)
+        self.savePose_btn = QtGui.QPushButton('SAVE POSE')
+        self.savePose_btn.clicked.connect(self.savePose)
+        self.poseHLayout.addWidget(self.savePose_btn)
+        self.canvas.currentChanged.connect(self.refreshPoses)
+        self.refreshPoses()
+
+        # Mirror and flip
+        self.mirrorHLayout = QtGui.QHBoxLayout()
+        self.mainVLayout.addLayout(self.mirrorHLayout)
+        self.mirror_btn = QtGui.QPushButton('MIRROR')
+        self.mirror_btn.clicked.connect(self.mirrorPose)
+        self.mirrorHLayout.addWidget(self.mirror_btn)
+        self.flip_btn = QtGui.QPushButton('FLIP')
+        self.flip_btn.clicked.connect(self.flipPose)
+        self.mirrorHLayout.addWidget(self.flip_btn)
+        self.mirrorAnim_chk = QtGui.QCheckBox('Anim')
+        self.mirrorHLayout.addWidget(self.mirrorAnim_chk)
+
         self.mainWindow.show()
@@ -2,6 +2,7 @@ import maya.cmds as cmds
 import maya.OpenMayaUI as omui
 from PySide import QtCore, QtGui
 from shiboken import wrapInstance
+from rooftops.core import registry
 
 def maya_main_window():
     main_window_ptr = omui.MQtUtil.mainWindow()
@@ -35,9 +36,10 @@ class PickerGui(object):
     def getSceneRigs(self):
         '''
         Collect all metaRigs in the scene by checking for 'metaRigName' attribute
+        Rigs come from a registry which is kept current by scene callbacks, rather than a scan of every node
         
         '''
-        sceneRigs = [node for node in cmds.ls() if cmds.attributeQuery('metaRigName', node=node, exists=1)]
+        sceneRigs = registry.getSceneRigs(attr='metaRigName', nodeType='dependNode')
         print 'Metarigs found: %s' % sceneRigs
         return sceneRigs
             
@@ -0,0 +1,155 @@
+# Reading and writing picker files.
+# Pickers are stored as a single compact json document (format version 2). Each tab holds one typed array per button field
+# rather than one element per button, and the style sheets and default values shared between buttons are stored once:
+#     {"format":"rooftopsPicker", "version":2,
+#      "styles":[style, ...], "defaults":[{attr:value}, ...],
+#      "tabs":[{"label":label, "bg":file,
+#               "rects":[x, y, width, height, x, y, ...], "text":[...], "sceneNode":[...], "parentNode":[...],
+#               "mirrorNode":[...], "rigPart":[...], "style":[styleIndex, ...], "defaults":[defaultsIndex, ...]}]}
+# Version 1 pickers (the pretty printed xml written by earlier versions of the editor) can still be read, and converted with convertXml.
+# Parsed pickers are cached in process, keyed by path and modification time, so reopening a picker does no parsing.
+# No Maya or Qt imports - run 'python pickerFile.py [files]' to convert xml pickers outside of Maya.
+import os
+import sys
+import json
+import xml.etree.ElementTree as et
+
+FORMAT = 'rooftopsPicker'
+VERSION = 2
+EXTENSION = '_picker.json'
+XML_EXTENSION = '_picker.xml'
+STRING_FIELDS = ['text', 'sceneNode', 'parentNode', 'mirrorNode', 'rigPart']
+
+_cache = {}
+
+def readXml(path):
+    '''
+    reads a version 1 xml picker and returns it in the same form as readPicker
+    '''
+    root = et.parse(path).getroot()
+    tabs = []
+    for tab in root.find('tabs'):
+        buttons = []
+        for btn in tab.find('buttons'):
+            attrDict = dict(btn.attrib)
+            for attr in ['xPos', 'yPos', 'width', 'height']:
+                attrDict[attr] = int(attrDict[attr])
+            attrDict['defaults'] = json.loads(attrDict.get('defaults') or '{}')
+            for field in STRING_FIELDS:
+                attrDict.setdefault(field, '')
+            buttons.append(attrDict)
+        bg = tab.find('bg')
+        tabs.append({'label':tab.get('label') or '', 'bg':bg.get('file') if bg is not None else '', 'buttons':buttons})
+    return {'version':1, 'tabs':tabs}
+
+def readJson(path):
+    '''
+    reads a version 2 json picker and returns it in the same form as readPicker
+    '''
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if data.get('format') != FORMAT or data.get('version', 0) > VERSION:
+        raise ValueError('Unsupported picker file: %s' % path)
+    styles, defaults = data['styles'], data['defaults']
+    tabs = []
+    for tab in data['tabs']:
+        rects = tab['rects']
+        columns = [tab[field] for field in STRING_FIELDS]
+        buttons = []
+        for i, (style, default) in enumerate(zip(tab['style'], tab['defaults'])):
+            attrDict = dict(zip(STRING_FIELDS, [column[i] for column in columns]))
+            attrDict['xPos'], attrDict['yPos'], attrDict['width'], attrDict['height'] = rects[i * 4:i * 4 + 4]
+            attrDict['style'] = styles[style]
+            attrDict['defaults'] = defaults[default]
+            buttons.append(attrDict)
+        tabs.append({'label':tab['label'], 'bg':tab['bg'], 'buttons':buttons})
+    return {'version':data['version'], 'tabs':tabs}
+
+def readPicker(path):
+    '''
+    returns the picker stored at path as {'version':version, 'tabs':[{'label':label, 'bg':file, 'buttons':[attrDict, ...]}, ...]}
+    Each attrDict holds xPos, yPos, width, height as ints, style and the STRING_FIELDS as strings and defaults as a dict.
+    xml and json pickers are both read. The result is cached until the file changes - treat it as read only.
+    Returns None if path doesn't exist
+    '''
+    path = os.path.abspath(path)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    key = (stat.st_mtime, stat.st_size)
+    cached = _cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    if path.lower().endswith('.xml'):
+        data = readXml(path)
+    else:
+        data = readJson(path)
+    _cache[path] = (key, data)
+    return data
+
+def writePicker(path, tabs):
+    '''
+    writes tabs, a list of {'label':label, 'bg':file, 'buttons':[attrDict, ...]} as in readPicker, to path as a version 2 picker
+    '''
+    styles, defaults = [], []
+    styleIndex, defaultsIndex = {}, {}
+    tabData = []
+    for tab in tabs:
+        data = dict([(field, []) for field in STRING_FIELDS + ['style', 'defaults']])
+        data['label'], data['bg'], data['rects'] = tab['label'], tab['bg'], []
+        for attrDict in tab['buttons']:
+            data['rects'].extend([int(attrDict[attr]) for attr in ['xPos', 'yPos', 'width', 'height']])
+            for field in STRING_FIELDS:
+                data[field].append(attrDict.get(field) or '')
+
+            # shared values are stored once and referenced by index
+            style = attrDict.get('style') or ''
+            if style not in styleIndex:
+                styleIndex[style] = len(styles)
+                styles.append(style)
+            data['style'].append(styleIndex[style])
+
+            default = attrDict.get('defaults') or {}
+            defaultKey = json.dumps(default, sort_keys=True)
+            if defaultKey not in defaultsIndex:
+                defaultsIndex[defaultKey] = len(defaults)
+                defaults.append(default)
+            data['defaults'].append(defaultsIndex[defaultKey])
+        tabData.append(data)
+
+    with open(path, 'w') as f:
+        json.dump({'format':FORMAT, 'version':VERSION, 'styles':styles, 'defaults':defaults, 'tabs':tabData}, f, separators=(',', ':'))
+    _cache.pop(os.path.abspath(path), None)
+
+def convertXml(xmlPath, jsonPath=None):
+    '''
+    converts the xml picker at xmlPath to a version 2 picker. By default it is written alongside, named *_picker.json.
+    Returns the path written
+    '''
+    if not jsonPath:
+        jsonPath = os.path.splitext(xmlPath)[0] + '.json'
+    writePicker(jsonPath, readXml(xmlPath)['tabs'])
+    return jsonPath
+
+def findPickers(directory):
+    '''
+    returns {asset:path} for the pickers in directory. Where an asset has both, the json picker is preferred over the xml
+    '''
+    pickers = {}
+    for f in sorted(os.listdir(directory)):
+        for extension in [EXTENSION, XML_EXTENSION]:
+            if f.endswith(extension):
+                asset = f[:-len(extension)]
+                if extension == EXTENSION or asset not in pickers:
+                    pickers[asset] = os.path.join(directory, f)
+    return pickers
+
+######################################################################################################################################################
+
+if __name__ == '__main__':
+    paths = sys.argv[1:]
+    if not paths:
+        pickerDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pickers')
+        paths = [os.path.join(pickerDir, f) for f in os.listdir(pickerDir) if f.endswith(XML_EXTENSION)]
+    for path in paths:
+        print('%s -> %s' % (path, convertXml(path)))
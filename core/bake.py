@@ -0,0 +1,109 @@
+# Snapping and baking IK / FK switches over a range of frames.
+# The snap pairs of a system - each node with the metaType being snapped and its snap_target - are resolved once from the
+# MetaRig's index. The matrices the snap needs are then evaluated for every frame at once by rooftops.core.sampler, rather
+# than by moving the timeline, and the aligned channels for all nodes and frames are worked out as stacked arrays:
+#     target world matrices     - where each node has to go
+#     node world and parent matrices - the current frame of each node, so that nodes under other snapped nodes follow their new parent
+# The result is keyed in bulk through pose.writeKeys, or set through pose.writeValues when snapping the current frame only.
+# Scale is left as it is, as with common.align. Joint orients are accounted for. Rotate axes and pivots are assumed to be zero.
+import numpy as np
+import maya.cmds as cmds
+from rooftops.core import pose, mirror, sampler
+
+def getSnapPairs(rig, rigNode):
+    '''
+    returns [(node, target)] for the nodes in rigNode's system which share its metaType and have a snap target,
+    in system order. Everything comes from one read of rig's index
+    '''
+    nodes = rig.getIndex()['nodes']
+    nodeData = nodes.get(str(rigNode))
+    if not nodeData:
+        return []
+    pairs = []
+    for node in rig.getSystemNodes(nodeData['system']):
+        data = nodes.get(node)
+        if data and data['metaType'] == nodeData['metaType'] and data['snap']:
+            pairs.append((node, data['snap'][0]))
+    return pairs
+
+def _getHierarchy(nodes):
+    '''
+    returns, for each of nodes, the index of its nearest ancestor in nodes or -1, and the nodes' indices ordered parents first
+    '''
+    longNames = {}
+    for longName in cmds.ls(nodes, long=1) or []:
+        longNames[longName.split('|')[-1]] = longName
+    paths = [longNames.get(node.split('|')[-1], node) for node in nodes]
+    ancestors = []
+    for path in paths:
+        candidates = [(len(other), i) for i, other in enumerate(paths) if path.startswith(other + '|')]
+        ancestors.append(max(candidates)[1] if candidates else -1)
+    order = sorted(range(len(nodes)), key=lambda i: paths[i].count('|'))
+    return ancestors, order
+
+def _getJointOrients(nodes):
+    '''
+    returns (nodes, 3, 3) joint orient rotations - identity for nodes that aren't joints
+    '''
+    orients = np.zeros((len(nodes), 3))
+    for i, node in enumerate(nodes):
+        if cmds.attributeQuery('jointOrient', node=node, exists=1):
+            orients[i] = cmds.getAttr('%s.jointOrient' % node)[0]
+    return mirror.eulerToMatrices(orients, 0)
+
+######################################################################################################################################################
+
+def snap(pairs, frames=None, translate=True, orient=True):
+    '''
+    aligns each node to its target, for pairs of (node, target), as common.align does for each pair in turn.
+    With frames, the nodes are keyed at each of frames instead of being set at the current frame.
+    Returns the number of values written
+    '''
+    if not pairs:
+        return 0
+    nodes = [str(node) for node, target in pairs]
+    targets = [str(target) for node, target in pairs]
+    numFrames = 1 if frames is None else len(frames)
+    ancestors, order = _getHierarchy(nodes)
+    orders = np.array([cmds.getAttr('%s.rotateOrder' % node) or 0 for node in nodes], dtype=int)
+    jointOrients = _getJointOrients(nodes)
+
+    sampled = sampler.sampleMatrices(['%s.worldMatrix[0]' % n for n in targets + nodes] + ['%s.parentMatrix[0]' % n for n in nodes], frames)
+    targetWorld, nodeWorld, nodeParent = np.split(sampled.reshape(numFrames, -1, 4, 4), 3, axis=1)
+    trsPlugs = ['%s.%s' % (node, attr) for node in nodes for attr in mirror.TRS_ATTRS]
+    current = sampler.sampleValues(trsPlugs, frames).reshape(numFrames, -1, 9)
+
+    aligned = targetWorld.copy()
+    if not translate:
+        aligned[..., 3, :3] = nodeWorld[..., 3, :3]
+    if not orient:
+        aligned[..., :3, :3] = nodeWorld[..., :3, :3]
+
+    channels = current.copy()
+    newWorld = nodeWorld.copy()
+    for i in order:
+        parent = nodeParent[:, i]
+        a = ancestors[i]
+        if a >= 0:
+            # whatever lies between the node and its snapped ancestor moves with the ancestor
+            offset = np.matmul(nodeParent[:, i], np.linalg.inv(nodeWorld[:, a]))
+            parent = np.matmul(offset, newWorld[:, a])
+        local = np.matmul(aligned[:, i], np.linalg.inv(parent))
+        local[:, :3, :3] = np.matmul(local[:, :3, :3], jointOrients[i].T)
+        channels[:, i] = mirror.decomposeMatrices(local, orders[i], near=current[:, i])
+        # scale is kept, so the node's new world matrix comes from its channels rather than from the target
+        channels[:, i, 6:9] = current[:, i, 6:9]
+        local = mirror.composeMatrices(channels[:, i], orders[i])
+        local[:, :3, :3] = np.matmul(local[:, :3, :3], jointOrients[i])
+        newWorld[:, i] = np.matmul(local, parent)
+
+    attrs = (mirror.TRANSLATE if translate else []) + (mirror.ROTATE if orient else [])
+    columns = [i * 9 + mirror.TRS_ATTRS.index(attr) for i, node in enumerate(nodes) for attr in attrs
+               if cmds.getAttr('%s.%s' % (node, attr), settable=1)]
+    plugs = [trsPlugs[c] for c in columns]
+    values = channels.reshape(numFrames, -1)[:, columns]
+    if frames is None:
+        pose.writeValues(plugs, values[0])
+    else:
+        pose.writeKeys(plugs, frames, values)
+    return values.size
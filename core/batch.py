@@ -0,0 +1,192 @@
+# Deferred graph edits.
+# A GraphBatch queues createNode / connectAttr / setAttr calls and applies them all at once when flushed.
+# With undo switched off the queue goes through a single MDGModifier (plus an MDagModifier for any DAG nodes). Otherwise it is replayed through maya.cmds inside one undo chunk
+# so that the whole batch is a single undoable step.
+# The queue itself is plain python and can be inspected without Maya - see GraphBatch.ops and GraphBatch.describe()
+import re
+import maya.cmds as cmds
+import maya.OpenMaya as om
+
+class GraphBatch(object):
+    '''
+    Queue of DG edits with the same call signatures as maya.cmds.
+    createNode returns the name the node will have once flushed, so it can be used to build plug names straight away.
+    Nothing in the queue exists in the scene until flush() is called - don't query queued nodes before then.
+    '''
+    def __init__(self, useApi=None):
+        self.ops = []
+        self.reserved = set()
+        self.useApi = useApi
+        self.modifier = None
+        self.dagModifier = None
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.flush()
+
+    def uniqueName(self, name):
+        '''
+        returns name, or name with its trailing number incremented until it clashes with neither the scene nor the queue
+        '''
+        if name not in self.reserved and not cmds.objExists(name):
+            return name
+        match = re.match(r'^(.*?)(\d*)$', name)
+        base, digits = match.group(1), match.group(2)
+        index = int(digits) + 1 if digits else 1
+        while '%s%s' % (base, index) in self.reserved or cmds.objExists('%s%s' % (base, index)):
+            index += 1
+        return '%s%s' % (base, index)
+
+    def createNode(self, nodeType, name=None, n=None, parent=None, p=None):
+        '''
+        queues a node. Shapes and other DAG nodes, apart from transforms, must be given a parent - which may itself be queued
+        '''
+        name = self.uniqueName(name or n or '%s1' % nodeType)
+        self.reserved.add(name)
+        self.ops.append(('createNode', nodeType, name, parent or p))
+        return name
+
+    def connectAttr(self, src, dst, force=False, f=False):
+        self.ops.append(('connectAttr', str(src), str(dst), force or f))
+
+    def setAttr(self, plug, *values):
+        self.ops.append(('setAttr', str(plug), values))
+
+    def describe(self):
+        '''
+        returns the queue as a list of MEL style strings
+        '''
+        lines = []
+        for op in self.ops:
+            if op[0] == 'createNode':
+                lines.append('createNode %s -n "%s"%s;' % (op[1], op[2], ' -p "%s"' % op[3] if op[3] else ''))
+            elif op[0] == 'connectAttr':
+                lines.append('connectAttr %s"%s" "%s";' % ('-f ' if op[3] else '', op[1], op[2]))
+            else:
+                lines.append('setAttr "%s" %s;' % (op[1], ' '.join(str(v) for v in op[2])))
+        return lines
+
+    ##################################################################################################################################################
+    def flush(self):
+        '''
+        applies and clears the queue
+        '''
+        if not self.ops:
+            return
+        useApi = self.useApi
+        if useApi is None:
+            useApi = hasattr(om, 'MDGModifier') and not cmds.undoInfo(q=1, state=1)
+        if useApi:
+            self.flushApi()
+        else:
+            self.flushCmds()
+        self.ops = []
+        self.reserved = set()
+
+    def flushCmds(self):
+        cmds.undoInfo(openChunk=1)
+        try:
+            for op in self.ops:
+                if op[0] == 'createNode' and op[3]:
+                    cmds.createNode(op[1], name=op[2], parent=op[3])
+                elif op[0] == 'createNode':
+                    cmds.createNode(op[1], name=op[2])
+                elif op[0] == 'connectAttr':
+                    cmds.connectAttr(op[1], op[2], force=op[3])
+                else:
+                    cmds.setAttr(op[1], *op[2])
+        finally:
+            cmds.undoInfo(closeChunk=1)
+
+    def flushApi(self):
+        '''
+        applies the queue through a single MDGModifier. Nodes are created by a first doIt so that plugs on them can be found by name
+        for the connections and values, which are applied by a second doIt on the same modifier. undo() reverts both.
+        Transforms and parented nodes are created by an MDagModifier, as MDGModifier can't make DAG nodes.
+        '''
+        mod = om.MDGModifier()
+        dagMod = om.MDagModifier()
+        created = []
+        objects = {}
+        for op in self.ops:
+            if op[0] != 'createNode':
+                continue
+            if op[3] or op[1] == 'transform':
+                parent = objects.get(op[3]) if op[3] else om.MObject.kNullObj
+                if parent is None:
+                    parent = getNode(op[3])
+                obj = dagMod.createNode(op[1], parent)
+                dagMod.renameNode(obj, op[2])
+            else:
+                obj = mod.createNode(op[1])
+                mod.renameNode(obj, op[2])
+            objects[op[2]] = obj
+            created.append((obj, op[2]))
+        dagMod.doIt()
+        mod.doIt()
+        self.dagModifier = dagMod
+        for obj, name in created:
+            if om.MFnDependencyNode(obj).name() != name:
+                raise RuntimeError('Batched node was renamed on creation: %s' % name)
+
+        for op in self.ops:
+            if op[0] == 'connectAttr':
+                dst = getPlug(op[2])
+                if op[3]:
+                    sources = om.MPlugArray()
+                    if dst.connectedTo(sources, 1, 0):
+                        mod.disconnect(sources[0], dst)
+                mod.connect(getPlug(op[1]), dst)
+            elif op[0] == 'setAttr':
+                plug = getPlug(op[1])
+                values = op[2]
+                if len(values) == 1:
+                    setPlugValue(mod, plug, values[0])
+                else:
+                    for i, value in enumerate(values):
+                        setPlugValue(mod, plug.child(i), value)
+        mod.doIt()
+        self.modifier = mod
+
+    def undo(self):
+        '''
+        reverts the last api flush
+        '''
+        if self.modifier:
+            self.modifier.undoIt()
+            self.modifier = None
+        if self.dagModifier:
+            self.dagModifier.undoIt()
+            self.dagModifier = None
+
+######################################################################################################################################################
+
+def getNode(name):
+    sel = om.MSelectionList()
+    sel.add(name)
+    obj = om.MObject()
+    sel.getDependNode(0, obj)
+    return obj
+
+def getPlug(name):
+    sel = om.MSelectionList()
+    sel.add(name)
+    plug = om.MPlug()
+    sel.getPlug(0, plug)
+    return plug
+
+def setPlugValue(mod, plug, value):
+    if isinstance(value, bool):
+        mod.newPlugValueBool(plug, value)
+    elif isinstance(value, (int, long)):
+        mod.newPlugValueInt(plug, value)
+    elif isinstance(value, float):
+        mod.newPlugValueDouble(plug, value)
+    else:
+        mod.newPlugValueString(plug, str(value))
@@ -0,0 +1,178 @@
+# Bounding volume hierarchy over triangles for batched closest point queries.
+# No Maya imports - vertices and triangles are read by the caller (see rooftops.systems.rivet) so this can be tested outside of Maya.
+# The tree is built once per mesh. Queries walk it for all points at once - each pass handles every (point, node) pair still in play.
+import numpy as np
+
+def _dot(a, b):
+    return (a * b).sum(axis=-1)
+
+def closestOnTriangles(points, a, b, c):
+    '''
+    returns (positions, barycentrics) of the closest point on each triangle abc to the corresponding point.
+    All arguments are (n, 3) arrays. Barycentrics are (n, 3) weights for a, b and c. Regions are resolved as in Ericson's
+    Real-Time Collision Detection - vertices, then edges, then the face
+    '''
+    ab, ac = b - a, c - a
+    ap, bp, cp = points - a, points - b, points - c
+    d1, d2 = _dot(ab, ap), _dot(ac, ap)
+    d3, d4 = _dot(ab, bp), _dot(ac, bp)
+    d5, d6 = _dot(ab, cp), _dot(ac, cp)
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+
+    def ratio(num, denom):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(denom != 0.0, num / denom, 0.0)
+
+    total = va + vb + vc
+    v, w = ratio(vb, total), ratio(vc, total)
+    bary = np.stack([1.0 - v - w, v, w], axis=1)
+
+    zero, one = np.zeros_like(d1), np.ones_like(d1)
+    tAB = ratio(d1, d1 - d3)
+    tAC = ratio(d2, d2 - d6)
+    tBC = ratio(d4 - d3, (d4 - d3) + (d5 - d6))
+    regions = [
+               ((d1 <= 0.0) & (d2 <= 0.0), (one, zero, zero)),
+               ((d3 >= 0.0) & (d4 <= d3), (zero, one, zero)),
+               ((vc <= 0.0) & (d1 >= 0.0) & (d3 <= 0.0), (1.0 - tAB, tAB, zero)),
+               ((d6 >= 0.0) & (d5 <= d6), (zero, zero, one)),
+               ((vb <= 0.0) & (d2 >= 0.0) & (d6 <= 0.0), (1.0 - tAC, zero, tAC)),
+               ((va <= 0.0) & (d4 - d3 >= 0.0) & (d5 - d6 >= 0.0), (zero, 1.0 - tBC, tBC)),
+               ]
+    done = np.zeros(len(points), dtype=bool)
+    for mask, weights in regions:
+        mask = mask & ~done
+        if mask.any():
+            bary[mask] = np.stack(weights, axis=1)[mask]
+        done |= mask
+
+    positions = a * bary[:, 0:1] + b * bary[:, 1:2] + c * bary[:, 2:3]
+    return positions, bary
+
+def boxDistances(points, mins, maxs):
+    '''
+    returns the squared distance from each point to the corresponding axis aligned box - 0 inside the box
+    '''
+    gap = np.maximum(mins - points, 0.0) + np.maximum(points - maxs, 0.0)
+    return _dot(gap, gap)
+
+######################################################################################################################################################
+
+class TriangleBVH(object):
+    '''
+    Median split bounding volume hierarchy over the triangles of a mesh.
+    vertices is an (n, 3) array of positions, triangles an (m, 3) array of vertex indices
+    '''
+    def __init__(self, vertices, triangles, leafSize=8):
+        self.vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+        self.triangles = np.asarray(triangles, dtype=int).reshape(-1, 3)
+        self.corners = self.vertices[self.triangles]
+        self.leafSize = leafSize
+        self.build()
+
+    def build(self):
+        '''
+        builds the node arrays. Each node covers order[start:start + count]. Leaves have a count, internal nodes have left / right children
+        '''
+        corners = self.corners
+        triMins, triMaxs = corners.min(axis=1), corners.max(axis=1)
+        centroids = corners.mean(axis=1)
+        self.order = np.arange(len(corners))
+
+        mins, maxs, left, right, start, count = [], [], [], [], [], []
+        stack = [(0, len(corners), -1, 0)]
+        while stack:
+            first, last, parent, side = stack.pop()
+            index = len(mins)
+            tris = self.order[first:last]
+            mins.append(triMins[tris].min(axis=0))
+            maxs.append(triMaxs[tris].max(axis=0))
+            left.append(-1)
+            right.append(-1)
+            start.append(first)
+            count.append(last - first)
+            if parent != -1:
+                (left if side == 0 else right)[parent] = index
+            if last - first <= self.leafSize:
+                continue
+            # split on the longest axis of the centroids at the median
+            c = centroids[tris]
+            axis = (c.max(axis=0) - c.min(axis=0)).argmax()
+            half = (last - first) // 2
+            self.order[first:last] = tris[np.argpartition(c[:, axis], half)]
+            count[index] = 0
+            stack.append((first + half, last, index, 1))
+            stack.append((first, first + half, index, 0))
+
+        self.mins, self.maxs = np.array(mins), np.array(maxs)
+        self.left, self.right = np.array(left), np.array(right)
+        self.start, self.count = np.array(start), np.array(count)
+
+    def _testLeaves(self, pointIndex, nodes, points, best):
+        '''
+        tests every triangle of each leaf node against its point and updates best where closer
+        '''
+        counts = self.count[nodes]
+        owner = np.repeat(np.arange(len(nodes)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        tris = self.order[self.start[nodes][owner] + offsets]
+        pids = pointIndex[owner]
+        corners = self.corners[tris]
+        positions, bary = closestOnTriangles(points[pids], corners[:, 0], corners[:, 1], corners[:, 2])
+        dist = _dot(positions - points[pids], positions - points[pids])
+
+        # closest triangle per point, then keep it if it beats the current best
+        order = np.lexsort((dist, pids))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = pids[order][1:] != pids[order][:-1]
+        order = order[first]
+        better = dist[order] < best['dist'][pids[order]]
+        order = order[better]
+        target = pids[order]
+        best['dist'][target] = dist[order]
+        best['tri'][target] = tris[order]
+        best['bary'][target] = bary[order]
+        best['pos'][target] = positions[order]
+
+    def closestPoints(self, points):
+        '''
+        returns (triangles, barycentrics, positions, distances) for the closest point on the mesh to each of points
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        num = len(points)
+        best = {'dist':np.full(num, np.inf), 'tri':np.zeros(num, dtype=int), 'bary':np.zeros((num, 3)), 'pos':np.zeros((num, 3))}
+        allPoints = np.arange(num)
+
+        # Seed each point's bound by descending greedily to the nearest leaf
+        nodes = np.zeros(num, dtype=int)
+        inner = self.count[nodes] == 0
+        while inner.any():
+            l, r = self.left[nodes[inner]], self.right[nodes[inner]]
+            p = points[inner]
+            nearLeft = boxDistances(p, self.mins[l], self.maxs[l]) <= boxDistances(p, self.mins[r], self.maxs[r])
+            nodes[inner] = np.where(nearLeft, l, r)
+            inner = self.count[nodes] == 0
+        self._testLeaves(allPoints, nodes, points, best)
+        seeded = nodes
+
+        # Walk the tree for all points together, culling nodes that can't beat the current bound
+        pointIndex, nodes = allPoints, np.zeros(num, dtype=int)
+        while len(nodes):
+            keep = boxDistances(points[pointIndex], self.mins[nodes], self.maxs[nodes]) < best['dist'][pointIndex]
+            pointIndex, nodes = pointIndex[keep], nodes[keep]
+            leaf = self.count[nodes] > 0
+            test = leaf & (nodes != seeded[pointIndex])
+            if test.any():
+                self._testLeaves(pointIndex[test], nodes[test], points, best)
+            inner = ~leaf
+            pointIndex = np.concatenate([pointIndex[inner], pointIndex[inner]])
+            nodes = np.concatenate([self.left[nodes[inner]], self.right[nodes[inner]]])
+
+        return best['tri'], best['bary'], best['pos'], np.sqrt(best['dist'])
+
+    def interpolate(self, values, triangles, barycentrics):
+        '''
+        returns values interpolated across triangles. values is an (m, 3, k) array holding k values for each corner of every triangle
+        '''
+        values = np.asarray(values, dtype=float)
+        return (values[triangles] * barycentrics[:, :, None]).sum(axis=1)
@@ -5,6 +5,7 @@ import maya.OpenMaya as om
 import os, math
 import math as math
 import pymel.core as pmc
+from rooftops.core import geometry
 
 
 # Functions
@@ -91,21 +92,11 @@ def pointsAlongVector( start='', end='', divisions=2 ):
     if not startPos or not endPos:
         return showDialog( 'Argument Error', 'Cannot determine start and end points' )
         
-    startVec = om.MVector(startPos[0], startPos[1], startPos[2])
-    endVec = om.MVector(endPos[0], endPos[1], endPos[2])
-    newVec = endVec - startVec
-    segLength = newVec.length() / divisions
-    newVec.normalize()
+    points = [tuple(p) for p in geometry.pointsAlongVectors(startPos, endPos, divisions)[0].tolist()]
     
-    points = []
-    
-    points.append(tuple(startPos))
-
-    for p in range( 1, divisions ):
-        point = newVec * segLength * p + startVec
-        points.append((point.x, point.y, point.z))
-        
-    points.append(tuple(endPos))
+    # keep the supplied start and end exactly as they were passed in
+    points[0] = tuple(startPos)
+    points[-1] = tuple(endPos)
     
     return points
 
@@ -151,7 +142,6 @@ def align( node=None, target=None, translate=True, orient=True, scale=False ):
             return showDialog( 'Argument Error', 'Cannot determine nodes to align' )
 
     targetMatrix = cmds.xform( target, q=True, ws=1, matrix=True )
-    nodeMatrix = cmds.xform( node, q=True, ws=1, matrix=True )
     
     nodeScale = cmds.getAttr(node+'.scale')[0]
     
@@ -159,10 +149,12 @@ def align( node=None, target=None, translate=True, orient=True, scale=False ):
         cmds.xform ( node, ws=1, matrix=targetMatrix )
     elif translate:
         # set row4 x y z to row4 of targetMatrix
+        nodeMatrix = cmds.xform( node, q=True, ws=1, matrix=True )
         nodeMatrix[ 12:-1 ] = targetMatrix[ 12:-1 ]
         cmds.xform ( node, ws=1, matrix=nodeMatrix )
     elif orient:
         # set row4 x y z to row4 of nodeMatrix
+        nodeMatrix = cmds.xform( node, q=True, ws=1, matrix=True )
         targetMatrix[ 12:-1 ] = nodeMatrix[ 12:-1 ]
         cmds.xform ( node, ws=1, matrix=targetMatrix )
         
@@ -170,6 +162,85 @@ def align( node=None, target=None, translate=True, orient=True, scale=False ):
         cmds.setAttr(node+'.scale', nodeScale[0], nodeScale[1], nodeScale[2])
         
 ######################################################################################################################################################
+
+def getWorldMatrices( nodes ):
+    '''
+    returns an (n, 16) array of the world matrices of nodes. Each unique node is only queried once
+    
+    '''
+    cache = {}
+    for node in nodes:
+        if node not in cache:
+            cache[node] = cmds.xform( node, q=True, ws=1, matrix=True )
+    return geometry.asMatrices([cache[node] for node in nodes])
+
+######################################################################################################################################################
+
+def setWorldMatrices( nodes, matrices, scales=None ):
+    '''
+    sets the world matrix of each node in nodes as a single undoable step - one xform per node.
+    If scales is supplied, each node's local scale is set back to the corresponding value afterwards. Nodes sharing a scale
+    are set together, with one xform for each distinct scale rather than one setAttr per node
+    
+    '''
+    cmds.undoInfo( openChunk=True )
+    try:
+        for i, node in enumerate(nodes):
+            cmds.xform( node, ws=1, matrix=[float(v) for v in matrices[i]] )
+        if scales is not None:
+            groups = {}
+            for node, nodeScale in zip(nodes, scales):
+                groups.setdefault(tuple(nodeScale), []).append(node)
+            for nodeScale, group in groups.items():
+                cmds.xform( group, scale=nodeScale )
+    finally:
+        cmds.undoInfo( closeChunk=True )
+
+######################################################################################################################################################
+
+def _isBelow( path, parents ):
+    return any(path == parent or path.startswith(parent + '|') for parent in parents)
+
+def alignMany( nodes, targets, translate=True, orient=True, scale=False ):
+    '''
+    aligns each node in nodes to the corresponding node in targets - the same result as calling align for each pair in turn.
+    Snapshots all the matrices it needs up front, computes the aligned matrices in one go and writes them back with
+    setWorldMatrices.
+    Where the order of the aligns matters, the pairs are aligned one at a time instead - if a target sits below one of the
+    nodes being aligned, or if one node sits below another, moving the first would change a matrix snapshotted for a later pair
+    
+    '''
+    if len(nodes) != len(targets):
+        return showDialog( 'Argument Error', 'alignMany needs the same number of nodes and targets' )
+    if not nodes:
+        return
+    
+    # Check whether any target, or any other node, is affected by moving one of the nodes
+    longNames = {}
+    for longName in cmds.ls( list(set(nodes) | set(targets)), long=True ):
+        longNames[longName.split('|')[-1]] = longName
+    nodePaths = [longNames.get(node.split('|')[-1], node) for node in nodes]
+    targetPaths = [longNames.get(target.split('|')[-1], target) for target in targets]
+    ordered = any(_isBelow(path, nodePaths) for path in targetPaths)
+    if not ordered:
+        ordered = any(_isBelow(path, nodePaths[:i] + nodePaths[i+1:]) for i, path in enumerate(nodePaths))
+    if ordered:
+        for i in range(len(nodes)):
+            align( node=nodes[i], target=targets[i], translate=translate, orient=orient, scale=scale )
+        return
+    
+    targetMatrices = getWorldMatrices(targets)
+    nodeMatrices = targetMatrices
+    if not translate or not orient:
+        nodeMatrices = getWorldMatrices(nodes)
+    matrices = geometry.alignedMatrices(nodeMatrices, targetMatrices, translate=translate, orient=orient)
+    
+    scales = None
+    if not scale:
+        scales = [cmds.getAttr(node+'.scale')[0] for node in nodes]
+    setWorldMatrices(nodes, matrices, scales)
+        
+######################################################################################################################################################
         
 def attrCtrl(lock=True, keyable=False, channelBox=False, nodeList=[], attrList=[]):
     '''
@@ -194,23 +265,10 @@ def getDistance( object1, object2 ):
     '''
     Calculates distance between two Transforms using magnitude
     '''
-    def mag(numbers):
-        num = 0
-        for eachNumber in numbers:
-            num += math.pow(eachNumber, 2)
-            
-        mag = math.sqrt(num)
-        return mag
-
-    vector1 = (cmds.xform(object1, query=1, worldSpace=1, translation=1))
-    vector2 = (cmds.xform(object2, query=1, worldSpace=1, translation=1))
-    
-    calc = []
-    calc.append(vector1[0] - vector2[0])
-    calc.append(vector1[1] - vector2[1])
-    calc.append(vector1[2] - vector2[2])
+    vector1 = cmds.xform(object1, query=1, worldSpace=1, translation=1)
+    vector2 = cmds.xform(object2, query=1, worldSpace=1, translation=1)
     
-    return mag(calc)
+    return float(geometry.distances(vector1, vector2)[0])
 
 ######################################################################################################################################################
 
@@ -297,30 +355,12 @@ def placePoleVector(node1=None, node2=None, node3=None, axis='-z', mult=30):
     if not p1 or not p2 or not p3:
         return showDialog( 'Argument Error', 'Cannot determine p1, p2 and p3' )
     
-    # check to see whether the points are in line
-    v1 = om.MVector(p1[0], p1[1], p1[2])
-    v2 = om.MVector(p2[0], p2[1], p2[2])
-    v3 = om.MVector(p3[0], p3[1], p3[2])
-    v4 = v2 - v1
-    v5 = v3 - v1
-    
-    if v4.angle(v5) < 0.00001 or v4.angle(v5) > 3.1415:
-        # Create a matrix from p2
-        p2Matrix = cmds.xform( node2, q=True, matrix=True, ws=True )
-        returnMatrix = om.MMatrix()
-        om.MScriptUtil.createMatrixFromList( p2Matrix, returnMatrix)
-        
-        row = {'x':0, '-x':0, 'y':1, '-y':1, 'z':2, '-z':2}[axis]
-        mult = mult * {'x':1, '-x':-1, 'y':1, '-y':-1, 'z':1, '-z':-1}[axis]
-        
-        rowVec = om.MVector(returnMatrix( row, 0 ), returnMatrix( row, 1 ), returnMatrix( row, 2 ))
-        resultVec = (rowVec * mult) + v2
-        return (resultVec.x, resultVec.y, resultVec.z)
-    else:
-        midPoint = pointsAlongVector( start=p1, end=p3, divisions=2 )[ 1 ]
-        v6 = om.MVector(midPoint[0], midPoint[1], midPoint[2])
-        resultVec = ( (v2 - v6) * mult ) + v6
-        return (resultVec.x, resultVec.y, resultVec.z)
+    # If the points are in line, displace the middle point along axis of node2's world matrix
+    fallback = None
+    if geometry.inLine(p1, p2, p3)[0]:
+        fallback = geometry.axisVectors(cmds.xform( node2, q=True, matrix=True, ws=True ), axis)
+    
+    return tuple(geometry.poleVectors(p1, p2, p3, fallback=fallback, mult=mult)[0].tolist())
     
     
 ######################################################################################################################################################
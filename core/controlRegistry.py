@@ -0,0 +1,217 @@
+# Registry of the controls in a rig, written at build time.
+# Every control made by rooftops.systems.controls is registered as it is created. Builders mark themselves with the system
+# decorator, which records the system and side of the controls they make, and the role of each control is taken from its name.
+# When the outermost builder returns, the controls' keyable values are read as their defaults and the whole system is written to
+# the active rig root in one go, as a json dictionary on its controlRegistry attribute:
+#     {ctrl:{'system':system, 'side':side, 'role':role, 'defaults':{attr:value}}}
+# Nothing is recorded unless a rig root has been set with setRig - builds are unaffected otherwise. The rig root is forgotten
+# when it is deleted, or when a new scene is made or opened.
+# Controls are held by UUID until they are written, so one renamed in between is written, and given its role, under its new name.
+# A builder that raises writes nothing. Reading the controls of a rig back is a single getAttr - findRig resolves the rig root
+# from a node in the rig's hierarchy, such as the top level transform the picker works from.
+#
+# Usage:
+#     metaRig.setActive()
+#     arm.build(*joints, side='lf')
+#     controlRegistry.getControls(controlRegistry.findRig('PAULO'), system='arm', role='fk')
+import inspect, json, functools
+import maya.cmds as cmds
+import maya.OpenMaya as om
+from rooftops.core import registry as rigRegistry
+
+REGISTRY_ATTR = 'controlRegistry'
+SIDES = ['lf', 'rt', 'cn']
+ROLES = ['fk', 'ik', 'bend', 'settings', 'twist', 'pole', 'tweak']
+
+_rig = None
+_scopes = []
+_callbacks = []
+
+def setRig(root):
+    '''
+    sets the node that controls are registered to. Pass None to stop registering. Returns the previous rig root
+    '''
+    global _rig
+    previous = _rig
+    _rig = str(root) if root else None
+    if _rig:
+        watchScene()
+    return previous
+
+def getRig():
+    '''
+    returns the rig root controls are registered to, or None. A rig root which no longer exists is forgotten
+    '''
+    if _rig and not cmds.objExists(_rig):
+        setRig(None)
+    return _rig
+
+def clearRig(*args):
+    setRig(None)
+
+def watchScene():
+    '''
+    installs the callbacks that forget the rig root when a new scene is made or opened, if they aren't installed already
+    '''
+    if _callbacks:
+        return
+    for message in [om.MSceneMessage.kAfterNew, om.MSceneMessage.kAfterOpen]:
+        _callbacks.append(om.MSceneMessage.addCallback(message, clearRig))
+
+def unwatchScene():
+    for callback in _callbacks:
+        om.MMessage.removeCallback(callback)
+    del _callbacks[:]
+
+def getRole(ctrl):
+    '''
+    returns the role of ctrl from the tokens of its name, eg. lf_upArm_fk_ctrl is 'fk'. Controls with no role token are 'main'
+    '''
+    tokens = str(ctrl).split('|')[-1].split(':')[-1].split('_')
+    for token in tokens:
+        if token in ROLES:
+            return token
+    return 'main'
+
+def _getSide(callArgs):
+    if callArgs.get('side'):
+        return callArgs['side']
+    for arg in ['prefix', 'name']:
+        token = str(callArgs.get(arg) or '').split('_')[0]
+        if token in SIDES:
+            return token
+    return 'cn'
+
+def system(name):
+    '''
+    decorator for a build function - controls created while it runs are registered to system name, with the side the builder
+    was called with. Builders called by other builders register to their own system, and everything is written when the outermost returns
+    '''
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not getRig():
+                return fn(*args, **kwargs)
+            _scopes.append({'system':name, 'side':_getSide(inspect.getcallargs(fn, *args, **kwargs)), 'controls':[]})
+            try:
+                result = fn(*args, **kwargs)
+            except:
+                # a failed build leaves nothing in the registry
+                _scopes.pop()
+                raise
+            scope = _scopes.pop()
+            if _scopes:
+                _scopes[-1]['controls'].extend(scope['controls'])
+            elif getRig():
+                write(_rig, scope['controls'])
+            return result
+        return wrapper
+    return decorator
+
+def register(ctrl, role=None):
+    '''
+    records ctrl in the current build. Called by the functions in rooftops.systems.controls as each control is created.
+    Outside of a builder, ctrl is written to the rig straight away
+    '''
+    if not getRig():
+        return
+    scope = _scopes[-1] if _scopes else {'system':None, 'side':'cn'}
+    entry = ((cmds.ls(str(ctrl), uuid=1) or [str(ctrl)])[0], {'system':scope['system'], 'side':scope['side'], 'role':role})
+    if _scopes:
+        scope['controls'].append(entry)
+    else:
+        write(_rig, [entry])
+
+def getDefaults(ctrl):
+    '''
+    returns {attr:value} for the unlocked keyable attributes of ctrl
+    '''
+    defaults = {}
+    for attr in cmds.listAttr(ctrl, keyable=1, unlocked=1) or []:
+        value = cmds.getAttr('%s.%s' % (ctrl, attr))
+        if isinstance(value, (int, float, bool)):
+            defaults[attr] = value
+    return defaults
+
+######################################################################################################################################################
+
+def read(root):
+    '''
+    returns the registry stored on root - {} if there isn't one
+    '''
+    if not cmds.attributeQuery(REGISTRY_ATTR, node=root, exists=1):
+        return {}
+    return json.loads(cmds.getAttr('%s.%s' % (root, REGISTRY_ATTR)) or '{}')
+
+def findRig(node):
+    '''
+    returns the node holding the registry for the rig node belongs to, or None if the rig has none.
+    That is node itself if it holds a registry, the MetaRig its metaRoot connection leads to, or otherwise the MetaRig in
+    node's namespace with registered controls under node in the DAG
+    '''
+    if not node or not cmds.objExists(node):
+        return None
+    if cmds.attributeQuery(REGISTRY_ATTR, node=node, exists=1):
+        return node
+    if cmds.attributeQuery('metaRoot', node=node, exists=1):
+        for rig in cmds.listConnections('%s.metaRoot' % node, source=1, destination=0) or []:
+            if cmds.attributeQuery(REGISTRY_ATTR, node=rig, exists=1):
+                return rig
+    path = (cmds.ls(node, long=1) or [''])[0]
+    namespace = str(node).rpartition(':')[0]
+    for rig in rigRegistry.getSceneRigs():
+        if rig.rpartition(':')[0] != namespace or not cmds.attributeQuery(REGISTRY_ATTR, node=rig, exists=1):
+            continue
+        for ctrl in getControls(rig):
+            ctrlPath = (cmds.ls(ctrl, long=1) or [''])[0]
+            if ctrlPath:
+                if ctrlPath.startswith(path + '|'):
+                    return rig
+                # every control of a rig sits under the same root, so one is enough to rule the rig out
+                break
+    return None
+
+def write(root, entries):
+    '''
+    adds entries, a list of (ctrl, {'system', 'side', 'role'}), to the registry on root. ctrl is a name or UUID, and controls
+    are written under their current names. A role of None is taken from the name. The current values of each ctrl's keyable
+    attributes are stored as its defaults
+    '''
+    if not entries:
+        return
+    registry = read(root)
+    for ctrl, data in entries:
+        ctrl = (cmds.ls(str(ctrl)) or [None])[0]
+        if not ctrl:
+            continue
+        data = dict(data)
+        data['role'] = data.get('role') or getRole(ctrl)
+        data['defaults'] = getDefaults(ctrl)
+        registry[ctrl] = data
+    if not cmds.attributeQuery(REGISTRY_ATTR, node=root, exists=1):
+        cmds.addAttr(root, ln=REGISTRY_ATTR, dt='string')
+    cmds.setAttr('%s.%s' % (root, REGISTRY_ATTR), json.dumps(registry, sort_keys=True), type='string')
+
+def getControls(root, system=None, side=None, role=None):
+    '''
+    returns the names of the controls registered on root, filtered by system, side and role if they are given.
+    If root is in a namespace, so are the controls
+    '''
+    namespace = str(root).rpartition(':')[0]
+    controls = []
+    for ctrl, data in sorted(read(root).items()):
+        if system and data['system'] != system:
+            continue
+        if side and data['side'] != side:
+            continue
+        if role and data['role'] != role:
+            continue
+        controls.append('%s:%s' % (namespace, ctrl) if namespace else ctrl)
+    return controls
+
+def getControlDefaults(root):
+    '''
+    returns {ctrl:{attr:value}} for every control registered on root, namespaced as for getControls
+    '''
+    namespace = str(root).rpartition(':')[0]
+    return dict((('%s:%s' % (namespace, ctrl) if namespace else ctrl), data['defaults']) for ctrl, data in read(root).items())
@@ -0,0 +1,120 @@
+# Vectorised placement maths.
+# Every function takes sequences of points (anything numpy can turn into an (n, 3) array) and works on all of them at once.
+# No Maya imports - positions are gathered by the caller, so this module can be tested and benchmarked outside of Maya.
+import numpy as np
+
+AXIS_ROWS = {'x':(0, 1.0), '-x':(0, -1.0), 'y':(1, 1.0), '-y':(1, -1.0), 'z':(2, 1.0), '-z':(2, -1.0)}
+
+def asPoints(points):
+    '''
+    returns points as a float (n, 3) array. A single point is returned as a (1, 3) array
+    '''
+    return np.asarray(points, dtype=float).reshape(-1, 3)
+
+######################################################################################################################################################
+
+def pointsAlongVectors(starts, ends, divisions=2):
+    '''
+    returns an (n, divisions + 1, 3) array of evenly spaced points from each start to the corresponding end.
+    divisions = 2 gives [start, midpoint, end] for each pair
+    '''
+    starts, ends = asPoints(starts), asPoints(ends)
+    steps = np.linspace(0.0, 1.0, divisions + 1)
+    return starts[:, None, :] + (ends - starts)[:, None, :] * steps[None, :, None]
+
+######################################################################################################################################################
+
+def distances(a, b):
+    '''
+    returns the distance between each point in a and the corresponding point in b
+    '''
+    return np.linalg.norm(asPoints(a) - asPoints(b), axis=1)
+
+def distanceMatrix(a, b):
+    '''
+    returns an (n, m) array of distances from every point in a to every point in b
+    '''
+    a, b = asPoints(a), asPoints(b)
+    return np.linalg.norm(a[:, None, :] - b[None, :, :], axis=2)
+
+def coincident(a, b, tolerance=0.01):
+    '''
+    returns a bool array - True where a point in a lies within tolerance of the corresponding point in b
+    '''
+    return distances(a, b) <= tolerance
+
+######################################################################################################################################################
+
+def angles(v1, v2):
+    '''
+    returns the angle in radians between corresponding vectors. Zero length vectors give an angle of 0 - as MVector.angle does
+    '''
+    v1, v2 = asPoints(v1), asPoints(v2)
+    lengths = np.linalg.norm(v1, axis=1) * np.linalg.norm(v2, axis=1)
+    dots = np.einsum('ij,ij->i', v1, v2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosines = np.where(lengths > 0.0, dots / lengths, 1.0)
+    return np.arccos(np.clip(cosines, -1.0, 1.0))
+
+def inLine(p1, p2, p3, tolerance=0.00001):
+    '''
+    returns a bool array - True where the three points of a chain lie on a straight line
+    '''
+    p1 = asPoints(p1)
+    a = angles(asPoints(p2) - p1, asPoints(p3) - p1)
+    return (a < tolerance) | (a > 3.1415)
+
+def axisVectors(matrices, axis='-z'):
+    '''
+    returns the row of each flat 16 float world matrix that corresponds to axis, negated for negative axes
+    '''
+    row, sign = AXIS_ROWS[axis]
+    matrices = np.asarray(matrices, dtype=float).reshape(-1, 16)
+    return matrices[:, row * 4:row * 4 + 3] * sign
+
+def poleVectors(p1, p2, p3, fallback=None, mult=30):
+    '''
+    returns an (n, 3) array of pole vector positions for n three point chains.
+    Each position lies on the plane of its chain, pushed out from the midpoint of p1 and p3 through p2 by mult.
+    Where a chain is in line, the position is p2 moved mult along the corresponding fallback vector - see axisVectors.
+    '''
+    p1, p2, p3 = asPoints(p1), asPoints(p2), asPoints(p3)
+    mid = (p1 + p3) * 0.5
+    result = (p2 - mid) * mult + mid
+    straight = inLine(p1, p2, p3)
+    if straight.any():
+        if fallback is None:
+            raise ValueError('Chains are in line - a fallback vector is required')
+        fallback = asPoints(fallback)
+        if len(fallback) == 1:
+            fallback = np.repeat(fallback, len(p1), axis=0)
+        result[straight] = p2[straight] + fallback[straight] * mult
+    return result
+
+######################################################################################################################################################
+
+def asMatrices(matrices):
+    '''
+    returns matrices as a float (n, 16) array of flat, row major world matrices
+    '''
+    return np.asarray(matrices, dtype=float).reshape(-1, 16)
+
+def alignedMatrices(nodeMatrices, targetMatrices, translate=True, orient=True):
+    '''
+    returns the world matrices that align each node to its target, as common.align does:
+        translate and orient - the target matrix
+        translate only - the node matrix with the target's position
+        orient only - the target matrix with the node's position
+    '''
+    nodeMatrices, targetMatrices = asMatrices(nodeMatrices), asMatrices(targetMatrices)
+    if translate and orient:
+        return targetMatrices.copy()
+    if translate:
+        result = nodeMatrices.copy()
+        result[:, 12:15] = targetMatrices[:, 12:15]
+    elif orient:
+        result = targetMatrices.copy()
+        result[:, 12:15] = nodeMatrices[:, 12:15]
+    else:
+        result = nodeMatrices.copy()
+    return result
@@ -1,4 +1,5 @@
 import maya.cmds as cmds
+import maya.OpenMaya as om
 import maya.OpenMayaUI as omui
 from PySide import QtCore, QtGui
 from shiboken import wrapInstance
@@ -7,10 +8,16 @@ def maya_main_window():
     main_window_ptr = omui.MQtUtil.mainWindow()
     return wrapInstance(long(main_window_ptr), QtGui.QWidget)
 import json
+from rooftops.core import registry, controlRegistry, bake
 
 # Colours for buttons on gui - default values: right-red, centre-green, left-blue
 colourList=[[0,255,0], [0,0,255], [255,0,0]]
 
+# Attributes whose values are held in the MetaRig index. Setting one refreshes just that node's entry
+INDEX_VALUE_ATTRS = set(['side', 'metaType', 'buttonPos', 'buttonPosX', 'buttonPosY', 'buttonSize', 'buttonSizeX', 'buttonSizeY'])
+# Connections to these attributes don't change the index. They invalidate the getAllMetaChildren cache instead
+INDEX_IGNORED_ATTRS = set(['metaParent', 'metaChildren'])
+
 ######################################################################################################################################################
 
 def align( node=None, target=None, translate=True, orient=True ):
@@ -106,6 +113,9 @@ def parentConnect(parent=None, child=None):
     # Connect new parent
     messageConnect(fromNode=parent, toNode=child, fromName='message', toName='metaParent')
     
+    # The new and old parents, and all their ancestors, have changed descendants
+    invalidateMetaChildren(parent, *(oldParent or []))
+    
 def getMetaChildren(node=None):
     '''
     returns a list of all metaChildren of Node
@@ -122,32 +132,120 @@ def getMetaChildren(node=None):
         
     return metaChildren
 
+# Descendants of each meta node found by getAllMetaChildren, keyed by node - (ordered list, set)
+# The cache is kept in step with the scene by callbacks, installed the first time it is used:
+#     node removed / renamed      - the node and every cached ancestor of it are dropped
+#     open / new / import / reference load and unload, undo / redo - the whole cache is cleared
+_metaChildrenCache = {}
+_metaChildrenCallbacks = []
+
+def watchMetaChildren():
+    '''
+    installs the callbacks that keep the getAllMetaChildren cache current, if they aren't installed already
+    '''
+    if _metaChildrenCallbacks:
+        return
+    _metaChildrenCallbacks.append(om.MDGMessage.addNodeRemovedCallback(_metaNodeRemoved, 'dependNode'))
+    _metaChildrenCallbacks.append(om.MNodeMessage.addNameChangedCallback(om.MObject(), _metaNodeRenamed))
+    for message in [om.MSceneMessage.kAfterOpen, om.MSceneMessage.kAfterNew, om.MSceneMessage.kAfterImport,
+                    om.MSceneMessage.kAfterLoadReference, om.MSceneMessage.kAfterUnloadReference,
+                    om.MSceneMessage.kAfterCreateReference, om.MSceneMessage.kAfterRemoveReference]:
+        _metaChildrenCallbacks.append(om.MSceneMessage.addCallback(message, _metaSceneChanged))
+    for event in ['Undo', 'Redo']:
+        _metaChildrenCallbacks.append(om.MEventMessage.addEventCallback(event, _metaSceneChanged))
+
+def unwatchMetaChildren():
+    '''
+    removes the getAllMetaChildren cache callbacks and clears the cache
+    '''
+    for callback in _metaChildrenCallbacks:
+        om.MMessage.removeCallback(callback)
+    del _metaChildrenCallbacks[:]
+    _metaChildrenCache.clear()
+
+def _metaNodeRemoved(node, clientData):
+    if _metaChildrenCache:
+        invalidateMetaChildren(om.MFnDependencyNode(node).name())
+
+def _metaNodeRenamed(node, previousName, clientData):
+    if _metaChildrenCache and previousName:
+        invalidateMetaChildren(previousName)
+
+def _metaSceneChanged(clientData):
+    _metaChildrenCache.clear()
+
+def invalidateMetaChildren(*nodes):
+    '''
+    removes nodes and every cached ancestor of them from the getAllMetaChildren cache. With no nodes the whole cache is cleared
+    '''
+    if not nodes:
+        _metaChildrenCache.clear()
+        return
+    nodes = set(str(node) for node in nodes)
+    for key in list(_metaChildrenCache):
+        if key in nodes or _metaChildrenCache[key][1] & nodes:
+            del _metaChildrenCache[key]
+
 def getAllMetaChildren(node=None):
     '''
     returns a list of all metaDescendents of Node
+    The hierarchy is walked breadth first - one listConnections per generation - and is safe against cycles.
+    Descendants of every node visited are cached until they are invalidated - see watchMetaChildren
     
     '''
     if not node and len(cmds.ls(sl=1)) == 1:
-        node = cmds.ls(sl=1)
+        node = cmds.ls(sl=1)[0]
     if not node:
         return 'Please supply a node whose descendents you wish to list'
+    node = str(node)
+    
+    watchMetaChildren()
+    if node in _metaChildrenCache:
+        return list(_metaChildrenCache[node][0])
     
     metaChildren = []
+    seen = set([node])
+    children = {node:[]}
+    tree = True
+    frontier = [node]
+    while frontier:
+        query = [n for n in frontier if n not in _metaChildrenCache or n == node]
+        pairs = cmds.listConnections(['%s.metaChildren' % n for n in query], source=1, destination=0, connections=1) or []
+        nextFrontier = []
+        # cached subtrees are added whole rather than queried
+        for n in frontier:
+            if n in _metaChildrenCache and n != node:
+                for child in _metaChildrenCache[n][0]:
+                    if child in seen:
+                        tree = False
+                    else:
+                        seen.add(child)
+                        metaChildren.append(child)
+        for plug, child in zip(pairs[::2], pairs[1::2]):
+            if child in seen:
+                tree = False
+                continue
+            seen.add(child)
+            metaChildren.append(child)
+            children.setdefault(plug.split('.')[0], []).append(child)
+            children[child] = []
+            nextFrontier.append(child)
+        frontier = nextFrontier
+    
+    # Cache every subtree. If a node was reached twice the walk isn't a tree, so only the result for node itself is kept
+    if tree:
+        for n in reversed([node] + metaChildren):
+            if n not in children or n in _metaChildrenCache:
+                continue
+            descendants = []
+            for child in children[n]:
+                descendants.append(child)
+                descendants.extend(_metaChildrenCache[child][0])
+            _metaChildrenCache[n] = (descendants, set(descendants))
+    else:
+        _metaChildrenCache[node] = (metaChildren, set(metaChildren))
     
-    def __getAllMetaChildrenRecurse__(node):
-        mc = getMetaChildren(node)
-        if mc:
-            for n in mc:
-                print n
-                pass
-                __getAllMetaChildrenRecurse__(n)
-        metaChildren.append(node)
-        
-    mc = getMetaChildren(node)
-    for n in mc:
-        __getAllMetaChildrenRecurse__(n)
-
-    return metaChildren
+    return list(_metaChildrenCache[node][0])
     
 def addDictionaryAttr(node=None, dictName=None):
     '''
@@ -184,19 +282,29 @@ def readDict(dict=None):
 class MetaRig(object):
     '''
     Main meta class
+    The rig's index is read once and kept until the rig itself changes it, or invalidate is called.
+    A live rig - as used by the picker - also installs callbacks that keep the index in step with edits made elsewhere.
+    They stay in place until close is called
     
     '''
-    def __init__(self, name='Rig1', fromNode=None):
+    def __init__(self, name='Rig1', fromNode=None, live=False):
         self.name=name
+        self.live = live
+        self.index = None
+        self.dirty = set()
+        self.callbacks = []
         self.build(fromNode)
         
     def build(self, fromNode):
         if fromNode:
             self.root = fromNode
-            self.systems=cmds.listAttr(fromNode, category='metaSystem')
+            self.systems=cmds.listAttr(fromNode, category='metaSystem') or []
         else:
             self.root = cmds.createNode('network', name=self.name)
             cmds.addAttr(self.root, ln='metaRig', dt="string")
+            registry.registerRig(self.root)
+            # controls built from here on are registered to the new rig
+            self.setActive()
             #messageConnect(fromNode=self.root, toNode=self.root, fromName='message', toName='metaRig')
             self.systems=[]
             
@@ -228,6 +336,8 @@ class MetaRig(object):
         self.addUIAttrs(nw)
         
         self.systems.append(name)
+        self.setActive()
+        self.invalidate()
     
     def getSystemMetaRoot(self, system):
         # Return the network node at the root of the specified system
@@ -239,52 +349,221 @@ class MetaRig(object):
         
     def getMetaRigNodes(self):
         # Returns a list of all nodes connected to the metaRig
-        rigNodes = cmds.listConnections('%s.message' % self.root)
-        if rigNodes:
-            return rigNodes
-        else:
-            return []
+        return list(self.getIndex()['order'])
         
     def getSystemNodes(self, system):
         '''
         returns a list of all rignodes in the given system
         '''
-        systemMetaRoot = self.getSystemMetaRoot(system)
-        systemAttrs = cmds.listAttr(systemMetaRoot, category='metaNode')
-        systemNodes = [cmds.listConnections('%s.%s' % (systemMetaRoot, attr))[0] for attr in systemAttrs]
-        return systemNodes
+        systemData = self.getIndex()['systems'].get(system)
+        if not systemData:
+            return []
+        return list(systemData['nodes'])
     
     def getSystem(self, rigNode):
         '''
         returns the system that the given rigNode belongs to
         '''
-        systemMetaRoot = cmds.listConnections('%s.systemMetaRoot'% rigNode)[0]
-        system = cmds.getAttr('%s.systemName' % systemMetaRoot)
-        return system
-        
+        nodeData = self.getNodeData(rigNode)
+        if nodeData:
+            return nodeData['system']
         
     def getSide(self, rigNode):
         '''
         returns the side of the rigNode (centre, left or right)
         '''
-        if cmds.attributeQuery('systemType', node=rigNode, exists=1):
-            return cmds.getAttr('%s.side' % rigNode)
-        elif cmds.attributeQuery('systemMetaRoot', node=rigNode, exists=1):
-            return cmds.getAttr('%s.side' % cmds.listConnections('%s.systemMetaRoot' % rigNode)[0])
-        else:
-            return 0
+        nodeData = self.getNodeData(rigNode)
+        if nodeData and nodeData['system']:
+            return self.index['systems'][nodeData['system']]['side']
+        return 0
         
     def getMetaType(self, rigNode):
-        if cmds.attributeQuery('systemType', node=rigNode, exists=1):
-            return 0
-        else:
+        nodeData = self.getNodeData(rigNode)
+        if not nodeData:
             return cmds.getAttr('%s.metaType' % rigNode)
+        return nodeData['metaType']
         
     def getSnapNode(self, rigNode):
-        if cmds.attributeQuery('snap_target', node=rigNode, exists=1):
-            return cmds.listConnections('%s.snap_target' % rigNode)
+        nodeData = self.getNodeData(rigNode)
+        if nodeData:
+            return nodeData['snap']
+            
+    def getButtonData(self, rigNode):
+        '''
+        returns the button position and size stored on rigNode as ([x, y], [x, y])
+        '''
+        nodeData = self.getNodeData(rigNode)
+        return list(nodeData['pos']), list(nodeData['size'])
+    
+    def setActive(self):
+        '''
+        makes this the rig that controls are registered to as systems are built
+        '''
+        controlRegistry.setRig(self.root)
+    
+    def getControls(self, system=None, side=None, role=None):
+        '''
+        returns the controls registered to the rig, optionally filtered by system, side and role
+        '''
+        return controlRegistry.getControls(self.root, system=system, side=side, role=role)
+    
+    ##################################################################################################################################################
+    # Index
+    
+    def getIndex(self):
+        '''
+        returns the rig's index, building it if it has been invalidated and refreshing any nodes whose values have changed
+        '''
+        if self.index is None:
+            self.buildIndex()
+        if self.dirty:
+            for node in self.dirty:
+                if node in self.index['nodes']:
+                    self.readNodeValues(node, self.index['nodes'][node])
+                    if self.index['nodes'][node]['isSystem']:
+                        self.index['systems'][self.index['nodes'][node]['system']]['side'] = self.index['nodes'][node]['side']
+            self.dirty = set()
+        return self.index
+    
+    def getNodeData(self, rigNode):
+        '''
+        returns the index entry for rigNode - a dictionary of system, side, metaType, snap, pos and size. None if rigNode isn't in the rig
+        '''
+        return self.getIndex()['nodes'].get(str(rigNode))
+    
+    def buildIndex(self):
+        '''
+        reads the whole rig into self.index. All connections are gathered by one listConnections on the root's message
+        and one on every node connected to it
+        '''
+        self.removeCallbacks()
+        order = []
+        for node in cmds.listConnections('%s.message' % self.root, source=0, destination=1) or []:
+            if node not in order:
+                order.append(node)
+        
+        nodes = dict((node, {'system':None, 'isSystem':False, 'snap':None}) for node in order)
+        systems = {}
+        systemNames = {}
+        pairs = cmds.listConnections([self.root] + order, connections=1) or []
+        
+        # system roots first - they are connected to the root's system attributes
+        for plug, other in zip(pairs[::2], pairs[1::2]):
+            node, attr = plug.split('.', 1)
+            if node == self.root and attr in self.systems:
+                systems[attr] = {'root':other, 'side':0, 'nodes':[]}
+                systemNames[other] = attr
+                if other in nodes:
+                    nodes[other]['system'] = attr
+                    nodes[other]['isSystem'] = True
+        
+        for plug, other in zip(pairs[::2], pairs[1::2]):
+            node, attr = plug.split('.', 1)
+            attr = attr.split('[')[0]
+            if node == self.root or node not in nodes:
+                continue
+            if node in systemNames:
+                if attr not in ('message', 'metaRoot') and other in nodes and other not in systems[systemNames[node]]['nodes']:
+                    systems[systemNames[node]]['nodes'].append(other)
+            elif attr == 'systemMetaRoot' and other in systemNames:
+                nodes[node]['system'] = systemNames[other]
+            elif attr == 'snap_target':
+                nodes[node]['snap'] = (nodes[node]['snap'] or []) + [other]
+        
+        for node in order:
+            self.readNodeValues(node, nodes[node])
+            if nodes[node]['isSystem']:
+                systems[nodes[node]['system']]['side'] = nodes[node]['side']
+        
+        self.index = {'order':order, 'nodes':nodes, 'systems':systems, 'systemRoots':systemNames}
+        self.dirty = set()
+        if self.live:
+            self.addCallbacks()
+        return self.index
+    
+    def readNodeValues(self, node, nodeData):
+        '''
+        reads the attribute values held in the index for node into nodeData
+        '''
+        nodeData['side'] = cmds.getAttr('%s.side' % node) if nodeData['isSystem'] else 0
+        nodeData['metaType'] = 0 if nodeData['isSystem'] else cmds.getAttr('%s.metaType' % node)
+        nodeData['pos'] = list(cmds.getAttr('%s.buttonPos' % node)[0])
+        nodeData['size'] = list(cmds.getAttr('%s.buttonSize' % node)[0])
+    
+    def invalidate(self, node=None):
+        '''
+        marks node's values as changed, or with no node, discards the whole index so that it is rebuilt on the next lookup
+        '''
+        if node:
+            self.dirty.add(node)
         else:
-            None
+            # callbacks are left in place until the rebuild - removing them from inside a callback isn't safe
+            self.index = None
+            self.dirty = set()
+    
+    ##################################################################################################################################################
+    # Callbacks - keep the index in step with the scene
+    
+    def addCallbacks(self):
+        sel = om.MSelectionList()
+        for node in [self.root] + self.index['order']:
+            sel.add(node)
+        for i in range(sel.length()):
+            obj = om.MObject()
+            sel.getDependNode(i, obj)
+            self.callbacks.append(om.MNodeMessage.addAttributeChangedCallback(obj, self.attributeChanged))
+            self.callbacks.append(om.MNodeMessage.addNameChangedCallback(obj, self.nameChanged))
+        self.callbacks.append(om.MDGMessage.addNodeRemovedCallback(self.nodeRemoved, 'dependNode'))
+    
+    def removeCallbacks(self):
+        for callback in self.callbacks:
+            om.MMessage.removeCallback(callback)
+        self.callbacks = []
+    
+    def close(self):
+        '''
+        removes the rig's callbacks and discards its index
+        '''
+        self.removeCallbacks()
+        self.index = None
+        self.dirty = set()
+    
+    def attributeChanged(self, msg, plug, otherPlug, clientData):
+        if self.index is None:
+            return
+        node = om.MFnDependencyNode(plug.node()).name()
+        attr = om.MFnAttribute(plug.attribute()).name()
+        structure = om.MNodeMessage.kConnectionMade | om.MNodeMessage.kConnectionBroken | \
+                    om.MNodeMessage.kAttributeAdded | om.MNodeMessage.kAttributeRemoved
+        if msg & structure:
+            if attr in INDEX_IGNORED_ATTRS:
+                invalidateMetaChildren(node)
+            else:
+                self.invalidate()
+        elif msg & om.MNodeMessage.kAttributeSet:
+            if attr == 'systemName':
+                self.invalidate()
+            elif attr in INDEX_VALUE_ATTRS:
+                self.invalidate(node)
+    
+    def nameChanged(self, node, previousName, clientData):
+        if self.index is not None:
+            self.invalidate()
+    
+    def nodeRemoved(self, node, clientData):
+        if self.index is None:
+            return
+        name = om.MFnDependencyNode(node).name()
+        if name == self.root or name in self.index['systemRoots']:
+            self.invalidate()
+        elif name in self.index['nodes']:
+            nodeData = self.index['nodes'].pop(name)
+            self.index['order'].remove(name)
+            self.dirty.discard(name)
+            if nodeData['system'] in self.index['systems']:
+                systemNodes = self.index['systems'][nodeData['system']]['nodes']
+                if name in systemNodes:
+                    systemNodes.remove(name)
             
     
     def addRigNode(self, node=None, system=None, name=None, parent=None):
@@ -307,7 +586,7 @@ class MetaRig(object):
         if name in rigNodeNames:
             return '%s rigNode already exists. Please provide a unique name for your new rigNode' % name
         
-        rigNodes = self.getMetaRigNodes()
+        rigNodes = cmds.listConnections('%s.message' % self.root) or []
         if node in rigNodes:
             return '%s is already connected to the rig.' % node
         
@@ -324,6 +603,7 @@ class MetaRig(object):
             cmds.addAttr(node, ln='metaType', at='enum', enumName='noSnap:fk:ik', category='metaNode')
             
         self.addUIAttrs(node)
+        self.invalidate()
             
     def addUIAttrs(self, node):
         if not cmds.attributeQuery('buttonPos', node=node, exists=1):
@@ -336,6 +616,39 @@ class MetaRig(object):
             cmds.addAttr(node, ln='buttonSizeY', p='buttonSize', at='short', category='metaUI')
 
 
+class PickerItem(QtGui.QGraphicsRectItem):
+    '''
+    A picker button - a single rectangle in the picker's QGraphicsScene rather than a widget
+    '''
+    def __init__(self, picker, buttonData):
+        super(PickerItem, self).__init__(0, 0, buttonData['size'][0], buttonData['size'][1])
+        self.picker = picker
+        self.rigNode = buttonData['toolTip']
+        self.metaType = buttonData['metaType']
+        self.setPos(buttonData['pos'][0], buttonData['pos'][1])
+        colour = buttonData['colour']
+        self.setBrush(QtGui.QBrush(QtGui.QColor(colour[0], colour[1], colour[2], 75)))
+        self.setToolTip(self.rigNode)
+        
+    def mousePressEvent(self, event):
+        if event.button() == QtCore.Qt.LeftButton:
+            self.picker.buttonSelect(self.rigNode)
+        else:
+            super(PickerItem, self).mousePressEvent(event)
+            
+    def contextMenuEvent(self, event):
+        if self.metaType == 0:
+            return
+        menu = QtGui.QMenu()
+        snap = menu.addAction('snap')
+        bakeSnap = menu.addAction('snap playback range')
+        action = menu.exec_(event.screenPos())
+        if action == snap:
+            self.picker.snap(self.rigNode)
+        elif action == bakeSnap:
+            self.picker.bakeSnap(self.rigNode)
+
+
 class PickerGui(QtGui.QWidget):
     '''
     Gui for selecting rig controls and calling functions on them
@@ -345,12 +658,15 @@ class PickerGui(QtGui.QWidget):
         self.uiName = 'pickerGui'
         self.delete()
         self.rigData = self.getRigData()
-        self.buttonList = []
+        # QGraphicsScene and MetaRig for each rig that has been shown, keyed by rig root
+        self.rigScenes = {}
         self.sceneRigs = self.getSceneRigs()
         self.build()
         
     def delete(self):
         #check to see if the ui already exists and, if so, delete it
+        for rig, scene in getattr(self, 'rigScenes', {}).values():
+            rig.close()
         if cmds.window(self.uiName, exists=True):
             cmds.deleteUI(self.uiName, wnd=True)
             
@@ -364,10 +680,10 @@ class PickerGui(QtGui.QWidget):
     
     def getSceneRigs(self):
         '''
-        Collect all metaRigs in the scene by checking for 'metaRigName' attribute
+        Collect all metaRigs in the scene - network nodes with a 'metaRig' attribute - from the scene's rig registry
         
         '''
-        sceneRigs = [node for node in cmds.ls(type='network') if cmds.attributeQuery('metaRig', node=node, exists=1)]
+        sceneRigs = registry.getSceneRigs()
         print 'Metarigs found: %s' % sceneRigs
         return sceneRigs
     
@@ -377,8 +693,7 @@ class PickerGui(QtGui.QWidget):
         returns a dictionary
         
         '''
-        buttonPos = [cmds.getAttr('%s.buttonPosX' % rigNode), cmds.getAttr('%s.buttonPosY' % rigNode)]
-        buttonSize = [cmds.getAttr('%s.buttonSizeX' % rigNode), cmds.getAttr('%s.buttonSizeY' % rigNode)]
+        buttonPos, buttonSize = self.rig.getButtonData(rigNode)
         toolTip = rigNode
         side = self.rig.getSide(rigNode)
         colour = colourList[side]
@@ -392,78 +707,79 @@ class PickerGui(QtGui.QWidget):
     def changeRig(self):
         '''
         Called when a rig is selected from the combobox
-        Instantiates a new metaRig to self.rig
-        Gathers its metadata and builds the buttons
-        
-        '''
-        self.rig = MetaRig(fromNode=self.sceneRigs[self.sceneRigsComboBox.currentIndex()])
-        print self.rig.root
-        # Button widget
-        try:
-            # destroy buttons
-            self.buttonWidget.deleteLater()
-        except:
-            print 'no buttons to delete'
-        self.buttonWidget = QtGui.QWidget()
-        self.mainLayout.addWidget(self.buttonWidget)
-            
-        # Build buttons
-        rigNodes = self.rig.getMetaRigNodes()
-        buttonData = [self.getButtonData(rigNode) for rigNode in rigNodes]
-        self.buttonList = []
-        for button in buttonData:
-            b = QtGui.QPushButton('', parent=self.buttonWidget)
-            if button['metaType'] != 0:
-                b.setContextMenuPolicy(QtCore.Qt.ActionsContextMenu)
-                snap = QtGui.QAction(self)
-                snap.setText("snap")
-                snap.triggered.connect(self.snap)
-                snap.setToolTip(button['toolTip'])
-                b.addAction(snap)
-                  
-            b.setStyleSheet('background-color: rgba(%s, %s, %s, 75);' % (button['colour'][0], button['colour'][1], button['colour'][2]))
-            b.setGeometry(button['pos'][0], button['pos'][1], button['size'][0], button['size'][1])
-            b.setToolTip(button['toolTip'])
-            b.clicked.connect(self.buttonSelect)
-            self.buttonList.append(b)
-            
+        Shows the rig's picker scene, building it the first time the rig is shown or if the rig has changed since
+        
+        '''
+        root = self.sceneRigs[self.sceneRigsComboBox.currentIndex()]
+        cached = self.rigScenes.get(root)
+        if cached and cached[0].index is not None and not cached[0].dirty:
+            self.rig, scene = cached
+        else:
+            if cached:
+                self.rig = cached[0]
+                cached[1].deleteLater()
+            else:
+                self.rig = MetaRig(fromNode=root, live=True)
+            scene = self.buildRigScene()
+            self.rigScenes[root] = (self.rig, scene)
+        self.pickerView.setScene(scene)
         return self.rig
     
-    def snap(self):
-        rigNode = self.sender().toolTip()
-        system = self.rig.getSystem(rigNode)
-        systemNodes = self.rig.getSystemNodes(system)
-        snapDirection = self.rig.getMetaType(rigNode)
-        for node in systemNodes:
-            if self.rig.getMetaType(node) == snapDirection:
-                snap = self.rig.getSnapNode(node)
-                if snap:
-                    align(node, snap)
+    def buildRigScene(self):
+        '''
+        returns a QGraphicsScene holding an item for each node in self.rig
+        Button data all comes from the rig's index, which is read in one go. The scene's BSP tree index handles hit testing
+        '''
+        scene = QtGui.QGraphicsScene(self)
+        scene.setItemIndexMethod(QtGui.QGraphicsScene.BspTreeIndex)
+        for rigNode in self.rig.getMetaRigNodes():
+            scene.addItem(PickerItem(self, self.getButtonData(rigNode)))
+        # keep the scene origin at the top left of the view so buttons sit where their buttonPos says
+        scene.setSceneRect(scene.itemsBoundingRect().united(QtCore.QRectF(0, 0, 1, 1)))
+        return scene
+    
+    def snap(self, rigNode=None):
+        '''
+        snaps the nodes in rigNode's system which share its metaType to their snap targets at the current frame
+        '''
+        if not rigNode:
+            rigNode = self.sender().toolTip()
+        bake.snap(bake.getSnapPairs(self.rig, rigNode))
     
-    def buttonSelect(self):
+    def bakeSnap(self, rigNode=None):
         '''
-        Called when a gui button is pressed. Selects the rigNode corresponding to the sender button
+        as snap, keying every frame of the playback range
+        '''
+        if not rigNode:
+            rigNode = self.sender().toolTip()
+        start, end = cmds.playbackOptions(q=1, min=1), cmds.playbackOptions(q=1, max=1)
+        bake.snap(bake.getSnapPairs(self.rig, rigNode), frames=range(int(start), int(end) + 1))
+    
+    def buttonSelect(self, rigNode=None):
+        '''
+        Called when a gui button is pressed. Selects rigNode, or the rigNode corresponding to the sender button
         Shift+Click behaves as in Maya
         alt click selects all downstream nodes
         ctrl+click selects all nodes in the system
         '''
-        sender = self.sender()
+        if not rigNode:
+            rigNode = self.sender().toolTip()
         selNodes = []
         modifiers = QtGui.QApplication.keyboardModifiers()
         
         if modifiers == QtCore.Qt.ShiftModifier:
             selNodes = cmds.ls(sl=1)
-            if not sender.toolTip() in selNodes:
-                selNodes.append(sender.toolTip())
+            if not rigNode in selNodes:
+                selNodes.append(rigNode)
             else:
-                selNodes.remove(sender.toolTip())
+                selNodes.remove(rigNode)
         elif modifiers == QtCore.Qt.AltModifier:
-            selNodes = [sender.toolTip()] + getAllMetaChildren(node=sender.toolTip())
+            selNodes = [rigNode] + getAllMetaChildren(node=rigNode)
         elif modifiers == QtCore.Qt.ControlModifier:
-            system = self.rig.getSystem(sender.toolTip())
+            system = self.rig.getSystem(rigNode)
             selNodes = self.rig.getSystemNodes(system)
         else:
-            selNodes.append(sender.toolTip())
+            selNodes.append(rigNode)
             
         cmds.select(selNodes)
     
@@ -490,6 +806,11 @@ class PickerGui(QtGui.QWidget):
         self.mainLayout.addWidget(self.sceneRigsComboBox)
         self.sceneRigsComboBox.addItems([rig for rig in self.sceneRigs])
         
+        # Picker view - each rig's buttons live in their own QGraphicsScene
+        self.pickerView = QtGui.QGraphicsView()
+        self.pickerView.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop)
+        self.mainLayout.addWidget(self.pickerView)
+        
             
         # Signals and slots
         self.sceneRigsComboBox.currentIndexChanged.connect(self.changeRig)
@@ -0,0 +1,363 @@
+# Mirroring and flipping poses between paired controls.
+# Every pair is handled at once with numpy - local matrices are composed from the source controls' channels, mirrored, and
+# decomposed back into channels for the targets as stacked (..., 4, 4) arrays, so a whole character, or a whole frame range, is one pass.
+#
+# The mirror is taken in each control's parent space. With M the reflection across the mirror plane and, at rest,
+# L the local matrix and P the parent's world matrix of source A and target B:
+#     D = P_B . M . P_A^-1 . M                     relates the rest parent frames
+#     C = L_B . D . M . L_A^-1 . M                 relates the rest control frames
+#     L_B' = C . M . L_A . M . D^-1
+# which returns B to its rest pose when A is at rest and agrees with mirroring the world matrix whenever the parents are mirrored.
+# Because C and D come from the rig's rest pose, the axis conventions of each side - lf ctrls pointing down -x, rt ctrls down +x,
+# poles on -z and z and so on - are absorbed automatically. Scalar user attributes are copied across unchanged; the side
+# conventions behind them (the lf unitConversion factor of -1 on pin, the lf extend subtracting rather than adding) are built into
+# the rig so the same value gives the mirrored result.
+# Rest poses are measured once per set of pairs and rest values by briefly zeroing the controls with undo suspended, and cached
+# in a MirrorTable. On an animated shot, keyed channels may read back their anim curves rather than the rest values - those
+# controls are put at rest in the maths instead, along with the parent matrices of the controls below them.
+# The cache is cleared whenever the scene changes under it - new, open, import, reference changes and the removal of any
+# transform - so a rebuilt or reloaded rig is measured afresh.
+import numpy as np
+import maya.cmds as cmds
+import maya.OpenMaya as om
+from rooftops.core import pose, sampler
+
+TRANSLATE = ['translateX', 'translateY', 'translateZ']
+ROTATE = ['rotateX', 'rotateY', 'rotateZ']
+SCALE = ['scaleX', 'scaleY', 'scaleZ']
+TRS_ATTRS = TRANSLATE + ROTATE + SCALE
+REST = dict([(attr, 0.0) for attr in TRANSLATE + ROTATE] + [(attr, 1.0) for attr in SCALE])
+ROTATE_ORDERS = ['xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx']
+AXES = {'x':0, 'y':1, 'z':2}
+
+_tables = {}
+_callbacks = []
+
+######################################################################################################################################################
+# Matrix maths - row vector matrices as in Maya
+
+def _axisRotations(angles, axis):
+    '''
+    returns (n, 3, 3) row vector rotations by angles (radians) about axis 0, 1 or 2
+    '''
+    c, s = np.cos(angles), np.sin(angles)
+    m = np.zeros(angles.shape + (3, 3))
+    i, j = [(1, 2), (2, 0), (0, 1)][axis]
+    m[..., axis, axis] = 1.0
+    m[..., i, i], m[..., i, j] = c, s
+    m[..., j, i], m[..., j, j] = -s, c
+    return m
+
+def eulerToMatrices(rotations, orders):
+    '''
+    returns (..., 3, 3) rotation matrices for (..., 3) euler rotations in degrees. orders holds a rotate order index for each rotation
+    '''
+    rotations = np.radians(rotations)
+    axisMatrices = [_axisRotations(rotations[..., a], a) for a in range(3)]
+    result = np.zeros(rotations.shape[:-1] + (3, 3))
+    orders = np.broadcast_to(orders, rotations.shape[:-1])
+    for index, order in enumerate(ROTATE_ORDERS):
+        mask = orders == index
+        if not mask.any():
+            continue
+        m = axisMatrices[AXES[order[0]]][mask]
+        for letter in order[1:]:
+            m = np.matmul(m, axisMatrices[AXES[letter]][mask])
+        result[mask] = m
+    return result
+
+def _wrap(angles, near):
+    return angles + 360.0 * np.round((near - angles) / 360.0)
+
+def matricesToEuler(matrices, orders, near=None):
+    '''
+    returns (..., 3) euler rotations in degrees for (..., 3, 3) rotation matrices. If near is given, of the equivalent rotations
+    the one closest to near is returned - pass the current values to avoid flips
+    '''
+    result = np.zeros(matrices.shape[:-2] + (3,))
+    orders = np.broadcast_to(orders, matrices.shape[:-2])
+    # the row vector matrix for order ijk is the transpose of the column vector matrix Rk . Rj . Ri
+    m = np.swapaxes(matrices, -1, -2)
+    for index, order in enumerate(ROTATE_ORDERS):
+        mask = orders == index
+        if not mask.any():
+            continue
+        i, j, k = [AXES[letter] for letter in order]
+        sign = 1.0 if order in ROTATE_ORDERS[:3] else -1.0
+        r = m[mask]
+        b = np.arcsin(np.clip(-sign * r[:, k, i], -1.0, 1.0))
+        a = np.arctan2(sign * r[:, k, j], r[:, k, k])
+        c = np.arctan2(sign * r[:, j, i], r[:, i, i])
+        # gimbal lock - put all of the rotation into the first axis
+        locked = np.cos(b) < 1e-6
+        if locked.any():
+            a[locked] = np.arctan2(-sign * r[locked, j, k], r[locked, j, j])
+            c[locked] = 0.0
+        angles = np.zeros((len(r), 3))
+        angles[:, i], angles[:, j], angles[:, k] = a, b, c
+        result[mask] = np.degrees(angles)
+
+    if near is not None:
+        near = np.broadcast_to(near, result.shape)
+        alternate = result.copy()
+        for index, order in enumerate(ROTATE_ORDERS):
+            mask = orders == index
+            i, j, k = [AXES[letter] for letter in order]
+            alternate[mask, i] += 180.0
+            alternate[mask, j] = 180.0 - alternate[mask, j]
+            alternate[mask, k] += 180.0
+        result, alternate = _wrap(result, near), _wrap(alternate, near)
+        useAlternate = np.abs(alternate - near).sum(axis=-1) < np.abs(result - near).sum(axis=-1)
+        result[useAlternate] = alternate[useAlternate]
+    return result
+
+def composeMatrices(channels, orders):
+    '''
+    returns (..., 4, 4) local matrices for (..., 9) translate, rotate and scale channels
+    '''
+    m = np.zeros(channels.shape[:-1] + (4, 4))
+    m[..., :3, :3] = eulerToMatrices(channels[..., 3:6], orders) * channels[..., 6:9, None]
+    m[..., 3, :3] = channels[..., 0:3]
+    m[..., 3, 3] = 1.0
+    return m
+
+def decomposeMatrices(matrices, orders, near=None):
+    '''
+    returns (..., 9) translate, rotate and scale channels for (..., 4, 4) local matrices. near is (..., 9) channels to keep rotations close to
+    '''
+    channels = np.zeros(matrices.shape[:-2] + (9,))
+    scale = np.linalg.norm(matrices[..., :3, :3], axis=-1)
+    rotation = matrices[..., :3, :3] / np.where(scale == 0.0, 1.0, scale)[..., None]
+    flipped = np.linalg.det(rotation) < 0
+    scale[flipped, 0] *= -1.0
+    rotation[flipped, 0] *= -1.0
+    channels[..., 0:3] = matrices[..., 3, :3]
+    channels[..., 3:6] = matricesToEuler(rotation, orders, None if near is None else near[..., 3:6])
+    channels[..., 6:9] = scale
+    return channels
+
+def reflection(axis='x'):
+    m = np.identity(4)
+    m[AXES[axis], AXES[axis]] = -1.0
+    return m
+
+######################################################################################################################################################
+
+class MirrorTable(object):
+    '''
+    Rest pose relationships for a list of (source, target) pairs. A control paired with itself is mirrored onto itself.
+    rest is an optional {ctrl:{attr:value}} of rest values - translate and rotate 0, scale 1 otherwise
+    '''
+    def __init__(self, pairs, axis='x', rest=None):
+        self.pairs = [(str(a), str(b)) for a, b in pairs]
+        self.axis = axis
+        self.rest = rest or {}
+        self.calibrate()
+
+    def calibrate(self):
+        '''
+        measures the rest local and parent matrices of every control, then puts the controls back where they were.
+        Undo is suspended so that this leaves nothing in the undo queue. Channels which are locked or driven, such as the
+        translates driven by extend, are left as they are and never written. Keyed channels which read back their anim
+        curve rather than the rest value written to them are put at rest here instead - see restParents
+        '''
+        controls = []
+        for pair in self.pairs:
+            for ctrl in pair:
+                if ctrl not in controls:
+                    controls.append(ctrl)
+        restPlugs, restValues = [], []
+        for ctrl in controls:
+            values = dict(REST, **self.rest.get(ctrl, {}))
+            for attr in sorted(values):
+                plug = '%s.%s' % (ctrl, attr)
+                if cmds.objExists(plug) and cmds.getAttr(plug, settable=1):
+                    restPlugs.append(plug)
+                    restValues.append(values[attr])
+        self.settable = set(restPlugs)
+
+        undoState = cmds.undoInfo(q=1, stateWithoutFlush=1)
+        cmds.undoInfo(stateWithoutFlush=0)
+        try:
+            current = pose.readValues(restPlugs)
+            pose.writeValues(restPlugs, restValues)
+            readBack = pose.readValues(restPlugs)
+            rest = np.array(pose.readValues(['%s.%s' % (ctrl, attr) for ctrl in controls for attr in TRS_ATTRS])).reshape(-1, 9)
+            parents = np.array([cmds.getAttr('%s.parentMatrix' % ctrl) for ctrl in controls], dtype=float).reshape(-1, 4, 4)
+            overridden = [plug for plug, value, read in zip(restPlugs, restValues, readBack) if abs(value - read) > pose.TOLERANCE]
+            if overridden:
+                worlds = np.array([cmds.getAttr('%s.worldMatrix' % ctrl) for ctrl in controls], dtype=float).reshape(-1, 4, 4)
+            pose.writeValues(restPlugs, current)
+        finally:
+            cmds.undoInfo(stateWithoutFlush=undoState if undoState is not None else 1)
+
+        orders = np.array([cmds.getAttr('%s.rotateOrder' % ctrl) or 0 for ctrl in controls], dtype=int)
+        if overridden:
+            cmds.warning('%d keyed channels are evaluated from their anim curves - their rest values are used directly' % len(overridden))
+            values = dict(zip(restPlugs, restValues))
+            measured = rest.copy()
+            for plug in overridden:
+                ctrl, attr = plug.split('.', 1)
+                if attr in TRS_ATTRS:
+                    rest[controls.index(ctrl), TRS_ATTRS.index(attr)] = values[plug]
+            parents = restParents(controls, parents, worlds, measured, rest, orders)
+        index = dict((ctrl, i) for i, ctrl in enumerate(controls))
+        src = np.array([index[a] for a, b in self.pairs], dtype=int)
+        dst = np.array([index[b] for a, b in self.pairs], dtype=int)
+        self.sourceOrders, self.targetOrders = orders[src], orders[dst]
+
+        M = reflection(self.axis)
+        restLocal = composeMatrices(rest, orders)
+        D = np.matmul(np.matmul(np.matmul(parents[dst], M), np.linalg.inv(parents[src])), M)
+        self.C = np.matmul(np.matmul(np.matmul(restLocal[dst], D), M), np.matmul(np.linalg.inv(restLocal[src]), M))
+        self.Dinv = np.linalg.inv(D)
+        self.M = M
+
+        # user attributes shared by both controls of a pair are copied across
+        userAttrs = dict((ctrl, set(cmds.listAttr(ctrl, userDefined=1, keyable=1) or [])) for ctrl in controls)
+        self.extraAttrs = [sorted(userAttrs[a] & userAttrs[b]) for a, b in self.pairs]
+        for (a, b), attrs in zip(self.pairs, self.extraAttrs):
+            self.settable.update('%s.%s' % (b, attr) for attr in attrs if cmds.getAttr('%s.%s' % (b, attr), settable=1))
+
+    def compute(self, channels, near=None):
+        '''
+        returns the mirrored target channels for source channels. channels is (..., pairs, 9) translate, rotate and scale values,
+        so several frames can be mirrored at once. near is the targets' current channels, used to keep rotations continuous
+        '''
+        local = composeMatrices(np.asarray(channels, dtype=float), self.sourceOrders)
+        mirrored = np.matmul(np.matmul(np.matmul(np.matmul(self.C, self.M), local), self.M), self.Dinv)
+        return decomposeMatrices(mirrored, self.targetOrders, near)
+
+    def getPlugs(self):
+        '''
+        returns (sourcePlugs, targetPlugs) - the translate, rotate and scale plugs of each pair, followed by the shared user attributes.
+        Not every target plug is settable - see writable
+        '''
+        sources = ['%s.%s' % (a, attr) for a, b in self.pairs for attr in TRS_ATTRS]
+        targets = ['%s.%s' % (b, attr) for a, b in self.pairs for attr in TRS_ATTRS]
+        for (a, b), attrs in zip(self.pairs, self.extraAttrs):
+            sources.extend('%s.%s' % (a, attr) for attr in attrs)
+            targets.extend('%s.%s' % (b, attr) for attr in attrs)
+        return sources, targets
+
+    def writable(self, plugs):
+        '''
+        returns a boolean array, True for each of plugs which can be set
+        '''
+        return np.array([plug in self.settable for plug in plugs], dtype=bool)
+
+def getTable(pairs, axis='x', rest=None):
+    '''
+    returns the cached MirrorTable for pairs, axis and the rest values of the paired controls, measuring it on first use
+    '''
+    pairs = tuple((str(a), str(b)) for a, b in pairs)
+    rest = rest or {}
+    controls = sorted(set([c for pair in pairs for c in pair]))
+    restKey = tuple((c, tuple(sorted(rest[c].items()))) for c in controls if rest.get(c))
+    key = (pairs, axis, restKey)
+    if key not in _tables:
+        watchScene()
+        _tables[key] = MirrorTable(pairs, axis, rest)
+    return _tables[key]
+
+def restParents(controls, parents, worlds, measured, rest, orders):
+    '''
+    returns the parent matrices of controls with each control put at its rest channels. parents, worlds and measured are the
+    parent matrices, world matrices and channels as they were measured. Only controls below a control whose channels differ
+    from their rest channels are changed - the transforms in between are taken to be fixed
+    '''
+    paths = [(cmds.ls(ctrl, long=1) or [ctrl])[0] for ctrl in controls]
+    # parents before children
+    byDepth = sorted(range(len(controls)), key=lambda i: paths[i].count('|'))
+    moved = set()
+    result = parents.copy()
+    restWorlds = worlds.copy()
+    for i in byDepth:
+        ancestors = [j for j in range(len(controls)) if paths[i].startswith(paths[j] + '|')]
+        if ancestors:
+            a = max(ancestors, key=lambda j: len(paths[j]))
+            if a in moved:
+                between = np.matmul(parents[i], np.linalg.inv(worlds[a]))
+                result[i] = np.matmul(between, restWorlds[a])
+                moved.add(i)
+        if not np.allclose(measured[i], rest[i]):
+            moved.add(i)
+            local = composeMatrices(rest[i:i + 1], orders[i:i + 1])[0]
+        else:
+            local = np.matmul(worlds[i], np.linalg.inv(parents[i]))
+        if i in moved:
+            restWorlds[i] = np.matmul(local, result[i])
+    return result
+
+def clearCache(*args):
+    _tables.clear()
+
+def watchScene():
+    '''
+    installs the callbacks that clear the table cache when the scene changes, if they aren't installed already
+    '''
+    if _callbacks:
+        return
+    for message in [om.MSceneMessage.kAfterOpen, om.MSceneMessage.kAfterNew, om.MSceneMessage.kAfterImport,
+                    om.MSceneMessage.kAfterLoadReference, om.MSceneMessage.kAfterUnloadReference,
+                    om.MSceneMessage.kAfterCreateReference, om.MSceneMessage.kAfterRemoveReference]:
+        _callbacks.append(om.MSceneMessage.addCallback(message, clearCache))
+    _callbacks.append(om.MDGMessage.addNodeRemovedCallback(clearCache, 'transform'))
+
+def unwatchScene():
+    for callback in _callbacks:
+        om.MMessage.removeCallback(callback)
+    del _callbacks[:]
+    _tables.clear()
+
+def mirrorName(ctrl):
+    '''
+    returns the name of the control on the other side from ctrl, eg. lf_hand_fk_ctrl for rt_hand_fk_ctrl. Centre controls return themselves
+    '''
+    namespace, name = pose.splitNamespace(ctrl)
+    side, sep, rest = name.partition('_')
+    other = {'lf':'rt', 'rt':'lf'}.get(side)
+    if not other:
+        return ctrl
+    return '%s:%s%s%s' % (namespace, other, sep, rest) if namespace else other + sep + rest
+
+def flipPairs(pairs, centre=None):
+    '''
+    returns pairs in both directions, plus each of centre paired with itself - mirroring these swaps the sides of a pose
+    '''
+    result = []
+    for a, b in pairs:
+        for pair in [(a, b), (b, a)]:
+            if pair not in result:
+                result.append(pair)
+    for ctrl in centre or []:
+        if (ctrl, ctrl) not in result:
+            result.append((ctrl, ctrl))
+    return result
+
+######################################################################################################################################################
+
+def mirror(pairs, axis='x', frames=None, rest=None):
+    '''
+    sets each target to the mirror of its source, for pairs of (source, target) controls. Every source is read before anything
+    is written, so pairs may run in both directions - see flipPairs. With frames, the targets are keyed at each frame instead.
+    Returns the number of values written
+    '''
+    table = getTable(pairs, axis, rest)
+    sourcePlugs, targetPlugs = table.getPlugs()
+    numTrs = len(table.pairs) * 9
+
+    if frames is None:
+        values = np.array(pose.readValues(sourcePlugs))
+        near = np.array(pose.readValues(targetPlugs[:numTrs])).reshape(-1, 9)
+        values[:numTrs] = table.compute(values[:numTrs].reshape(-1, 9), near).ravel()
+        valid = ~np.isnan(values) & table.writable(targetPlugs)
+        pose.writeValues([plug for plug, v in zip(targetPlugs, valid) if v], values[valid])
+        return int(valid.sum())
+
+    values = sampler.sampleValues(sourcePlugs, frames)
+    near = sampler.sampleValues(targetPlugs[:numTrs], frames).reshape(len(frames), -1, 9)
+    values[:, :numTrs] = table.compute(values[:, :numTrs].reshape(len(frames), -1, 9), near).reshape(len(frames), -1)
+    valid = ~np.isnan(values).any(axis=0) & table.writable(targetPlugs)
+    pose.writeKeys([plug for plug, v in zip(targetPlugs, valid) if v], frames, values[:, valid])
+    return int(valid.sum()) * len(frames)
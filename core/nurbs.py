@@ -0,0 +1,382 @@
+# NumPy NURBS curve evaluation and closest point projection.
+# No Maya imports - curve data is read by the caller (see rooftops.systems.curve.getCurveData) so this can be tested outside of Maya.
+# Curves are non-rational, which covers every curve the rigs create with cmds.curve / cmds.circle.
+import numpy as np
+from rooftops.core import bvh
+
+def _deBoor(d, params, spans, knots, degree):
+    '''
+    de Boor's algorithm over the leading axis. d is an (m, degree + 1, k) array holding the cvs that influence each param's span
+    '''
+    d = d.copy()
+    p, t = degree, knots
+    for r in range(1, p + 1):
+        for j in range(p, r - 1, -1):
+            left = t[spans + j - p]
+            right = t[spans + j + 1 - r]
+            denom = right - left
+            with np.errstate(divide='ignore', invalid='ignore'):
+                alpha = np.where(denom > 0.0, (params - left) / denom, 0.0)
+            d[:, j] = (1.0 - alpha)[:, None] * d[:, j - 1] + alpha[:, None] * d[:, j]
+    return d[:, p]
+
+def _findSpans(knots, degree, numCvs, params):
+    spans = np.searchsorted(knots, params, side='right') - 1
+    return np.clip(spans, degree, numCvs - 1)
+
+def _hodograph(cvs, knots, degree):
+    '''
+    returns the cvs and knots of the derivative of a B-spline along the first axis of cvs
+    '''
+    denom = knots[degree + 1:degree + len(cvs)] - knots[1:len(cvs)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(denom > 0.0, degree / denom, 0.0)
+    scale = scale.reshape((-1,) + (1,) * (cvs.ndim - 1))
+    return (cvs[1:] - cvs[:-1]) * scale, knots[1:-1]
+
+def _expandMayaKnots(knots):
+    '''
+    Maya stores len(cvs) + degree - 1 knots. The two missing end knots are never used for evaluation, so they are padded by repetition
+    '''
+    knots = list(knots)
+    return [knots[0]] + knots + [knots[-1]]
+
+######################################################################################################################################################
+
+class NurbsCurve(object):
+    '''
+    A non-rational B-spline curve.
+    knots is the full knot vector - len(cvs) + degree + 1 values. Use fromMaya for the shorter knot list Maya stores.
+    '''
+    def __init__(self, cvs, knots, degree):
+        self.cvs = np.asarray(cvs, dtype=float).reshape(-1, 3)
+        self.knots = np.asarray(knots, dtype=float)
+        self.degree = int(degree)
+        if len(self.knots) != len(self.cvs) + self.degree + 1:
+            raise ValueError('Expected %s knots for %s cvs of degree %s, got %s' %
+                             (len(self.cvs) + self.degree + 1, len(self.cvs), self.degree, len(self.knots)))
+        self._derivative = None
+        self._spans = None
+
+    @classmethod
+    def fromMaya(cls, cvs, knots, degree):
+        '''
+        builds a curve from the shorter knot list Maya stores
+        '''
+        return cls(cvs, _expandMayaKnots(knots), degree)
+
+    def domain(self):
+        return self.knots[self.degree], self.knots[len(self.cvs)]
+
+    def findSpans(self, params):
+        '''
+        returns the knot span index for each parameter
+        '''
+        return _findSpans(self.knots, self.degree, len(self.cvs), params)
+
+    def evaluate(self, params, spans=None):
+        '''
+        returns an (m, 3) array of points on the curve at params - de Boor's algorithm, vectorised over all params.
+        spans gives the knot span of each param. Pass it to evaluate the end of a span from that span's side of a discontinuous knot
+        '''
+        params = np.atleast_1d(np.asarray(params, dtype=float))
+        p, t = self.degree, self.knots
+        if spans is None:
+            spans = self.findSpans(params)
+        return _deBoor(self.cvs[spans[:, None] - p + np.arange(p + 1)[None, :]], params, spans, t, p)
+
+    def derivative(self):
+        '''
+        returns the first derivative (hodograph) as a NurbsCurve of degree - 1. Degree 0 curves return None
+        '''
+        if self.degree == 0:
+            return None
+        if self._derivative is None:
+            cvs, knots = _hodograph(self.cvs, self.knots, self.degree)
+            self._derivative = NurbsCurve(cvs, knots, self.degree - 1)
+        return self._derivative
+
+    def evaluateDerivatives(self, params, spans=None):
+        '''
+        returns points, first and second derivatives at params as three (m, 3) arrays
+        '''
+        params = np.atleast_1d(np.asarray(params, dtype=float))
+        if spans is None:
+            spans = self.findSpans(params)
+        points = self.evaluate(params, spans)
+        zeros = np.zeros_like(points)
+        first = self.derivative()
+        if first is None:
+            return points, zeros, zeros
+        # span i of a curve is span i - 1 of its derivative, as the derivative drops the first knot
+        second = first.derivative()
+        return points, first.evaluate(params, spans - 1), second.evaluate(params, spans - 2) if second is not None else zeros
+
+    ##################################################################################################################################################
+    # Closest point
+
+    def spanBoxes(self):
+        '''
+        returns (spans, starts, ends, mins, maxs) for every non empty knot span.
+        By the convex hull property the curve over a span lies within the bounding box of that span's degree + 1 cvs
+        '''
+        if self._spans is None:
+            p, t = self.degree, self.knots
+            index = np.array([i for i in range(p, len(self.cvs)) if t[i + 1] > t[i]], dtype=int)
+            cvs = self.cvs[index[:, None] - p + np.arange(p + 1)[None, :]]
+            self._spans = (index, t[index], t[index + 1], cvs.min(axis=1), cvs.max(axis=1))
+        return self._spans
+
+    def closestParameters(self, points, samples=8, iterations=10, tolerance=1e-9):
+        '''
+        returns the parameter of the closest point on the curve to each of points, as an (n,) array.
+
+        Every span is sampled to get an upper bound on each point's closest distance. Spans whose bounding box is further
+        away than that bound can't hold the closest point and are skipped. Newton iterations on the squared distance are then
+        run from the best sample in every remaining span, for all points at once, and the closest result per point is kept.
+        Newton may leave the span it started in - a minimum just past a span's end is often only reachable from that side,
+        when the best sample of the span holding it lies at its far end.
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        spans, starts, ends, mins, maxs = self.spanBoxes()
+        numSpans = len(starts)
+
+        # Sample every span
+        steps = np.linspace(0.0, 1.0, samples + 1)
+        sampleParams = (starts[:, None] + (ends - starts)[:, None] * steps[None, :])
+        samplePoints = self.evaluate(sampleParams.ravel(), np.repeat(spans, samples + 1)).reshape(numSpans, samples + 1, 3)
+        sampleDist = ((points[:, None, None, :] - samplePoints[None, :, :, :]) ** 2).sum(axis=3)
+        bestSample = sampleDist.argmin(axis=2)
+        bestSampleDist = sampleDist[np.arange(len(points))[:, None], np.arange(numSpans)[None, :], bestSample]
+        upper = bestSampleDist.min(axis=1)
+
+        # Lower bound per span from its bounding box
+        gap = np.maximum(mins[None, :, :] - points[:, None, :], 0.0) + np.maximum(points[:, None, :] - maxs[None, :, :], 0.0)
+        lower = (gap ** 2).sum(axis=2)
+        pointIndex, spanIndex = np.nonzero(lower <= upper[:, None] + tolerance)
+
+        # Newton refinement from the best sample in each candidate span
+        u = sampleParams[spanIndex, bestSample[pointIndex, spanIndex]]
+        lo, hi = self.domain()
+        target = points[pointIndex]
+        for i in range(iterations):
+            c, d1, d2 = self.evaluateDerivatives(u)
+            diff = c - target
+            f1 = (d1 * diff).sum(axis=1)
+            f2 = (d2 * diff).sum(axis=1) + (d1 * d1).sum(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                step = np.where(f2 > 0.0, f1 / f2, 0.0)
+            u = np.clip(u - step, lo, hi)
+            if np.abs(step).max() < tolerance:
+                break
+
+        # Keep the closest candidate per point
+        dist = ((self.evaluate(u) - target) ** 2).sum(axis=1)
+        order = np.lexsort((dist, pointIndex))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = pointIndex[order][1:] != pointIndex[order][:-1]
+        result = np.empty(len(points))
+        result[pointIndex[order][first]] = u[order][first]
+        return result
+
+    def closestPoints(self, points, **kwargs):
+        '''
+        returns (params, positions) of the closest points on the curve to points
+        '''
+        params = self.closestParameters(points, **kwargs)
+        return params, self.evaluate(params)
+
+######################################################################################################################################################
+
+class NurbsSurface(object):
+    '''
+    A non-rational B-spline surface.
+    cvs is a (numU, numV, 3) grid. knotsU / knotsV are full knot vectors - use fromMaya for the shorter knot lists Maya stores.
+    '''
+    def __init__(self, cvs, knotsU, knotsV, degreeU, degreeV):
+        self.cvs = np.asarray(cvs, dtype=float)
+        self.knotsU = np.asarray(knotsU, dtype=float)
+        self.knotsV = np.asarray(knotsV, dtype=float)
+        self.degreeU, self.degreeV = int(degreeU), int(degreeV)
+        numU, numV = self.cvs.shape[:2]
+        if len(self.knotsU) != numU + self.degreeU + 1 or len(self.knotsV) != numV + self.degreeV + 1:
+            raise ValueError('Knot vectors do not match a %s x %s cv grid of degree %s, %s' % (numU, numV, self.degreeU, self.degreeV))
+        self._partials = None
+        self._tree = None
+
+    @classmethod
+    def fromMaya(cls, cvs, numU, numV, knotsU, knotsV, degreeU, degreeV):
+        '''
+        builds a surface from Maya's flat, u major cv list and shorter knot lists
+        '''
+        cvs = np.asarray(cvs, dtype=float).reshape(numU, numV, 3)
+        return cls(cvs, _expandMayaKnots(knotsU), _expandMayaKnots(knotsV), degreeU, degreeV)
+
+    def domain(self):
+        '''
+        returns ((minU, maxU), (minV, maxV))
+        '''
+        numU, numV = self.cvs.shape[:2]
+        return ((self.knotsU[self.degreeU], self.knotsU[numU]), (self.knotsV[self.degreeV], self.knotsV[numV]))
+
+    def normalize(self, u, v):
+        '''
+        maps params into the 0 - 1 range used by follicles
+        '''
+        (u0, u1), (v0, v1) = self.domain()
+        return (np.asarray(u) - u0) / (u1 - u0), (np.asarray(v) - v0) / (v1 - v0)
+
+    def evaluate(self, u, v):
+        '''
+        returns an (m, 3) array of points on the surface at the params u, v
+        '''
+        u = np.atleast_1d(np.asarray(u, dtype=float))
+        v = np.atleast_1d(np.asarray(v, dtype=float))
+        pu, pv = self.degreeU, self.degreeV
+        numU, numV = self.cvs.shape[:2]
+        spansU = _findSpans(self.knotsU, pu, numU, u)
+        spansV = _findSpans(self.knotsV, pv, numV, v)
+        rows = spansU[:, None] - pu + np.arange(pu + 1)[None, :]
+        cols = spansV[:, None] - pv + np.arange(pv + 1)[None, :]
+        # (m, pu + 1, pv + 1, 3) block of cvs per param - collapse v first, then u
+        d = self.cvs[rows[:, :, None], cols[:, None, :]]
+        d = _deBoor(d.transpose(0, 2, 1, 3).reshape(len(u), pv + 1, -1), v, spansV, self.knotsV, pv)
+        return _deBoor(d.reshape(len(u), pu + 1, 3), u, spansU, self.knotsU, pu)
+
+    def partials(self):
+        '''
+        returns the derivative surfaces along u and v. A direction of degree 0 gives None
+        '''
+        if self._partials is None:
+            su = sv = None
+            if self.degreeU:
+                cvs, knots = _hodograph(self.cvs, self.knotsU, self.degreeU)
+                su = NurbsSurface(cvs, knots, self.knotsV, self.degreeU - 1, self.degreeV)
+            if self.degreeV:
+                cvs, knots = _hodograph(self.cvs.transpose(1, 0, 2), self.knotsV, self.degreeV)
+                sv = NurbsSurface(cvs.transpose(1, 0, 2), self.knotsU, knots, self.degreeU, self.degreeV - 1)
+            self._partials = (su, sv)
+        return self._partials
+
+    ##################################################################################################################################################
+    # Closest point
+
+    def tessellate(self, samples=6):
+        '''
+        returns (vertices, triangles, params) for a grid of samples quads per knot span. params holds the (u, v) of each vertex
+        '''
+        def grid(knots, degree, num):
+            breaks = np.unique(knots[degree:num + 1])
+            steps = np.linspace(0.0, 1.0, samples + 1)[:-1]
+            values = (breaks[:-1, None] + np.diff(breaks)[:, None] * steps[None, :]).ravel()
+            return np.append(values, breaks[-1])
+
+        numU, numV = self.cvs.shape[:2]
+        us = grid(self.knotsU, self.degreeU, numU)
+        vs = grid(self.knotsV, self.degreeV, numV)
+        u, v = np.meshgrid(us, vs, indexing='ij')
+        params = np.stack([u.ravel(), v.ravel()], axis=1)
+        vertices = self.evaluate(params[:, 0], params[:, 1])
+
+        nu, nv = len(us), len(vs)
+        i, j = np.meshgrid(np.arange(nu - 1), np.arange(nv - 1), indexing='ij')
+        a, b = (i * nv + j).ravel(), ((i + 1) * nv + j).ravel()
+        c, d = b + 1, a + 1
+        triangles = np.concatenate([np.stack([a, b, c], axis=1), np.stack([a, c, d], axis=1)])
+        return vertices, triangles, params
+
+    def closestParameters(self, points, samples=6, iterations=6):
+        '''
+        returns (u, v) arrays of the params of the closest points on the surface to points.
+        Points are first projected onto a tessellation of the surface through a TriangleBVH, which is built once and kept.
+        The interpolated params are then refined with damped Newton steps on the surface itself. Where the surface folds, the
+        tessellation can pick the wrong side of a fold, so Newton is also run from the middle of the knot span the projection
+        lands in and of each span around it, and the closest result kept
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if self._tree is None:
+            vertices, triangles, params = self.tessellate(samples)
+            self._tree = (bvh.TriangleBVH(vertices, triangles), params[triangles])
+        tree, triangleParams = self._tree
+        tris, bary = tree.closestPoints(points)[:2]
+        uv = tree.interpolate(triangleParams, tris, bary)
+        u, v, dist = self._refine(points, uv[:, 0].copy(), uv[:, 1].copy(), iterations)
+
+        # the middle of the spans around each projection - every point gets the same 9 neighbours, clamped to the domain
+        numU, numV = self.cvs.shape[:2]
+        breaksU = np.unique(self.knotsU[self.degreeU:numU + 1])
+        breaksV = np.unique(self.knotsV[self.degreeV:numV + 1])
+        midU, midV = (breaksU[:-1] + breaksU[1:]) * 0.5, (breaksV[:-1] + breaksV[1:]) * 0.5
+        spanU = np.clip(np.searchsorted(breaksU, u, side='right') - 1, 0, len(midU) - 1)
+        spanV = np.clip(np.searchsorted(breaksV, v, side='right') - 1, 0, len(midV) - 1)
+        offsets = np.array([(i, j) for i in (-1, 0, 1) for j in (-1, 0, 1)])
+        seedU = midU[np.clip(spanU[:, None] + offsets[None, :, 0], 0, len(midU) - 1)].ravel()
+        seedV = midV[np.clip(spanV[:, None] + offsets[None, :, 1], 0, len(midV) - 1)].ravel()
+        # a couple of steps from every seed is enough to tell which basin each falls into - only the best is refined further
+        screen = min(2, iterations)
+        seedU, seedV, seedDist = self._refine(np.repeat(points, len(offsets), axis=0), seedU, seedV, screen)
+        pick = np.arange(len(points)) * len(offsets) + seedDist.reshape(len(points), len(offsets)).argmin(axis=1)
+        seedU, seedV, seedDist = self._refine(points, seedU[pick], seedV[pick], iterations - screen)
+
+        closer = seedDist < dist
+        u[closer], v[closer] = seedU[closer], seedV[closer]
+        return u, v
+
+    def _refine(self, points, u, v, iterations):
+        '''
+        damped Newton steps towards the closest point to each of points, starting from params u, v.
+        Returns the refined (u, v) and the squared distance of each
+        '''
+        (u0, u1), (v0, v1) = self.domain()
+        su, sv = self.partials()
+        suu, suv = su.partials() if su is not None else (None, None)
+        svv = sv.partials()[1] if sv is not None else None
+
+        def sample(surface, u, v):
+            return surface.evaluate(u, v) if surface is not None else np.zeros((len(u), 3))
+
+        dist = ((self.evaluate(u, v) - points) ** 2).sum(axis=1)
+        for i in range(iterations):
+            r = self.evaluate(u, v) - points
+            du, dv = sample(su, u, v), sample(sv, u, v)
+            gu, gv = (du * r).sum(axis=1), (dv * r).sum(axis=1)
+            # Newton on the squared distance - falls back to Gauss-Newton where the hessian isn't positive definite
+            a, b, c = (du * du).sum(axis=1), (du * dv).sum(axis=1), (dv * dv).sum(axis=1)
+            ha = a + (sample(suu, u, v) * r).sum(axis=1)
+            hb = b + (sample(suv, u, v) * r).sum(axis=1)
+            hc = c + (sample(svv, u, v) * r).sum(axis=1)
+            newton = (ha > 0.0) & (ha * hc - hb * hb > 1e-12)
+            a, b, c = np.where(newton, ha, a), np.where(newton, hb, b), np.where(newton, hc, c)
+            det = a * c - b * b
+            with np.errstate(divide='ignore', invalid='ignore'):
+                stepU = np.where(det > 1e-12, (c * gu - b * gv) / det, 0.0)
+                stepV = np.where(det > 1e-12, (a * gv - b * gu) / det, 0.0)
+                # where a step pushes a param already on the edge of the domain outwards, solve along the edge instead
+                edgeU = ((u <= u0) & (stepU > 0.0)) | ((u >= u1) & (stepU < 0.0))
+                edgeV = ((v <= v0) & (stepV > 0.0)) | ((v >= v1) & (stepV < 0.0))
+                # along an edge only the curvature in that direction matters, so use it wherever it is positive
+                edgeA, edgeC = np.where(ha > 1e-12, ha, a), np.where(hc > 1e-12, hc, c)
+                alongU = np.where(edgeA > 1e-12, gu / edgeA, 0.0)
+                alongV = np.where(edgeC > 1e-12, gv / edgeC, 0.0)
+                # in a corner, slide along whichever edge leads into the domain and promises the bigger drop
+                corner = edgeU & edgeV
+                inU = ~(((u <= u0) & (alongU > 0.0)) | ((u >= u1) & (alongU < 0.0)))
+                inV = ~(((v <= v0) & (alongV > 0.0)) | ((v >= v1) & (alongV < 0.0)))
+                slideU = corner & inU & (~inV | (gu * alongU >= gv * alongV))
+                slideV = corner & inV & ~slideU
+                stepU = np.where(edgeV & ~edgeU | slideU, alongU, np.where(edgeU, 0.0, stepU))
+                stepV = np.where(edgeU & ~edgeV | slideV, alongV, np.where(edgeV, 0.0, stepV))
+
+            # halve steps that don't bring the point closer
+            pending = np.ones(len(points), dtype=bool)
+            for halving in range(6):
+                newU = np.clip(u - stepU, u0, u1)
+                newV = np.clip(v - stepV, v0, v1)
+                newDist = ((self.evaluate(newU, newV) - points) ** 2).sum(axis=1)
+                accept = pending & (newDist < dist)
+                u[accept], v[accept], dist[accept] = newU[accept], newV[accept], newDist[accept]
+                pending &= ~accept
+                if not pending.any():
+                    break
+                stepU, stepV = stepU * 0.5, stepV * 0.5
+        return u, v, dist
@@ -0,0 +1,393 @@
+# Pose capture and application for whole characters.
+# A Pose holds its values as packed arrays - one entry per plug, with parallel arrays for the control and attribute each value belongs to -
+# so that capturing, filtering and applying a pose are single passes over the arrays rather than a command per attribute:
+#     capture  - the plugs are read in one API pass through an MSelectionList (cmds.getAttr when OpenMaya isn't available)
+#     apply    - current values are read the same way and only the plugs that differ are set. With undo switched off they are set
+#                by a single MDGModifier. Otherwise they are set through maya.cmds inside one undo chunk, so the pose is one undoable step
+#     keys     - writeKeys keys many plugs over a range of frames the same way, with one addKeys call per anim curve through the API.
+#                With undo on, the keys are built on scratch curves and pasted onto the plugs inside one undo chunk
+# Each control belongs to a part (the picker's rigPart, or the control's system and side from the control registry) so that a pose
+# can be applied to part of a character.
+# Named poses are kept in a PoseLibrary, stored as one compact json document with shared control, attribute and part tables:
+#     {"format":"rooftopsPoseLibrary", "version":1, "controls":[...], "attrs":[...], "parts":[...],
+#      "poses":{name:{"controls":[controlIndex, ...], "parts":[partIndex, ...], "owners":[index into controls, ...],
+#                     "attrs":[attrIndex, ...], "values":[...]}}}
+# Libraries are cached in process, keyed by path and modification time.
+import os
+import json
+from array import array
+import maya.cmds as cmds
+import maya.OpenMaya as om
+
+FORMAT = 'rooftopsPoseLibrary'
+VERSION = 1
+TOLERANCE = 1e-9
+MISSING = float('nan')
+# scratch anim curve type for each unit returned by _getUnit
+CURVE_TYPES = {'angle':'animCurveTA', 'distance':'animCurveTL'}
+
+_cache = {}
+
+def splitNamespace(node):
+    '''
+    returns (namespace, name) for node
+    '''
+    namespace, sep, name = str(node).rpartition(':')
+    return namespace, name
+
+def _getUnit(plug):
+    '''
+    returns 'angle', 'distance', 'bool', 'int' or None for plug. API values are in internal units - cmds values are in UI units
+    '''
+    attr = plug.attribute()
+    if attr.hasFn(om.MFn.kUnitAttribute):
+        unitType = om.MFnUnitAttribute(attr).unitType()
+        if unitType == om.MFnUnitAttribute.kAngle:
+            return 'angle'
+        if unitType == om.MFnUnitAttribute.kDistance:
+            return 'distance'
+    elif attr.hasFn(om.MFn.kEnumAttribute):
+        return 'int'
+    elif attr.hasFn(om.MFn.kNumericAttribute):
+        unitType = om.MFnNumericAttribute(attr).unitType()
+        if unitType == om.MFnNumericData.kBoolean:
+            return 'bool'
+        if unitType in (om.MFnNumericData.kByte, om.MFnNumericData.kChar, om.MFnNumericData.kShort,
+                        om.MFnNumericData.kInt, om.MFnNumericData.kLong):
+            return 'int'
+    return None
+
+def _getPlugs(names):
+    '''
+    returns an MPlug for each of names - None where the plug doesn't exist
+    '''
+    sel = om.MSelectionList()
+    plugs = []
+    for name in names:
+        sel.clear()
+        plug = om.MPlug()
+        try:
+            sel.add(name)
+            sel.getPlug(0, plug)
+        except RuntimeError:
+            plug = None
+        plugs.append(plug)
+    return plugs
+
+def _getAttr(plug, time=None):
+    try:
+        if time is None:
+            return float(cmds.getAttr(plug))
+        return float(cmds.getAttr(plug, time=time))
+    except (ValueError, RuntimeError):
+        return MISSING
+
+def readValues(plugNames, time=None):
+    '''
+    returns an array of the values of plugNames, in UI units, at the current time or at time. Plugs which don't exist read as MISSING (nan)
+    '''
+    if not hasattr(om, 'MSelectionList'):
+        return array('d', [_getAttr(plug, time) for plug in plugNames])
+    context = getContext(time)
+    values = array('d')
+    for plug in _getPlugs(plugNames):
+        values.append(MISSING if plug is None else plugValue(plug, _getUnit(plug), context))
+    return values
+
+def getContext(time=None):
+    '''
+    returns an MDGContext for time in UI units - the normal context, for the current time, if time is None
+    '''
+    return om.MDGContext() if time is None else om.MDGContext(om.MTime(time, om.MTime.uiUnit()))
+
+def plugValue(plug, unit, context):
+    '''
+    returns the value of MPlug plug under context, in UI units. unit is as returned by _getUnit
+    '''
+    if unit == 'angle':
+        return plug.asMAngle(context).asUnits(om.MAngle.uiUnit())
+    if unit == 'distance':
+        return plug.asMDistance(context).asUnits(om.MDistance.uiUnit())
+    return plug.asDouble(context)
+
+def _internalValue(unit, value):
+    if unit == 'angle':
+        return om.MAngle(value, om.MAngle.uiUnit()).asRadians()
+    if unit == 'distance':
+        return om.MDistance(value, om.MDistance.uiUnit()).asCentimeters()
+    return value
+
+def writeValues(plugNames, values, useApi=None):
+    '''
+    sets each of plugNames to the corresponding value, as a single undoable step. Values are in UI units.
+    Returns the MDGModifier used if the values went through the API, so that the caller can undo them
+    '''
+    if not plugNames:
+        return None
+    if useApi is None:
+        useApi = hasattr(om, 'MDGModifier') and not cmds.undoInfo(q=1, state=1)
+    if not useApi:
+        cmds.undoInfo(openChunk=1)
+        try:
+            for plug, value in zip(plugNames, values):
+                cmds.setAttr(plug, value)
+        finally:
+            cmds.undoInfo(closeChunk=1)
+        return None
+
+    mod = om.MDGModifier()
+    for plug, value in zip(_getPlugs(plugNames), values):
+        if plug is None:
+            continue
+        unit = _getUnit(plug)
+        if unit == 'angle':
+            mod.newPlugValueMAngle(plug, om.MAngle(value, om.MAngle.uiUnit()))
+        elif unit == 'distance':
+            mod.newPlugValueMDistance(plug, om.MDistance(value, om.MDistance.uiUnit()))
+        elif unit == 'bool':
+            mod.newPlugValueBool(plug, bool(value))
+        elif unit == 'int':
+            mod.newPlugValueInt(plug, int(round(value)))
+        else:
+            mod.newPlugValueDouble(plug, value)
+    mod.doIt()
+    return mod
+
+def _getNode(name):
+    sel = om.MSelectionList()
+    sel.add(name)
+    node = om.MObject()
+    sel.getDependNode(0, node)
+    return node
+
+def writeKeys(plugNames, frames, values, useApi=None):
+    '''
+    keys each of plugNames at frames. values holds a row of values per frame, one value per plug, in UI units.
+    Each plug's keys are built by one MFnAnimCurve.addKeys call, replacing the keys in that range. With undo switched off
+    they are added straight to the plug's anim curve. Otherwise API edits can't be undone, so they are added to a scratch
+    curve which is pasted onto the plug - the scratch curves are created and deleted inside the same undo chunk.
+    Plugs driven by anything other than an anim curve are skipped. Without OpenMaya each key is set by setKeyframe
+    '''
+    if not plugNames or not len(frames):
+        return None
+    if not hasattr(om, 'MFnAnimCurve'):
+        cmds.undoInfo(openChunk=1)
+        try:
+            for f, frame in enumerate(frames):
+                for p, plug in enumerate(plugNames):
+                    cmds.setKeyframe(plug, time=frame, value=values[f][p])
+        finally:
+            cmds.undoInfo(closeChunk=1)
+        return None
+    if useApi is None:
+        useApi = not cmds.undoInfo(q=1, state=1)
+
+    mod = om.MDGModifier()
+    times = om.MTimeArray()
+    for frame in frames:
+        times.append(om.MTime(frame, om.MTime.uiUnit()))
+    span = (min(frames), max(frames))
+    scratch = {}
+    if not useApi:
+        cmds.undoInfo(openChunk=1)
+    try:
+        for p, plug in enumerate(_getPlugs(plugNames)):
+            if plug is None:
+                continue
+            sources = om.MPlugArray()
+            animated = plug.connectedTo(sources, 1, 0) and sources.length()
+            if animated and not sources[0].node().hasFn(om.MFn.kAnimCurve):
+                continue
+            unit = _getUnit(plug)
+            curve = om.MFnAnimCurve()
+            if not useApi:
+                if not unit in scratch:
+                    scratch[unit] = cmds.createNode(CURVE_TYPES.get(unit, 'animCurveTU'), skipSelect=1)
+                curve.setObject(_getNode(scratch[unit]))
+            elif animated:
+                curve.setObject(sources[0].node())
+            else:
+                curve.create(plug, mod)
+            keys = om.MDoubleArray()
+            for f in range(len(frames)):
+                keys.append(_internalValue(unit, values[f][p]))
+            curve.addKeys(times, keys, om.MFnAnimCurve.kTangentGlobal, om.MFnAnimCurve.kTangentGlobal, False)
+            if not useApi:
+                cmds.copyKey(scratch[unit])
+                cmds.pasteKey(plugNames[p], time=span, option='replace')
+    finally:
+        if not useApi:
+            if scratch:
+                cmds.delete(list(scratch.values()))
+            cmds.undoInfo(closeChunk=1)
+    if not useApi:
+        return None
+    mod.doIt()
+    return mod
+
+######################################################################################################################################################
+
+class Pose(object):
+    '''
+    Values for a set of controls. controls and parts are parallel lists. owners, attrs and values are parallel arrays with
+    one entry per plug - owners holds the index of the plug's control. Control names are stored without their namespace
+    '''
+    def __init__(self, controls=None, parts=None, owners=None, attrs=None, values=None):
+        self.controls = list(controls or [])
+        self.parts = list(parts or [''] * len(self.controls))
+        self.owners = array('i', owners or [])
+        self.attrs = list(attrs or [])
+        self.values = array('d', values or [])
+
+    def __len__(self):
+        return len(self.values)
+
+    @classmethod
+    def capture(cls, controls, attrs=None, parts=None):
+        '''
+        captures the current values of controls. attrs is a list of attributes, or {ctrl:[attrs]}. By default each control's
+        unlocked keyable attributes are captured. parts is an optional {ctrl:part}
+        '''
+        pose = cls()
+        plugNames = []
+        for ctrl in controls:
+            namespace, name = splitNamespace(ctrl)
+            if isinstance(attrs, dict):
+                ctrlAttrs = attrs.get(ctrl, [])
+            else:
+                ctrlAttrs = attrs or cmds.listAttr(ctrl, keyable=1, unlocked=1) or []
+            pose.controls.append(name)
+            pose.parts.append((parts or {}).get(ctrl, ''))
+            for attr in ctrlAttrs:
+                pose.owners.append(len(pose.controls) - 1)
+                pose.attrs.append(attr)
+                plugNames.append('%s.%s' % (ctrl, attr))
+        pose.values = readValues(plugNames)
+        return pose
+
+    @classmethod
+    def fromDefaults(cls, defaults, parts=None):
+        '''
+        makes a pose from {ctrl:{attr:value}}, as stored on picker buttons and in the control registry
+        '''
+        pose = cls()
+        for ctrl in sorted(defaults):
+            pose.controls.append(splitNamespace(ctrl)[1])
+            pose.parts.append((parts or {}).get(ctrl, ''))
+            for attr in sorted(defaults[ctrl]):
+                pose.owners.append(len(pose.controls) - 1)
+                pose.attrs.append(attr)
+                pose.values.append(float(defaults[ctrl][attr]))
+        return pose
+
+    def asDefaults(self):
+        '''
+        returns the pose as {ctrl:{attr:value}}
+        '''
+        defaults = dict((ctrl, {}) for ctrl in self.controls)
+        for owner, attr, value in zip(self.owners, self.attrs, self.values):
+            defaults[self.controls[owner]][attr] = value
+        return defaults
+
+    def getPlugs(self, namespace='', parts=None, controls=None):
+        '''
+        returns (plugNames, values) for the pose in namespace, limited to the controls in parts and / or controls if given
+        '''
+        prefix = '%s:' % namespace.strip(':') if namespace.strip(':') else ''
+        if controls is not None:
+            controls = set(splitNamespace(c)[1] for c in controls)
+        use = [(parts is None or part in parts) and (controls is None or ctrl in controls) for ctrl, part in zip(self.controls, self.parts)]
+        plugNames, values = [], array('d')
+        for owner, attr, value in zip(self.owners, self.attrs, self.values):
+            if use[owner]:
+                plugNames.append('%s%s.%s' % (prefix, self.controls[owner], attr))
+                values.append(value)
+        return plugNames, values
+
+    def apply(self, namespace='', parts=None, controls=None, useApi=None):
+        '''
+        applies the pose, or the part of it in parts / controls, in one step. Plugs which already hold their value, or
+        which no longer exist, are skipped. Returns the number of plugs set
+        '''
+        plugNames, values = self.getPlugs(namespace, parts, controls)
+        current = readValues(plugNames)
+        # nan never compares greater, so missing plugs drop out here too
+        changed = [i for i in range(len(values)) if abs(values[i] - current[i]) > TOLERANCE]
+        writeValues([plugNames[i] for i in changed], [values[i] for i in changed], useApi)
+        return len(changed)
+
+######################################################################################################################################################
+
+class PoseLibrary(object):
+    '''
+    Named poses stored in a single file
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.poses = {}
+        if path and os.path.exists(path):
+            self.poses = dict(readLibrary(path))
+
+    def names(self):
+        return sorted(self.poses)
+
+    def get(self, name):
+        return self.poses.get(name)
+
+    def add(self, name, pose):
+        self.poses[name] = pose
+        self.save()
+
+    def remove(self, name):
+        if name in self.poses:
+            del self.poses[name]
+            self.save()
+
+    def save(self):
+        writeLibrary(self.path, self.poses)
+
+def readLibrary(path):
+    '''
+    returns {name:Pose} from the library at path. The result is cached until the file changes - treat it as read only
+    '''
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime, stat.st_size)
+    cached = _cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if data.get('format') != FORMAT or data.get('version', 0) > VERSION:
+        raise ValueError('Unsupported pose library: %s' % path)
+    controls, attrs, parts = data['controls'], data['attrs'], data['parts']
+    poses = {}
+    for name, p in data['poses'].items():
+        poses[name] = Pose([controls[i] for i in p['controls']], [parts[i] for i in p['parts']],
+                           p['owners'], [attrs[i] for i in p['attrs']], p['values'])
+    _cache[path] = (key, poses)
+    return poses
+
+def writeLibrary(path, poses):
+    '''
+    writes {name:Pose} to path
+    '''
+    tables = {'controls':[], 'attrs':[], 'parts':[]}
+    indices = {'controls':{}, 'attrs':{}, 'parts':{}}
+    def index(table, value):
+        if value not in indices[table]:
+            indices[table][value] = len(tables[table])
+            tables[table].append(value)
+        return indices[table][value]
+
+    data = {}
+    for name, pose in poses.items():
+        data[name] = {'controls':[index('controls', c) for c in pose.controls],
+                      'parts':[index('parts', p) for p in pose.parts],
+                      'owners':list(pose.owners),
+                      'attrs':[index('attrs', a) for a in pose.attrs],
+                      'values':list(pose.values)}
+    with open(path, 'w') as f:
+        json.dump({'format':FORMAT, 'version':VERSION, 'controls':tables['controls'], 'attrs':tables['attrs'],
+                   'parts':tables['parts'], 'poses':data}, f, separators=(',', ':'))
+    _cache.pop(os.path.abspath(path), None)
@@ -0,0 +1,138 @@
+# Live registry of the MetaRig roots in the scene.
+# The scene is scanned once with a single indexed ls query. After that the registry is kept current by callbacks:
+#     node added           - a node already carrying the rig attribute is registered straight away. Otherwise, as
+#                            attributes are usually added after the node, the registry is marked unchecked and one
+#                            deferred rescan is queued, however many nodes are added - nothing is kept per node
+#     node removed         - dropped from the registry
+#     name changed         - the rig is renamed in place
+#     open / new / import / reference load and unload - the scene is rescanned
+# so getRigs() is a lookup rather than a scan of every node in the scene.
+import maya.cmds as cmds
+import maya.OpenMaya as om
+
+class RigRegistry(object):
+    '''
+    Tracks every node in the scene carrying attr. nodeType limits the nodes that are considered, 'dependNode' considers everything
+    '''
+    def __init__(self, attr='metaRig', nodeType='network'):
+        self.attr = attr
+        self.nodeType = nodeType
+        self.rigs = []
+        self.unchecked = False
+        self.callbacks = []
+        self.running = False
+
+    def start(self):
+        '''
+        scans the scene and installs the callbacks that keep the registry current
+        '''
+        if self.running:
+            return
+        self.scan()
+        self.callbacks.append(om.MDGMessage.addNodeAddedCallback(self.nodeAdded, self.nodeType))
+        self.callbacks.append(om.MDGMessage.addNodeRemovedCallback(self.nodeRemoved, self.nodeType))
+        self.callbacks.append(om.MNodeMessage.addNameChangedCallback(om.MObject(), self.nameChanged))
+        for message in [om.MSceneMessage.kAfterOpen, om.MSceneMessage.kAfterNew, om.MSceneMessage.kAfterImport,
+                        om.MSceneMessage.kAfterLoadReference, om.MSceneMessage.kAfterUnloadReference,
+                        om.MSceneMessage.kAfterCreateReference, om.MSceneMessage.kAfterRemoveReference]:
+            self.callbacks.append(om.MSceneMessage.addCallback(message, self.sceneChanged))
+        self.running = True
+
+    def stop(self):
+        for callback in self.callbacks:
+            om.MMessage.removeCallback(callback)
+        self.callbacks = []
+        self.running = False
+
+    def scan(self):
+        '''
+        finds every rig in the scene, including referenced and namespaced rigs, with one ls query
+        '''
+        kwargs = {'objectsOnly':1, 'recursive':1}
+        if self.nodeType != 'dependNode':
+            kwargs['type'] = self.nodeType
+        self.rigs = []
+        for node in cmds.ls('*.%s' % self.attr, **kwargs) or []:
+            if node not in self.rigs:
+                self.rigs.append(node)
+        self.unchecked = False
+
+    def check(self):
+        '''
+        rescans the scene if nodes have been added since it was last scanned
+        '''
+        if self.unchecked and self.running:
+            self.scan()
+
+    def getRigs(self):
+        '''
+        returns the names of all rigs in the scene
+        '''
+        # the deferred rescan may not have run yet - it waits for Maya to be idle
+        self.check()
+        return list(self.rigs)
+
+    def register(self, node):
+        node = str(node)
+        if node not in self.rigs:
+            self.rigs.append(node)
+
+    def unregister(self, node):
+        node = str(node)
+        if node in self.rigs:
+            self.rigs.remove(node)
+
+    ##################################################################################################################################################
+    # Callbacks
+
+    def nodeAdded(self, node, clientData):
+        fn = om.MFnDependencyNode(node)
+        if fn.hasAttribute(self.attr):
+            self.register(fn.name())
+        elif not self.unchecked:
+            self.unchecked = True
+            cmds.evalDeferred(self.check, lowestPriority=1)
+
+    def nodeRemoved(self, node, clientData):
+        if self.rigs:
+            self.unregister(om.MFnDependencyNode(node).name())
+
+    def nameChanged(self, node, previousName, clientData):
+        if previousName in self.rigs:
+            self.rigs[self.rigs.index(previousName)] = om.MFnDependencyNode(node).name()
+
+    def sceneChanged(self, clientData):
+        self.scan()
+
+######################################################################################################################################################
+
+_registries = {}
+
+def getRegistry(attr='metaRig', nodeType='network'):
+    '''
+    returns the running registry for attr, starting it on first use
+    '''
+    registry = _registries.get((attr, nodeType))
+    if not registry:
+        registry = _registries[(attr, nodeType)] = RigRegistry(attr, nodeType)
+    registry.start()
+    return registry
+
+def getSceneRigs(attr='metaRig', nodeType='network'):
+    '''
+    returns the names of all nodes in the scene carrying attr - by default, all MetaRig roots
+    '''
+    return getRegistry(attr, nodeType).getRigs()
+
+def registerRig(node, attr='metaRig'):
+    '''
+    adds a newly created rig to any running registry for attr. Registries pick up new nodes by themselves,
+    but this makes the rig available straight away
+    '''
+    for (registryAttr, nodeType), registry in _registries.items():
+        if registryAttr == attr and registry.running:
+            registry.register(node)
+
+def stopAll():
+    for registry in _registries.values():
+        registry.stop()
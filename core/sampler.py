@@ -0,0 +1,78 @@
+# Sampling a rig over a range of frames without moving the timeline.
+# Plugs are resolved to MPlugs once. Each frame is then pulled under its own MDGContext, which evaluates the graph at that
+# time without changing the current time, redrawing or running any time changed callbacks. cmds.getAttr(time=) is used
+# when OpenMaya isn't available.
+# Results are dense, C ordered float64 numpy arrays - one row per frame - so they can be sliced, reshaped to (..., 4, 4)
+# or handed to other code through the buffer protocol without a copy. Pass out to fill an existing array rather than allocating one.
+#
+# Usage:
+#     matrices = sampler.sampleWorldMatrices(['lf_hand_fk_ctrl', 'lf_hand_ik_ctrl'], range(1, 101))     # (100, 2, 16)
+#     values = sampler.sampleValues(['lf_hand_fk_ctrl.rotateX'], range(1, 101))                        # (100, 1)
+import numpy as np
+import maya.cmds as cmds
+import maya.OpenMaya as om
+from rooftops.core import pose
+
+def _getFrames(frames):
+    return [None] if frames is None else list(frames)
+
+def _getOutput(out, shape):
+    if out is None:
+        return np.empty(shape)
+    if out.shape != shape or out.dtype != np.float64 or not out.flags.c_contiguous:
+        raise ValueError('out must be a contiguous float64 array of shape %s' % (shape,))
+    return out
+
+def sampleValues(plugNames, frames=None, out=None):
+    '''
+    returns a (frames, plugs) array of the values of plugNames at each of frames, in UI units. With no frames, a single
+    row is read at the current time. Plugs which don't exist read as pose.MISSING (nan)
+    '''
+    frames = _getFrames(frames)
+    out = _getOutput(out, (len(frames), len(plugNames)))
+    if not hasattr(om, 'MSelectionList'):
+        for f, frame in enumerate(frames):
+            out[f] = pose.readValues(plugNames, frame)
+        return out
+
+    plugs = pose._getPlugs(plugNames)
+    units = [None if plug is None else pose._getUnit(plug) for plug in plugs]
+    for f, frame in enumerate(frames):
+        context = pose.getContext(frame)
+        row = out[f]
+        for p, plug in enumerate(plugs):
+            row[p] = pose.MISSING if plug is None else pose.plugValue(plug, units[p], context)
+    return out
+
+def sampleMatrices(plugNames, frames=None, out=None):
+    '''
+    returns a (frames, plugs, 16) array of the matrix plugs plugNames at each of frames, each matrix flattened row by row.
+    With no frames, a single row is read at the current time
+    '''
+    frames = _getFrames(frames)
+    out = _getOutput(out, (len(frames), len(plugNames), 16))
+    if not hasattr(om, 'MSelectionList'):
+        for f, frame in enumerate(frames):
+            for p, plug in enumerate(plugNames):
+                out[f, p] = cmds.getAttr(plug) if frame is None else cmds.getAttr(plug, time=frame)
+        return out
+
+    plugs = pose._getPlugs(plugNames)
+    for f, frame in enumerate(frames):
+        context = pose.getContext(frame)
+        for p, plug in enumerate(plugs):
+            matrix = om.MFnMatrixData(plug.asMObject(context)).matrix()
+            out[f, p] = [matrix(i, j) for i in range(4) for j in range(4)]
+    return out
+
+def sampleWorldMatrices(nodes, frames=None, out=None):
+    '''
+    returns a (frames, nodes, 16) array of the world matrices of nodes at each of frames
+    '''
+    return sampleMatrices(['%s.worldMatrix[0]' % node for node in nodes], frames, out)
+
+def sampleParentMatrices(nodes, frames=None, out=None):
+    '''
+    returns a (frames, nodes, 16) array of the parent matrices of nodes at each of frames
+    '''
+    return sampleMatrices(['%s.parentMatrix[0]' % node for node in nodes], frames, out)
@@ -0,0 +1,80 @@
+# Index of the scene for the pickers.
+# Rather than querying the scene once per picker file or once per curve, the index is built with a fixed number of queries:
+#     top level dag nodes    - one ls
+#     namespaces             - one namespaceInfo
+#     controls               - one ls of every nurbsCurve, whose long names give each curve's parent transform and root,
+#                              then one listConnections over all of the candidates to drop those driven by a constraint
+# Controls are *_ctrl transforms with a nurbsCurve shape and no constraint inputs, grouped by their top level node.
+import maya.cmds as cmds
+
+class SceneIndex(object):
+    '''
+    Top level nodes, namespaces and controls of the scene. Call build() again, or refresh(roots) for particular rigs, after the scene changes
+    '''
+    def __init__(self, ctrlSuffix='_ctrl'):
+        self.ctrlSuffix = ctrlSuffix
+        self.roots = set()
+        self.namespaces = set()
+        self.controls = {}
+        self.build()
+
+    def build(self):
+        '''
+        indexes the whole scene
+        '''
+        self.roots = set(cmds.ls(assemblies=1) or [])
+        self.namespaces = set(cmds.namespaceInfo(':', listOnlyNamespaces=1, recurse=1) or [])
+        self.controls = self.findControls(cmds.ls(type='nurbsCurve', long=1) or [])
+
+    def refresh(self, roots):
+        '''
+        re-indexes the controls under roots only
+        '''
+        if not isinstance(roots, (list, tuple, set)):
+            roots = [roots]
+        roots = [r for r in roots if cmds.objExists(r)]
+        for root in roots:
+            self.roots.add(root.split('|')[-1])
+            self.controls.pop(root.split('|')[-1], None)
+        if roots:
+            self.controls.update(self.findControls(cmds.listRelatives(roots, ad=1, type='nurbsCurve', fullPath=1) or []))
+
+    def findControls(self, curves):
+        '''
+        returns {root:[controls]} for the constraint free *_ctrl parents of curves. curves must be long names
+        '''
+        # kept in scene order, with a set for the membership test
+        candidates = []
+        seen = set()
+        for curve in curves:
+            parent = curve.rsplit('|', 1)[0]
+            if parent and parent.endswith(self.ctrlSuffix) and parent not in seen:
+                seen.add(parent)
+                candidates.append(parent)
+
+        # a single query for the constraint inputs of every candidate. Plugs come back with the shortest unique
+        # node name, so candidates are matched on any trailing part of their long name
+        constrained = set()
+        if candidates:
+            connections = cmds.listConnections(candidates, type='constraint', d=0, connections=1) or []
+            constrained = set(plug.split('.')[0] for plug in connections[::2])
+
+        controls = {}
+        for candidate in candidates:
+            parts = candidate.split('|')
+            if any('|'.join(parts[-i:]) in constrained for i in range(1, len(parts))):
+                continue
+            controls.setdefault(parts[1], []).append(candidate)
+        return controls
+
+    def hasRoot(self, node):
+        return node in self.roots
+
+    def hasNamespace(self, namespace):
+        return namespace.strip(':') in self.namespaces
+
+    def getControls(self, root):
+        '''
+        returns the long names of the controls under root
+        '''
+        return list(self.controls.get(root.strip('|').split('|')[0], []))
@@ -1,2 +1,2 @@
-python E:\CODE_DEV\rooftops\pipeline_tools\live_edit\movie_merge.py E:\PROJECTS\ROOFTOPS\STORY\LIVE_EDIT -watch
+py -3 E:\CODE_DEV\rooftops\pipeline_tools\live_edit\service.py E:\PROJECTS\ROOFTOPS\STORY\LIVE_EDIT -status E:\PROJECTS\ROOFTOPS\STORY\LIVE_EDIT\live_edit_status.json -port 8765
 pause
\ No newline at end of file
@@ -0,0 +1,461 @@
+# Joining movies with ffmpeg.
+# Movies whose streams all match - same codecs, frame size, pixel format, frame rate, time base and audio format - are joined
+# with the concat demuxer and stream copy, so nothing is decoded or encoded and the time taken is little more than copying
+# the files. Anything else falls back to the concat filter, which decodes and re-encodes every input - or, given a segment
+# cache, each input is normalized to a common format once and the cached segments are joined with stream copy.
+# Inputs are checked with ffprobe, once per file version - probes are cached in process by path, size and mtime.
+# Commands are built as argument lists, so paths with spaces work and no shell is involved. Commands run on behalf of a
+# scheduler.MergeJob are attached to it, so that the job can be cancelled by killing its ffmpeg.
+# Given a metrics.MergeMetrics, probes are timed and ffmpeg is run with -progress, its progress parsed as it runs.
+#
+# Merges are written as generators of steps - the Commands to run and the blocking Calls to make - so that what a merge does is
+# decided in one place however its commands are run. drive runs the steps here and now, service.drive runs them with asyncio:
+#     method = drive(merge_steps(paths, out, ffmpeg), job)
+import os
+import json
+import time
+import types
+import shutil
+import tempfile
+import subprocess
+
+# the stream properties which have to match for stream copy to give a valid movie
+STREAM_KEYS = ['codec_type', 'codec_name', 'codec_tag_string', 'profile', 'width', 'height', 'pix_fmt', 'r_frame_rate',
+               'time_base', 'sample_rate', 'sample_fmt', 'channels', 'channel_layout']
+
+# the format clips are normalized to before being cached as segments - see segment_cache.py. The frame size, frame rate and
+# audio format are taken from the clips being joined by derive_profile, so these only apply where the clips can't be probed
+PROFILE = {'width':1920, 'height':1080, 'fps':24, 'pix_fmt':'yuv420p', 'vcodec':'libx264', 'preset':'veryfast', 'crf':18,
+           'acodec':'aac', 'sample_rate':48000, 'channels':2}
+
+_probes = {}
+
+
+class Cancelled(Exception):
+    '''
+    raised when the job a command was run for has been cancelled
+    '''
+    pass
+
+
+class Command(object):
+    '''
+    a step of a merge - cmd to run, as run does. With capture, the output of cmd is sent back to the merge
+    '''
+    def __init__(self, cmd, progress=None, capture=False):
+        self.cmd = cmd
+        self.progress = progress
+        self.capture = capture
+
+
+class Call(object):
+    '''
+    a step of a merge - fn(*args), blocking work such as hashing a movie. What fn returns is sent back to the merge
+    '''
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+
+
+class Plan(object):
+    '''
+    steps through a merge generator. The generator yields Commands and Calls for a driver to run, and is sent back the result
+    of each, or has the exception it raised thrown into it. It may also yield another generator, which is stepped through in
+    turn and its result sent back. Anything else it yields is its result, and it is closed
+    '''
+    def __init__(self, steps):
+        self.stack = [steps]
+        self.done = False
+        self.result = None
+
+    def advance(self, value=None, error=None):
+        '''
+        :param value: the result of the last step
+        :param error: the exception the last step raised, if it failed
+        :return: the next Command or Call to run. None once the merge has given its result, and done is set.
+                 Raises whatever the merge raises
+        '''
+        while self.stack:
+            steps = self.stack[-1]
+            try:
+                step = steps.send(value) if error is None else steps.throw(error)
+            except StopIteration:
+                step = None
+            except BaseException as e:
+                self.stack.pop()
+                if not self.stack:
+                    raise
+                value, error = None, e
+                continue
+            value, error = None, None
+            if isinstance(step, (Command, Call)):
+                return step
+            if isinstance(step, types.GeneratorType):
+                self.stack.append(step)
+                continue
+            self.stack.pop().close()
+            value = step
+        self.done = True
+        self.result = value
+        return None
+
+
+def drive(steps, job=None):
+    '''
+    runs a merge generator - see Plan. Commands are run by run, calls are made directly
+    :param job: the scheduler.MergeJob the merge is run for. Raises Cancelled if the job is cancelled
+    :return: the result of the merge
+    '''
+    plan = Plan(steps)
+    step = plan.advance()
+    while not plan.done:
+        value, error = None, None
+        try:
+            if job is not None and job.cancelled:
+                raise Cancelled(job.folder)
+            if isinstance(step, Command):
+                value = run(step.cmd, job, step.progress, step.capture)
+            else:
+                value = step.fn(*step.args)
+        except BaseException as e:
+            error = e
+        step = plan.advance(value, error)
+    return plan.result
+
+
+def as_command(program):
+    '''
+    :param program: a path to an executable, or a list of arguments which runs it
+    :return: program as a list of arguments
+    '''
+    if isinstance(program, (list, tuple)):
+        return list(program)
+    return [program]
+
+
+def get_ffprobe(ffmpeg):
+    '''
+    :param ffmpeg: the ffmpeg executable, as a path or list of arguments
+    :return: the ffprobe alongside it
+    '''
+    if isinstance(ffmpeg, (list, tuple)):
+        return list(ffmpeg)
+    folder, name = os.path.split(ffmpeg)
+    return os.path.join(folder, name.replace('ffmpeg', 'ffprobe'))
+
+
+def probe_key(path):
+    '''
+    :return: the key path's probe is cached under - its path, size and mtime. None if path doesn't exist
+    '''
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime)
+
+
+def probe_command(path, ffprobe):
+    '''
+    :return: the command which prints the streams of path as json
+    '''
+    return as_command(ffprobe) + ['-v', 'error', '-show_entries', 'stream=%s' % ','.join(STREAM_KEYS), '-of', 'json', path]
+
+
+def parse_probe(output):
+    '''
+    :param output: the output of probe_command
+    :return: a list of {key:value} for each stream, holding the STREAM_KEYS it has. None if output can't be read
+    '''
+    try:
+        streams = json.loads(output.decode('utf-8'))['streams']
+    except (ValueError, KeyError, TypeError):
+        return None
+    return [dict((k, stream[k]) for k in STREAM_KEYS if k in stream) for stream in streams]
+
+
+def probe_steps(path, ffprobe):
+    '''
+    the steps of probing path - see Plan. Probes are cached by probe_key, so a movie is only probed again once it has changed
+    :return: a list of {key:value} for each stream in path, holding the STREAM_KEYS it has. None if path can't be probed
+    '''
+    key = probe_key(path)
+    if key is None or key in _probes:
+        yield _probes.get(key)
+    else:
+        try:
+            output = yield Command(probe_command(path, ffprobe), capture=True)
+        except (OSError, subprocess.CalledProcessError):
+            output = None
+        result = parse_probe(output) if output is not None else None
+        if result is not None:
+            _probes[key] = result
+        yield result
+
+
+def probe(path, ffprobe):
+    '''
+    :param path: a movie
+    :param ffprobe: the ffprobe executable, as a path or list of arguments
+    :return: a list of {key:value} for each stream in path, holding the STREAM_KEYS it has. None if path can't be probed
+    '''
+    return drive(probe_steps(path, ffprobe))
+
+
+def clear_probes():
+    _probes.clear()
+
+
+def majority(values):
+    '''
+    :return: the most common of values, the earliest breaking ties. None if values is empty
+    '''
+    counts = {}
+    for value in values:
+        counts[value] = counts.get(value, 0) + 1
+    best = None
+    for value in values:
+        if best is None or counts[value] > counts[best]:
+            best = value
+    return best
+
+
+def derive_profile(probes, profile=None):
+    '''
+    :param probes: the probe of each input, as returned by probe
+    :param profile: overrides, which win over anything derived
+    :return: the profile to normalize the inputs to - PROFILE, with the frame size, frame rate and audio format most of the
+             inputs share, so that a 720p or 25 fps edit stays 720p or 25 fps
+    '''
+    video, audio = [], []
+    for streams in probes or []:
+        for stream in streams or []:
+            if stream.get('codec_type') == 'video' and stream.get('width') and stream.get('height') and \
+                    stream.get('r_frame_rate', '0/0') != '0/0':
+                video.append((int(stream['width']), int(stream['height']), stream['r_frame_rate']))
+                break
+        for stream in streams or []:
+            if stream.get('codec_type') == 'audio' and stream.get('sample_rate') and stream.get('channels'):
+                audio.append((int(stream['sample_rate']), int(stream['channels'])))
+                break
+    derived = {}
+    if video:
+        derived['width'], derived['height'], derived['fps'] = majority(video)
+    if audio:
+        derived['sample_rate'], derived['channels'] = majority(audio)
+    derived.update(profile or {})
+    return dict(PROFILE, **derived)
+
+
+def can_stream_copy(probes):
+    '''
+    :param probes: the probe of each input
+    :return: True if the inputs can be joined without re-encoding
+    '''
+    if not probes or any(p is None for p in probes):
+        return False
+    first = probes[0]
+    return bool(first) and all(p == first for p in probes[1:])
+
+
+def choose_method(probes, segment_cache=False):
+    '''
+    :param probes: the probe of each movie being joined
+    :param segment_cache: whether there is a segment cache to normalize mismatched movies through
+    :return: how the movies are joined - 'copy' if they match, otherwise 'segments' with a segment cache, or 'filter'
+    '''
+    if can_stream_copy(probes):
+        return 'copy'
+    return 'segments' if segment_cache else 'filter'
+
+
+def run(cmd, job=None, progress=None, capture=False):
+    '''
+    runs cmd, raising subprocess.CalledProcessError if it fails
+    :param job: a scheduler.MergeJob. The process is attached to it while it runs, and Cancelled is raised if the job is cancelled
+    :param progress: a progress.ProgressParser, fed the output of cmd as it runs. cmd must write its progress to stdout - see
+                     ffmpeg_command
+    :param capture: return the output of cmd
+    :return: the output of cmd with capture, otherwise None
+    '''
+    if job is None and progress is None:
+        if capture:
+            return subprocess.check_output(cmd)
+        subprocess.check_call(cmd)
+        return None
+    if job is not None and job.cancelled:
+        raise Cancelled(cmd)
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE if progress is not None or capture else None)
+    if job is not None:
+        job.attach(process)
+    output = None
+    try:
+        if progress is not None:
+            for line in iter(process.stdout.readline, b''):
+                progress.feed(line)
+            process.stdout.close()
+        elif capture:
+            output = process.communicate()[0]
+        code = process.wait()
+    finally:
+        if job is not None:
+            job.detach(process)
+    if job is not None and job.cancelled:
+        raise Cancelled(cmd)
+    if code:
+        raise subprocess.CalledProcessError(code, cmd)
+    return output
+
+
+def write_concat_list(paths, list_path):
+    '''
+    writes a concat demuxer list of paths to list_path
+    '''
+    with open(list_path, 'w') as f:
+        for path in paths:
+            path = os.path.abspath(path).replace('\\', '/').replace("'", "'\\''")
+            f.write("file '%s'\n" % path)
+
+
+def ffmpeg_command(ffmpeg, progress=False):
+    '''
+    :param progress: have ffmpeg write its progress to stdout, for a progress.ProgressParser
+    :return: the start of an ffmpeg command - the executable and its global options
+    '''
+    cmd = as_command(ffmpeg) + ['-y', '-v', 'error']
+    if progress:
+        cmd += ['-progress', 'pipe:1', '-nostats']
+    return cmd
+
+
+def copy_command(ffmpeg, list_path, out, progress=False):
+    '''
+    :return: the command which joins the movies in list_path into out with stream copy
+    '''
+    return ffmpeg_command(ffmpeg, progress) + ['-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', out]
+
+
+def filter_command(ffmpeg, paths, out, progress=False):
+    '''
+    :return: the command which joins paths into out with the concat filter, re-encoding the video and audio
+    '''
+    cmd = ffmpeg_command(ffmpeg, progress)
+    for path in paths:
+        cmd += ['-i', path.replace('\\', '/')]
+    inputs = ''.join('[%d:0] [%d:1] ' % (i, i) for i in range(len(paths)))
+    cmd += ['-filter_complex', '%sconcat=n=%d:v=1:a=1 [v] [a]' % (inputs, len(paths)), '-map', '[v]', '-map', '[a]', out]
+    return cmd
+
+
+def normalize_command(ffmpeg, path, out, profile=None, progress=False):
+    '''
+    :return: the command which re-encodes path to out in profile, scaled and padded to its frame size, so that any
+             movies normalized with the same profile can be joined with stream copy
+    '''
+    p = dict(PROFILE, **(profile or {}))
+    scale = 'scale=%(width)d:%(height)d:force_original_aspect_ratio=decrease,pad=%(width)d:%(height)d:(ow-iw)/2:(oh-ih)/2,setsar=1' % p
+    return ffmpeg_command(ffmpeg, progress) + ['-i', path.replace('\\', '/'), '-vf', scale, '-r', str(p['fps']),
+                                               '-c:v', p['vcodec'], '-preset', p['preset'], '-crf', str(p['crf']),
+                                               '-pix_fmt', p['pix_fmt'], '-c:a', p['acodec'], '-ar', str(p['sample_rate']),
+                                               '-ac', str(p['channels']), out]
+
+
+def track(metrics, kind):
+    '''
+    :return: a progress.ProgressParser for a command of kind, recorded in metrics. None without metrics
+    '''
+    return metrics.progress(kind) if metrics is not None else None
+
+
+def copy_join_steps(paths, out, ffmpeg, metrics=None):
+    '''
+    the steps of joining paths into out with the concat demuxer and stream copy - see Plan
+    '''
+    handle, list_path = tempfile.mkstemp(suffix='.txt', prefix='concat_')
+    os.close(handle)
+    try:
+        write_concat_list(paths, list_path)
+        progress = track(metrics, 'join')
+        yield Command(copy_command(ffmpeg, list_path, out, progress is not None), progress)
+    finally:
+        os.remove(list_path)
+
+
+def copy_join(paths, out, ffmpeg, job=None, metrics=None):
+    '''
+    joins paths into out with the concat demuxer and stream copy. Raises subprocess.CalledProcessError if ffmpeg fails
+    '''
+    drive(copy_join_steps(paths, out, ffmpeg, metrics), job)
+
+
+def join_steps(paths, out, ffmpeg, ffprobe=None, segment_cache=None, metrics=None, profile=None):
+    '''
+    the steps of join - see Plan
+    :return: 'copy', 'segments' or 'filter' - how the movies were joined
+    '''
+    probes = []
+    for path in paths:
+        start = time.time()
+        probes.append((yield probe_steps(path, ffprobe or get_ffprobe(ffmpeg))))
+        if metrics is not None:
+            metrics.probed(path, time.time() - start, probes[-1])
+    method = choose_method(probes, segment_cache is not None)
+    if method == 'filter':
+        progress = track(metrics, 'join')
+        yield Command(filter_command(ffmpeg, paths, out, progress is not None), progress)
+    elif method == 'segments':
+        segments = yield segment_cache.segment_steps(paths, metrics, derive_profile(probes, profile))
+        try:
+            yield copy_join_steps(segments, out, ffmpeg, metrics)
+        finally:
+            segment_cache.release(segments)
+    else:
+        yield copy_join_steps(paths, out, ffmpeg, metrics)
+    yield method
+
+
+def join(paths, out, ffmpeg, ffprobe=None, segment_cache=None, job=None, metrics=None, profile=None):
+    '''
+    joins paths, in order, into out - with stream copy if they match, otherwise with the concat filter.
+    Raises subprocess.CalledProcessError if ffmpeg fails
+    :param paths: the movies to join
+    :param out: the movie to write
+    :param ffmpeg: the ffmpeg executable, as a path or list of arguments
+    :param ffprobe: the ffprobe executable. By default the one alongside ffmpeg
+    :param segment_cache: a segment_cache.SegmentCache. Mismatched movies are normalized through it, so only movies that
+                          haven't been seen before are re-encoded, rather than joined with the concat filter
+    :param job: the scheduler.MergeJob the join is run for. Raises Cancelled if the job is cancelled
+    :param metrics: a metrics.MergeMetrics to record probe times and ffmpeg progress in
+    :param profile: overrides for the profile movies are normalized to - see derive_profile
+    :return: 'copy', 'segments' or 'filter' - how the movies were joined
+    '''
+    return drive(join_steps(paths, out, ffmpeg, ffprobe, segment_cache, metrics, profile), job)
+
+
+def replace(partial, out):
+    '''
+    moves partial to out, replacing any movie already there
+    '''
+    if os.path.exists(out):
+        os.remove(out)
+    os.rename(partial, out)
+
+
+def merge_steps(paths, out, ffmpeg, ffprobe=None, segment_cache=None, metrics=None, profile=None):
+    '''
+    the steps of merging paths into out - see Plan. A single movie is copied, more are joined. The merge is written alongside
+    out and replaces it once complete, so a cancelled or failed merge never leaves a broken movie
+    :return: 'copy', 'segments' or 'filter' - how the movies were joined
+    '''
+    partial = out[:-len('.mov')] + '.partial.mov'
+    try:
+        if len(paths) == 1:
+            yield Call(shutil.copy, paths[0], partial)
+            method = 'copy'
+        else:
+            method = yield join_steps(paths, partial, ffmpeg, ffprobe, segment_cache, metrics, profile)
+        yield Call(replace, partial, out)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    yield method
@@ -0,0 +1,116 @@
+# A stand in for ffmpeg and ffprobe, for benchmarking movie_merge without real movies or an ffmpeg install.
+# Fake clips are a single json header line - {"streams":[{stream properties}, ...], "frames":n} - followed by the frame data.
+# Run as 'python fake_ffmpeg.py [args]' it understands the commands built by concat.py:
+#     ffprobe       -show_entries ... -of json clip           prints the clip's streams as ffprobe would
+#     stream copy   -f concat -i list -c copy out             copies the frame data of each clip in the list, refusing mismatched clips
+#     filter        -i clip ... -filter_complex ... out       decodes and re-encodes the frame data of every clip. Each frame costs a few
+#                                                             zlib passes, around 10ms - roughly a fast x264 preset at 1080p
+#     normalize     -i clip -vf ...pad=w:h... -r fps out      re-encodes one clip the same way, to the default streams at the padded size and rate
+# With -progress pipe:1, progress is written to stdout in ffmpeg's format - every PROGRESS_FRAMES frames and at the end.
+# make_clip writes clips to test with.
+from __future__ import print_function
+import os
+import re
+import sys
+import json
+import time
+import zlib
+
+FRAME_SIZE = 65536
+ENCODE_PASSES = 3
+FPS = 24
+PROGRESS_FRAMES = 24
+VIDEO = {'codec_type':'video', 'codec_name':'h264', 'profile':'High', 'width':1920, 'height':1080, 'pix_fmt':'yuv420p',
+         'r_frame_rate':'24/1', 'time_base':'1/24'}
+AUDIO = {'codec_type':'audio', 'codec_name':'aac', 'sample_rate':'48000', 'sample_fmt':'fltp', 'channels':2,
+         'channel_layout':'stereo', 'time_base':'1/48000'}
+
+
+def make_clip(path, frames=24, **video):
+    '''
+    writes a fake clip of frames frames to path. video overrides properties of the video stream, eg. width=1280
+    '''
+    header = {'streams':[dict(VIDEO, **video), AUDIO], 'frames':frames}
+    with open(path, 'wb') as f:
+        f.write((json.dumps(header) + '\n').encode('utf-8'))
+        for i in range(frames):
+            f.write(os.urandom(FRAME_SIZE))
+
+
+def read_clip(path):
+    with open(path, 'rb') as f:
+        header = json.loads(f.readline().decode('utf-8'))
+        return header, f.read()
+
+
+def write_clip(path, header, data):
+    with open(path, 'wb') as f:
+        f.write((json.dumps(header) + '\n').encode('utf-8'))
+        f.write(data)
+
+
+def report(frames, size, started, end=False):
+    '''
+    writes a block of progress for frames frames and size bytes written, as ffmpeg -progress pipe:1 does
+    '''
+    elapsed = max(time.time() - started, 1e-6)
+    out_us = int(frames * 1e6 / FPS)
+    lines = ['frame=%d' % frames, 'fps=%.2f' % (frames / elapsed), 'stream_0_0_q=-1.0',
+             'bitrate=%.1fkbits/s' % (size * 8 / 1000.0 / (out_us / 1e6)) if out_us else 'bitrate=N/A', 'total_size=%d' % size,
+             'out_time_us=%d' % out_us, 'out_time_ms=%d' % out_us,
+             'out_time=%02d:%02d:%09.6f' % (out_us // 3600000000, out_us // 60000000 % 60, out_us % 60000000 / 1e6),
+             'dup_frames=0', 'drop_frames=0', 'speed=%.3gx' % (out_us / 1e6 / elapsed), 'progress=%s' % ('end' if end else 'continue')]
+    sys.stdout.write('\n'.join(lines) + '\n')
+    sys.stdout.flush()
+
+
+def main(args):
+    if '-show_entries' in args:
+        header, data = read_clip(args[-1])
+        print(json.dumps({'streams':header['streams']}))
+        return 0
+
+    out = args[-1]
+    progress = '-progress' in args
+    started = time.time()
+    if '-f' in args and args[args.index('-f') + 1] == 'concat':
+        with open(args[args.index('-i') + 1]) as f:
+            paths = [line.strip()[len("file '"):-1].replace("'\\''", "'") for line in f if line.strip()]
+        clips = [read_clip(path) for path in paths]
+        if any(header['streams'] != clips[0][0]['streams'] for header, data in clips):
+            print('Non-monotonous DTS / mismatched streams in concat input', file=sys.stderr)
+            return 1
+        header = dict(clips[0][0], frames=sum(h['frames'] for h, d in clips))
+        write_clip(out, header, b''.join(d for h, d in clips))
+        if progress:
+            report(header['frames'], os.path.getsize(out), started, end=True)
+        return 0
+
+    paths = [args[i + 1] for i, arg in enumerate(args) if arg == '-i']
+    clips = [read_clip(path) for path in paths]
+    encoded = []
+    for header, data in clips:
+        for offset in range(0, len(data), FRAME_SIZE):
+            frame = data[offset:offset + FRAME_SIZE]
+            for i in range(ENCODE_PASSES):
+                zlib.compress(frame, 9)
+            encoded.append(frame)
+            if progress and len(encoded) % PROGRESS_FRAMES == 0:
+                report(len(encoded), len(encoded) * FRAME_SIZE, started)
+    header = dict(clips[0][0], frames=sum(h['frames'] for h, d in clips))
+    if '-vf' in args:
+        # normalizing - the output takes the frame size of the pad filter and the default streams
+        width, height = re.search(r'pad=(\d+):(\d+)', args[args.index('-vf') + 1]).groups()
+        header['streams'] = [dict(VIDEO, width=int(width), height=int(height)), AUDIO]
+        if '-r' in args:
+            rate = args[args.index('-r') + 1]
+            rate = rate if '/' in rate else rate + '/1'
+            header['streams'][0].update(r_frame_rate=rate, time_base='%s/%s' % tuple(reversed(rate.split('/'))))
+    write_clip(out, header, b''.join(encoded))
+    if progress:
+        report(len(encoded), os.path.getsize(out), started, end=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,106 @@
+# Merge benchmarks for movie_merge.
+# Generates fake clips and joins them with fake_ffmpeg.py standing in for ffmpeg, so the cost of each way of joining can be
+# measured anywhere. For each clip count, a folder of matching clips is joined with stream copy and a folder with one
+# mismatched clip falls back to the concat filter. The mismatched folder is then joined through a warm segment cache
+# after one clip has changed, as the watcher does. Times include probing and the ffmpeg processes.
+#
+# Usage:
+#     python -m rooftops.pipeline_tools.live_edit.merge_benchmark
+#     python -m rooftops.pipeline_tools.live_edit.merge_benchmark --clips 2 --clips 16 --frames 48 --repeat 5 --json results.json
+from __future__ import print_function
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from rooftops.pipeline_tools.live_edit import concat, fake_ffmpeg, segment_cache
+
+FAKE_FFMPEG = [sys.executable, os.path.abspath(fake_ffmpeg.__file__).replace('.pyc', '.py')]
+CLIP_COUNTS = [1, 2, 4, 8, 16, 32]
+
+
+def make_folder(root, name, clips, frames, mismatched=False):
+    '''
+    :return: the paths of clips fake clips written to root/name. With mismatched, the last clip has a different frame size
+    '''
+    folder = os.path.join(root, name)
+    os.mkdir(folder)
+    paths = []
+    for i in range(clips):
+        path = os.path.join(folder, 'shot%03d.mov' % i)
+        if mismatched and i == clips - 1:
+            fake_ffmpeg.make_clip(path, frames, width=1280, height=720)
+        else:
+            fake_ffmpeg.make_clip(path, frames)
+        paths.append(path)
+    return paths
+
+
+def time_join(paths, out, repeat, cache=None, frames=24):
+    times = []
+    for i in range(repeat):
+        # probes are cached per file version - clear them so every run pays for probing as a fresh merge would
+        concat.clear_probes()
+        if cache:
+            # one shot has been re-rendered since the last merge
+            fake_ffmpeg.make_clip(paths[0], frames)
+        start = time.time()
+        method = concat.join(paths, out, FAKE_FFMPEG, segment_cache=cache)
+        times.append(time.time() - start)
+    return method, min(times)
+
+
+def run(clip_counts=None, frames=24, repeat=3):
+    '''
+    :return: {clips:{'copy':seconds, 'filter':seconds, 'segments':seconds}} of the best of repeat joins for each clip count
+    '''
+    results = {}
+    root = tempfile.mkdtemp(prefix='merge_benchmark_')
+    try:
+        for clips in clip_counts or CLIP_COUNTS:
+            results[clips] = {}
+            for name, mismatched in [('copy', False), ('filter', True)]:
+                if clips == 1 and mismatched:
+                    continue
+                paths = make_folder(root, '%s_%d' % (name, clips), clips, frames, mismatched)
+                method, seconds = time_join(paths, os.path.join(root, '%s_%d_combine.mov' % (name, clips)), repeat)
+                assert method == name, 'expected a %s join of %d clips, got %s' % (name, clips, method)
+                results[clips][name] = seconds
+                if mismatched:
+                    cache = segment_cache.SegmentCache(os.path.join(root, 'cache_%d' % clips), FAKE_FFMPEG)
+                    cache.segments(paths)
+                    method, seconds = time_join(paths, os.path.join(root, 'segments_%d_combine.mov' % clips), repeat, cache, frames)
+                    results[clips]['segments'] = seconds
+    finally:
+        shutil.rmtree(root)
+    return results
+
+
+def report(results):
+    lines = ['%6s %12s %12s %12s' % ('clips', 'copy', 'filter', 'segments')]
+    for clips in sorted(results):
+        r = results[clips]
+        lines.append('%6d' % clips + ''.join('%12s' % ('%.1fms' % (r[k] * 1000) if k in r else '-') for k in ['copy', 'filter', 'segments']))
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark joining live edit clips with a fake ffmpeg')
+    parser.add_argument('--clips', type=int, action='append', help='number of clips to join - may be repeated')
+    parser.add_argument('--frames', type=int, default=24, help='frames per clip')
+    parser.add_argument('--repeat', type=int, default=3, help='number of joins per measurement')
+    parser.add_argument('--json', help='write results to this file as json')
+    args = parser.parse_args(args)
+
+    results = run(args.clips, args.frames, max(1, args.repeat))
+    print(report(results))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+    return results
+
+
+if __name__ == '__main__':
+    main()
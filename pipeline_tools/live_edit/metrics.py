@@ -0,0 +1,144 @@
+# Merge metrics for live edit.
+# Each merge is measured with a MergeMetrics - how long every input took to probe, what it holds, and the progress ffmpeg
+# reported for every command it ran - and written as one json line to a rolling metrics log. Once the log grows past
+# max_bytes it is rotated, keeping backups old logs alongside it (metrics.jsonl.1, metrics.jsonl.2...):
+#     {"time":finish time, "folder":path, "state":'done', 'failed' or 'cancelled', "method":'copy', 'segments' or 'filter',
+#      "inputs":[{"name":file name, "probe_seconds":s, "codec":video codec, "width":w, "height":h}],
+#      "runs":[{"kind":'join' or 'normalize', "frames":n, "fps":ffmpeg's fps, "bytes":bytes written, "seconds":s, ...}],
+#      "frames":frames in the merged movie, "fps":frames per second of wall time, "bytes":size of the merged movie,
+#      "probe_seconds":total probe time, "seconds":wall time}
+# Run on a log, it summarizes the merges by folder and by codec, slowest first:
+#     python metrics.py E:\PROJECTS\ROOFTOPS\STORY\LIVE_EDIT\live_edit_metrics.jsonl
+from __future__ import print_function
+import os
+import sys
+import json
+import time
+import logging
+import logging.handlers
+if not 'E:\\CODE_DEV\\' in sys.path:
+    sys.path.append('E:\\CODE_DEV\\')
+from rooftops.pipeline_tools.live_edit import progress
+
+MAX_BYTES = 5 * 1024 ** 2
+BACKUPS = 5
+
+
+class MergeMetrics(object):
+
+    def __init__(self, folder):
+        '''
+        :param folder: the sequence folder being merged
+        '''
+        self.folder = folder
+        self.started = time.time()
+        self.inputs = []
+        self.runs = []
+
+    def probed(self, path, seconds, streams):
+        '''
+        records the probe of an input
+        :param seconds: how long the probe took - close to nothing if it was cached
+        :param streams: the probe, as returned by concat.probe
+        '''
+        video = [s for s in streams or [] if s.get('codec_type') == 'video']
+        video = video[0] if video else {}
+        self.inputs.append({'name':os.path.basename(path), 'probe_seconds':seconds, 'codec':video.get('codec_name'),
+                            'width':video.get('width'), 'height':video.get('height')})
+
+    def progress(self, kind):
+        '''
+        :param kind: what the command does - 'join' or 'normalize'
+        :return: a progress.ProgressParser to feed the command's progress output to
+        '''
+        parser = progress.ProgressParser()
+        self.runs.append((kind, parser))
+        return parser
+
+    def record(self, state, method=None, out=None):
+        '''
+        :param state: how the merge ended - 'done', 'failed' or 'cancelled'
+        :param method: how the movies were joined
+        :param out: the merged movie
+        :return: the metrics of the merge, as written to the log
+        '''
+        now = time.time()
+        runs = [dict(parser.summary(), kind=kind) for kind, parser in self.runs]
+        joins = [run for run in runs if run['kind'] == 'join']
+        frames = joins[-1]['frames'] if joins else None
+        seconds = now - self.started
+        return {'time':now, 'folder':self.folder, 'state':state, 'method':method, 'inputs':self.inputs, 'runs':runs,
+                'frames':frames, 'fps':frames / seconds if frames and seconds else None,
+                'bytes':os.path.getsize(out) if out and os.path.exists(out) else None,
+                'probe_seconds':sum(i['probe_seconds'] for i in self.inputs), 'seconds':seconds}
+
+
+class MetricsLog(object):
+
+    def __init__(self, path, max_bytes=MAX_BYTES, backups=BACKUPS):
+        '''
+        :param path: the log file
+        :param max_bytes: the size the log is rotated at
+        :param backups: the number of rotated logs to keep
+        '''
+        self.path = path
+        # a logger of its own, so records are written whole when merges finish on several threads
+        self.logger = logging.getLogger('rooftops.live_edit.metrics.%s' % os.path.abspath(path))
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if not self.logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger.addHandler(handler)
+
+    def write(self, record):
+        self.logger.info(json.dumps(record, sort_keys=True))
+
+
+def read(path, backups=BACKUPS):
+    '''
+    :return: the records in the log at path and its rotated logs, oldest first
+    '''
+    records = []
+    for p in ['%s.%d' % (path, i) for i in range(backups, 0, -1)] + [path]:
+        if not os.path.exists(p):
+            continue
+        with open(p, 'r') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def summarize(records, key):
+    '''
+    :param records: merge metrics, as read from the log
+    :param key: a function giving the names a record is grouped under
+    :return: [(name, merges, mean seconds, mean fps, mean probe seconds)], slowest first
+    '''
+    groups = {}
+    for record in records:
+        if record.get('state') != 'done':
+            continue
+        for name in key(record):
+            groups.setdefault(name, []).append(record)
+
+    def mean(values):
+        values = [v for v in values if v is not None]
+        return sum(values) / len(values) if values else None
+
+    rows = [(name, len(group), mean(r['seconds'] for r in group), mean(r['fps'] for r in group),
+             mean(r['probe_seconds'] for r in group)) for name, group in groups.items()]
+    return sorted(rows, key=lambda row: -row[2])
+
+
+if __name__ == '__main__':
+    records = read(sys.argv[1])
+    for title, key in [('folder', lambda r: [os.path.basename(r['folder'])]),
+                       ('codec', lambda r: sorted(set(str(i['codec']) for i in r['inputs'])))]:
+        print('%-24s %6s %10s %10s %10s' % (title, 'merges', 'seconds', 'fps', 'probe'))
+        for name, merges, seconds, fps, probe in summarize(records, key):
+            print('%-24s %6d %10.2f %10s %10.3f' % (name, merges, seconds, '%.1f' % fps if fps else '-', probe))
+        print('')
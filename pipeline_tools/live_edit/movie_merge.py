@@ -1,118 +1,147 @@
+from __future__ import print_function
 import os
 import subprocess
 import time
-import shutil
 #from sl_codebase.utils.file_utils import FileUtils
 import sys
 if not 'E:\\CODE_DEV\\' in sys.path:
     sys.path.append('E:\\CODE_DEV\\')
 from rooftops.utils import global_settings as gs
+from rooftops.pipeline_tools.live_edit import watcher, concat, segment_cache, scheduler, metrics
 
 
 
 class MovieMerge(object):
 
-    def __init__(self, folder, watch=False):
+    def __init__(self, folder, watch=False, ffmpeg=None, ffprobe=None, cache=None, cache_size=None, workers=None, metrics_log=None,
+                 profile=None):
         '''
         :param folder: the folder to operate on
         :param watch: whether or not to continuously watch the folder, False by default
+        :param ffmpeg: the ffmpeg executable, as a path or list of arguments. Taken from the global settings by default
+        :param ffprobe: the ffprobe executable. Taken from the global settings, or found alongside ffmpeg, by default
+        :param cache: where normalized segments are kept. Taken from the global settings, or folder/.segment_cache, by default
+        :param cache_size: the most bytes of segments to keep
+        :param workers: the most folders to merge at once. Taken from the global settings, or one per core up to 4, by default
+        :param metrics_log: the rolling log merge metrics are written to. Taken from the global settings, or
+                            folder/live_edit_metrics.jsonl, by default
+        :param profile: overrides for the profile mismatched movies are normalized to, eg. {'width':1280, 'height':720, 'fps':25}.
+                        Taken from the global settings by default. Anything not overridden is taken from the movies being merged
         :return:
         '''
         self.folder = folder
-        dirs = [os.path.join(self.folder, dir) for dir in os.listdir(self.folder) if os.path.isdir(os.path.join(self.folder, dir))]
+        self.ffmpeg = ffmpeg or gs.globalSettings['ffmpeg']
+        self.ffprobe = ffprobe or gs.globalSettings.get('ffprobe') or concat.get_ffprobe(self.ffmpeg)
+        cache = cache or gs.globalSettings.get('live_edit_cache') or os.path.join(folder, '.segment_cache')
+        cache_size = cache_size or gs.globalSettings.get('live_edit_cache_size') or segment_cache.MAX_BYTES
+        self.segment_cache = segment_cache.SegmentCache(cache, self.ffmpeg, cache_size)
+        self.profile = profile or gs.globalSettings.get('live_edit_profile')
+        metrics_log = metrics_log or gs.globalSettings.get('live_edit_metrics') or os.path.join(folder, 'live_edit_metrics.jsonl')
+        self.metrics_log = metrics.MetricsLog(metrics_log)
+        workers = workers or gs.globalSettings.get('live_edit_workers') or scheduler.default_workers()
+        self.scheduler = scheduler.MergeScheduler(self.merge_job, workers)
 
         self.initial_state = {}
-        for dir in dirs:
-            for file in os.listdir(dir):
-                if file.endswith(".mov") and not 'combined' in file:
-                    mod = os.path.getmtime(os.path.join(dir, file))
-                    if dir in self.initial_state.keys():
-                        files = self.initial_state[dir]
-                        files.append([file, mod])
-                        self.initial_state[dir] = files
-                    else:
-                        self.initial_state[dir] = [[file, mod]]
-
-        for dir, files in self.initial_state.iteritems():
-            paths = []
-            for item in files:
-                paths.append(os.path.join(dir, item[0]))
-            self.merge_movs(paths)
-
-        if watch:
-            self.__watch()
+        for dir in watcher.list_folders(self.folder):
+            listing = watcher.snapshot(dir)
+            if listing:
+                self.initial_state[dir] = listing
+            else:
+                remove_stale(self.output(dir))
 
-    def __watch(self):
-        while 1:
-            #print 'watching'
-            time.sleep(5)
-            for dir, dir_files in self.initial_state.iteritems():
-                files = []
-
-                for file in os.listdir(dir):
-                    if file.endswith(".mov") and not 'combined' in file:
-                        mod = os.path.getmtime(os.path.join(dir, file))
-                        files.append([file, mod])
-                added = []
-
-                for item in files:
-                    for file in dir_files:
-                        if item[0] == file[0] and item[1] != file[1]:
-                            added.append(item)
-
-                if added or len(files) < len(dir_files) or len(files) > len(dir_files):
-                    paths = []
-                    for item in files:
-                        paths.append(os.path.join(dir, item[0]))
-                    self.merge_movs(paths)
-
-                for add in added:
-                    print "movie %s added" % add[0]
-
-                self.initial_state[dir] = files
-
-    def merge_movs(self, mov_paths):
-        mov_paths.sort()
-        folder_name = os.path.basename(os.path.dirname(mov_paths[0]))
-        out = os.path.join(self.folder, "%s_combine.mov" % folder_name)
-        out = out.replace("\\", "/")
-
-        if len(mov_paths) == 1:
-            shutil.copy(mov_paths[0], out)
-            return
+        for dir in sorted(self.initial_state):
+            self.scheduler.submit(dir)
 
-        cmd = "%s -y " % gs.globalSettings['ffmpeg']
-        for item in mov_paths:
-            item = item.replace("\\", "/")
-            cmd += "-i %s " % item
-        cmd += '-filter_complex "'
+        try:
+            if watch:
+                self.__watch()
+            self.scheduler.shutdown()
+        except KeyboardInterrupt:
+            self.scheduler.shutdown(cancel=True)
+            raise
 
-        count = 0
-        for item in mov_paths:
-            cmd += "[%d:0] [%d:1] " % (count, count)
-            count += 1
+    def __watch(self):
+        # folders are reported once the movies in them have stopped changing, and only the folder that changed is merged.
+        # Merges run on the scheduler, so a folder that changes again while it is being merged has its merge restarted
+        folder_watcher = watcher.FolderWatcher(self.folder, self.folder_changed, listings=self.initial_state)
+        folder_watcher.run()
+
+    def folder_changed(self, dir, listing):
+        added, changed, removed = watcher.diff(self.initial_state.get(dir, {}), listing)
+        for name in added:
+            print("movie %s added" % name)
+        for name in changed:
+            print("movie %s changed" % name)
+        for name in removed:
+            print("movie %s removed" % name)
+        self.initial_state[dir] = listing
+        self.scheduler.submit(dir)
+
+    def merge_job(self, dir, job):
+        # run by the scheduler. The folder is listed again as the merge starts, so it picks up changes made while it was queued
+        self.merge_folder(dir, watcher.snapshot(dir), job)
+
+    def merge_folder(self, dir, listing, job=None):
+        '''
+        :param dir: a sequence folder
+        :param listing: the movies in dir, as returned by watcher.snapshot
+        :param job: the scheduler.MergeJob the merge is run for
+        '''
+        if listing:
+            self.merge_movs([os.path.join(dir, name) for name in listing], job)
+        else:
+            remove_stale(self.output(dir))
 
-        cmd += 'concat=n=%d:v=1:a=1 [v] [a]" -map "[v]" -map "[a]" %s' % (len(mov_paths), out)
+    def output(self, dir):
+        '''
+        :return: the merged movie of the sequence folder dir - <folder>_combine.mov in the live edit root
+        '''
+        return os.path.join(self.folder, "%s_combine.mov" % os.path.basename(dir)).replace("\\", "/")
 
-        print '\n\n\n%s\n\n' % cmd
+    def merge_movs(self, mov_paths, job=None):
+        mov_paths.sort()
+        folder_name = os.path.basename(os.path.dirname(mov_paths[0]))
+        out = self.output(os.path.dirname(mov_paths[0]))
+        merge_metrics = metrics.MergeMetrics(os.path.dirname(mov_paths[0]))
+        state, method = scheduler.FAILED, None
 
         try:
-            subprocess.check_call(cmd)
-            print "Combined file written to %s" % out
-        except subprocess.CalledProcessError:
-            print "Combine failed."
+            method = concat.drive(concat.merge_steps(mov_paths, out, self.ffmpeg, self.ffprobe, self.segment_cache,
+                                                     merge_metrics, self.profile), job)
+            state = scheduler.DONE
+            print("Combined file written to %s (%s)" % (out, {'copy':'stream copy', 'segments':'cached segments'}.get(method, 're-encoded')))
+        except concat.Cancelled:
+            state = scheduler.CANCELLED
+            print("Combine of %s superseded." % folder_name)
+        except (OSError, IOError, subprocess.CalledProcessError):
+            print("Combine failed.")
+        finally:
+            self.metrics_log.write(merge_metrics.record(state, method, out if state == scheduler.DONE else None))
+
+
+def remove_stale(out):
+    '''
+    removes out, the merged movie of a folder that no longer holds any movies
+    '''
+    if os.path.exists(out):
+        try:
+            os.remove(out)
+            print("No movies left - removed %s" % out)
+        except OSError as e:
+            print("No movies left, but %s couldn't be removed and is stale: %s" % (out, e))
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Movie Combiner")
     parser.add_argument("folder", action="store", help="The folder to operate on.")
     parser.add_argument("-watch", dest="watch", action="store_true", help="Run in continuous watch mode.")
+    parser.add_argument("-workers", dest="workers", type=int, help="The most folders to merge at once.")
 
     result = parser.parse_args()
 
     if result.folder:
         if result.watch:
-            MovieMerge(result.folder, watch=True)
+            MovieMerge(result.folder, watch=True, workers=result.workers)
         else:
-            MovieMerge(result.folder)
+            MovieMerge(result.folder, workers=result.workers)
 
@@ -0,0 +1,136 @@
+# Parsing of ffmpeg's -progress output.
+# Run with '-progress pipe:1 -nostats', ffmpeg writes blocks of key=value lines to stdout as it works, each block ending
+# with a progress line - 'continue' while it is running and 'end' once it has finished:
+#     frame=240
+#     fps=96.4
+#     stream_0_0_q=28.0
+#     bitrate=6510.3kbits/s
+#     total_size=8138752
+#     out_time_us=10000000
+#     out_time_ms=10000000
+#     out_time=00:00:10.000000
+#     dup_frames=0
+#     drop_frames=0
+#     speed=3.87x
+#     progress=end
+# ffmpeg before 4.2 writes no out_time_us, only out_time_ms - which, despite its name, is also in microseconds.
+# Numeric values are converted, and N/A becomes None. Lines are parsed one at a time, so a recorded output file parses
+# exactly as a running ffmpeg does:
+#     python progress.py recorded.txt
+# progress_sample.txt, alongside, is the progress of a 250 frame encode as ffmpeg 4.1 writes it. check parses it:
+#     python progress.py -check
+from __future__ import print_function
+import os
+import sys
+import time
+
+INTS = ['frame', 'total_size', 'out_time_us', 'out_time_ms', 'dup_frames', 'drop_frames']
+FLOATS = ['fps', 'bitrate', 'speed']
+UNITS = {'bitrate':'kbits/s', 'speed':'x'}
+
+
+def convert(key, value):
+    '''
+    :return: value, a string from the progress output, as a number where key is numeric. None for N/A or a bad number
+    '''
+    if key not in INTS and key not in FLOATS and not key.endswith('_q'):
+        return value
+    value = value.strip()
+    if key in UNITS and value.endswith(UNITS[key]):
+        value = value[:-len(UNITS[key])]
+    try:
+        return int(value) if key in INTS else float(value)
+    except ValueError:
+        return None
+
+
+class ProgressParser(object):
+
+    def __init__(self):
+        self.current = {}
+        self.last = None
+        self.updates = 0
+        self.started = time.time()
+        self.ended = None
+
+    def feed(self, line):
+        '''
+        :param line: a line of progress output, as bytes or text
+        :return: the block the line completes, as {key:value}, otherwise None
+        '''
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        line = line.strip()
+        if '=' not in line:
+            return None
+        key, value = line.split('=', 1)
+        self.current[key] = convert(key, value)
+        if key != 'progress':
+            return None
+        block, self.current = self.current, {}
+        self.last = block
+        self.updates += 1
+        if value == 'end':
+            self.ended = time.time()
+        return block
+
+    def finished(self):
+        '''
+        :return: True once ffmpeg has reported the end
+        '''
+        return self.ended is not None
+
+    def summary(self):
+        '''
+        :return: {'frames', 'fps', 'bytes', 'out_seconds', 'speed', 'seconds', 'updates'} from the last block. fps is as
+                 ffmpeg reported it, seconds is the time from the parser being made to the end being reported
+        '''
+        last = self.last or {}
+        out_time = last.get('out_time_us')
+        if out_time is None:
+            out_time = last.get('out_time_ms')
+        return {'frames':last.get('frame'), 'fps':last.get('fps'), 'bytes':last.get('total_size'), 'speed':last.get('speed'),
+                'out_seconds':out_time / 1e6 if out_time is not None else None,
+                'seconds':(self.ended or time.time()) - self.started, 'updates':self.updates}
+
+
+def parse(lines):
+    '''
+    :param lines: progress output - a file, or any iterable of lines
+    :return: the blocks in lines, in order. A trailing incomplete block is dropped
+    '''
+    parser = ProgressParser()
+    blocks = []
+    for line in lines:
+        block = parser.feed(line)
+        if block is not None:
+            blocks.append(block)
+    return blocks
+
+
+def check(path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'progress_sample.txt')):
+    '''
+    parses progress_sample.txt, raising AssertionError if it doesn't parse as expected
+    '''
+    parser = ProgressParser()
+    with open(path, 'rb') as f:
+        blocks = [block for block in (parser.feed(line) for line in f) if block is not None]
+    assert [block['progress'] for block in blocks] == ['continue', 'continue', 'end'], blocks
+    assert blocks[0]['bitrate'] is None and blocks[1]['bitrate'] == 4806.6, blocks
+    summary = parser.summary()
+    assert parser.finished() and summary['updates'] == 3, summary
+    assert (summary['frames'], summary['fps'], summary['bytes'], summary['speed']) == (250, 163.9, 6365091, 6.56), summary
+    assert summary['out_seconds'] == 10.0, summary
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['-check']:
+        check()
+        print('progress_sample.txt parsed')
+        sys.exit(0)
+    for path in sys.argv[1:]:
+        with open(path, 'rb') as f:
+            blocks = parse(f)
+        last = blocks[-1] if blocks else {}
+        print('%s: %d updates, %s frames at %s fps, %s bytes, %s' % (path, len(blocks), last.get('frame'), last.get('fps'),
+                                                                    last.get('total_size'), last.get('progress')))
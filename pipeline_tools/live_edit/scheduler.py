@@ -0,0 +1,240 @@
+# Runs live edit folder merges concurrently.
+# Merges are queued as MergeJobs and run by a fixed number of worker threads. The work of a merge is done by ffmpeg, in its own
+# process, so each worker drives one ffmpeg at a time and the worker count bounds the number of ffmpeg processes running.
+# A folder is only ever merged by one worker at a time:
+#     - submitting a folder that is already queued returns the queued job - the merge reads the folder when it starts, so
+#       one merge covers every change made while it waited
+#     - submitting a folder that is being merged cancels that merge, killing its ffmpeg, and queues a new one. The new
+#       merge waits for the cancelled one to finish
+# These rules are kept by a MergeQueue, which service.MergeService shares.
+#
+# Usage:
+#     scheduler = MergeScheduler(merge, workers=4)      # merge is called as merge(folder, job) on a worker thread
+#     scheduler.submit(folder)
+#     scheduler.wait()
+#     scheduler.shutdown()
+import time
+import threading
+import multiprocessing
+from rooftops.pipeline_tools.live_edit import concat
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+def default_workers():
+    '''
+    :return: the number of workers to use when none is given - one per core, up to 4
+    '''
+    try:
+        return max(1, min(4, multiprocessing.cpu_count()))
+    except NotImplementedError:
+        return 2
+
+
+class MergeJob(object):
+
+    def __init__(self, folder):
+        '''
+        :param folder: the sequence folder to merge
+        '''
+        self.folder = folder
+        self.state = QUEUED
+        self.cancelled = False
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.processes = set()
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return 'MergeJob(%r, %s)' % (self.folder, self.state)
+
+    def attach(self, process):
+        '''
+        records process as running for the job, so that it is killed if the job is cancelled
+        '''
+        with self.lock:
+            self.processes.add(process)
+            if self.cancelled:
+                kill(process)
+
+    def detach(self, process):
+        with self.lock:
+            self.processes.discard(process)
+
+    def cancel(self):
+        '''
+        cancels the job, killing any process it is running. The merge raises concat.Cancelled once its process has exited
+        '''
+        with self.lock:
+            self.cancelled = True
+            for process in self.processes:
+                kill(process)
+
+
+def kill(process):
+    try:
+        process.kill()
+    except OSError:
+        # already exited
+        pass
+
+
+
+class MergeQueue(object):
+    '''
+    the queued and running merges. Not locked - MergeScheduler calls it with its condition held, and service.MergeService
+    from its event loop
+    '''
+    def __init__(self):
+        self.queue = []
+        self.running = {}
+
+    def busy(self):
+        return bool(self.queue or self.running)
+
+    def submit(self, folder):
+        '''
+        queues a merge of folder, cancelling the merge of folder that is running, if there is one
+        :return: (the MergeJob which will merge folder, True if it was newly queued)
+        '''
+        for job in self.queue:
+            if job.folder == folder:
+                return job, False
+        if folder in self.running:
+            self.running[folder].cancel()
+        job = MergeJob(folder)
+        self.queue.append(job)
+        return job, True
+
+    def next_job(self):
+        '''
+        :return: the first queued job whose folder isn't being merged, now marked as running, or None
+        '''
+        for job in self.queue:
+            if job.folder not in self.running:
+                self.queue.remove(job)
+                self.running[job.folder] = job
+                job.state = RUNNING
+                job.started = time.time()
+                return job
+        return None
+
+    def finish(self, job, error=None):
+        '''
+        marks job as finished
+        :param error: the exception the merge raised, if it did
+        '''
+        if error is None:
+            job.state = CANCELLED if job.cancelled else DONE
+        elif isinstance(error, concat.Cancelled):
+            job.state = CANCELLED
+        else:
+            job.state = FAILED
+            job.error = error
+        job.finished = time.time()
+        del self.running[job.folder]
+
+    def cancel(self):
+        '''
+        drops the queued merges and cancels those running
+        '''
+        for job in self.queue:
+            job.cancelled = True
+            job.state = CANCELLED
+        del self.queue[:]
+        for job in self.running.values():
+            job.cancel()
+
+######################################################################################################################################################
+
+
+class MergeScheduler(object):
+
+    def __init__(self, merge, workers=None):
+        '''
+        :param merge: called as merge(folder, job) to merge a folder. Raises concat.Cancelled if the job is cancelled
+        :param workers: the most merges to run at once. default_workers() by default
+        '''
+        self.merge = merge
+        self.workers = workers or default_workers()
+        self.jobs = MergeQueue()
+        self.finished = {}
+        self.closing = False
+        self.condition = threading.Condition()
+        self.threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.work, name='merge_worker_%d' % i)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, folder):
+        '''
+        queues a merge of folder, cancelling the merge of folder that is running, if there is one
+        :return: the MergeJob which will merge folder
+        '''
+        with self.condition:
+            if self.closing:
+                raise RuntimeError('the scheduler has been shut down')
+            job, new = self.jobs.submit(folder)
+            if new:
+                self.condition.notify_all()
+            return job
+
+    def work(self):
+        while True:
+            with self.condition:
+                job = self.jobs.next_job()
+                while job is None:
+                    if self.closing and not self.jobs.queue:
+                        return
+                    self.condition.wait()
+                    job = self.jobs.next_job()
+
+            error = None
+            try:
+                self.merge(job.folder, job)
+            except Exception as e:
+                error = e
+            finally:
+                with self.condition:
+                    self.jobs.finish(job, error)
+                    self.finished[job.folder] = job
+                    self.condition.notify_all()
+
+    def wait(self, timeout=None):
+        '''
+        waits until every queued merge has finished
+        :param timeout: the longest to wait, in seconds. None to wait for as long as it takes
+        :return: True if all merges have finished
+        '''
+        end = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while self.jobs.busy():
+                if end is None:
+                    self.condition.wait()
+                else:
+                    remaining = end - time.time()
+                    if remaining <= 0:
+                        return False
+                    self.condition.wait(remaining)
+        return True
+
+    def shutdown(self, cancel=False):
+        '''
+        stops the workers once the queued merges have run
+        :param cancel: drop the queued merges and cancel those running, rather than waiting for them
+        '''
+        with self.condition:
+            self.closing = True
+            if cancel:
+                self.jobs.cancel()
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
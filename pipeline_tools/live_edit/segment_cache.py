@@ -0,0 +1,270 @@
+# Cache of normalized live edit segments.
+# Clips that can't be joined with stream copy are each re-encoded once, to a common profile - see concat.derive_profile - and
+# kept as segments. Joining a folder then only re-encodes the clips that have changed, and the segments are joined with stream copy.
+# Sources are matched on path, size and mtime. A source that has changed is hashed, and segments are stored by content hash
+# and profile, so a clip that has only been touched, copied or renamed still finds its segment, and folders normalized to
+# different profiles share the cache.
+# The cache is bounded in size - the least recently used segments are removed once it grows past max_bytes - and its
+# manifest is kept on disk alongside the segments, so a restarted watcher carries on where it left off:
+#     {"version":2,
+#      "sources":{path:{"size":size, "mtime":mtime, "hash":content hash}},
+#      "segments":{content hash_profile hash:{"hash":content hash, "file":name, "bytes":size, "used":time}}}
+import os
+import json
+import time
+import hashlib
+import threading
+from rooftops.pipeline_tools.live_edit import concat
+
+VERSION = 2
+MANIFEST = 'manifest.json'
+MAX_BYTES = 10 * 1024 ** 3
+HASH_CHUNK = 1024 * 1024
+
+
+def content_hash(path):
+    '''
+    :return: the sha1 of the contents of path
+    '''
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        chunk = f.read(HASH_CHUNK)
+        while chunk:
+            sha.update(chunk)
+            chunk = f.read(HASH_CHUNK)
+    return sha.hexdigest()
+
+
+def profile_hash(profile):
+    '''
+    :return: a short hash of profile, which segments normalized to it are stored under
+    '''
+    return hashlib.sha1(json.dumps(profile, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+class SegmentCache(object):
+
+    def __init__(self, directory, ffmpeg, max_bytes=MAX_BYTES, profile=None):
+        '''
+        :param directory: where segments and the manifest are kept. Created if it doesn't exist
+        :param ffmpeg: the ffmpeg executable, as a path or list of arguments
+        :param max_bytes: the size the segments are kept within
+        :param profile: overrides for concat.PROFILE, giving the profile clips are normalized to when none is passed
+        '''
+        self.directory = directory
+        self.ffmpeg = ffmpeg
+        self.max_bytes = max_bytes
+        self.profile = dict(concat.PROFILE, **(profile or {}))
+        self.sources = {}
+        self.entries = {}
+        self.normalized = 0
+        # merges may run at once - see scheduler.py. The lock guards the tables and manifest, and segments being joined are
+        # pinned - {file name:number of merges using it} - so that no other merge evicts them
+        self.lock = threading.RLock()
+        self.pins = {}
+        self.partials = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.load()
+
+    def load(self):
+        '''
+        reads the manifest, dropping any segments whose files have gone. A manifest from another version is ignored
+        '''
+        path = os.path.join(self.directory, MANIFEST)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if data.get('version') != VERSION:
+            return
+        self.entries = dict((k, e) for k, e in data['segments'].items() if os.path.exists(os.path.join(self.directory, e['file'])))
+        self.sources = dict((p, s) for p, s in data['sources'].items() if s['hash'] in self.hashes())
+
+    def save(self):
+        '''
+        writes the manifest. It is written to a temporary file first, so an interrupted save leaves the previous manifest intact
+        '''
+        path = os.path.join(self.directory, MANIFEST)
+        temp = path + '.tmp'
+        with self.lock:
+            with open(temp, 'w') as f:
+                json.dump({'version':VERSION, 'sources':self.sources, 'segments':self.entries},
+                          f, separators=(',', ':'))
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(temp, path)
+
+    def total_bytes(self):
+        return sum(e['bytes'] for e in self.entries.values())
+
+    def hashes(self):
+        '''
+        :return: the content hashes that have segments, in any profile
+        '''
+        return set(e['hash'] for e in self.entries.values())
+
+    def key(self, h, profile=None):
+        '''
+        :return: the key of the segment of content hash h in profile - self.profile by default
+        '''
+        return '%s_%s' % (h, profile_hash(profile or self.profile))
+
+    def lookup(self, path, profile=None):
+        '''
+        :param path: a source clip
+        :param profile: the profile of the segment wanted - self.profile by default
+        :return: (the content hash of path, the path of its segment). The segment is None if path has to be normalized
+        '''
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self.lock:
+            source = self.sources.get(path)
+        if not source or source['size'] != stat.st_size or source['mtime'] != stat.st_mtime:
+            source = {'size':stat.st_size, 'mtime':stat.st_mtime, 'hash':content_hash(path)}
+            with self.lock:
+                self.sources[path] = source
+
+        with self.lock:
+            entry = self.entries.get(self.key(source['hash'], profile))
+            if entry is not None and os.path.exists(os.path.join(self.directory, entry['file'])):
+                entry['used'] = time.time()
+                return source['hash'], os.path.join(self.directory, entry['file'])
+        return source['hash'], None
+
+    def segment_name(self, h, profile=None):
+        return '%s_%s.mov' % (h[:16], profile_hash(profile or self.profile))
+
+    def partial(self, h, profile=None):
+        '''
+        :return: a path to normalize the segment of content hash h to, unique to this call
+        '''
+        with self.lock:
+            self.partials += 1
+            return os.path.join(self.directory, 'partial_%d_%d_%s' % (os.getpid(), self.partials, self.segment_name(h, profile)))
+
+    def add(self, h, partial, profile=None):
+        '''
+        moves a normalized partial into the cache as the segment of content hash h in profile
+        :return: the path of the segment
+        '''
+        name = self.segment_name(h, profile)
+        segment = os.path.join(self.directory, name)
+        with self.lock:
+            if os.path.exists(segment):
+                os.remove(segment)
+            os.rename(partial, segment)
+            self.normalized += 1
+            self.entries[self.key(h, profile)] = {'hash':h, 'file':name, 'bytes':os.path.getsize(segment), 'used':time.time()}
+        return segment
+
+    def normalize_steps(self, path, h, metrics=None, profile=None):
+        '''
+        the steps of normalizing path, of content hash h, into the cache - see concat.Plan. Normalizing is done outside of
+        the lock, so that other merges carry on
+        :return: the path of the segment
+        '''
+        partial = self.partial(h, profile)
+        try:
+            progress = concat.track(metrics, 'normalize')
+            yield concat.Command(concat.normalize_command(self.ffmpeg, os.path.abspath(path), partial, profile,
+                                                          progress is not None), progress)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        yield self.add(h, partial, profile)
+
+    def get_steps(self, path, metrics=None, profile=None):
+        '''
+        the steps of get - see concat.Plan. Sources are looked up as a call, as a changed source is hashed
+        '''
+        profile = profile or self.profile
+        h, segment = yield concat.Call(self.lookup, path, profile)
+        if segment is None:
+            segment = yield self.normalize_steps(path, h, metrics, profile)
+        yield segment
+
+    def get(self, path, job=None, metrics=None, profile=None):
+        '''
+        :param path: a source clip
+        :param job: the scheduler.MergeJob the segment is wanted for - normalizing is cancelled with it
+        :param metrics: a metrics.MergeMetrics to record the progress of normalizing in
+        :param profile: the profile to normalize to - self.profile by default
+        :return: the path of path's segment, normalizing it if there isn't one.
+                 Raises subprocess.CalledProcessError if ffmpeg fails
+        '''
+        return concat.drive(self.get_steps(path, metrics, profile), job)
+
+    def segment_steps(self, paths, metrics=None, profile=None):
+        '''
+        the steps of segments - see concat.Plan
+        '''
+        result = []
+        try:
+            for path in paths:
+                segment = yield self.get_steps(path, metrics, profile)
+                self.pin(segment)
+                result.append(segment)
+        except BaseException:
+            self.release(result)
+            raise
+        finally:
+            self.evict()
+            self.save()
+        yield result
+
+    def segments(self, paths, job=None, metrics=None, profile=None):
+        '''
+        :param paths: source clips
+        :param job: the scheduler.MergeJob the segments are wanted for
+        :param metrics: a metrics.MergeMetrics to record the progress of normalizing in
+        :param profile: the profile to normalize to - self.profile by default
+        :return: the segment for each of paths. Segments are made for clips that don't have one, the least recently used
+                 segments of other clips are evicted if the cache is over size, and the manifest is saved.
+                 The segments are pinned until they are passed to release
+        '''
+        return concat.drive(self.segment_steps(paths, metrics, profile), job)
+
+    def pin(self, segment):
+        with self.lock:
+            name = os.path.basename(segment)
+            self.pins[name] = self.pins.get(name, 0) + 1
+
+    def release(self, segments):
+        '''
+        unpins segments, as returned by segments, once they have been joined
+        '''
+        with self.lock:
+            for segment in segments:
+                name = os.path.basename(segment)
+                self.pins[name] -= 1
+                if not self.pins[name]:
+                    del self.pins[name]
+
+    def evict(self, keep=()):
+        '''
+        removes the least recently used segments until the cache is within max_bytes. Segments in keep, and those pinned
+        by a merge in progress, are never removed
+        :return: the number of segments removed
+        '''
+        with self.lock:
+            keep = set(keep)
+            total = self.total_bytes()
+            removed = 0
+            for k, entry in sorted(self.entries.items(), key=lambda item: item[1].get('used', 0)):
+                if total <= self.max_bytes:
+                    break
+                if entry['hash'] in keep or entry['file'] in self.pins:
+                    continue
+                try:
+                    os.remove(os.path.join(self.directory, entry['file']))
+                except OSError:
+                    pass
+                total -= entry['bytes']
+                del self.entries[k]
+                removed += 1
+            hashes = self.hashes()
+            self.sources = dict((p, s) for p, s in self.sources.items() if s['hash'] in hashes)
+        return removed
@@ -0,0 +1,317 @@
+# The live edit merge service.
+# A long running, asyncio based version of movie_merge's watch mode. Any number of live edit roots are watched, folders are
+# merged as they settle - by a fixed number of worker tasks, with ffmpeg and ffprobe run as async subprocesses - and the state
+# of the service is published as json, to a status file and, given a port, at http://127.0.0.1:port/status:
+#     {"updated":time, "roots":[...], "workers":n, "queue_depth":n,
+#      "queued":[{"folder":path, "waiting":seconds}],
+#      "in_flight":[{"folder":path, "running":seconds}],
+#      "merges":{folder:{"state":state, "finished":time, "seconds":merge time,
+#                        "latency":time from the folder settling to its merged movie, "method":'copy', 'segments' or 'filter',
+#                        "frames":frames merged, "fps":frames merged per second}},
+#      "totals":{state:count}}
+# Every merge is measured, and its metrics written to a rolling log - see metrics.py.
+# Queueing is shared with scheduler.py - a folder already queued isn't queued again, and a folder that changes while it is
+# being merged has its merge cancelled and restarted. Merges are concat's merge steps, with only the running of their
+# commands done here. SIGINT or SIGTERM stop the service: watching stops, running merges
+# are cancelled, their ffmpeg killed and partial movies removed, and a final status is written.
+# Needs Python 3.7 or later - on Windows run it with the launcher, as CombineAnimations.bat does. movie_merge.py -watch still
+# runs in Python 2.
+#
+# Usage:
+#     py -3 service.py E:\PROJECTS\ROOFTOPS\STORY\LIVE_EDIT [more roots] -status status.json -port 8765 -workers 4
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import subprocess
+import concurrent.futures
+if not 'E:\\CODE_DEV\\' in sys.path:
+    sys.path.append('E:\\CODE_DEV\\')
+from rooftops.utils import global_settings as gs
+from rooftops.pipeline_tools.live_edit import watcher, concat, segment_cache, scheduler, metrics, movie_merge
+
+STATUS_INTERVAL = 1.0
+WATCH_TIMEOUT = 0.5
+
+
+async def run(cmd, job=None, progress=None, capture=False):
+    '''
+    concat.run, with cmd run as an async subprocess
+    '''
+    if job is not None and job.cancelled:
+        raise concat.Cancelled(cmd)
+    stdout = asyncio.subprocess.PIPE if progress is not None or capture else None
+    process = await asyncio.create_subprocess_exec(*cmd, stdout=stdout)
+    if job is not None:
+        job.attach(process)
+    try:
+        output = None
+        if progress is not None:
+            line = await process.stdout.readline()
+            while line:
+                progress.feed(line)
+                line = await process.stdout.readline()
+            await process.wait()
+        else:
+            output, error = await process.communicate()
+    except asyncio.CancelledError:
+        scheduler.kill(process)
+        await process.wait()
+        raise
+    finally:
+        if job is not None:
+            job.detach(process)
+    if job is not None and job.cancelled:
+        raise concat.Cancelled(cmd)
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+    return output
+
+
+async def drive(steps, job=None):
+    '''
+    concat.drive, with commands run as async subprocesses and calls run on a thread. A cancelled task has
+    asyncio.CancelledError thrown into the merge, so it cleans up as it would for concat.Cancelled
+    '''
+    loop = asyncio.get_running_loop()
+    plan = concat.Plan(steps)
+    step = plan.advance()
+    while not plan.done:
+        value, error = None, None
+        try:
+            if job is not None and job.cancelled:
+                raise concat.Cancelled(job.folder)
+            if isinstance(step, concat.Command):
+                value = await run(step.cmd, job, step.progress, step.capture)
+            else:
+                value = await loop.run_in_executor(None, step.fn, *step.args)
+        except BaseException as e:
+            error = e
+        step = plan.advance(value, error)
+    return plan.result
+
+######################################################################################################################################################
+
+
+class MergeService(object):
+
+    def __init__(self, roots, ffmpeg=None, ffprobe=None, workers=None, status=None, port=None, cache_size=None, settle=0.5,
+                 metrics_log=None, profile=None):
+        '''
+        :param roots: the live edit roots to watch
+        :param ffmpeg: the ffmpeg executable, as a path or list of arguments. Taken from the global settings by default
+        :param ffprobe: the ffprobe executable. Taken from the global settings, or found alongside ffmpeg, by default
+        :param workers: the most folders to merge at once. Taken from the global settings, or one per core up to 4, by default
+        :param status: the json file to write the status to. By default live_edit_status.json in the first root
+        :param port: serve the status at http://127.0.0.1:port/status. Not served by default
+        :param cache_size: the most bytes of segments to keep for each root
+        :param settle: how long, in seconds, a folder must be left alone before it is merged
+        :param metrics_log: the rolling log merge metrics are written to. Taken from the global settings, or
+                            live_edit_metrics.jsonl in the first root, by default
+        :param profile: overrides for the profile mismatched movies are normalized to - see concat.derive_profile. Taken from
+                        the global settings by default
+        '''
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.ffmpeg = ffmpeg or gs.globalSettings['ffmpeg']
+        self.ffprobe = ffprobe or gs.globalSettings.get('ffprobe') or concat.get_ffprobe(self.ffmpeg)
+        self.workers = workers or gs.globalSettings.get('live_edit_workers') or scheduler.default_workers()
+        self.status_path = status or os.path.join(self.roots[0], 'live_edit_status.json')
+        self.port = port
+        self.settle = settle
+        self.profile = profile or gs.globalSettings.get('live_edit_profile')
+        cache_size = cache_size or gs.globalSettings.get('live_edit_cache_size') or segment_cache.MAX_BYTES
+        self.caches = dict((root, segment_cache.SegmentCache(os.path.join(root, '.segment_cache'), self.ffmpeg, cache_size))
+                           for root in self.roots)
+        metrics_log = metrics_log or gs.globalSettings.get('live_edit_metrics') or os.path.join(self.roots[0], 'live_edit_metrics.jsonl')
+        self.metrics_log = metrics.MetricsLog(metrics_log)
+
+        self.jobs = scheduler.MergeQueue()
+        self.merges = {}
+        self.totals = dict((state, 0) for state in [scheduler.DONE, scheduler.FAILED, scheduler.CANCELLED])
+        self.loop = None
+        self.changed = None
+        self.stopping = None
+        self.watching = False
+
+    def submit(self, folder):
+        '''
+        queues a merge of folder, cancelling the merge of folder that is running, if there is one. Called on the loop
+        :return: the scheduler.MergeJob which will merge folder
+        '''
+        job, new = self.jobs.submit(folder)
+        if new:
+            self.changed.set()
+        return job
+
+    def folder_changed(self, folder, listing):
+        # called on a watcher thread
+        self.loop.call_soon_threadsafe(self.submit, folder)
+
+    async def work(self):
+        while True:
+            job = self.jobs.next_job()
+            while job is None:
+                self.changed.clear()
+                await self.changed.wait()
+                job = self.jobs.next_job()
+            method, error = None, None
+            merge_metrics = metrics.MergeMetrics(job.folder)
+            try:
+                method = await self.merge(job, merge_metrics)
+            except asyncio.CancelledError:
+                error = concat.Cancelled(job.folder)
+                raise
+            except Exception as e:
+                error = e
+                if not isinstance(e, concat.Cancelled):
+                    print("Combine of %s failed: %s" % (job.folder, e))
+            finally:
+                self.jobs.finish(job, error)
+                self.totals[job.state] += 1
+                if method is not None or job.state != scheduler.DONE:
+                    record = merge_metrics.record(job.state, method, self.output(job.folder) if job.state == scheduler.DONE else None)
+                    self.metrics_log.write(record)
+                    if job.state != scheduler.CANCELLED:
+                        self.merges[job.folder] = {'state':job.state, 'finished':job.finished, 'method':method,
+                                                   'seconds':job.finished - job.started, 'latency':job.finished - job.submitted,
+                                                   'frames':record['frames'], 'fps':record['fps']}
+                self.changed.set()
+
+    def output(self, folder):
+        '''
+        :return: the merged movie of folder - <folder>_combine.mov in its root
+        '''
+        return os.path.join(os.path.dirname(folder), "%s_combine.mov" % os.path.basename(folder)).replace("\\", "/")
+
+    async def merge(self, job, merge_metrics=None):
+        '''
+        merges the movies in job.folder into <folder>_combine.mov in its root
+        :param merge_metrics: a metrics.MergeMetrics to record probe times and ffmpeg progress in
+        :return: how the movies were joined, or None if there was nothing to merge
+        '''
+        listing = watcher.snapshot(job.folder)
+        if not listing:
+            movie_merge.remove_stale(self.output(job.folder))
+            return None
+        mov_paths = sorted(os.path.join(job.folder, name) for name in listing)
+        out = self.output(job.folder)
+        method = await drive(concat.merge_steps(mov_paths, out, self.ffmpeg, self.ffprobe, self.caches.get(os.path.dirname(job.folder)),
+                                                merge_metrics, self.profile), job)
+        print("Combined file written to %s (%s)" % (out, {'copy':'stream copy', 'segments':'cached segments'}.get(method, 're-encoded')))
+        return method
+
+    def watch(self, root):
+        # run on its own thread - FolderWatcher blocks while it waits for changes
+        folder_watcher = watcher.FolderWatcher(root, self.folder_changed, settle=self.settle)
+        try:
+            while self.watching:
+                folder_watcher.step(min(WATCH_TIMEOUT, self.settle))
+        finally:
+            folder_watcher.backend.close()
+
+    def status(self):
+        '''
+        :return: the status of the service, as published
+        '''
+        now = time.time()
+        return {'updated':now, 'roots':self.roots, 'workers':self.workers, 'queue_depth':len(self.jobs.queue),
+                'queued':[{'folder':job.folder, 'waiting':now - job.submitted} for job in self.jobs.queue],
+                'in_flight':[{'folder':job.folder, 'running':now - job.started} for job in self.jobs.running.values()],
+                'merges':self.merges, 'totals':self.totals}
+
+    def write_status(self):
+        # written to a temporary file first, so readers never see a partial status
+        temp = self.status_path + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump(self.status(), f, indent=4, sort_keys=True)
+        os.replace(temp, self.status_path)
+
+    async def publish(self):
+        while True:
+            self.write_status()
+            await asyncio.sleep(STATUS_INTERVAL)
+
+    async def serve(self, reader, writer):
+        # a minimal http server - every GET is answered with the status
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            if request.split()[:1] == [b'GET']:
+                code, body = '200 OK', json.dumps(self.status(), indent=4, sort_keys=True).encode('utf-8')
+            else:
+                code, body = '405 Method Not Allowed', b''
+            writer.write(('HTTP/1.0 %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n' % (code, len(body))).encode('ascii') + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def stop(self):
+        '''
+        stops the service. Safe to call from any thread
+        '''
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+
+    async def run(self):
+        '''
+        runs the service until stop is called, or SIGINT or SIGTERM is received
+        '''
+        self.loop = asyncio.get_running_loop()
+        self.changed = asyncio.Event()
+        self.stopping = asyncio.Event()
+        for sig in [signal.SIGINT, signal.SIGTERM]:
+            try:
+                self.loop.add_signal_handler(sig, self.stopping.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows - Ctrl+C raises KeyboardInterrupt instead, and the running merges are cancelled as asyncio.run exits
+                pass
+
+        self.watching = True
+        executor = concurrent.futures.ThreadPoolExecutor(len(self.roots))
+        watchers = [self.loop.run_in_executor(executor, self.watch, root) for root in self.roots]
+        tasks = [asyncio.ensure_future(self.work()) for i in range(self.workers)]
+        tasks.append(asyncio.ensure_future(self.publish()))
+        server = None
+        if self.port:
+            server = await asyncio.start_server(self.serve, '127.0.0.1', self.port)
+        print("Watching %s with %d workers" % (', '.join(self.roots), self.workers))
+        try:
+            await self.stopping.wait()
+        finally:
+            self.watching = False
+            self.jobs.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.gather(*watchers, return_exceptions=True)
+            executor.shutdown()
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+            self.write_status()
+            print("Stopped")
+
+
+def main(args=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Live edit merge service")
+    parser.add_argument("roots", nargs="+", help="The live edit folders to watch.")
+    parser.add_argument("-workers", dest="workers", type=int, help="The most folders to merge at once.")
+    parser.add_argument("-status", dest="status", help="The json file to write the status to.")
+    parser.add_argument("-port", dest="port", type=int, help="Serve the status on this local port.")
+    result = parser.parse_args(args)
+
+    service = MergeService(result.roots, workers=result.workers, status=result.status, port=result.port)
+    try:
+        asyncio.run(service.run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+# Event driven watching of the live edit folders.
+# Each sequence folder directly under the root is watched for movies being added, rewritten or removed. On Linux the
+# folders are watched with inotify, so changes are seen as they happen. Elsewhere, or if inotify can't be used, the
+# folders are stat'ed every poll seconds instead and compared with the previous listing.
+# Either way a changed folder is only reported once it has settled - no events for settle seconds and no change in
+# the size or modification time of its movies between two listings - so a playblast that is still being written
+# doesn't trigger a merge. With inotify, a movie that has been created or written to is also held back until the
+# writer closes it (IN_CLOSE_WRITE), for up to hold seconds after its last write - a movie that is never closed, by a
+# writer that crashed or a hard link made to it, is then left to the settle and size check.
+# Listings are dictionaries keyed by file name, {name:(size, mtime)}.
+#
+# Usage:
+#     watcher = FolderWatcher(root, callback)
+#     watcher.run()                 # calls callback(folder, listing) for each folder that changes, until stop() is called
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+EXTENSIONS = ('.mov',)
+HOLD = 60.0
+
+# inotify constants, from sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+FOLDER_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+ROOT_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def is_movie(name):
+    '''
+    :param name: a file name
+    :return: True for the movies that get merged - merged movies themselves are skipped
+    '''
+    return name.lower().endswith(EXTENSIONS) and 'combined' not in name
+
+
+def list_folders(root):
+    '''
+    :param root: the live edit root
+    :return: the paths of the sequence folders in root. Hidden folders, such as the segment cache, are skipped
+    '''
+    folders = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if os.path.isdir(path) and not name.startswith('.'):
+            folders.append(path)
+    return folders
+
+
+def snapshot(folder):
+    '''
+    :param folder: a sequence folder
+    :return: {name:(size, mtime)} for the movies in folder. Empty if the folder has gone
+    '''
+    listing = {}
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return listing
+    for name in names:
+        if is_movie(name):
+            try:
+                stat = os.stat(os.path.join(folder, name))
+            except OSError:
+                continue
+            listing[name] = (stat.st_size, stat.st_mtime)
+    return listing
+
+
+def diff(old, new):
+    '''
+    :param old: a previous listing
+    :param new: the current listing
+    :return: (added, changed, removed) lists of file names
+    '''
+    added = sorted(name for name in new if name not in old)
+    changed = sorted(name for name in new if name in old and new[name] != old[name])
+    removed = sorted(name for name in old if name not in new)
+    return added, changed, removed
+
+######################################################################################################################################################
+
+
+class PollingBackend(object):
+    '''
+    Finds changed folders by listing every folder each poll seconds
+    '''
+    def __init__(self, root, poll=0.5):
+        self.root = root
+        self.poll = poll
+        self.listings = dict((folder, snapshot(folder)) for folder in list_folders(root))
+
+    def wait(self, timeout):
+        '''
+        :param timeout: the longest to wait, in seconds
+        :return: the set of folders that have changed
+        '''
+        time.sleep(min(timeout, self.poll))
+        changed = set()
+        folders = list_folders(self.root)
+        for folder in set(folders) | set(self.listings):
+            listing = snapshot(folder)
+            if listing != self.listings.get(folder):
+                changed.add(folder)
+            self.listings[folder] = listing
+        for folder in set(self.listings) - set(folders):
+            del self.listings[folder]
+        return changed
+
+    def writing(self, folder):
+        '''
+        :return: the movies in folder known to be open for writing - polling can't tell, so always empty
+        '''
+        return set()
+
+    def close(self):
+        pass
+
+
+class InotifyBackend(object):
+    '''
+    Finds changed folders from inotify events. Raises OSError if inotify isn't available
+    '''
+    def __init__(self, root, hold=HOLD):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, 'inotify is only available on Linux')
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.root = root
+        self.hold = hold
+        self.folders = {}
+        # {folder:{movie created or written to and not yet closed:time of its last write}}
+        self.open = {}
+        self.root_wd = self.add_watch(root, ROOT_MASK)
+        for folder in list_folders(root):
+            self.folders[self.add_watch(folder, FOLDER_MASK)] = folder
+
+    def add_watch(self, path, mask):
+        wd = self.libc.inotify_add_watch(self.fd, os.path.abspath(path).encode(sys.getfilesystemencoding()), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed for %s' % path)
+        return wd
+
+    def wait(self, timeout):
+        '''
+        :param timeout: the longest to wait, in seconds
+        :return: the set of folders that have changed
+        '''
+        changed = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    break
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0').decode(sys.getfilesystemencoding())
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # events were lost - treat every folder as changed
+                    changed.update(self.folders.values())
+                elif wd == self.root_wd:
+                    if mask & IN_ISDIR and not name.startswith('.'):
+                        folder = os.path.join(self.root, name)
+                        if mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(folder):
+                            self.folders[self.add_watch(folder, FOLDER_MASK)] = folder
+                        changed.add(folder)
+                elif wd in self.folders:
+                    if mask & IN_IGNORED:
+                        folder = self.folders.pop(wd)
+                        self.open.pop(folder, None)
+                        changed.add(folder)
+                    elif not name or is_movie(name):
+                        folder = self.folders[wd]
+                        if name and mask & (IN_CREATE | IN_MODIFY):
+                            self.open.setdefault(folder, {})[name] = time.time()
+                        elif name and mask & (IN_CLOSE_WRITE | IN_DELETE | IN_MOVED_FROM):
+                            self.open.get(folder, {}).pop(name, None)
+                        changed.add(folder)
+        return changed
+
+    def writing(self, folder):
+        '''
+        :return: the movies in folder that have been created or written to and not yet closed, leaving out those that
+                 haven't been written to for hold seconds
+        '''
+        held = self.open.get(folder, {})
+        now = time.time()
+        for name in [name for name, last in held.items() if now - last >= self.hold]:
+            del held[name]
+        return set(held)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def get_backend(root, poll=0.5, hold=HOLD):
+    '''
+    :return: an InotifyBackend for root where inotify can be used, otherwise a PollingBackend
+    '''
+    try:
+        return InotifyBackend(root, hold)
+    except (OSError, AttributeError):
+        return PollingBackend(root, poll)
+
+######################################################################################################################################################
+
+
+class FolderWatcher(object):
+
+    def __init__(self, root, callback, listings=None, settle=0.5, poll=0.5, hold=HOLD):
+        '''
+        :param root: the live edit root, whose sequence folders are watched
+        :param callback: called as callback(folder, listing) with each folder that has changed and settled
+        :param listings: {folder:listing} of the folders as they were last merged. Folders that differ are reported straight away
+        :param settle: how long, in seconds, a folder must be left alone before it is reported
+        :param poll: how often, in seconds, folders are listed when inotify isn't available
+        :param hold: the longest, in seconds, a movie that isn't written to is waited on to be closed
+        '''
+        self.root = root
+        self.callback = callback
+        self.settle = settle
+        self.backend = get_backend(root, poll, hold)
+        self.listings = dict(listings or {})
+        self.running = False
+        # folders waiting to settle - {folder:(time of the last change, listing at that time)}
+        self.pending = {}
+        now = time.time()
+        for folder in list_folders(root):
+            listing = snapshot(folder)
+            if listing != self.listings.get(folder, {}):
+                self.pending[folder] = (now - settle, listing)
+
+    def step(self, timeout=None):
+        '''
+        waits for changes for up to timeout seconds and reports the folders that have settled
+        :return: the folders reported
+        '''
+        if timeout is None:
+            timeout = self.settle
+        # folders held back by a writer settle no sooner than its next event, so only the others shorten the wait
+        settling = [t for folder, (t, listing) in self.pending.items() if not self.backend.writing(folder)]
+        if settling:
+            timeout = max(0.0, min(timeout, min(settling) + self.settle - time.time()))
+        for folder in self.backend.wait(timeout):
+            self.pending[folder] = (time.time(), snapshot(folder))
+
+        reported = []
+        now = time.time()
+        for folder, (last, listing) in sorted(self.pending.items()):
+            if now - last < self.settle or self.backend.writing(folder):
+                continue
+            current = snapshot(folder)
+            if current != listing:
+                # changed without an event reaching us yet - check again once it has been left alone for settle seconds
+                self.pending[folder] = (now, current)
+                continue
+            del self.pending[folder]
+            if current != self.listings.get(folder, {}):
+                self.listings[folder] = current
+                reported.append(folder)
+                self.callback(folder, current)
+        return reported
+
+    def run(self):
+        '''
+        reports changed folders until stop is called
+        '''
+        self.running = True
+        try:
+            while self.running:
+                self.step()
+        finally:
+            self.backend.close()
+
+    def stop(self):
+        self.running = False
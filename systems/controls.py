@@ -1,5 +1,7 @@
+# Control shapes. Every control is registered with rooftops.core.controlRegistry as it is created -
+# role defaults to the role in the control's name, eg. 'fk' for lf_upArm_fk_ctrl
 import maya.cmds as cmds
-from rooftops.core import common
+from rooftops.core import common, controlRegistry
 import pymel.core as pmc
 
 
@@ -24,7 +26,7 @@ def orientCtrl(ctrl=None, axis=None):
     
 ######################################################################################################################################################
 
-def circleCtrl(radius=20.0, name='', axis='z'):
+def circleCtrl(radius=20.0, name='', axis='z', role=None):
     '''
     creates a circular nurbs curve
     
@@ -33,11 +35,12 @@ def circleCtrl(radius=20.0, name='', axis='z'):
     
     if axis != 'z':
         orientCtrl(ctrl=ctrl, axis=axis)
+    controlRegistry.register(ctrl[0], role)
     return ctrl
 
 ######################################################################################################################################################
 
-def circleBumpCtrl(radius=20.0, name='', axis='z'):
+def circleBumpCtrl(radius=20.0, name='', axis='z', role=None):
     '''
     creates a circular nurbs curve with a bump to indicate orientation
     
@@ -51,11 +54,12 @@ def circleBumpCtrl(radius=20.0, name='', axis='z'):
     
     if axis != 'z':
         orientCtrl(ctrl=ctrl, axis=axis)
+    controlRegistry.register(ctrl, role)
     return ctrl
 
 ######################################################################################################################################################
 
-def boxCtrl(size=20.0, name=''):
+def boxCtrl(size=20.0, name='', role=None):
     '''
     Creates a box shaped nurbs curve
     
@@ -70,12 +74,13 @@ def boxCtrl(size=20.0, name=''):
     knots = [1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16]
     
     ctrl = pmc.curve(degree=1, p=points, k=knots, name=name)
+    controlRegistry.register(ctrl, role)
     
     return ctrl
     
 ######################################################################################################################################################
 
-def crossCtrl(size=20.0, name='', axis='z'):
+def crossCtrl(size=20.0, name='', axis='z', role=None):
     '''
     Creates a locator shaped nurbs curve
     
@@ -88,12 +93,13 @@ def crossCtrl(size=20.0, name='', axis='z'):
     knots = [1,2,3,4,5,6,7,8]
     
     ctrl = pmc.curve(degree=1, p=points, k=knots, name=name)
+    controlRegistry.register(ctrl, role)
     
     return ctrl
 
 ######################################################################################################################################################
 
-def squareCtrl(size=20.0, name='', axis='y'):
+def squareCtrl(size=20.0, name='', axis='y', role=None):
     '''
     creates a square nurbs curve
     
@@ -107,11 +113,12 @@ def squareCtrl(size=20.0, name='', axis='y'):
     ctrl = pmc.curve(degree=1, p=points, k=knots, name=name)
     if axis != 'z':
         orientCtrl(ctrl=ctrl, axis=axis)
+    controlRegistry.register(ctrl, role)
     return ctrl
 
 ######################################################################################################################################################
 
-def pinCtrl(radius=20.0, name='', axis='z'):
+def pinCtrl(radius=20.0, name='', axis='z', role=None):
     '''
     creates a pin control
     
@@ -130,6 +137,7 @@ def pinCtrl(radius=20.0, name='', axis='z'):
     shapes = pmc.listRelatives(line, shapes = True)
     shapes[1].rename(shapes[0].nodeName().replace('Shape', 'CircleShape'))
     pmc.delete(circle)
+    controlRegistry.register(line, role)
     
     return line
 
@@ -1,5 +1,6 @@
 import maya.cmds as cmds
 from rooftops.core import common
+from rooftops.core import nurbs
 import pymel.core as pmc
 
 def curveBetweenNodes(start=None, end=None, name=''):
@@ -252,8 +253,8 @@ class TangentCurve(object):
         self.spans = []
         for i in range(len(self.points)):
             loc = cmds.spaceLocator(name = '%s_cv_%s_loc' % (self.name, str(i)))[0]
-            common.align(loc, self.points[i])
             self.cv_locs.append(loc)
+        common.alignMany(self.cv_locs, self.points)
         for i in range(numSpans):
             span = self.buildSpan(self.cv_locs[i:i+3], i)
             cmds.parent(span['main_grp'], self.dnt_grp)
@@ -451,6 +452,24 @@ class CompressSegment(object):
 
 ######################################################################################################################################################
 
+def getCurveData(crv):
+    '''
+    reads crv's world space cvs, knots and degree in one go and returns them as a nurbs.NurbsCurve
+    '''
+    shape = common.getPyNode(crv)
+    if shape.type() != 'nurbsCurve':
+        shape = shape.getShape()
+    return nurbs.NurbsCurve.fromMaya([tuple(p) for p in shape.getCVs(space='world')], shape.getKnots(), shape.degree())
+
+def getClosestParameters(crv, points):
+    '''
+    returns a list of the uParams of the curve at the closest points to each of points.
+    All points are solved together - see nurbs.NurbsCurve.closestParameters
+    '''
+    if not points:
+        return []
+    return [float(u) for u in getCurveData(crv).closestParameters([tuple(p) for p in points])]
+
 def getClosestPointOnCurve(crv, point=None, obj=None):
     '''
     returns the uParam of the curve at the closest point to point or obj
@@ -462,12 +481,7 @@ def getClosestPointOnCurve(crv, point=None, obj=None):
     else:
         return 'Incorrect paramters passed in'
 
-    npoc = pmc.createNode('nearestPointOnCurve')
-    crv.worldSpace[0].connect(npoc.inputCurve)
-    npoc.inPosition.set(point)
-    result = npoc.parameter.get()
-    pmc.delete(npoc)
-    return result
+    return getClosestParameters(crv, [point])[0]
 
 
 
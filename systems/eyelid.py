@@ -7,7 +7,8 @@ def build(crv, name=''):
     creates a Marco Giordano style eyelid rig
 
     '''
-    params = [curve.getClosestPointOnCurve(crv=crv, point = pmc.pointPosition(cv)) for cv in crv.cv[:]]
+    crvData = curve.getCurveData(crv)
+    params = [float(u) for u in crvData.closestParameters(crvData.cvs)]
 
     mainGrp = pmc.group(empty=1, name='%s_grp' % name)
     baseGrp = pmc.group(empty=1, name='%s_base_grp' % name)
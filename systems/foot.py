@@ -1,8 +1,9 @@
 import maya.cmds as cmds
 
-from rooftops.core import common
+from rooftops.core import common, controlRegistry
 from rooftops.systems import rivet, controls
 
+@controlRegistry.system('foot')
 def buildFoot(name='', numJoints=5, side='rt', blendAttr=None, cleanup=1):
     
     # main ik group
@@ -15,15 +16,13 @@ def buildFoot(name='', numJoints=5, side='rt', blendAttr=None, cleanup=1):
     cmds.parent(ikPlane, noTouch_grp)
     
     # Create ik follicles
-    ikFollicles=[]
-    for i in range(numJoints):
-        f = rivet.build(mesh=ikPlane, paramV=(1.0/(numJoints-1) * i), paramU=0.5, name=(name + '_ik_' + str(i+1)))
-        ikFollicles.append(f)
-        cmds.parent(f, noTouch_grp)
+    ikFollicles = rivet.buildMany(mesh=ikPlane, params=[(0.5, (1.0/(numJoints-1) * i)) for i in range(numJoints)],
+                                  names=[(name + '_ik_' + str(i+1)) for i in range(numJoints)])
+    cmds.parent(ikFollicles, noTouch_grp)
         
     # Create IK Control
     ##ikCtrl = cmds.circle(name=(name + '_ik_bend_ctrl'))[0]
-    ikCtrl = controls.circleBumpCtrl(radius=5.0, name=(name + '_ik_bend_ctrl'), axis='x')[0]
+    ikCtrl = controls.circleBumpCtrl(radius=5.0, name=(name + '_ik_bend_ctrl'), axis='x').nodeName()
     cmds.parent(ikCtrl, grp)
     common.insertGroup(ikCtrl)
     cmds.addAttr(ikCtrl, ln='falloff', at='double', keyable=1, minValue=0.01)
@@ -55,7 +54,7 @@ def buildFoot(name='', numJoints=5, side='rt', blendAttr=None, cleanup=1):
     
     # Create IK toe Control
     ##ikToeCtrl = cmds.circle(name=(name + '_ik_toe_ctrl'))[0]
-    ikToeCtrl = controls.circleBumpCtrl(radius=3.0, name=(name + '_ik_toe_ctrl'), axis='x')[0]
+    ikToeCtrl = controls.circleBumpCtrl(radius=3.0, name=(name + '_ik_toe_ctrl'), axis='x').nodeName()
     cmds.parent(ikToeCtrl, ikCtrl)
     common.insertGroup(ikToeCtrl)
         
@@ -89,15 +88,13 @@ def buildFoot(name='', numJoints=5, side='rt', blendAttr=None, cleanup=1):
     cmds.parent(fkPlane, fk_noTouch_grp)
     
     # Create fk follicles
-    fkFollicles=[]
-    for i in range(numJoints):
-        f = rivet.build(mesh=fkPlane, paramV=(1.0/(numJoints-1) * i), paramU=0.5, name=(name + '_fk_' + str(i+1)))
-        fkFollicles.append(f)
-        cmds.parent(f, fk_noTouch_grp)
+    fkFollicles = rivet.buildMany(mesh=fkPlane, params=[(0.5, (1.0/(numJoints-1) * i)) for i in range(numJoints)],
+                                  names=[(name + '_fk_' + str(i+1)) for i in range(numJoints)])
+    cmds.parent(fkFollicles, fk_noTouch_grp)
     
     # Create FK Control
     ##fkCtrl = cmds.circle(name=(name + '_fk_bend_ctrl'))[0]
-    fkCtrl = controls.circleBumpCtrl(radius=4.0, name=(name + '_fk_bend_ctrl'), axis='x')[0]
+    fkCtrl = controls.circleBumpCtrl(radius=4.0, name=(name + '_fk_bend_ctrl'), axis='x').nodeName()
     cmds.parent(fkCtrl, fk_grp)
     common.insertGroup(fkCtrl)
     cmds.addAttr(fkCtrl, ln='falloff', at='double', keyable=1, minValue=0.01)
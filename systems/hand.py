@@ -1,10 +1,13 @@
 import maya.cmds as cmds
 import maya.OpenMaya as om
 import math
-from rooftops.core import common
+from rooftops.core import common, geometry, controlRegistry
 from rooftops.systems import controls
+from rooftops.utils import profiler
 
 
+@profiler.builder('hand')
+@controlRegistry.system('hand')
 def build( root, fingerDict, side='rt', cleanUp=1 ):
     '''
     Builds an fk hand with extendable knuckles
@@ -70,11 +73,12 @@ def buildFinger( side, name, rootJnt, rootGrp, cleanUp ):
     # Duplicate joint chain
     dupJnts = cmds.duplicate( rootJnt, rc=1 )
     print dupJnts
+    extend = extendJnts(dupJnts)
     jnts=[]
     ctrls = []
     index=1
     for d in range(len(dupJnts)):
-        if isExtendJnt(dupJnts[d]):
+        if extend[d]:
             j = cmds.rename(dupJnts[d], side + '_hand_' + name + '_Extend_' + str(index) + '_jnt')
             grp = common.insertGroup( node=j )
             grp = cmds.rename( grp, j.replace('jnt', 'grp') )
@@ -89,7 +93,7 @@ def buildFinger( side, name, rootJnt, rootGrp, cleanUp ):
             
             if d < (len(dupJnts)-1):
                 # Build control
-                c = controls.circleBumpCtrl( radius=5.0, name = side + '_hand_' + name + str(index) + '_ctrl', axis=twistAxis)[0]
+                c = controls.circleBumpCtrl( radius=5.0, name = side + '_hand_' + name + str(index) + '_ctrl', axis=twistAxis).nodeName()
                 grp = common.insertGroup( node=c )
                 grp = cmds.rename( grp, c.replace('ctrl', 'grp') )
                 common.align( node=grp, target=j )
@@ -133,13 +137,18 @@ def isExtendJnt( jnt, tolerance=0.01 ):
     jntPos = cmds.xform( jnt, ws=1, t=1, q=1 )
     childPos = cmds.xform( childJnt, ws=1, t=1, q=1 )
     
-    jntVec = om.MVector(jntPos[0], jntPos[1], jntPos[2])
-    childVec = om.MVector(childPos[0], childPos[1], childPos[2])
-    newVec = jntVec - childVec
-    if newVec.length() <= tolerance:
-        return True
-    else:
-        return False
+    return bool(geometry.coincident(jntPos, childPos, tolerance)[0])
+
+def extendJnts( jnts, tolerance=0.01 ):
+    '''
+    returns a list of bools, one per joint in a single hierarchical chain - True for each joint that isExtendJnt would return True for.
+    Queries each position once and tests the whole chain in one go
+    
+    '''
+    positions = [cmds.xform( j, ws=1, t=1, q=1 ) for j in jnts]
+    if len(positions) < 2:
+        return [True] * len(positions)
+    return geometry.coincident(positions[:-1], positions[1:], tolerance).tolist() + [True]
     
 '''
 rt_hand = build( side='rt', root='rt_hand_root_defJnt',
@@ -1,12 +1,13 @@
 import pymel.core as pmc
 import maya.cmds as cmds
-from rooftops.core import common
+from rooftops.core import common, controlRegistry
 reload(common)
 from rooftops.systems import curve, controls, measure, nonRoll
 
 legNames=['upper', 'lower', 'ankle', 'end']
 armNames=['upper', 'lower', 'wrist', 'end']
 
+@controlRegistry.system('limb')
 def tripleChain(top=None, mid=None, bot=None, end=None, prefix='', settingsCtrl=None, globalScaleAttr=None, nameList=legNames):
     '''
     makes an fk, ik and result chain based on the supplied 4 joint hierarchy
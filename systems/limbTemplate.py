@@ -0,0 +1,633 @@
+# The triple chain limb (arm / leg), built from a per limb name table.
+# LIMBS holds the names each limb uses for its joints and controls - arm.build and leg.build just call buildLimb with their entry.
+# The stretchy IK part of the limb is a declarative graph template - plain data, nodes, connections and constant attrs with names
+# written as %(key)s templates. compileTemplate() turns a template into a BuildPlan once. Instantiating the plan for each side /
+# limb is just string substitution into a GraphBatch, so four limbs are four replays of the same cached plan.
+import maya.cmds as cmds
+import math
+from rooftops.core import batch, common
+from rooftops.systems import curve, controls, measure, nonRoll
+from rooftops.utils import profiler
+
+######################################################################################################################################################
+# Limbs
+#
+# Names used by each limb:
+#     limb      - the limb as a whole
+#     upper     - the first joint / segment
+#     lower     - the second joint / segment
+#     end       - the third joint, where the ik handle sits
+#     mid       - the joint between upper and lower, which gets the pole vector and main bend ctrl
+#     extremity - the fk / ik ctrls at the end joint
+#     base      - the bend ctrl at the start of the upper segment
+LIMBS = {
+         'arm':{'limb':'arm', 'upper':'upArm', 'lower':'lowArm', 'end':'wrist', 'mid':'elbow', 'extremity':'hand', 'base':'shldr'},
+         'leg':{'limb':'leg', 'upper':'upLeg', 'lower':'lowLeg', 'end':'ankle', 'mid':'knee', 'extremity':'foot', 'base':'hip'},
+         }
+
+######################################################################################################################################################
+# Templates
+#
+# Each template is a list of blocks which are applied in order. A block can be made conditional with
+#     'when':key   - only applied if inputs[key] is truthy
+#     'unless':key - only applied if inputs[key] is falsy
+# Node entries are (key, nodeType, nameTemplate). The created node's name is added to the inputs under key for use in later templates.
+# Attr values are either constants or, when a string, the name of an input.
+
+# Stretchy IK: scales the upper and lower joints by the ratio of limb length to control distance, with extend, stretch and pin blending.
+# Inputs:
+#     side, limb, upper, lower - naming e.g. 'lf', 'arm', 'upArm', 'lowArm'
+#     ikEndCtrl - ik control with extend, stretch and pin attrs
+#     limbDist, upperDist, lowerDist - distanceDimension shapes from measure.build
+#     upperLength, lowerLength, totalLength - rest lengths of the chain
+#     ikMid, ikEnd - ik joints driven by the pinned lengths
+#     globalScaleAttr - optional plug which scales the measured distances
+#     negatePin - True for sides whose joints point down negative x
+STRETCHY_IK = [
+    {
+     'nodes':[
+              ('stretch_md', 'multiplyDivide', '%(side)s_%(limb)s_stretchFactor_md'),
+              ('squash_md', 'multiplyDivide', '%(side)s_%(limb)s_squashFactor_md'),
+              ('stretch_cond', 'condition', '%(side)s_%(limb)s_stretchFactor_cond'),
+              ('extend_pma', 'plusMinusAverage', '%(side)s_%(limb)s_extend_pma'),
+              ('upperStretch_md', 'multiplyDivide', '%(side)s_%(upper)s_stretch_md'),
+              ('upperStretchAmount_bc', 'blendColors', '%(side)s_%(upper)s_stretchAmount_bc'),
+              ('upperPinAmount_bc', 'blendColors', '%(side)s_%(upper)s_pinAmount_bc'),
+              ('lowerStretch_md', 'multiplyDivide', '%(side)s_%(lower)s_stretch_md'),
+              ('lowerStretchAmount_bc', 'blendColors', '%(side)s_%(lower)s_stretchAmount_bc'),
+              ('lowerPinAmount_bc', 'blendColors', '%(side)s_%(lower)s_pinAmount_bc'),
+              ('extendGlobalScale_md', 'multiplyDivide', '%(side)s_%(limb)s_extendGlobalScale_md'),
+              ('limbDistGlobalScale_md', 'multiplyDivide', '%(side)s_%(limb)sDist_globalScale_md'),
+              ('upperDistGlobalScale_md', 'multiplyDivide', '%(side)s_%(upper)sDistGlobalScale_md'),
+              ('lowerDistGlobalScale_md', 'multiplyDivide', '%(side)s_%(lower)sDistGlobalScale_md'),
+              ],
+     'connections':[
+                    ('%(ikEndCtrl)s.extend', '%(extendGlobalScale_md)s.input1X'),
+                    ('%(limbDist)s.distance', '%(limbDistGlobalScale_md)s.input1X'),
+                    ('%(upperDist)s.distance', '%(upperDistGlobalScale_md)s.input1X'),
+                    ('%(lowerDist)s.distance', '%(lowerDistGlobalScale_md)s.input1X'),
+                    ],
+     'attrs':[
+              ('%(limbDistGlobalScale_md)s.operation', 2),
+              ('%(upperDistGlobalScale_md)s.operation', 2),
+              ('%(lowerDistGlobalScale_md)s.operation', 2),
+              ],
+     },
+    {
+     'when':'globalScaleAttr',
+     'connections':[
+                    ('%(globalScaleAttr)s', '%(limbDistGlobalScale_md)s.input2X'),
+                    ('%(globalScaleAttr)s', '%(upperDistGlobalScale_md)s.input2X'),
+                    ('%(globalScaleAttr)s', '%(lowerDistGlobalScale_md)s.input2X'),
+                    ],
+     },
+    {
+     'unless':'globalScaleAttr',
+     'attrs':[
+              ('%(limbDistGlobalScale_md)s.input2X', 1),
+              ('%(upperDistGlobalScale_md)s.input2X', 1),
+              ('%(lowerDistGlobalScale_md)s.input2X', 1),
+              ],
+     },
+    {
+     'connections':[
+                    ('%(extendGlobalScale_md)s.outputX', '%(extend_pma)s.input1D[0]'),
+                    ('%(extend_pma)s.output1D', '%(squash_md)s.input1X'),
+                    ('%(limbDistGlobalScale_md)s.outputX', '%(stretch_md)s.input1X'),
+                    ('%(limbDistGlobalScale_md)s.outputX', '%(stretch_cond)s.firstTerm'),
+                    ('%(extend_pma)s.output1D', '%(stretch_cond)s.secondTerm'),
+                    ('%(stretch_md)s.outputX', '%(stretch_cond)s.colorIfTrueR'),
+                    ('%(squash_md)s.outputX', '%(stretch_cond)s.colorIfFalseR'),
+                    ('%(stretch_cond)s.outColorR', '%(upperStretch_md)s.input1X'),
+                    ('%(stretch_cond)s.outColorR', '%(lowerStretch_md)s.input1X'),
+                    ('%(ikEndCtrl)s.stretch', '%(upperStretchAmount_bc)s.blender'),
+                    ('%(upperStretch_md)s.outputX', '%(upperStretchAmount_bc)s.color1R'),
+                    ('%(ikEndCtrl)s.stretch', '%(lowerStretchAmount_bc)s.blender'),
+                    ('%(lowerStretch_md)s.outputX', '%(lowerStretchAmount_bc)s.color1R'),
+                    ('%(ikEndCtrl)s.pin', '%(upperPinAmount_bc)s.blender'),
+                    ('%(upperDistGlobalScale_md)s.outputX', '%(upperPinAmount_bc)s.color1R'),
+                    ('%(upperStretchAmount_bc)s.outputR', '%(upperPinAmount_bc)s.color2R'),
+                    ('%(ikEndCtrl)s.pin', '%(lowerPinAmount_bc)s.blender'),
+                    ('%(lowerDistGlobalScale_md)s.outputX', '%(lowerPinAmount_bc)s.color1R'),
+                    ('%(lowerStretchAmount_bc)s.outputR', '%(lowerPinAmount_bc)s.color2R'),
+                    ],
+     'attrs':[
+              ('%(extend_pma)s.input1D[1]', 'totalLength'),
+              ('%(squash_md)s.input2X', 'totalLength'),
+              ('%(squash_md)s.operation', 2),
+              ('%(stretch_md)s.input2X', 'totalLength'),
+              ('%(stretch_md)s.operation', 2),
+              ('%(stretch_cond)s.operation', 2),
+              ('%(upperStretch_md)s.input2X', 'upperLength'),
+              ('%(lowerStretch_md)s.input2X', 'lowerLength'),
+              ('%(upperStretchAmount_bc)s.color2R', 'upperLength'),
+              ('%(lowerStretchAmount_bc)s.color2R', 'lowerLength'),
+              ],
+     },
+    {
+     'when':'negatePin',
+     'nodes':[
+              ('upperPinAmount_uc', 'unitConversion', '%(side)s_%(upper)sPinAmount_uc'),
+              ('lowerPinAmount_uc', 'unitConversion', '%(side)s_%(lower)sPinAmount_uc'),
+              ],
+     'connections':[
+                    ('%(upperPinAmount_bc)s.outputR', '%(upperPinAmount_uc)s.input'),
+                    ('%(upperPinAmount_uc)s.output', '%(ikMid)s.tx'),
+                    ('%(lowerPinAmount_bc)s.outputR', '%(lowerPinAmount_uc)s.input'),
+                    ('%(lowerPinAmount_uc)s.output', '%(ikEnd)s.tx'),
+                    ],
+     'attrs':[
+              ('%(upperPinAmount_uc)s.conversionFactor', -1),
+              ('%(lowerPinAmount_uc)s.conversionFactor', -1),
+              ],
+     },
+    {
+     'unless':'negatePin',
+     'connections':[
+                    ('%(upperPinAmount_bc)s.outputR', '%(ikMid)s.tx'),
+                    ('%(lowerPinAmount_bc)s.outputR', '%(ikEnd)s.tx'),
+                    ],
+     },
+    ]
+
+######################################################################################################################################################
+
+class BuildPlan(object):
+    '''
+    A template flattened into a list of (condition, op, args) steps.
+    Conditions are (key, expected truth) pairs or None. Ops are 'node', 'connect' and 'set'.
+    '''
+    def __init__(self, steps, required, created):
+        self.steps = steps
+        self.required = required
+        self.created = created
+
+    def instantiate(self, dg=None, **inputs):
+        '''
+        queues the plan into the GraphBatch dg, substituting inputs into every name.
+        If dg is not supplied the plan is queued into a new batch which is flushed before returning.
+        Returns a dict of the names of the nodes that were created, keyed as in the template
+        '''
+        missing = [key for key in self.required if key not in inputs]
+        if missing:
+            raise ValueError('Missing template inputs: %s' % ', '.join(missing))
+        flush = dg is None
+        if flush:
+            dg = batch.GraphBatch()
+
+        names = dict(inputs)
+        result = {}
+        for condition, op, args in self.steps:
+            if condition and bool(names.get(condition[0])) != condition[1]:
+                continue
+            if op == 'node':
+                key, nodeType, name = args
+                result[key] = names[key] = dg.createNode(nodeType, name=name % names)
+            elif op == 'connect':
+                dg.connectAttr(args[0] % names, args[1] % names)
+            else:
+                plug, value = args
+                dg.setAttr(plug % names, names[value] if isinstance(value, basestring) else value)
+
+        if flush:
+            dg.flush()
+        return result
+
+######################################################################################################################################################
+
+_plans = {}
+
+def _templateKeys(text):
+    keys = []
+    start = text.find('%(')
+    while start != -1:
+        end = text.index(')s', start)
+        keys.append(text[start + 2:end])
+        start = text.find('%(', end)
+    return keys
+
+def compileTemplate(template):
+    '''
+    returns the BuildPlan for template. Plans are cached so each template is only compiled once per session
+    '''
+    plan = _plans.get(id(template))
+    if plan is not None and plan[0] is template:
+        return plan[1]
+
+    steps, created, referenced = [], [], []
+    for block in template:
+        condition = None
+        if 'when' in block:
+            condition = (block['when'], True)
+        elif 'unless' in block:
+            condition = (block['unless'], False)
+        for key, nodeType, name in block.get('nodes', []):
+            steps.append((condition, 'node', (key, nodeType, name)))
+            created.append(key)
+            referenced.extend(_templateKeys(name))
+        for src, dst in block.get('connections', []):
+            steps.append((condition, 'connect', (src, dst)))
+            referenced.extend(_templateKeys(src) + _templateKeys(dst))
+        for plug, value in block.get('attrs', []):
+            steps.append((condition, 'set', (plug, value)))
+            referenced.extend(_templateKeys(plug))
+            if isinstance(value, basestring):
+                referenced.append(value)
+
+    # Inputs used by unconditional steps must always be supplied. Conditional keys are looked up with get
+    conditional = set(s[0][0] for s in steps if s[0])
+    required = sorted(set(k for k in referenced if k not in created) - conditional)
+    plan = BuildPlan(steps, required, created)
+    _plans[id(template)] = (template, plan)
+    return plan
+
+######################################################################################################################################################
+
+def buildLimb(limb, joints, side='lf', twistJoints=5, globalScaleAttr=None, cleanup=0):
+    '''
+    makes a triple chain limb using a set of 4 existing hierarchical joints
+    limb is a key of LIMBS. If any of joints are missing, the 4 selected joints are used
+    '''
+    #Validation
+    if not all(joints) or len(joints) != 4:
+        if len(cmds.ls(sl=1)) == 4:
+            joints = cmds.ls(sl=1)
+        else:
+            return common.showDialog( 'Argument Error', 'Please supply 4 hierarchical joints' )
+    upperJnt, lowerJnt, endJnt = joints[:3]
+    n = dict(LIMBS[limb], side=side)
+    chainNames = [n['upper'], n['lower'], n['end'], 'end']
+
+    profiler.section('Setup')
+    # Root group
+    root = cmds.group(empty=1, name='%(side)s_%(limb)s_grp' % n)
+
+    #Constrain group which is aligned to the first joint and can be used to attach the limb to a shoulder / hip
+    const = cmds.group(empty=1, name='%(side)s_%(limb)s_const_grp' % n)
+    common.align(const, upperJnt)
+    cmds.parent(const, root)
+
+    # result chain
+    dupes = cmds.duplicate(upperJnt, rc=1)
+    resultChain = []
+    for i in range(4):
+        jnt = cmds.rename(dupes[i], '%s_%s_result_jnt' %(side, chainNames[i]) )
+        resultChain.append(jnt)
+
+    cmds.parent(resultChain[0], const)
+
+    # fk chain
+    dupes = cmds.duplicate(resultChain[0], rc=1)
+    fkChain = []
+    for i in range(4):
+        jnt = cmds.rename(dupes[i], '%s_%s_fk_jnt' %(side, chainNames[i]) )
+        fkChain.append(jnt)
+
+    # ik chain
+    dupes = cmds.duplicate(resultChain[0], rc=1)
+    ikChain = []
+    for i in range(4):
+        jnt = cmds.rename(dupes[i], '%s_%s_ik_jnt' %(side, chainNames[i]) )
+        ikChain.append(jnt)
+
+    # Settings ctrl
+    settingsCtrl = controls.crossCtrl(name='%(side)s_%(limb)s_settings_ctrl' % n)
+    common.align(settingsCtrl, const)
+    cmds.parent(settingsCtrl, root)
+    # ik / fk attr
+    cmds.addAttr( settingsCtrl, longName='state', at='enum', enumName='ik:fk', keyable=True )
+    stateRev = cmds.createNode('reverse', name='%(side)s_%(limb)s_state_rev' % n)
+    cmds.connectAttr('%s.state' % settingsCtrl, '%s.inputX' % stateRev)
+    # bendy ctrls switch
+    cmds.addAttr( settingsCtrl, longName='bendy_ctrls', at='enum', enumName='hide:show', keyable=True )
+
+    ##################################################################################################################################### FK Ctrls
+    profiler.section('FK Ctrls')
+    fkGrp = cmds.group(empty=1, name='%(side)s_%(limb)s_fk_grp' % n)
+    cmds.parent(fkGrp, root)
+    cmds.connectAttr('%s.state' % settingsCtrl, '%s.visibility' % fkGrp)
+
+    fkUpperCtrl = controls.circleBumpCtrl(name='%(side)s_%(upper)s_fk_ctrl' % n, axis='x', radius=10).nodeName()
+    fkLowerCtrl = controls.circleBumpCtrl(name='%(side)s_%(lower)s_fk_ctrl' % n, axis='x', radius=10).nodeName()
+    fkExtremityCtrl = controls.circleBumpCtrl(name='%(side)s_%(extremity)s_fk_ctrl' % n, axis='x', radius=10).nodeName()
+    common.alignMany([fkUpperCtrl, fkLowerCtrl, fkExtremityCtrl], fkChain[:3])
+
+    # fk upper
+    cmds.parent(fkUpperCtrl, fkGrp)
+    common.insertGroup(fkUpperCtrl)
+
+    # fk lower
+    cmds.parent(fkLowerCtrl, fkUpperCtrl)
+
+    # fk extremity
+    cmds.parent(fkExtremityCtrl, fkLowerCtrl)
+
+    cmds.parentConstraint(fkUpperCtrl, fkChain[0])
+    cmds.parentConstraint(fkLowerCtrl, fkChain[1])
+    cmds.parentConstraint(fkExtremityCtrl, fkChain[2])
+
+    # add extend attrs
+    for ctrl in [fkLowerCtrl, fkExtremityCtrl]:
+        cmds.addAttr( ctrl, longName='extend', at='double', keyable=True )
+        extend_pma = cmds.createNode('plusMinusAverage', name='%s_extend_pma' % ctrl)
+        cmds.setAttr('%s.input1D[0]' % extend_pma, cmds.getAttr('%s.tx' % ctrl))
+        if side == 'lf':
+            cmds.setAttr('%s.operation' % extend_pma, 2)
+        cmds.connectAttr('%s.extend' % ctrl, '%s.input1D[1]' % extend_pma)
+        cmds.connectAttr('%s.output1D' % extend_pma, '%s.tx' % ctrl)
+
+    ##################################################################################################################################### IK ctrls ####
+    profiler.section('IK Ctrls')
+    ikGrp = cmds.group(empty=1, name='%(side)s_%(limb)s_ik_grp' % n)
+    cmds.parent(ikGrp, root)
+    cmds.connectAttr('%s.outputX' % stateRev, '%s.visibility' % ikGrp)
+
+    # IK extremity
+    ikExtremityCtrl = controls.boxCtrl(name='%(side)s_%(extremity)s_ik_ctrl' % n, size=10)
+    common.align(ikExtremityCtrl, resultChain[2], orient=0)
+    cmds.parent(ikExtremityCtrl, ikGrp)
+    common.insertGroup(ikExtremityCtrl)
+
+    cmds.addAttr( ikExtremityCtrl, longName='stretch', at='double', minValue=0, maxValue=1, defaultValue=0, keyable=True )
+    cmds.addAttr( ikExtremityCtrl, longName='extend', at='double', keyable=True )
+    cmds.addAttr( ikExtremityCtrl, longName='pin', at='double', minValue=0, maxValue=1, defaultValue=0, keyable=True )
+
+    # IK mid / pole vector
+    ikMidCtrl = controls.crossCtrl(name='%(side)s_%(mid)s_ik_ctrl' % n, size=10)
+
+    pvAxis = '-z'
+    if side == 'rt':
+        pvAxis='z'
+    pv = common.placePoleVector(node1=resultChain[0], node2=resultChain[1], node3=resultChain[2], axis=pvAxis)
+    cmds.setAttr('%s.t' % ikMidCtrl, pv[0], pv[1], pv[2])
+    cmds.parent(ikMidCtrl, ikGrp)
+    common.insertGroup(ikMidCtrl)
+
+    # IK Solvers
+    ikHandle = cmds.ikHandle( solver='ikRPsolver', name='%(side)s_%(limb)s_ikHandle' % n, startJoint=ikChain[ 0 ], endEffector=ikChain[ 2 ] )[ 0 ]
+    common.align(ikHandle, resultChain[2])
+    cmds.poleVectorConstraint(ikMidCtrl, ikHandle)
+    cmds.parent(ikHandle, ikExtremityCtrl)
+
+    endIkHandle = cmds.ikHandle( solver='ikSCsolver', name='%(side)s_%(limb)s_end_ikHandle' % n, startJoint=ikChain[ 2 ], endEffector=ikChain[ 3 ] )[ 0 ]
+    common.align(endIkHandle, resultChain[3])
+    cmds.parent(endIkHandle, ikExtremityCtrl)
+    cmds.setAttr('%s.rotateX' % endIkHandle, 0)
+
+    # Set up ik / fk blending
+    for i in range(4):
+        common.blendAttrs(targ1=ikChain[i], targ2=fkChain[i], driven=resultChain[i], blendAttr='%s.state' % settingsCtrl)
+
+    ############################################################################################################################## Stretchy IK
+    profiler.section('Stretchy IK')
+    # upper to end measure
+    limbDist = measure.build(start=resultChain[0], end=resultChain[2], name='%(side)s_%(limb)sDist' % n)
+    cmds.parent(limbDist['start'], const)
+    cmds.parent(limbDist['xform'], const)
+    cmds.parent(limbDist['end'], ikExtremityCtrl)
+
+    # upper to mid measure
+    upperDist = measure.build(start=resultChain[0], end=ikMidCtrl, startLoc=limbDist['start'], name='%(side)s_%(upper)sDist' % n)
+    cmds.parent(upperDist['xform'], const)
+    cmds.parent(upperDist['end'], ikMidCtrl)
+
+    # mid to end measure
+    lowerDist = measure.build(start=ikMidCtrl, end=ikExtremityCtrl, startLoc=upperDist['end'], endLoc=limbDist['end'],
+                              name='%(side)s_%(lower)sDist' % n)
+    cmds.parent(lowerDist['xform'], const)
+
+    # Utility graph
+    upperLength = math.fabs(cmds.getAttr('%s.tx' % resultChain[1]))
+    lowerLength = math.fabs(cmds.getAttr('%s.tx' % resultChain[2]))
+
+    compileTemplate(STRETCHY_IK).instantiate(side=side, limb=n['limb'], upper=n['upper'], lower=n['lower'],
+                                             ikEndCtrl=ikExtremityCtrl, limbDist=limbDist['shape'],
+                                             upperDist=upperDist['shape'], lowerDist=lowerDist['shape'],
+                                             upperLength=upperLength, lowerLength=lowerLength,
+                                             totalLength=upperLength + lowerLength,
+                                             ikMid=ikChain[1], ikEnd=ikChain[2],
+                                             globalScaleAttr=globalScaleAttr, negatePin=(side == 'lf'))
+
+    ############################################################################################################################# Twist extration
+    profiler.section('Twist extraction')
+    upperNonRoll = nonRoll.build(joint=resultChain[0], name='%(side)s_%(upper)s' % n)
+    cmds.parent(upperNonRoll['main_grp'], const)
+
+    lowerNonRoll = nonRoll.build(joint=resultChain[1], name='%(side)s_%(lower)s' % n)
+    cmds.parent(lowerNonRoll['main_grp'], upperNonRoll['nonRoll'])
+
+    endNonRoll = nonRoll.build(joint=resultChain[2], name='%(side)s_%(end)s' % n)
+    cmds.parent(endNonRoll['main_grp'], resultChain[1])
+
+    ############################################################################################################################# Bendy limb
+    profiler.section('Bendy %(limb)s' % n)
+    bendGrp = cmds.group(empty=1, name='%(side)s_%(limb)s_bend_grp' % n)
+    cmds.parent(bendGrp, root)
+    cmds.connectAttr('%s.bendy_ctrls' % settingsCtrl, '%s.visibility' % bendGrp)
+
+    # Mid ctrl
+    bendyMidCtrl = controls.squareCtrl(name='%(side)s_%(mid)s_bend_ctrl' % n, axis='x', size=10)
+    cmds.parent(bendyMidCtrl, bendGrp)
+    bendyMidGrp = common.insertGroup(bendyMidCtrl)
+    bendyMidGrp = cmds.rename(bendyMidGrp, '%(side)s_%(mid)s_bend_grp' % n)
+    orientConstraint = cmds.orientConstraint(resultChain[0], resultChain[1], bendyMidGrp)[0]
+    cmds.setAttr('%s.interpType' % orientConstraint, 2)
+    cmds.pointConstraint(resultChain[1], bendyMidGrp)
+    cmds.addAttr(settingsCtrl, longName='auto_bend', at='double', minValue=0, maxValue=1, defaultValue=0, keyable=1)
+
+    # Auto / Manual mid bend - in sits on the upper segment, out on the lower
+    bendyMidInCtrl = _bendTweak(n, 'in', bendGrp, settingsCtrl, bendyMidCtrl, resultChain[0], resultChain[1], resultChain[0], 2)
+    bendyMidOutCtrl = _bendTweak(n, 'out', bendGrp, settingsCtrl, bendyMidCtrl, resultChain[1], resultChain[2], resultChain[2], 1)
+
+    # Base out
+    bendyBaseCtrl = _bendEnd(n, 'base', bendGrp, bendyMidCtrl, resultChain[0], resultChain[0])
+
+    # End in
+    bendyEndCtrl = _bendEnd(n, 'end', bendGrp, bendyMidCtrl, resultChain[1], resultChain[2])
+
+    ############################################################################################################################# Curve segments
+    profiler.section('Curve segments')
+    defJnts_grp = cmds.group(empty=1, name='%(side)s_%(limb)s_defJnts_grp' % n)
+    cmds.parent(defJnts_grp, root)
+
+    # upper
+    upperSeg = cmds.group(empty=1, name='%(side)s_%(upper)s_segment_grp' % n)
+    cmds.parent(upperSeg, defJnts_grp)
+    cmds.setAttr('%s.inheritsTransform' % upperSeg, 0)
+
+    crv = curve.curveBetweenNodes(start=upperJnt, end=lowerJnt, name='%(side)s_%(upper)s' % n)
+    cmds.parent(crv, const)
+
+    mpNodes = curve.nodesAlongCurve(crv=crv, numNodes=twistJoints, name='%(side)s_%(upper)s' % n, upNode=upperNonRoll['nonRoll'])
+    cmds.parent(mpNodes['grps'], upperSeg)
+
+    roll_uc = cmds.createNode('unitConversion', name='%(side)s_%(upper)s_roll_uc' % n)
+    cmds.setAttr('%s.conversionFactor' % roll_uc, 1.0)
+    cmds.connectAttr('%s.rotateX' % lowerNonRoll['info'], '%s.input' % roll_uc)
+
+    midRoll_uc = cmds.createNode('unitConversion', name='%(side)s_%(upper)s_%(mid)sRoll_uc' % n)
+    cmds.setAttr('%s.conversionFactor' % midRoll_uc, 1.0)
+    cmds.connectAttr('%s.rotateX' % bendyMidCtrl, '%s.input' % midRoll_uc)
+
+    roll_pma = cmds.createNode('plusMinusAverage', name='%(side)s_%(upper)s_roll_pma' % n)
+    cmds.connectAttr('%s.output' % roll_uc, '%s.input1D[0]' % roll_pma)
+    cmds.connectAttr('%s.output' % midRoll_uc, '%s.input1D[1]' % roll_pma)
+
+    # Create child joints
+    twistJnts = []
+    for i in range(len(mpNodes['mpNodes'])):
+        cmds.select(clear=1)
+        twistJnts.append(cmds.joint(name='%s_%s_%s_defJnt' % (side, n['upper'], i)))
+    common.alignMany(twistJnts, mpNodes['grps'])
+
+    for i in range(len(mpNodes['mpNodes'])):
+        cmds.parent(twistJnts[i], mpNodes['grps'][i])
+
+        totalRoll_uc = cmds.createNode('unitConversion', name='%s_%s_totalRoll_%s_uc' % (side, n['upper'], i+1))
+        if side == 'lf':
+            cmds.setAttr('%s.conversionFactor' % totalRoll_uc,  (1.0 / (twistJoints-1) * i)*-1)
+        else:
+            cmds.setAttr('%s.conversionFactor' % totalRoll_uc,  1.0 / (twistJoints-1) * i)
+        cmds.connectAttr('%s.output1D' % roll_pma, '%s.input' % totalRoll_uc)
+        cmds.connectAttr('%s.output' % totalRoll_uc, '%s.frontTwist' % mpNodes['mpNodes'][i])
+
+    upperCrvJnts = curve.bindCurve(crv=crv)
+    cmds.parent(upperCrvJnts[0], resultChain[0])
+    cmds.parent(upperCrvJnts[1], bendyBaseCtrl)
+    cmds.parent(upperCrvJnts[2], bendyMidInCtrl)
+    cmds.parent(upperCrvJnts[3], bendyMidCtrl)
+
+    # lower
+    lowerSeg = cmds.group(empty=1, name='%(side)s_%(lower)s_segment_grp' % n)
+    cmds.parent(lowerSeg, defJnts_grp)
+    cmds.setAttr('%s.inheritsTransform' % lowerSeg, 0)
+
+    crv = curve.curveBetweenNodes(start=lowerJnt, end=endJnt, name='%(side)s_%(lower)s' % n)
+    cmds.parent(crv, const)
+
+    mpNodes = curve.nodesAlongCurve(crv=crv, numNodes=twistJoints, name='%(side)s_%(lower)s' % n, upNode=resultChain[1])
+    cmds.parent(mpNodes['grps'], lowerSeg)
+
+    # Create child joints
+    twistJnts = []
+    for i in range(len(mpNodes['mpNodes'])):
+        cmds.select(clear=1)
+        twistJnts.append(cmds.joint(name='%s_%s_%s_defJnt' % (side, n['lower'], i)))
+    common.alignMany(twistJnts, mpNodes['grps'])
+
+    for i in range(len(mpNodes['mpNodes'])):
+        cmds.parent(twistJnts[i], mpNodes['grps'][i])
+
+        roll_uc = cmds.createNode('unitConversion', name='%s_%s_roll_%s_uc' % (side, n['lower'], i+1))
+        cmds.setAttr('%s.conversionFactor' % roll_uc, 1.0 / (twistJoints-1) * i)
+        cmds.connectAttr('%s.rotateX' % endNonRoll['info'], '%s.input' % roll_uc)
+
+        midRoll_uc = cmds.createNode('unitConversion', name='%s_%s_%sRoll_%s_uc' % (side, n['lower'], n['mid'], i+1))
+        cmds.setAttr('%s.conversionFactor' % midRoll_uc, 1.0 - (1.0 / (twistJoints-1) * i))
+        cmds.connectAttr('%s.rotateX' % bendyMidCtrl, '%s.input' % midRoll_uc)
+
+        roll_pma = cmds.createNode('plusMinusAverage', name='%s_%s_roll_%s_pma' % (side, n['lower'], i+1))
+        cmds.connectAttr('%s.output' % roll_uc, '%s.input1D[0]' % roll_pma)
+        cmds.connectAttr('%s.output' % midRoll_uc, '%s.input1D[1]' % roll_pma)
+
+        totalRoll_uc = cmds.createNode('unitConversion', name='%s_%s_totalRoll_%s_uc' % (side, n['lower'], i+1))
+        if side == 'lf':
+            cmds.setAttr('%s.conversionFactor' % totalRoll_uc, -1.0)
+        else:
+            cmds.setAttr('%s.conversionFactor' % totalRoll_uc, 1.0)
+        cmds.connectAttr('%s.output1D' % roll_pma, '%s.input' % totalRoll_uc)
+        cmds.connectAttr('%s.output' % totalRoll_uc, '%s.frontTwist' % mpNodes['mpNodes'][i])
+
+    lowerCrvJnts = curve.bindCurve(crv=crv)
+    cmds.parent(lowerCrvJnts[0], bendyMidCtrl)
+    cmds.parent(lowerCrvJnts[1], bendyMidOutCtrl)
+    cmds.parent(lowerCrvJnts[2], bendyEndCtrl)
+    cmds.parent(lowerCrvJnts[3], resultChain[2])
+
+    ############################################################################################################################################## CLEANUP
+    profiler.section('Cleanup')
+    if cleanup:
+        cmds.setAttr('%s.visibility' % const, 0)
+        common.attrCtrl(lock=True, keyable=False, channelBox=False, nodeList=[const, bendyMidCtrl], attrList=['visibility'])
+
+        common.attrCtrl(lock=True, keyable=False, channelBox=False,
+                        nodeList=[fkUpperCtrl, fkLowerCtrl, fkExtremityCtrl],
+                        attrList=['visibility', 'tx', 'ty', 'tz', 'sx', 'sy', 'sz'])
+
+        common.attrCtrl(lock=True, keyable=False, channelBox=False,
+                        nodeList=[ikExtremityCtrl,],
+                        attrList=['visibility', 'sx', 'sy', 'sz'])
+
+        common.attrCtrl(lock=True, keyable=False, channelBox=False,
+                        nodeList=[ikMidCtrl, bendyBaseCtrl, bendyMidInCtrl, bendyMidOutCtrl, bendyEndCtrl],
+                        attrList=['visibility', 'sx', 'sy', 'sz'])
+
+    ############################################################################################################################################## RETURN
+    returnDict={
+                '%(upper)s_fk_ctrl' % n:fkUpperCtrl,
+                '%(lower)s_fk_ctrl' % n:fkLowerCtrl,
+                '%(extremity)s_fk_ctrl' % n:fkExtremityCtrl,
+                '%(extremity)s_ik_ctrl' % n:ikExtremityCtrl,
+                '%(mid)s_ik_ctrl' % n: ikMidCtrl,
+                'settings':settingsCtrl,
+                '%(mid)s_bend_ctrl' % n:bendyMidCtrl,
+                '%(base)s_bend_ctrl' % n:bendyBaseCtrl,
+                '%(mid)s_in_bend_ctrl' % n:bendyMidInCtrl,
+                '%(mid)s_out_bend_ctrl' % n:bendyMidInCtrl,
+                'root':root,
+                'const':const
+                }
+
+    return returnDict
+
+def _bendTweak(n, direction, bendGrp, settingsCtrl, bendyMidCtrl, start, end, outer, point):
+    '''
+    makes the in / out bend ctrl either side of the mid bend ctrl. It sits at pointsAlongVector(start, end)[point] and blends,
+    by the settings ctrl's auto_bend, between following the mid bend ctrl and staying halfway between it and the outer joint
+    '''
+    m = dict(n, direction=direction)
+    constGrp = cmds.group(empty=1, name='%(side)s_%(mid)s_bend_%(direction)s_const_grp' % m)
+    common.align(constGrp, start)
+    points = common.pointsAlongVector(start, end, divisions=3)
+    cmds.setAttr('%s.t' % constGrp, points[point][0], points[point][1], points[point][2])
+    cmds.parent(constGrp, bendGrp)
+
+    ctrl = controls.squareCtrl(name='%(side)s_%(mid)s_bend_%(direction)s_ctrl' % m, axis='x', size=7.5)
+    common.align(ctrl, constGrp)
+    cmds.parent(ctrl, constGrp)
+
+    manual = cmds.group(empty=1, name='%(side)s_%(mid)s_bend_%(direction)s_manual_targ' % m)
+    common.align(manual, constGrp)
+    cmds.parent(manual, start)
+    cmds.pointConstraint(bendyMidCtrl, outer, manual)
+    cmds.pointConstraint(bendyMidCtrl, manual, e=1, w=2.0)
+
+    auto = cmds.group(empty=1, name='%(side)s_%(mid)s_bend_%(direction)s_auto_targ' % m)
+    common.align(auto, constGrp)
+    cmds.parent(auto, bendyMidCtrl)
+
+    parentConstraint = cmds.parentConstraint(manual, auto, constGrp)[0]
+    cmds.connectAttr('%s.auto_bend' % settingsCtrl, '%s.%sW1' % (parentConstraint, auto))
+    # the side isn't substituted into this name - kept as existing rigs have it
+    rev = cmds.createNode('reverse', name='%%s_%s_bend_auto_rev' % n['mid'])
+    cmds.connectAttr('%s.auto_bend' % settingsCtrl, '%s.inputX' % rev)
+    cmds.connectAttr('%s.outputX' % rev, '%s.%sW0' % (parentConstraint, manual))
+    return ctrl
+
+def _bendEnd(n, key, bendGrp, bendyMidCtrl, start, outer):
+    '''
+    makes the bend ctrl at the base or end of the limb, named from n[key]. It is aligned to start, stays halfway between the
+    mid bend ctrl and the outer joint and follows start's orientation
+    '''
+    name = n[key]
+    constGrp = cmds.group(empty=1, name='%s_%s_bend_const_grp' % (n['side'], name))
+    common.align(constGrp, start)
+    cmds.parent(constGrp, bendGrp)
+
+    ctrl = controls.squareCtrl(name='%s_%s_bend_ctrl' % (n['side'], name), axis='x', size=7.5)
+    common.align(ctrl, constGrp)
+    cmds.parent(ctrl, constGrp)
+    cmds.pointConstraint(bendyMidCtrl, outer, constGrp)
+    cmds.pointConstraint(bendyMidCtrl, constGrp, e=1, w=0.5)
+    cmds.orientConstraint(start, constGrp)
+    return ctrl
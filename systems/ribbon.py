@@ -31,8 +31,10 @@ def build(numBindJoints=6, numSpans=None, name='', numSkinJoints=3, width=None):
     cmds.setAttr(plane+'.inheritsTransform', 0)
     
     # Add follicles
+    follicles = rivet.buildMany(mesh=plane, params=[((1.0 / (numBindJoints-1) * index), 0.5) for index in range(numBindJoints)],
+                                names=[(name + '_' + str(index)) for index in range(numBindJoints)])
     for index in range(numBindJoints):
-        f = rivet.build( mesh=plane, paramU=(1.0 / (numBindJoints-1) * index), paramV=0.5, name=(name + '_' + str(index)))
+        f = follicles[index]
         cmds.parent(f, main_grp)
         j = cmds.joint(name=(name + '_' + str(index) + '_bnd'))
     
\ No newline at end of file
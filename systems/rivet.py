@@ -1,69 +1,125 @@
 import maya.cmds as cmds
-from rooftops.core import common
+import pymel.core as pmc
+import numpy as np
+from rooftops.core import common, batch, bvh, nurbs
+
+def getShape(mesh):
+    '''
+    returns the mesh or nurbsSurface shape of mesh
+    '''
+    if cmds.nodeType(mesh) == 'transform':
+        mesh = cmds.listRelatives(mesh, s=1)[0]
+    return mesh
+
+def readMesh(mesh):
+    '''
+    reads mesh's world space points, triangles and uvs in one go.
+    returns a bvh.TriangleBVH over the triangles and a (numTriangles, 3, 2) array of the uvs at each triangle corner
+    '''
+    shape = common.getPyNode(getShape(mesh))
+    points = np.array([tuple(p) for p in shape.getPoints(space='world')])
+    us, vs = shape.getUVs()
+    uvCounts, uvIds = shape.getAssignedUVs()
+    triCounts, triVerts = shape.getTriangles()
+    faceCounts, faceVerts = shape.getVertices()
+
+    # triangle vertices are object relative - map each back to the uv of its face vertex
+    triUvIds = []
+    faceStart, triStart = 0, 0
+    for face in range(len(faceCounts)):
+        faceUvs = dict(zip(faceVerts[faceStart:faceStart + faceCounts[face]], uvIds[faceStart:faceStart + faceCounts[face]]))
+        for vertex in triVerts[triStart:triStart + triCounts[face] * 3]:
+            triUvIds.append(faceUvs[vertex])
+        faceStart += faceCounts[face]
+        triStart += triCounts[face] * 3
+
+    uvs = np.stack([np.array(us), np.array(vs)], axis=1)
+    triangles = np.array(triVerts, dtype=int).reshape(-1, 3)
+    return bvh.TriangleBVH(points, triangles), uvs[np.array(triUvIds, dtype=int)].reshape(-1, 3, 2)
+
+def readSurface(surface):
+    '''
+    reads surface's world space cvs, knots and degrees in one go and returns them as a nurbs.NurbsSurface
+    '''
+    shape = common.getPyNode(getShape(surface))
+    return nurbs.NurbsSurface.fromMaya([tuple(p) for p in shape.getCVs(space='world')], shape.numCVsInU(), shape.numCVsInV(),
+                                       shape.getKnotsInU(), shape.getKnotsInV(), shape.degreeU(), shape.degreeV())
+
+def getClosestUVs(targs, mesh):
+    '''
+    returns a list of follicle (paramU, paramV) for the closest point on mesh to each of targs.
+    mesh may be a mesh or nurbsSurface. It is read once and all targs are resolved together
+    '''
+    shape = getShape(mesh)
+    points = [cmds.xform(targ, q=1, ws=1, t=1) for targ in targs]
+    if cmds.nodeType(shape) == 'mesh':
+        tree, triUvs = readMesh(shape)
+        tris, bary = tree.closestPoints(points)[:2]
+        uvs = tree.interpolate(triUvs, tris, bary)
+        return [(float(u), float(v)) for u, v in uvs]
+    surface = readSurface(shape)
+    u, v = surface.normalize(*surface.closestParameters(points))
+    return [(float(pu), float(pv)) for pu, pv in zip(u, v)]
+
+######################################################################################################################################################
+
+def buildMany(targs=None, mesh=None, params=None, names=None, dg=None):
+    '''
+    creates a follicle on mesh for each of targs, or for each (paramU, paramV) in params if they are given.
+    All follicles are queued into the GraphBatch dg. If dg is not supplied they are created together by a single flush.
+    Returns the follicle transforms
+    '''
+    if not mesh:
+        return 'Argument Error, Please provide a node for the mesh argument'
+    shape = getShape(mesh)
+    if params is None:
+        if not targs:
+            return 'Argument Error, Please provide nodes for targs or a list of params'
+        params = getClosestUVs(targs, shape)
+    if names is None:
+        names = ['%s_%s' % (mesh, i) for i in range(len(params))]
+
+    flush = dg is None
+    if flush:
+        dg = batch.GraphBatch()
+
+    isMesh = cmds.nodeType(shape) == 'mesh'
+    follicles = []
+    for (paramU, paramV), name in zip(params, names):
+        follXform = dg.createNode('transform', name=(name+'_foll'))
+        follShape = dg.createNode('follicle', name=(name+'_follShape'), parent=follXform)
+
+        if isMesh:
+            dg.connectAttr('%s.outMesh' % shape, '%s.inputMesh' % follShape)
+        else:
+            dg.connectAttr('%s.local' % shape, '%s.inputSurface' % follShape)
+        dg.connectAttr('%s.worldMatrix[0]' % shape, '%s.inputWorldMatrix' % follShape)
+
+        dg.connectAttr('%s.outRotate' % follShape, '%s.r' % follXform)
+        dg.connectAttr('%s.outTranslate' % follShape, '%s.t' % follXform)
+
+        dg.setAttr('%s.parameterU' % follShape, paramU)
+        dg.setAttr('%s.parameterV' % follShape, paramV)
+
+        dg.setAttr('%s.inheritsTransform' % follXform, 0)
+        follicles.append(follXform)
+
+    if flush:
+        dg.flush()
+    return follicles
 
 def build( targ=None, mesh=None, paramU=None, paramV=None, name='' ):
     '''
     creates a follicle at the closest point to targ on the surface of mesh
-    
+
     '''
     if paramU == None or paramV == None:
-        print paramU
-        print paramV
         if not targ or not mesh:
             return 'Argument Error, Please provide nodes for targ and mesh arguments'
-        
-        if cmds.nodeType(mesh) == 'transform':
-            mesh = cmds.listRelatives(mesh, s=1)[0]
-        
-        targPos = cmds.xform( targ, q=1, ws=1, t=1 )
-        pmm1 = cmds.createNode('pointMatrixMult')
-        cmds.setAttr('%s.inPoint' % pmm1, targPos[0], targPos[1], targPos[2] )
-        cmds.connectAttr('%s.worldInverseMatrix[0]' % mesh, '%s.inMatrix' % pmm1)
-        targPos = cmds.getAttr('%s.output' % pmm1)[0]
-        print targPos
-    
-        closestPoint=''
-        
-        if cmds.nodeType(mesh) == 'mesh':
-            closestPoint = cmds.createNode('closestPointOnMesh')
-            cmds.setAttr( '%s.inPosition' % closestPoint, targPos[0], targPos[1], targPos[2] )
-            cmds.connectAttr( '%s.worldMesh[0]' % mesh, '%s.inMesh' % closestPoint )
-        else:
-            closestPoint = cmds.createNode('closestPointOnSurface')
-            cmds.setAttr( '%s.inPosition' % closestPoint, targPos[0], targPos[1], targPos[2] )
-            cmds.connectAttr( '%s.worldSpace[0]' % mesh, '%s.inputSurface' % closestPoint )
-        
-        paramU = cmds.getAttr( '%s.result.parameterU' % closestPoint )
-        paramV = cmds.getAttr( '%s.result.parameterV' % closestPoint )
-    
-    # Create follicle
-    foll = cmds.createNode('follicle')
-    follXform = cmds.listRelatives(foll, p=1)[0]
-    follXform = cmds.rename(follXform, (name+'_foll'))
-    follShape = cmds.listRelatives(follXform, c=1)[0]
-    
-    if cmds.nodeType(mesh) == 'mesh':
-        cmds.connectAttr( '%s.outMesh' % mesh, '%s.inputMesh' % follShape )
+        follicles = buildMany(targs=[targ], mesh=mesh, names=[name])
     else:
-        cmds.connectAttr( '%s.local' % mesh, '%s.inputSurface' % follShape)
-    cmds.connectAttr( '%s.worldMatrix[0]' % mesh, '%s.inputWorldMatrix' % follShape )
-    
-    cmds.connectAttr( '%s.outRotate' % follShape, '%s.r' % follXform )
-    cmds.connectAttr( '%s.outTranslate' % follShape, '%s.t' % follXform )
-    
-    cmds.setAttr( '%s.parameterU' % follShape, paramU )
-    cmds.setAttr( '%s.parameterV' % follShape, paramV )
-    
-    cmds.setAttr( '%s.inheritsTransform' % follXform, 0 )
-    
-    # Create group at exact location of targ - this is the node to constrain to
-    #constGrp = cmds.group(empty=1, name=(name+'_const_grp'))
-    #common.align(constGrp, follXform, translate=False )
-    #common.align(constGrp, targ, orient=False )
-    #cmds.parent(constGrp, follXform)
-    
-    if paramU == None or paramV == None:
-        cmds.delete( pmm1 )
-        cmds.delete( closestPoint )
-    
-    return follXform
+        follicles = buildMany(mesh=mesh, params=[(paramU, paramV)], names=[name])
+    if isinstance(follicles, basestring):
+        # an error message from buildMany
+        return follicles
+    return follicles[0]
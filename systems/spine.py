@@ -1,7 +1,11 @@
 import pymel.core as pmc
 from rooftops.systems import curve, controls
 import rooftops.core.common as common
+import rooftops.core.controlRegistry as controlRegistry
+from rooftops.utils import profiler
 
+@profiler.builder('spine')
+@controlRegistry.system('spine')
 def buildSpine(start, end, numJoints=10, name=''):
     # base groups
     main_grp = pmc.group(empty=1, name='%s_grp' % name)
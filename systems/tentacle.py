@@ -1,7 +1,7 @@
 import rooftops.systems.curve as rt_curve
 import rooftops.systems.controls as rt_controls
 import maya.cmds as cmds
-from rooftops.core import common
+from rooftops.core import common, controlRegistry
 
 class Tentacle(object):
     def __init__(self, name='', numCtrls=17):
@@ -10,6 +10,7 @@ class Tentacle(object):
         self.numCtrls = numCtrls
         self.build()
 
+    @controlRegistry.system('tentacle')
     def build(self):
         self.tangentCrv = rt_curve.TangentCurve(points=cmds.ls(sl=1), name=self.name)
         self.main_grp = cmds.group(empty=1, name='%s_grp' % self.name)
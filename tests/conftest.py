@@ -0,0 +1,23 @@
+# Tests run outside of Maya, on the headless stand-in - see rooftops.utils.headless - or on plain numpy.
+# The folder holding rooftops is put on sys.path, as E:\CODE_DEV is in Maya, so run them from anywhere:
+#     python -m pytest E:\CODE_DEV\rooftops\tests
+import os
+import sys
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if not root in sys.path:
+    sys.path.insert(0, root)
+
+# must happen before any rooftops module imports maya
+from rooftops.utils import headless
+_scene = headless.install()
+
+
+@pytest.fixture
+def scene():
+    '''
+    the headless scene, emptied for each test
+    '''
+    _scene.reset()
+    return _scene
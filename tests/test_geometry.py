@@ -0,0 +1,105 @@
+# geometry against the per point MVector maths common.py used before it - pointsAlongVector, getDistance and placePoleVector.
+# The old formulas are restated on plain tuples below, step for step, so they run without Maya.
+import math
+import numpy as np
+import pytest
+from rooftops.core import geometry
+
+
+def sub(a, b):
+    return tuple(x - y for x, y in zip(a, b))
+
+def add(a, b):
+    return tuple(x + y for x, y in zip(a, b))
+
+def scale(a, s):
+    return tuple(x * s for x in a)
+
+def length(a):
+    return math.sqrt(sum(x * x for x in a))
+
+def normal(a):
+    # MVector.normalize leaves a zero length vector as it is
+    l = length(a)
+    return scale(a, 1.0 / l) if l else a
+
+def angle(a, b):
+    # MVector.angle gives 0 when either vector has no length
+    l = length(a) * length(b)
+    if not l:
+        return 0.0
+    return math.acos(max(-1.0, min(1.0, sum(x * y for x, y in zip(a, b)) / l)))
+
+def oldPointsAlongVector(start, end, divisions=2):
+    newVec = sub(end, start)
+    segLength = length(newVec) / divisions
+    newVec = normal(newVec)
+    points = [tuple(start)]
+    for p in range(1, divisions):
+        points.append(add(scale(newVec, segLength * p), start))
+    points.append(tuple(end))
+    return points
+
+def oldGetDistance(p1, p2):
+    return length(sub(p1, p2))
+
+def oldPlacePoleVector(p1, p2, p3, p2Matrix, axis='-z', mult=30):
+    v4 = sub(p2, p1)
+    v5 = sub(p3, p1)
+    if angle(v4, v5) < 0.00001 or angle(v4, v5) > 3.1415:
+        row = {'x':0, '-x':0, 'y':1, '-y':1, 'z':2, '-z':2}[axis]
+        mult = mult * {'x':1, '-x':-1, 'y':1, '-y':-1, 'z':1, '-z':-1}[axis]
+        rowVec = tuple(p2Matrix[row * 4:row * 4 + 3])
+        return add(scale(rowVec, mult), p2)
+    midPoint = oldPointsAlongVector(p1, p3, 2)[1]
+    return add(scale(sub(p2, midPoint), mult), midPoint)
+
+def rotateZ(degrees, translate=(0, 0, 0)):
+    # a flat, row major world matrix as cmds.xform(q=1, ws=1, matrix=1) returns
+    c, s = math.cos(math.radians(degrees)), math.sin(math.radians(degrees))
+    return [c, s, 0, 0, -s, c, 0, 0, 0, 0, 1, 0] + list(translate) + [1]
+
+@pytest.fixture
+def chains():
+    '''
+    random bent chains, as (p1, p2, p3) arrays of shape (n, 3)
+    '''
+    return np.random.RandomState(3).uniform(-20, 20, (3, 50, 3))
+
+@pytest.mark.parametrize('divisions', [1, 2, 5])
+def test_points_along_vectors(chains, divisions):
+    starts, ends = chains[0], chains[2]
+    # a zero length vector repeats the start
+    starts[0] = ends[0]
+    result = geometry.pointsAlongVectors(starts, ends, divisions)
+    assert result.shape == (len(starts), divisions + 1, 3)
+    for i in range(len(starts)):
+        assert np.allclose(result[i], oldPointsAlongVector(starts[i], ends[i], divisions))
+
+def test_distances(chains):
+    a, b = chains[0], chains[1]
+    b[0] = a[0]
+    expected = [oldGetDistance(a[i], b[i]) for i in range(len(a))]
+    assert np.allclose(geometry.distances(a, b), expected)
+    assert geometry.distances(a[0], b[0])[0] == 0.0
+
+def test_pole_vectors(chains):
+    p1, p2, p3 = chains
+    expected = [oldPlacePoleVector(p1[i], p2[i], p3[i], None) for i in range(len(p1))]
+    assert np.allclose(geometry.poleVectors(p1, p2, p3), expected)
+
+@pytest.mark.parametrize('axis', ['x', '-x', 'y', '-y', 'z', '-z'])
+def test_in_line_pole_vectors(axis):
+    # straight, folded back on itself and zero length chains, next to a bent one
+    p1 = [(0, 0, 0), (0, 0, 0), (1, 1, 1), (0, 0, 0)]
+    p2 = [(2, 0, 0), (2, 2, 0), (1, 1, 1), (1, 1, 0)]
+    p3 = [(4, 0, 0), (-3, -3, 0), (5, 2, 1), (2, 0, 0)]
+    matrices = [rotateZ(30 * i, p2[i]) for i in range(4)]
+    assert list(geometry.inLine(p1, p2, p3)) == [True, True, True, False]
+    expected = [oldPlacePoleVector(p1[i], p2[i], p3[i], matrices[i], axis, 12) for i in range(4)]
+    result = geometry.poleVectors(p1, p2, p3, fallback=geometry.axisVectors(matrices, axis), mult=12)
+    assert np.allclose(result, expected)
+
+def test_in_line_pole_vector_needs_a_fallback():
+    with pytest.raises(ValueError):
+        geometry.poleVectors([(0, 0, 0)], [(1, 0, 0)], [(2, 0, 0)])
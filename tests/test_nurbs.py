@@ -0,0 +1,68 @@
+# NurbsCurve.closestParameters against brute force sampling of the curve.
+import numpy as np
+import pytest
+from rooftops.core import nurbs
+
+SAMPLES = 20001
+
+
+def openCurve():
+    # an s shaped degree 3 curve, as cmds.curve makes it
+    cvs = [(0, 0, 0), (2, 4, 0), (5, -3, 1), (8, 5, -2), (11, 0, 0), (14, 2, 3)]
+    return nurbs.NurbsCurve.fromMaya(cvs, [0, 0, 0, 1, 2, 3, 3, 3], 3)
+
+def closedCurve():
+    # a periodic degree 3 curve, as cmds.circle makes it - the first three cvs are repeated at the end
+    angles = np.linspace(0.0, 2.0 * np.pi, 8, endpoint=False)
+    cvs = [(np.cos(a) * (5 + (i % 2)), np.sin(a) * (5 + (i % 2)), 0.5 * (i % 3)) for i, a in enumerate(angles)]
+    cvs += cvs[:3]
+    return nurbs.NurbsCurve.fromMaya(cvs, list(range(-2, 11)), 3)
+
+def bruteForce(curve, points):
+    '''
+    returns the distance from each of points to the nearest of SAMPLES points spread evenly over the curve's domain
+    '''
+    start, end = curve.domain()
+    samples = curve.evaluate(np.linspace(start, end, SAMPLES))
+    return np.sqrt(((points[:, None, :] - samples[None, :, :]) ** 2).sum(axis=2)).min(axis=1)
+
+def distances(curve, points, params):
+    return np.linalg.norm(curve.evaluate(params) - points, axis=1)
+
+@pytest.mark.parametrize('make', [openCurve, closedCurve])
+def test_matches_brute_force(make):
+    curve = make()
+    points = np.random.RandomState(7).uniform(-8, 16, (400, 3))
+    params = curve.closestParameters(points)
+    start, end = curve.domain()
+    assert params.shape == (400,)
+    assert ((params >= start) & (params <= end)).all()
+    # never further than the best sample, and the sampling is dense enough to be within a hair of the true closest point
+    assert (distances(curve, points, params) <= bruteForce(curve, points) + 1e-9).all()
+
+def test_points_beyond_the_ends_project_to_the_endpoints():
+    curve = openCurve()
+    start, end = curve.domain()
+    first, last = curve.evaluate([start, end])
+    # pushed out along the end tangents, the closest points are the ends themselves
+    tangents = curve.evaluateDerivatives([start, end])[1]
+    points = np.array([first - tangents[0] * 0.5, last + tangents[1] * 0.5])
+    params = curve.closestParameters(points)
+    assert params == pytest.approx([start, end])
+
+def test_points_on_the_curve_find_themselves():
+    for curve in [openCurve(), closedCurve()]:
+        start, end = curve.domain()
+        params = np.linspace(start, end, 37)
+        found = curve.closestParameters(curve.evaluate(params))
+        assert distances(curve, curve.evaluate(params), found) == pytest.approx(np.zeros(37), abs=1e-7)
+
+def test_closed_curve_seam():
+    # points just off the seam of a closed curve may be given either end of the domain, but the position must be the seam
+    curve = closedCurve()
+    start, end = curve.domain()
+    seam, tangent = [d[0] for d in curve.evaluateDerivatives([start])[:2]]
+    sides = np.cross(tangent, [(0, 0, 1), (1, 0, 0)])
+    points = seam + 1e-3 * sides / np.linalg.norm(sides, axis=1)[:, None]
+    params = curve.closestParameters(points)
+    assert np.allclose(curve.evaluate(params), seam, atol=1e-5)
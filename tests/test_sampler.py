@@ -0,0 +1,63 @@
+# sampler against scrubbing the timeline and querying each frame, on the headless stand-in.
+import numpy as np
+import pytest
+import maya.cmds as cmds
+from rooftops.core import sampler
+
+FRAMES = [1, 4, 7.5, 10, 13]
+
+
+@pytest.fixture
+def keyed(scene):
+    '''
+    a keyed parent with a child offset from it, so the child's world matrix depends on the keys
+    '''
+    parent = cmds.createNode('transform', name='parent')
+    child = cmds.createNode('transform', name='child', parent=parent)
+    cmds.xform(child, t=(0, 3, 1), ro=(0, 0, 20))
+    for frame, t, r in [(1, (0, 0, 0), (0, 0, 0)), (7, (4, 2, -1), (30, 45, 0)), (13, (-2, 5, 3), (90, -10, 60))]:
+        cmds.xform(parent, t=t, ro=r)
+        cmds.setKeyframe(parent, time=frame)
+    return [parent, child]
+
+def scrub(nodes, frames):
+    rows = []
+    for frame in frames:
+        cmds.currentTime(frame)
+        rows.append([cmds.xform(node, q=1, ws=1, matrix=1) for node in nodes])
+    return np.array(rows)
+
+def test_world_matrices_layout(keyed):
+    matrices = sampler.sampleWorldMatrices(keyed, FRAMES)
+    assert matrices.shape == (len(FRAMES), 2, 16)
+    assert matrices.dtype == np.float64
+    assert matrices.flags.c_contiguous
+
+def test_world_matrices_match_scrubbing(keyed):
+    matrices = sampler.sampleWorldMatrices(keyed, FRAMES)
+    assert cmds.currentTime(q=1) == 1
+    assert np.allclose(matrices, scrub(keyed, FRAMES))
+    # the keys really do move the nodes, so the comparison isn't of one repeated pose
+    assert not np.allclose(matrices[0], matrices[-1])
+
+def test_values_match_scrubbing(keyed):
+    plugs = ['parent.translateX', 'parent.rotateY', 'child.translateY']
+    values = sampler.sampleValues(plugs, FRAMES)
+    assert values.shape == (len(FRAMES), len(plugs))
+    expected = []
+    for frame in FRAMES:
+        cmds.currentTime(frame)
+        expected.append([cmds.getAttr(plug) for plug in plugs])
+    assert np.allclose(values, expected)
+
+def test_fills_out(keyed):
+    out = np.zeros((len(FRAMES), 2, 16))
+    assert sampler.sampleWorldMatrices(keyed, FRAMES, out=out) is out
+    assert np.allclose(out, scrub(keyed, FRAMES))
+
+@pytest.mark.parametrize('out', [np.zeros((len(FRAMES), 3, 16)),
+                                 np.zeros((len(FRAMES), 2, 16), dtype=np.float32),
+                                 np.zeros((len(FRAMES), 16, 2)).transpose(0, 2, 1)])
+def test_rejects_bad_out(keyed, out):
+    with pytest.raises(ValueError):
+        sampler.sampleWorldMatrices(keyed, FRAMES, out=out)
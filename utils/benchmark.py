@@ -0,0 +1,278 @@
+# Build benchmarks for the rig systems.
+# Runs each builder against the headless scene from rooftops.utils.headless and reports wall time and per-command call counts.
+#
+# Usage:
+#     python -m rooftops.utils.benchmark
+#     python -m rooftops.utils.benchmark --suite arm --suite leg --repeat 5 --json results.json
+#     python -m rooftops.utils.benchmark --suite arm --profile arm_profile    # writes arm_profile.json and arm_profile.folded
+import time, json, argparse
+from rooftops.utils import headless, profiler
+
+scene = headless.install()
+
+import maya.cmds as cmds
+
+######################################################################################################################################################
+# Source skeletons - positions are roughly those of the short film characters in cm
+
+ARM_POSITIONS = [(20, 150, 0), (45, 150, -3), (70, 150, 0), (80, 150, 0)]
+LEG_POSITIONS = [(10, 95, 0), (10, 52, 3), (10, 8, 0), (10, 0, 12)]
+SPINE_POSITIONS = [(0, 100, 0), (0, 140, 0)]
+FINGERS = {
+           'thumb':[(72, 148, 4), (75, 146, 7), (78, 144, 9), (80, 143, 10)],
+           'index':[(80, 150, 3), (85, 150, 3), (88, 150, 3), (90, 150, 3)],
+           'middle':[(80, 150, 0), (86, 150, 0), (86, 150, 0), (90, 150, 0), (92, 150, 0)],
+           'ring':[(80, 150, -3), (85, 150, -3), (88, 150, -3), (90, 150, -3)],
+           }
+CURVE_POSITIONS = [(0, 0, 0), (10, 5, 0), (20, 0, 0), (30, -5, 0), (40, 0, 0), (50, 5, 0)]
+LID_POSITIONS = [(3.2 * i - 16, 2.5 - 0.01 * (3.2 * i - 16) ** 2, 10 - 0.005 * (3.2 * i - 16) ** 2) for i in range(11)]
+
+def makeChain(positions, names):
+    '''
+    creates a hierarchy of joints at positions and returns their names
+    '''
+    cmds.select(clear=1)
+    joints = []
+    for pos, name in zip(positions, names):
+        joints.append(cmds.joint(name=name, position=pos))
+    return joints
+
+def mirror(positions):
+    return [(-p[0], p[1], p[2]) for p in positions]
+
+def makeLocators(positions, name):
+    locs = []
+    for i, pos in enumerate(positions):
+        loc = cmds.spaceLocator(name='%s_%s_loc' % (name, i))[0]
+        cmds.xform(loc, ws=1, t=pos)
+        locs.append(loc)
+    return locs
+
+######################################################################################################################################################
+# Suites - each takes no arguments and builds into the current (empty) scene.
+# A suite may give a setup function as a third item, run into the empty scene before the suite is timed
+
+def buildArm():
+    from rooftops.systems import arm
+    for side, positions in (('lf', ARM_POSITIONS), ('rt', mirror(ARM_POSITIONS))):
+        joints = makeChain(positions, ['%s_%s_defJnt' % (side, n) for n in ['upArm', 'lowArm', 'wrist', 'hand']])
+        arm.build(*joints, side=side, cleanup=1)
+
+def buildLeg():
+    from rooftops.systems import leg
+    for side, positions in (('lf', LEG_POSITIONS), ('rt', mirror(LEG_POSITIONS))):
+        joints = makeChain(positions, ['%s_%s_defJnt' % (side, n) for n in ['upLeg', 'lowLeg', 'ankle', 'foot']])
+        leg.build(*joints, side=side, cleanup=1)
+
+def buildSpine():
+    from rooftops.systems import spine
+    start, end = makeLocators(SPINE_POSITIONS, 'spine')
+    spine.buildSpine(start, end, numJoints=10, name='spine')
+
+def buildHand():
+    from rooftops.systems import hand
+    root = makeChain([ARM_POSITIONS[2]], ['lf_wrist_defJnt'])[0]
+    fingerDict = {}
+    for finger, positions in FINGERS.items():
+        joints = makeChain(positions, ['lf_%s%s_defJnt' % (finger, i + 1) for i in range(len(positions))])
+        fingerDict[finger] = joints[0]
+    hand.build(root, fingerDict, side='lf', cleanUp=1)
+
+def buildTangentCurve():
+    from rooftops.systems import curve
+    locs = makeLocators(CURVE_POSITIONS, 'tangent')
+    curve.TangentCurve(points=locs, name='tangent')
+
+def buildEyelid():
+    import pymel.core as pmc
+    from rooftops.systems import eyelid
+    crv = cmds.curve(point=[(x, y, z) for x, y, z in LID_POSITIONS], degree=3, name='lf_lid_top_lo_crv')
+    eyelid.build(pmc.PyNode(crv).getShape(), name='lf_lidTop')
+
+def buildRivets(count=50):
+    from rooftops.systems import rivet
+    plane = cmds.nurbsPlane(patchesU=8, patchesV=2, width=40, lengthRatio=0.25, axis=(0, 1, 0), name='rivet_nurbsPlane')[0]
+    positions = [(40.0 * i / (count - 1) - 20, 1.0 + (i % 3), 2.0 * (i % 5) - 4) for i in range(count)]
+    locs = makeLocators(positions, 'rivet')
+    rivet.buildMany(targs=locs, mesh=plane, names=['rivet_%s' % i for i in range(count)])
+
+def geometryKernel(count=10000):
+    '''
+    placement maths for count chains at once - no scene access
+    '''
+    import numpy as np
+    from rooftops.core import geometry
+    points = np.random.RandomState(0).uniform(-50, 150, (3, count, 3))
+    geometry.pointsAlongVectors(points[0], points[2], divisions=4)
+    geometry.poleVectors(points[0], points[1], points[2], fallback=(0, 0, -1))
+    geometry.distances(points[0], points[1])
+    geometry.coincident(points[1], points[2])
+
+def makePickerScene(rigs=12, controls=80, namespaces=4):
+    '''
+    rigs top level groups of nested *_ctrl curves, every fifth one constrained, with the first namespaces rigs namespaced
+    '''
+    for r in range(rigs):
+        root = cmds.group(empty=1, name=('rig%s:root' % r) if r < namespaces else 'rig%s' % r)
+        parent = root
+        for c in range(controls):
+            ctrl = cmds.circle(name='rig%s_%s_ctrl' % (r, c), ch=0)[0]
+            cmds.parent(ctrl, parent if c % 4 else root)
+            parent = ctrl
+            if c % 5 == 0:
+                loc = cmds.spaceLocator(name='rig%s_%s_loc' % (r, c))[0]
+                cmds.parentConstraint(loc, ctrl, mo=1)
+
+def pickerIndex():
+    '''
+    picker discovery and "SELECT RIG" for every rig against a fresh scene index
+    '''
+    from rooftops.core import sceneIndex
+    index = sceneIndex.SceneIndex()
+    pickers = ['PAULO', 'crank', 'CAMERA'] + ['rig%s' % r for r in range(16)]
+    [p for p in pickers if index.hasNamespace(p) or index.hasRoot(p)]
+    for root in sorted(index.controls):
+        index.refresh(root)
+        index.getControls(root)
+
+def makeMirrorScene():
+    '''
+    both arms, with the lf controls posed
+    '''
+    buildArm()
+    for i, ctrl in enumerate(sorted(cmds.ls('lf_*_ctrl', type='transform'))):
+        for attr in ['rotateX', 'rotateY', 'rotateZ']:
+            if cmds.getAttr('%s.%s' % (ctrl, attr), settable=1):
+                cmds.setAttr('%s.%s' % (ctrl, attr), (i * 7 % 40) - 20)
+
+def mirrorPose():
+    '''
+    measuring the mirror table, a flip of every arm control and mirroring lf to rt over 24 frames
+    '''
+    from rooftops.core import mirror
+    mirror.clearCache()
+    ctrls = sorted(cmds.ls('lf_*_ctrl', type='transform'))
+    pairs = [(c, mirror.mirrorName(c)) for c in ctrls if cmds.objExists(mirror.mirrorName(c))]
+    mirror.mirror(mirror.flipPairs(pairs))
+    mirror.mirror(pairs, frames=range(1, 25))
+
+def makeSnapScene(chains=4, length=5):
+    '''
+    chains of fk controls under zero groups, each control with a locator to snap to
+    '''
+    for c in range(chains):
+        parent = None
+        for i in range(length):
+            ctrl = cmds.createNode('transform', name='chain%s_%s_fk_ctrl' % (c, i))
+            zero = cmds.group(empty=1, name='chain%s_%s_fk_zero' % (c, i))
+            cmds.parent(ctrl, zero)
+            if parent:
+                cmds.parent(zero, parent)
+                cmds.setAttr('%s.translate' % zero, 3, 0, 0)
+            cmds.setAttr('%s.rotate' % zero, i * 5, 0, c * 10)
+            target = cmds.spaceLocator(name='chain%s_%s_ik_loc' % (c, i))[0]
+            cmds.setAttr('%s.translate' % target, c, i * 3, -i)
+            cmds.setAttr('%s.rotate' % target, 0, i * 15, c * 5)
+            parent = ctrl
+
+def snapBake():
+    '''
+    snapping every fk chain to its targets over 100 frames
+    '''
+    from rooftops.core import bake
+    ctrls = sorted(cmds.ls('*_fk_ctrl', type='transform'))
+    bake.snap([(c, c.replace('_fk_ctrl', '_ik_loc')) for c in ctrls], frames=range(1, 101))
+
+def sampleRig():
+    '''
+    world matrices and channels of every fk control over 100 frames
+    '''
+    from rooftops.core import sampler, mirror
+    ctrls = sorted(cmds.ls('*_fk_ctrl', type='transform'))
+    sampler.sampleWorldMatrices(ctrls, range(1, 101))
+    sampler.sampleValues(['%s.%s' % (c, attr) for c in ctrls for attr in mirror.TRS_ATTRS], range(1, 101))
+
+SUITES = [
+          ('arm', buildArm),
+          ('leg', buildLeg),
+          ('spine', buildSpine),
+          ('hand', buildHand),
+          ('tangentCurve', buildTangentCurve),
+          ('eyelid', buildEyelid),
+          ('rivet', buildRivets),
+          ('geometry', geometryKernel),
+          ('pickerIndex', pickerIndex, makePickerScene),
+          ('mirror', mirrorPose, makeMirrorScene),
+          ('snapBake', snapBake, makeSnapScene),
+          ('sample', sampleRig, makeSnapScene),
+          ]
+
+######################################################################################################################################################
+
+def run(suites=None, repeat=3):
+    '''
+    runs each suite repeat times in a fresh scene.
+    returns a dict of results keyed by suite name
+    '''
+    results = {}
+    for suite in SUITES:
+        name, fn = suite[:2]
+        if suites and name not in suites:
+            continue
+        times = []
+        for i in range(repeat):
+            scene.reset()
+            if len(suite) > 2:
+                suite[2]()
+                scene.calls = {}
+            start = time.time()
+            fn()
+            times.append(time.time() - start)
+        results[name] = {
+                         'best':min(times),
+                         'mean':sum(times) / len(times),
+                         'nodes':len(scene.nodes),
+                         'connections':len(scene.inputs),
+                         'totalCalls':scene.totalCalls(),
+                         'calls':dict(scene.calls),
+                         }
+    return results
+
+def report(results, top=8):
+    lines = []
+    for suite in SUITES:
+        name = suite[0]
+        if name not in results:
+            continue
+        r = results[name]
+        lines.append('%-14s best %8.2fms  mean %8.2fms  nodes %5d  connections %5d  calls %6d' %
+                     (name, r['best'] * 1000, r['mean'] * 1000, r['nodes'], r['connections'], r['totalCalls']))
+        calls = sorted(r['calls'].items(), key=lambda item: -item[1])[:top]
+        lines.append('    ' + '  '.join('%s:%d' % c for c in calls))
+    return '\n'.join(lines)
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark rig builds against a headless scene')
+    parser.add_argument('--suite', action='append', choices=[s[0] for s in SUITES], help='suite to run - may be repeated. Defaults to all')
+    parser.add_argument('--repeat', type=int, default=3, help='number of builds per suite')
+    parser.add_argument('--json', help='write results to this file as json')
+    parser.add_argument('--profile', help='profile the builds and write the report to PROFILE.json and PROFILE.folded')
+    args = parser.parse_args(args)
+
+    if args.profile:
+        profiler.reset()
+        profiler.enable()
+    results = run(args.suite, max(1, args.repeat))
+    print(report(results))
+    if args.profile:
+        profiler.disable()
+        profiler.writeJson(args.profile + '.json')
+        profiler.writeStacks(args.profile + '.folded')
+        print(profiler.summary())
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+    return results
+
+if __name__ == '__main__':
+    main()
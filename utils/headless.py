@@ -0,0 +1,1904 @@
+# Headless, in-memory stand-in for the parts of maya.cmds / maya.OpenMaya / pymel.core that rooftops calls.
+# Lets builders run outside of a Maya session so that build times can be measured and regressed on plain CI boxes.
+#
+# Usage:
+#     from rooftops.utils import headless
+#     scene = headless.install()          # must happen before any rooftops module imports maya
+#     from rooftops.systems import arm
+#     ...
+#     print scene.calls
+#
+# The scene models nodes, attributes, connections, DAG parenting and transform matrices.
+# It does not evaluate the dependency graph - getAttr returns the stored value of a plug, not the value flowing into it.
+# Keys set with setKeyframe are the exception - a keyed plug is interpolated linearly between its keys at the current time,
+# or at the time passed to getAttr. As in Maya, a value set on a keyed plug holds until the current time changes.
+import sys, types, math, re, copy, itertools, bisect
+
+# Transform channels and their short names
+ALIASES = {
+           't':'translate', 'tx':'translateX', 'ty':'translateY', 'tz':'translateZ',
+           'r':'rotate', 'rx':'rotateX', 'ry':'rotateY', 'rz':'rotateZ',
+           's':'scale', 'sx':'scaleX', 'sy':'scaleY', 'sz':'scaleZ',
+           'v':'visibility', 'jo':'jointOrient', 'jox':'jointOrientX', 'joy':'jointOrientY', 'joz':'jointOrientZ',
+           'ro':'rotateOrder', 'wm':'worldMatrix', 'wim':'worldInverseMatrix', 'm':'matrix', 'pm':'parentMatrix',
+           'it':'inheritsTransform', 'rpt':'rotatePivotTranslate',
+           }
+
+XYZ = ('X', 'Y', 'Z')
+RGB = ('R', 'G', 'B')
+
+# Compound attributes which exist on every node of the given types
+COMPOUNDS = {
+             'translate':XYZ, 'rotate':XYZ, 'scale':XYZ, 'jointOrient':XYZ, 'rotatePivotTranslate':XYZ,
+             }
+TYPE_COMPOUNDS = {
+                  'multiplyDivide':{'input1':XYZ, 'input2':XYZ, 'output':XYZ},
+                  'blendColors':{'color1':RGB, 'color2':RGB, 'output':RGB},
+                  'condition':{'colorIfTrue':RGB, 'colorIfFalse':RGB, 'outColor':RGB},
+                  'reverse':{'input':XYZ, 'output':XYZ},
+                  'vectorProduct':{'input1':XYZ, 'input2':XYZ, 'output':XYZ},
+                  'pointMatrixMult':{'inPoint':XYZ, 'output':XYZ},
+                  'closestPointOnMesh':{'inPosition':XYZ, 'position':XYZ},
+                  'closestPointOnSurface':{'inPosition':XYZ, 'position':XYZ},
+                  'nearestPointOnCurve':{'inPosition':XYZ, 'position':XYZ},
+                  'motionPath':{'allCoordinates':('xCoordinate', 'yCoordinate', 'zCoordinate'), 'worldUpVector':XYZ},
+                  'plusMinusAverage':{'output3D':('output3Dx', 'output3Dy', 'output3Dz')},
+                  }
+
+TRANSFORM_TYPES = set(['transform', 'joint', 'ikHandle', 'ikEffector', 'parentConstraint', 'pointConstraint',
+                       'orientConstraint', 'aimConstraint', 'poleVectorConstraint', 'bendHandle'])
+SHAPE_TYPES = set(['nurbsCurve', 'nurbsSurface', 'mesh', 'locator', 'follicle', 'distanceDimShape'])
+
+# Used by ls / listRelatives / listConnections type filters
+INHERITED_TYPES = {
+                   'constraint':set(['parentConstraint', 'pointConstraint', 'orientConstraint', 'aimConstraint', 'poleVectorConstraint']),
+                   'animCurve':set(['animCurveTL', 'animCurveTA', 'animCurveTU']),
+                   'transform':TRANSFORM_TYPES,
+                   'shape':SHAPE_TYPES,
+                   'dagNode':TRANSFORM_TYPES | SHAPE_TYPES,
+                   'geometryShape':set(['nurbsCurve', 'nurbsSurface', 'mesh']),
+                   }
+
+KEYABLE_TRANSFORM_ATTRS = ['visibility', 'translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ',
+                           'scaleX', 'scaleY', 'scaleZ']
+
+_BRACKET = re.compile(r'\[\s*([^\]]*?)\s*\]')
+
+######################################################################################################################################################
+# Matrix helpers - flat lists of 16 floats, row major, row vectors (the Maya convention)
+
+def identity():
+    return [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+
+def multMatrix(a, b):
+    '''
+    returns a * b
+    '''
+    return [sum(a[r*4+k] * b[k*4+c] for k in range(4)) for r in range(4) for c in range(4)]
+
+def inverseMatrix(m):
+    '''
+    Gauss-Jordan inverse of a 4x4 matrix
+    '''
+    a = [list(m[r*4:r*4+4]) + [1.0 if r == c else 0.0 for c in range(4)] for r in range(4)]
+    for col in range(4):
+        pivot = max(range(col, 4), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) < 1e-12:
+            raise RuntimeError('Matrix is singular')
+        a[col], a[pivot] = a[pivot], a[col]
+        p = a[col][col]
+        a[col] = [v / p for v in a[col]]
+        for r in range(4):
+            if r != col and a[r][col] != 0.0:
+                f = a[r][col]
+                a[r] = [a[r][i] - f * a[col][i] for i in range(8)]
+    return [a[r][4+c] for r in range(4) for c in range(4)]
+
+def eulerToMatrix(rotation):
+    '''
+    rotation in degrees, xyz rotate order
+    '''
+    a, b, c = [math.radians(v) for v in rotation]
+    ca, sa, cb, sb, cc, sc = math.cos(a), math.sin(a), math.cos(b), math.sin(b), math.cos(c), math.sin(c)
+    return [cb*cc, cb*sc, -sb, 0.0,
+            sa*sb*cc - ca*sc, sa*sb*sc + ca*cc, sa*cb, 0.0,
+            ca*sb*cc + sa*sc, ca*sb*sc - sa*cc, ca*cb, 0.0,
+            0.0, 0.0, 0.0, 1.0]
+
+def matrixToEuler(m):
+    '''
+    returns xyz euler angles in degrees from the rotation part of an orthonormal matrix
+    '''
+    sb = max(-1.0, min(1.0, -m[2]))
+    b = math.asin(sb)
+    if math.cos(b) > 1e-6:
+        a = math.atan2(m[6], m[10])
+        c = math.atan2(m[1], m[0])
+    else:
+        a = math.atan2(-m[9], m[5])
+        c = 0.0
+    return [math.degrees(a), math.degrees(b), math.degrees(c)]
+
+def composeMatrix(translate=(0, 0, 0), rotate=(0, 0, 0), scale=(1, 1, 1), jointOrient=None):
+    m = eulerToMatrix(rotate)
+    if jointOrient:
+        m = multMatrix(m, eulerToMatrix(jointOrient))
+    for r in range(3):
+        for c in range(3):
+            m[r*4+c] *= scale[r]
+    m[12], m[13], m[14] = translate
+    return m
+
+def decomposeMatrix(m, jointOrient=None):
+    '''
+    returns translate, rotate, scale
+    if jointOrient is supplied, rotate is returned relative to it
+    '''
+    rows = [m[0:3], m[4:7], m[8:11]]
+    scale = [math.sqrt(sum(v*v for v in row)) or 1.0 for row in rows]
+    rows = [[v / scale[i] for v in rows[i]] for i in range(3)]
+    det = (rows[0][0] * (rows[1][1]*rows[2][2] - rows[1][2]*rows[2][1]) -
+           rows[0][1] * (rows[1][0]*rows[2][2] - rows[1][2]*rows[2][0]) +
+           rows[0][2] * (rows[1][0]*rows[2][1] - rows[1][1]*rows[2][0]))
+    if det < 0:
+        scale[0] *= -1
+        rows[0] = [-v for v in rows[0]]
+    rot = rows[0] + [0.0] + rows[1] + [0.0] + rows[2] + [0.0] + [0.0, 0.0, 0.0, 1.0]
+    if jointOrient:
+        jo = eulerToMatrix(jointOrient)
+        joT = [jo[c*4+r] for r in range(4) for c in range(4)]
+        rot = multMatrix(rot, joT)
+    return list(m[12:15]), matrixToEuler(rot), scale
+
+def transformPoint(point, m):
+    x, y, z = point
+    return [x*m[0] + y*m[4] + z*m[8] + m[12], x*m[1] + y*m[5] + z*m[9] + m[13], x*m[2] + y*m[6] + z*m[10] + m[14]]
+
+
+######################################################################################################################################################
+
+_uuids = itertools.count(1)
+UUID = re.compile('^[0-9A-F]{8}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{12}$')
+
+
+class Node(object):
+    '''
+    A single node in the fake scene
+    '''
+    def __init__(self, name, nodeType):
+        self.name = name
+        self.type = nodeType
+        self.parent = None
+        self.children = []
+        self.values = {}
+        self.userAttrs = {}
+        self.locked = set()
+        self.cvs = None
+        self.knots = None
+        self.degree = 1
+        self.form = 0
+        # {attr:([times], [values])} sorted by time
+        self.keys = {}
+        # kept through renames, as Maya's node UUIDs are
+        self.uuid = '%08X-0000-0000-0000-%012X' % (id(self) & 0xFFFFFFFF, next(_uuids))
+
+    def isTransform(self):
+        return self.type in TRANSFORM_TYPES
+
+    def isDag(self):
+        return self.type in TRANSFORM_TYPES or self.type in SHAPE_TYPES
+
+    def compounds(self):
+        result = dict(COMPOUNDS)
+        result.update(TYPE_COMPOUNDS.get(self.type, {}))
+        for attr, data in self.userAttrs.items():
+            if data['children']:
+                result[attr] = tuple(c[len(attr):] for c in data['children'])
+        return result
+
+    def __repr__(self):
+        return 'Node(%r, %r)' % (self.name, self.type)
+
+
+class Scene(object):
+    '''
+    Holds every node, connection and the selection, plus a per-command call count
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.nodes = {}
+        self.inputs = {}
+        self.outputs = {}
+        self.selection = []
+        self.calls = {}
+        self.currentTime = 1.0
+        # keyed plugs set since the current time last changed, and the time getAttr(time=) is evaluating at
+        self.held = set()
+        self.contextTime = None
+        _sendMessage(MSceneMessage.kAfterNew)
+
+    def count(self, command):
+        self.calls[command] = self.calls.get(command, 0) + 1
+
+    def totalCalls(self):
+        return sum(self.calls.values())
+
+    # Names #######################################################################################
+    def uniqueName(self, name):
+        if not name:
+            name = 'node1'
+        if name not in self.nodes:
+            return name
+        match = re.match(r'^(.*?)(\d*)$', name)
+        base, digits = match.group(1), match.group(2)
+        index = int(digits) + 1 if digits else 1
+        while '%s%s' % (base, index) in self.nodes:
+            index += 1
+        return '%s%s' % (base, index)
+
+    def node(self, name, quiet=False):
+        if isinstance(name, Node):
+            return name
+        name = str(name)
+        if '|' in name:
+            name = name.rstrip('|').split('|')[-1]
+        if '.' in name:
+            name = name.split('.')[0]
+        n = self.nodes.get(name)
+        if n is None and not quiet:
+            raise ValueError('No object matches name: %s' % name)
+        return n
+
+    def createNode(self, nodeType, name=None, parent=None):
+        if not name:
+            name = '%s1' % nodeType
+        n = Node(self.uniqueName(name), nodeType)
+        self.nodes[n.name] = n
+        if nodeType == 'joint':
+            n.values['radius'] = 1.0
+        if parent is not None:
+            self.setParent(n, parent)
+        return n
+
+    def rename(self, node, newName):
+        node = self.node(node)
+        del self.nodes[node.name]
+        node.name = self.uniqueName(newName)
+        self.nodes[node.name] = node
+        return node.name
+
+    def longName(self, node):
+        path = []
+        while node is not None:
+            path.insert(0, node.name)
+            node = node.parent
+        return '|' + '|'.join(path)
+
+    def isType(self, node, nodeType):
+        if node.type == nodeType:
+            return True
+        return node.type in INHERITED_TYPES.get(nodeType, ())
+
+    # Plugs #######################################################################################
+    def normalizeAttr(self, attr):
+        attr = _BRACKET.sub(lambda m: '[%s]' % m.group(1), attr)
+        parts = []
+        for part in attr.split('.'):
+            index = ''
+            if '[' in part:
+                index = part[part.index('['):]
+                part = part[:part.index('[')]
+            parts.append(ALIASES.get(part, part) + index)
+        return '.'.join(parts)
+
+    def plug(self, plug):
+        '''
+        resolves 'node.attr' into (Node, attr)
+        '''
+        plug = str(plug)
+        if '.' not in plug:
+            raise ValueError('Invalid plug: %s' % plug)
+        nodeName, attr = plug.split('.', 1)
+        node = self.node(nodeName)
+        attr = self.normalizeAttr(attr)
+        # result.parameterU and friends - the leaf is what we store. Indexed paths such as target[0].targetWeight are kept whole
+        if '.' in attr and '[' not in attr:
+            attr = attr.split('.')[-1]
+        return node, attr
+
+    def attrExists(self, node, attr):
+        attr = self.normalizeAttr(attr)
+        base = attr.split('[')[0]
+        if base in node.userAttrs or base in node.values:
+            return True
+        if node.isTransform():
+            if base in KEYABLE_TRANSFORM_ATTRS or base in COMPOUNDS or base in ('inheritsTransform', 'worldMatrix',
+                                                                                 'matrix', 'parentMatrix', 'message',
+                                                                                 'rotatePivotTranslate', 'rotateOrder'):
+                return True
+        if base in ('message', 'isHistoricallyInteresting', 'caching', 'nodeState'):
+            return True
+        compounds = node.compounds()
+        for children in compounds.values():
+            if base in children:
+                return True
+        return False
+
+    def defaultValue(self, node, attr):
+        if attr in ('scaleX', 'scaleY', 'scaleZ', 'visibility', 'inheritsTransform'):
+            return 1.0 if attr != 'visibility' else True
+        if attr in node.userAttrs:
+            return node.userAttrs[attr]['default']
+        return 0.0
+
+    def getValue(self, node, attr):
+        if attr in node.keys and (self.contextTime is not None or (node, attr) not in self.held):
+            return self.keyValue(node, attr, self.currentTime if self.contextTime is None else self.contextTime)
+        if attr in node.values:
+            return node.values[attr]
+        compounds = node.compounds()
+        if attr in compounds:
+            return [tuple(self.getValue(node, attr + c if len(c) == 1 else c) for c in compounds[attr])]
+        return self.defaultValue(node, attr)
+
+    def setValue(self, node, attr, values):
+        compounds = node.compounds()
+        if attr in compounds:
+            if len(values) == 1 and isinstance(values[0], (list, tuple)):
+                values = values[0]
+            for c, v in zip(compounds[attr], values):
+                self.setValue(node, attr + c if len(c) == 1 else c, [v])
+            return
+        if attr in node.locked:
+            raise RuntimeError("The attribute '%s.%s' is locked or connected and cannot be modified." % (node.name, attr))
+        node.values[attr] = values[0] if len(values) == 1 else tuple(values)
+        if attr in node.keys:
+            self.held.add((node, attr))
+
+    # Keys ########################################################################################
+    def setKey(self, node, attr, time, value):
+        times, values = node.keys.setdefault(attr, ([], []))
+        time = float(time)
+        i = bisect.bisect_left(times, time)
+        if i < len(times) and times[i] == time:
+            values[i] = float(value)
+        else:
+            times.insert(i, time)
+            values.insert(i, float(value))
+        if time == self.currentTime:
+            self.held.discard((node, attr))
+
+    def keyValue(self, node, attr, time):
+        times, values = node.keys[attr]
+        i = bisect.bisect_left(times, time)
+        if i == 0:
+            return values[0]
+        if i == len(times):
+            return values[-1]
+        t0, t1 = times[i - 1], times[i]
+        return values[i - 1] + (values[i] - values[i - 1]) * (time - t0) / (t1 - t0)
+
+    # Connections #################################################################################
+    def connect(self, src, dst, force=False):
+        srcNode, srcAttr = self.plug(src)
+        dstNode, dstAttr = self.plug(dst)
+        key = (dstNode, dstAttr)
+        if key in self.inputs:
+            if self.inputs[key] == (srcNode, srcAttr):
+                raise RuntimeError('%s is already connected to %s.' % (src, dst))
+            if not force:
+                raise RuntimeError("The destination attribute '%s' already has an incoming connection." % dst)
+            self.disconnect(key)
+        self.inputs[key] = (srcNode, srcAttr)
+        self.outputs.setdefault((srcNode, srcAttr), []).append(key)
+
+    def disconnect(self, key):
+        src = self.inputs.pop(key, None)
+        if src is not None:
+            outs = self.outputs.get(src, [])
+            if key in outs:
+                outs.remove(key)
+            if not outs:
+                self.outputs.pop(src, None)
+
+    def connections(self, node, attr=None, source=True, destination=True):
+        '''
+        returns a list of ((node, attr), (otherNode, otherAttr)) for connections on node / node.attr
+        '''
+        def match(a):
+            return attr is None or a == attr or a.startswith(attr + '[') or a.startswith(attr + '.')
+
+        result = []
+        if source:
+            inputs = [((n, a), src) for (n, a), src in self.inputs.items() if n is node and match(a)]
+            result.extend(sorted(inputs, key=lambda item: _plugSortKey(item[0][1])))
+        if destination:
+            for (n, a), dsts in self.outputs.items():
+                if n is node and match(a):
+                    for dst in dsts:
+                        result.append(((n, a), dst))
+        return result
+
+    # DAG #########################################################################################
+    def setParent(self, node, parent):
+        if node.parent is not None:
+            node.parent.children.remove(node)
+        node.parent = parent
+        if parent is not None:
+            parent.children.append(node)
+
+    def descendants(self, node):
+        result = []
+        for c in node.children:
+            result.append(c)
+            result.extend(self.descendants(c))
+        return result
+
+    def shapes(self, node):
+        return [c for c in node.children if c.type in SHAPE_TYPES]
+
+    def localMatrix(self, node):
+        if not node.isTransform():
+            return identity()
+        get = lambda attr: [self.getValue(node, attr + c) for c in XYZ]
+        jo = get('jointOrient') if node.type == 'joint' else None
+        return composeMatrix(get('translate'), get('rotate'), get('scale'), jo)
+
+    def worldMatrix(self, node):
+        m = self.localMatrix(node)
+        if node.parent is not None and self.getValue(node, 'inheritsTransform'):
+            m = multMatrix(m, self.worldMatrix(node.parent))
+        return m
+
+    def parentMatrix(self, node):
+        if node.parent is None or not self.getValue(node, 'inheritsTransform'):
+            return identity()
+        return self.worldMatrix(node.parent)
+
+    def setLocalMatrix(self, node, m):
+        jo = [self.getValue(node, 'jointOrient' + c) for c in XYZ] if node.type == 'joint' else None
+        t, r, s = decomposeMatrix(m, jo)
+        for attr, values in (('translate', t), ('rotate', r), ('scale', s)):
+            for c, v in zip(XYZ, values):
+                if attr + c not in node.locked:
+                    node.values[attr + c] = v
+
+    def setWorldMatrix(self, node, m):
+        self.setLocalMatrix(node, multMatrix(m, inverseMatrix(self.parentMatrix(node))))
+
+    def worldPosition(self, node):
+        return self.worldMatrix(node)[12:15]
+
+    def setWorldPosition(self, node, pos):
+        local = transformPoint(pos, inverseMatrix(self.parentMatrix(node)))
+        for c, v in zip(XYZ, local):
+            node.values['translate' + c] = v
+
+    def delete(self, node):
+        for c in list(node.children):
+            self.delete(c)
+        for key in [k for k in self.inputs if k[0] is node]:
+            self.disconnect(key)
+        for src in [k for k in self.outputs if k[0] is node]:
+            for dst in list(self.outputs.get(src, [])):
+                self.disconnect(dst)
+        self.setParent(node, None)
+        self.nodes.pop(node.name, None)
+        self.selection = [s for s in self.selection if self.node(s, quiet=True) is not None]
+
+
+def _plugSortKey(attr):
+    match = re.search(r'\[(\d+)\]', attr)
+    return (attr.split('[')[0], int(match.group(1)) if match else -1)
+
+
+def _flag(kwargs, long, short=None, default=None):
+    if long in kwargs:
+        return kwargs[long]
+    if short and short in kwargs:
+        return kwargs[short]
+    return default
+
+
+def _flatten(args):
+    result = []
+    for a in args:
+        if isinstance(a, (list, tuple)):
+            result.extend(_flatten(a))
+        elif a is not None:
+            result.append(a)
+    return result
+
+
+######################################################################################################################################################
+
+class FakeCmds(object):
+    '''
+    Implementation of the maya.cmds commands used by rooftops.
+    Methods take and return plain strings exactly as maya.cmds does.
+    '''
+    def __init__(self, scene):
+        self.scene = scene
+
+    # Creation ####################################################################################
+    def createNode(self, nodeType, name=None, n=None, parent=None, p=None, skipSelect=False, ss=False):
+        scene = self.scene
+        name = name or n
+        parent = parent or p
+        if nodeType in SHAPE_TYPES:
+            if parent:
+                xform = scene.node(parent)
+            else:
+                xform = scene.createNode('transform', {'distanceDimShape':'distanceDimension1'}.get(nodeType, nodeType + '1'))
+            shape = scene.createNode(nodeType, name or '%sShape1' % nodeType, parent=xform)
+            return shape.name
+        node = scene.createNode(nodeType, name, parent=scene.node(parent) if parent else None)
+        if nodeType in TRANSFORM_TYPES:
+            scene.selection = [node.name]
+        return node.name
+
+    def group(self, *args, **kwargs):
+        scene = self.scene
+        name = _flag(kwargs, 'name', 'n', 'group1')
+        node = scene.createNode('transform', name)
+        members = _flatten(args)
+        if not _flag(kwargs, 'empty', 'em') and members:
+            first = scene.node(members[0])
+            scene.setParent(node, first.parent)
+            for m in members:
+                self._parent(scene.node(m), node, relative=False)
+        scene.selection = [node.name]
+        return node.name
+
+    def spaceLocator(self, name=None, n=None, position=None, p=None):
+        scene = self.scene
+        xform = scene.createNode('transform', name or n or 'locator1')
+        scene.createNode('locator', '%sShape' % xform.name, parent=xform)
+        if position or p:
+            scene.setWorldPosition(xform, position or p)
+        scene.selection = [xform.name]
+        return [xform.name]
+
+    def joint(self, *args, **kwargs):
+        scene = self.scene
+        if _flag(kwargs, 'query', 'q') or _flag(kwargs, 'edit', 'e'):
+            return None
+        name = _flag(kwargs, 'name', 'n', 'joint1')
+        parent = None
+        for s in scene.selection:
+            n = scene.node(s, quiet=True)
+            if n is not None and n.isTransform():
+                parent = n
+                break
+        j = scene.createNode('joint', name, parent=parent)
+        pos = _flag(kwargs, 'position', 'p')
+        if pos:
+            scene.setWorldPosition(j, pos)
+        scene.selection = [j.name]
+        return j.name
+
+    def _curveNode(self, name, shapeName, points, knots, degree, form=0):
+        scene = self.scene
+        xform = scene.createNode('transform', name)
+        shape = scene.createNode('nurbsCurve', shapeName or '%sShape' % xform.name, parent=xform)
+        shape.cvs = [list(p) for p in points]
+        shape.knots = list(knots)
+        shape.degree = degree
+        shape.form = form
+        scene.selection = [xform.name]
+        return xform
+
+    def curve(self, *args, **kwargs):
+        points = _flag(kwargs, 'point', 'p')
+        degree = _flag(kwargs, 'degree', 'd', 3)
+        knots = _flag(kwargs, 'knot', 'k')
+        if not knots:
+            spans = len(points) - degree
+            knots = [0] * (degree - 1) + list(range(spans + 1)) + [spans] * (degree - 1)
+        xform = self._curveNode(_flag(kwargs, 'name', 'n', 'curve1'), None, points, knots, degree)
+        return xform.name
+
+    def circle(self, *args, **kwargs):
+        radius = _flag(kwargs, 'radius', 'r', 1.0)
+        sections = _flag(kwargs, 'sections', 's', 8)
+        points = []
+        for i in range(sections + 3):
+            a = 2.0 * math.pi * (i % sections) / sections
+            points.append((math.cos(a) * radius, math.sin(a) * radius, 0.0))
+        knots = list(range(-2, sections + 3))
+        xform = self._curveNode(_flag(kwargs, 'name', 'n', 'nurbsCircle1'), None, points, knots, 3, form=2)
+        if _flag(kwargs, 'constructionHistory', 'ch', True):
+            return [xform.name, self.scene.createNode('makeNurbCircle').name]
+        return [xform.name]
+
+    def nurbsPlane(self, *args, **kwargs):
+        scene = self.scene
+        spansU = _flag(kwargs, 'patchesU', 'u', 1)
+        spansV = _flag(kwargs, 'patchesV', 'v', 1)
+        width = _flag(kwargs, 'width', 'w', 1.0)
+        ratio = _flag(kwargs, 'lengthRatio', 'lr', 1.0)
+        xform = scene.createNode('transform', _flag(kwargs, 'name', 'n', 'nurbsPlane1'))
+        shape = scene.createNode('nurbsSurface', '%sShape' % xform.name, parent=xform)
+        # cv grid in the xz plane - u along x, v along z
+        numU, numV = spansU + 3, spansV + 3
+        shape.cvs = [[(width * (float(u) / (numU - 1) - 0.5), 0.0, width * ratio * (float(v) / (numV - 1) - 0.5))
+                      for v in range(numV)] for u in range(numU)]
+        shape.degree = 3
+        # (u, v) knot lists as Maya stores them - both directions run 0 - 1
+        shape.knots = [[0.0, 0.0] + [float(i) / spans for i in range(spans + 1)] + [1.0, 1.0] for spans in (spansU, spansV)]
+        scene.selection = [xform.name]
+        if _flag(kwargs, 'constructionHistory', 'ch', True):
+            return [xform.name, scene.createNode('makeNurbPlane').name]
+        return [xform.name]
+
+    def nonLinear(self, *args, **kwargs):
+        scene = self.scene
+        deformerType = _flag(kwargs, 'type', None, 'bend')
+        deformer = scene.createNode(deformerType, '%s1' % deformerType)
+        handle = scene.createNode('transform', '%s1Handle' % deformerType)
+        scene.createNode('%sHandle' % deformerType, '%s1HandleShape' % deformerType, parent=handle)
+        for geo in _flatten(args):
+            scene.connect('%s.outputGeometry[0]' % deformer.name, '%s.create' % geo, force=True)
+        scene.connect('%s.worldMatrix[0]' % handle.name, '%s.matrix' % deformer.name)
+        return [deformer.name, handle.name]
+
+    def ikHandle(self, *args, **kwargs):
+        scene = self.scene
+        start = scene.node(_flag(kwargs, 'startJoint', 'sj'))
+        end = scene.node(_flag(kwargs, 'endEffector', 'ee'))
+        handle = scene.createNode('ikHandle', _flag(kwargs, 'name', 'n', 'ikHandle1'))
+        scene.setWorldPosition(handle, scene.worldPosition(end))
+        effector = scene.createNode('ikEffector', 'effector1', parent=end.parent)
+        handle.values['solver'] = _flag(kwargs, 'solver', 'sol', 'ikRPsolver')
+        scene.connect('%s.message' % start.name, '%s.startJoint' % handle.name)
+        scene.connect('%s.handlePath[0]' % effector.name, '%s.endEffector' % handle.name)
+        scene.connect('%s.translateX' % end.name, '%s.translateX' % effector.name)
+        scene.selection = [handle.name]
+        return [handle.name, effector.name]
+
+    def _constraint(self, constraintType, channels, args, kwargs):
+        scene = self.scene
+        objects = _flatten(args)
+        if _flag(kwargs, 'query', 'q'):
+            driven = scene.node(objects[-1])
+            const = self._findConstraint(driven, constraintType)
+            if const is None:
+                return None
+            if _flag(kwargs, 'weightAliasList', 'wal'):
+                return sorted([a for a in const.userAttrs if re.match(r'.*W\d+$', a)], key=lambda a: int(a.split('W')[-1]))
+            if _flag(kwargs, 'targetList', 'tl'):
+                return [src.name for (n, a), (src, sa) in scene.connections(const, 'target', destination=False)]
+            return None
+
+        targets = [scene.node(o) for o in objects[:-1]]
+        driven = scene.node(objects[-1])
+        weight = _flag(kwargs, 'weight', 'w', 1.0)
+
+        const = self._findConstraint(driven, constraintType)
+        if _flag(kwargs, 'edit', 'e'):
+            if const is not None:
+                for t in targets:
+                    for a in const.userAttrs:
+                        if a.startswith(t.name + 'W'):
+                            const.values[a] = weight
+            return [const.name] if const else None
+
+        name = _flag(kwargs, 'name', 'n') or '%s_%s1' % (driven.name, constraintType)
+        const = scene.createNode(constraintType, name, parent=driven)
+        for i, t in enumerate(targets):
+            alias = '%sW%s' % (t.name, i)
+            const.userAttrs[alias] = {'type':'double', 'category':None, 'keyable':True, 'multi':False,
+                                      'children':[], 'parent':None, 'default':1.0}
+            const.values[alias] = weight
+            scene.connect('%s.worldMatrix[0]' % t.name, '%s.target[%s].targetParentMatrix' % (const.name, i))
+            scene.connect('%s.%s' % (const.name, alias), '%s.target[%s].targetWeight' % (const.name, i))
+        for channel in channels:
+            dst = '%s.%s' % (driven.name, channel)
+            if scene.plug(dst) not in scene.inputs:
+                scene.connect('%s.constraint%s' % (const.name, channel[0].upper() + channel[1:]), dst)
+
+        # Constraints evaluate on creation - move the driven node so that following queries see the result
+        if targets and not _flag(kwargs, 'maintainOffset', 'mo'):
+            if 'translateX' in channels:
+                positions = [scene.worldPosition(t) for t in targets]
+                avg = [sum(p[i] for p in positions) / len(positions) for i in range(3)]
+                scene.setWorldPosition(driven, avg)
+            if 'rotateX' in channels and constraintType != 'aimConstraint':
+                m = scene.worldMatrix(targets[0])
+                current = scene.worldMatrix(driven)
+                m[12:15] = current[12:15]
+                scene.setWorldMatrix(driven, m)
+        return [const.name]
+
+    def _findConstraint(self, driven, constraintType):
+        for c in driven.children:
+            if c.type == constraintType:
+                return c
+        return None
+
+    def parentConstraint(self, *args, **kwargs):
+        return self._constraint('parentConstraint', ['translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ'], args, kwargs)
+
+    def pointConstraint(self, *args, **kwargs):
+        return self._constraint('pointConstraint', ['translateX', 'translateY', 'translateZ'], args, kwargs)
+
+    def orientConstraint(self, *args, **kwargs):
+        return self._constraint('orientConstraint', ['rotateX', 'rotateY', 'rotateZ'], args, kwargs)
+
+    def aimConstraint(self, *args, **kwargs):
+        return self._constraint('aimConstraint', ['rotateX', 'rotateY', 'rotateZ'], args, kwargs)
+
+    def poleVectorConstraint(self, *args, **kwargs):
+        return self._constraint('poleVectorConstraint', ['poleVectorX', 'poleVectorY', 'poleVectorZ'], args, kwargs)
+
+    def pathAnimation(self, *args, **kwargs):
+        scene = self.scene
+        objects = _flatten(args)
+        if _flag(kwargs, 'edit', 'e'):
+            mp = scene.node(objects[0])
+            upObject = _flag(kwargs, 'worldUpObject', 'wuo')
+            if upObject:
+                scene.connect('%s.worldMatrix[0]' % upObject, '%s.worldUpMatrix' % mp.name, force=True)
+            upType = _flag(kwargs, 'worldUpType', 'wut')
+            if upType:
+                mp.values['worldUpType'] = upType
+            return mp.name
+        node = scene.node(objects[0])
+        crv = scene.node(_flag(kwargs, 'curve', 'c'))
+        crvShape = scene.shapes(crv)[0] if crv.isTransform() else crv
+        mp = scene.createNode('motionPath', _flag(kwargs, 'name', 'n', 'motionPath1'))
+        mp.values['fractionMode'] = bool(_flag(kwargs, 'fractionMode', 'fm', False))
+        scene.connect('%s.worldSpace[0]' % crvShape.name, '%s.geometryPath' % mp.name)
+        anim = scene.createNode('animCurveTL', '%s_uValue' % mp.name)
+        scene.connect('%s.output' % anim.name, '%s.uValue' % mp.name)
+        for axis in 'xyz':
+            adl = scene.createNode('addDoubleLinear', 'addDoubleLinear1')
+            scene.connect('%s.%sCoordinate' % (mp.name, axis), '%s.input1' % adl.name)
+            scene.connect('%s.output' % adl.name, '%s.translate%s' % (node.name, axis.upper()), force=True)
+        if _flag(kwargs, 'follow', 'f'):
+            scene.connect('%s.rotate' % mp.name, '%s.rotate' % node.name, force=True)
+        return mp.name
+
+    def skinCluster(self, *args, **kwargs):
+        scene = self.scene
+        objects = _flatten(args)
+        skin = scene.createNode('skinCluster', _flag(kwargs, 'name', 'n', 'skinCluster1'))
+        for i, j in enumerate(objects[:-1]):
+            scene.connect('%s.worldMatrix[0]' % j, '%s.matrix[%s]' % (skin.name, i))
+        return [skin.name]
+
+    def duplicate(self, *args, **kwargs):
+        scene = self.scene
+        source = scene.node(_flatten(args)[0])
+        name = _flag(kwargs, 'name', 'n')
+        result = []
+
+        def _copy(node, parent, newName):
+            dupe = scene.createNode(node.type, newName or node.name, parent=parent)
+            dupe.values = copy.deepcopy(node.values)
+            dupe.userAttrs = copy.deepcopy(node.userAttrs)
+            dupe.locked = set(node.locked)
+            dupe.cvs = copy.deepcopy(node.cvs)
+            dupe.knots, dupe.degree, dupe.form = copy.copy(node.knots), node.degree, node.form
+            result.append(dupe.name)
+            for c in node.children:
+                if c.type in INHERITED_TYPES['constraint'] or c.type == 'ikEffector':
+                    continue
+                _copy(c, dupe, None)
+            return dupe
+
+        _copy(source, source.parent, name)
+        scene.selection = [result[0]]
+        return result
+
+    # Editing #####################################################################################
+    def rename(self, *args, **kwargs):
+        objects = _flatten(args)
+        if len(objects) == 1:
+            node, newName = self.scene.selection[0], objects[0]
+        else:
+            node, newName = objects[0], objects[-1]
+        return self.scene.rename(node, newName)
+
+    def _parent(self, node, parent, relative):
+        scene = self.scene
+        world = scene.worldMatrix(node) if node.isTransform() else None
+        scene.setParent(node, parent)
+        if world is not None and not relative:
+            scene.setWorldMatrix(node, world)
+
+    def parent(self, *args, **kwargs):
+        scene = self.scene
+        objects = _flatten(args)
+        relative = _flag(kwargs, 'relative', 'r', False)
+        if _flag(kwargs, 'world', 'w'):
+            children, parent = objects, None
+        else:
+            children, parent = objects[:-1], scene.node(objects[-1])
+            if not children:
+                children = list(scene.selection)
+        result = []
+        for c in children:
+            node = scene.node(c)
+            if _flag(kwargs, 'shape', 's'):
+                scene.setParent(node, parent)
+            else:
+                self._parent(node, parent, relative)
+            result.append(node.name)
+        return result
+
+    def delete(self, *args, **kwargs):
+        scene = self.scene
+        for o in _flatten(args):
+            node = scene.node(o, quiet=True)
+            if node is not None:
+                scene.delete(node)
+
+    def select(self, *args, **kwargs):
+        scene = self.scene
+        objects = [str(o) for o in _flatten(args)]
+        if _flag(kwargs, 'clear', 'cl'):
+            scene.selection = []
+            return
+        for o in objects:
+            scene.node(o)
+        if _flag(kwargs, 'add', None):
+            scene.selection.extend(objects)
+        elif _flag(kwargs, 'deselect', 'd'):
+            scene.selection = [s for s in scene.selection if s not in objects]
+        else:
+            scene.selection = objects
+
+    # Components ##################################################################################
+    def _components(self, spec):
+        '''
+        returns (shape, [indices]) for 'node.cv[...]'
+        '''
+        scene = self.scene
+        node, attr = scene.plug(spec)
+        if node.cvs is None:
+            node = scene.shapes(node)[0]
+        index = attr[attr.index('[') + 1:-1]
+        if index in ('*', ':', ''):
+            indices = list(range(len(node.cvs)))
+        elif ':' in index:
+            start, end = index.split(':')
+            indices = list(range(int(start or 0), int(end) + 1 if end else len(node.cvs)))
+        else:
+            indices = [int(index)]
+        return node, indices
+
+    def _transformComponents(self, targets, fn):
+        for t in targets:
+            if '.cv[' not in str(t):
+                continue
+            shape, indices = self._components(t)
+            for i in indices:
+                shape.cvs[i] = fn(shape.cvs[i])
+
+    def move(self, *args, **kwargs):
+        values = [a for a in args if isinstance(a, (int, float))]
+        targets = [a for a in _flatten(args) if not isinstance(a, (int, float))] or list(self.scene.selection)
+        if len(values) == 1:
+            offset = [0.0, 0.0, 0.0]
+            axis = 0 if _flag(kwargs, 'moveX', 'x') else 2 if _flag(kwargs, 'moveZ', 'z') else 1
+            offset[axis] = values[0]
+        else:
+            offset = (values + [0.0, 0.0, 0.0])[:3]
+        self._transformComponents(targets, lambda p: [p[i] + offset[i] for i in range(3)])
+        for t in targets:
+            if '.cv[' not in str(t):
+                node = self.scene.node(t)
+                pos = self.scene.worldPosition(node)
+                self.scene.setWorldPosition(node, [pos[i] + offset[i] for i in range(3)])
+
+    def rotate(self, *args, **kwargs):
+        values = [a for a in args if isinstance(a, (int, float))]
+        targets = [a for a in _flatten(args) if not isinstance(a, (int, float))] or list(self.scene.selection)
+        if len(values) == 1:
+            rotation = [0.0, 0.0, 0.0]
+            axis = 0 if _flag(kwargs, 'rotateX', 'x') else 1 if _flag(kwargs, 'rotateY', 'y') else 2
+            rotation[axis] = values[0]
+        else:
+            rotation = (values + [0.0, 0.0, 0.0])[:3]
+        m = eulerToMatrix(rotation)
+        self._transformComponents(targets, lambda p: transformPoint(p, m))
+
+    def pointPosition(self, component, world=True, w=True):
+        shape, indices = self._components(component)
+        p = shape.cvs[indices[0]]
+        return transformPoint(p, self.scene.worldMatrix(shape.parent))
+
+    # Attributes ##################################################################################
+    def addAttr(self, *args, **kwargs):
+        scene = self.scene
+        objects = _flatten(args) or list(scene.selection)
+        name = _flag(kwargs, 'longName', 'ln')
+        for o in objects:
+            node = scene.node(o)
+            if scene.attrExists(node, name) and name not in COMPOUNDS:
+                raise RuntimeError("Found a conflict with attribute name '%s' on %s" % (name, node.name))
+            data = {
+                    'type':_flag(kwargs, 'attributeType', 'at') or _flag(kwargs, 'dataType', 'dt'),
+                    'category':_flag(kwargs, 'category', 'ct'),
+                    'keyable':bool(_flag(kwargs, 'keyable', 'k', False)),
+                    'multi':bool(_flag(kwargs, 'multi', 'm', False)),
+                    'enumName':_flag(kwargs, 'enumName', 'en'),
+                    'children':[],
+                    'parent':_flag(kwargs, 'parent', 'p'),
+                    'default':_flag(kwargs, 'defaultValue', 'dv', 0.0),
+                    'min':_flag(kwargs, 'minValue', 'min'),
+                    'max':_flag(kwargs, 'maxValue', 'max'),
+                    }
+            node.userAttrs[name] = data
+            if data['parent']:
+                node.userAttrs[data['parent']]['children'].append(name)
+
+    def deleteAttr(self, *args, **kwargs):
+        scene = self.scene
+        for o in _flatten(args):
+            node, attr = scene.plug(o)
+            for key in [k for k in scene.inputs if k[0] is node and k[1].split('[')[0] == attr]:
+                scene.disconnect(key)
+            node.userAttrs.pop(attr, None)
+            node.values.pop(attr, None)
+
+    def attributeQuery(self, attr, node=None, n=None, exists=False, ex=False, **kwargs):
+        scene = self.scene
+        n = scene.node(node or n)
+        if exists or ex:
+            return scene.attrExists(n, attr)
+        data = n.userAttrs.get(scene.normalizeAttr(attr), {})
+        if _flag(kwargs, 'listEnum', 'le'):
+            return [data.get('enumName')] if data.get('enumName') else None
+        if _flag(kwargs, 'multi', 'm'):
+            return data.get('multi', False)
+        if _flag(kwargs, 'keyable', 'k'):
+            return data.get('keyable', attr in KEYABLE_TRANSFORM_ATTRS)
+        if _flag(kwargs, 'listChildren', 'lc'):
+            return data.get('children') or None
+        return None
+
+    def listAttr(self, *args, **kwargs):
+        scene = self.scene
+        objects = _flatten(args) or list(scene.selection)
+        category = _flag(kwargs, 'category', 'ct')
+        keyable = _flag(kwargs, 'keyable', 'k')
+        unlocked = _flag(kwargs, 'unlocked', 'u')
+        userDefined = _flag(kwargs, 'userDefined', 'ud')
+        result = []
+        for o in objects:
+            node = scene.node(o)
+            attrs = []
+            if not category and not userDefined and node.isTransform():
+                attrs.extend(KEYABLE_TRANSFORM_ATTRS)
+            for name, data in node.userAttrs.items():
+                if category:
+                    cats = data['category'] if isinstance(data['category'], (list, tuple)) else [data['category']]
+                    if category not in cats:
+                        continue
+                if keyable and not data['keyable']:
+                    continue
+                attrs.append(name)
+            if unlocked:
+                attrs = [a for a in attrs if a not in node.locked]
+            result.extend(attrs)
+        return result or None
+
+    def setAttr(self, plug, *values, **kwargs):
+        scene = self.scene
+        node, attr = scene.plug(plug)
+        lock = _flag(kwargs, 'lock', 'l')
+        if lock is not None:
+            children = node.compounds().get(attr)
+            for a in [attr + c if len(c) == 1 else c for c in children] if children else [attr]:
+                if lock:
+                    node.locked.add(a)
+                else:
+                    node.locked.discard(a)
+        for flag in ('keyable', 'channelBox'):
+            v = _flag(kwargs, flag, None)
+            if v is not None:
+                node.values.setdefault('__%s__' % flag, {})[attr] = v
+        if values:
+            if attr.startswith('cv['):
+                shape, indices = self._components(plug)
+                shape.cvs[indices[0]] = list(values)
+                return
+            if (node, attr) in scene.inputs:
+                raise RuntimeError("setAttr: The attribute '%s' is locked or connected and cannot be modified." % plug)
+            scene.setValue(node, attr, list(values))
+
+    def getAttr(self, plug, **kwargs):
+        time = _flag(kwargs, 'time', 't')
+        if time is not None:
+            previous, self.scene.contextTime = self.scene.contextTime, float(time)
+            try:
+                return self.getAttr(plug, **dict((k, v) for k, v in kwargs.items() if k not in ('time', 't')))
+            finally:
+                self.scene.contextTime = previous
+        scene = self.scene
+        node, attr = scene.plug(plug)
+        if _flag(kwargs, 'settable', 'se'):
+            return (node, attr) not in scene.inputs and attr not in node.locked
+        if attr.startswith('cv['):
+            shape, indices = self._components(plug)
+            return [tuple(shape.cvs[i]) for i in indices]
+        if node.cvs is None and attr in ('spans', 'degree', 'form') and scene.shapes(node):
+            node = scene.shapes(node)[0]
+        if node.cvs is not None:
+            if attr == 'spans':
+                return len(node.cvs) - node.degree
+            if attr == 'degree':
+                return node.degree
+            if attr == 'form':
+                return node.form
+        if attr in ('worldMatrix', 'worldMatrix[0]'):
+            return scene.worldMatrix(node)
+        if attr == 'matrix':
+            return scene.localMatrix(node)
+        if attr in ('worldInverseMatrix', 'worldInverseMatrix[0]'):
+            return inverseMatrix(scene.worldMatrix(node))
+        if attr in ('parentMatrix', 'parentMatrix[0]'):
+            return scene.parentMatrix(node)
+        if attr == 'time' and node.type == 'time':
+            return scene.currentTime
+        return scene.getValue(node, attr)
+
+    def connectAttr(self, src, dst, force=False, f=False, **kwargs):
+        self.scene.connect(src, dst, force=force or f)
+
+    def disconnectAttr(self, src, dst, **kwargs):
+        self.scene.disconnect(self.scene.plug(dst))
+
+    def listConnections(self, *args, **kwargs):
+        scene = self.scene
+        source = _flag(kwargs, 'source', 's', True)
+        destination = _flag(kwargs, 'destination', 'd', True)
+        nodeType = _flag(kwargs, 'type', 't')
+        plugs = _flag(kwargs, 'plugs', 'p', False)
+        connections = _flag(kwargs, 'connections', 'c', False)
+        result = []
+        for o in _flatten(args):
+            if '.' in str(o):
+                node, attr = scene.plug(o)
+            else:
+                node, attr = scene.node(o), None
+            for (n, a), (other, otherAttr) in scene.connections(node, attr, source, destination):
+                if nodeType and not scene.isType(other, nodeType):
+                    continue
+                if connections:
+                    result.append('%s.%s' % (n.name, a))
+                result.append('%s.%s' % (other.name, otherAttr) if plugs else other.name)
+        return result or None
+
+    # Queries #####################################################################################
+    def xform(self, *args, **kwargs):
+        scene = self.scene
+        objects = _flatten(args) or list(scene.selection)
+        node = scene.node(objects[0])
+        ws = _flag(kwargs, 'worldSpace', 'ws', False)
+        translation = _flag(kwargs, 'translation', 't')
+        rotation = _flag(kwargs, 'rotation', 'ro')
+        matrix = _flag(kwargs, 'matrix', 'm')
+        scale = _flag(kwargs, 'scale', 's')
+        if _flag(kwargs, 'query', 'q'):
+            if matrix:
+                return scene.worldMatrix(node) if ws else scene.localMatrix(node)
+            if translation:
+                if ws:
+                    return scene.worldPosition(node)
+                return [scene.getValue(node, 'translate' + c) for c in XYZ]
+            if rotation:
+                if ws:
+                    return decomposeMatrix(scene.worldMatrix(node))[1]
+                return [scene.getValue(node, 'rotate' + c) for c in XYZ]
+            return None
+        for o in objects:
+            node = scene.node(o)
+            if matrix:
+                if ws:
+                    scene.setWorldMatrix(node, list(matrix))
+                else:
+                    scene.setLocalMatrix(node, list(matrix))
+            if translation:
+                if ws:
+                    scene.setWorldPosition(node, translation)
+                else:
+                    scene.setValue(node, 'translate', list(translation))
+            if rotation:
+                if ws:
+                    world = scene.worldMatrix(node)
+                    rot = eulerToMatrix(rotation)
+                    rot[12:15] = world[12:15]
+                    scene.setWorldMatrix(node, rot)
+                else:
+                    scene.setValue(node, 'rotate', list(rotation))
+            if scale:
+                scene.setValue(node, 'scale', list(scale))
+
+    def ls(self, *args, **kwargs):
+        scene = self.scene
+        if _flag(kwargs, 'selection', 'sl'):
+            names = list(scene.selection)
+        elif _flag(kwargs, 'assemblies', None):
+            names = [n.name for n in scene.nodes.values() if n.isDag() and n.parent is None]
+        elif args and _flatten(args):
+            names = []
+            for a in _flatten(args):
+                a = str(a)
+                if '.' in a:
+                    # node.attr patterns list the nodes carrying attr - as plugs unless objectsOnly is set
+                    nodePattern, attr = a.split('.', 1)
+                    pattern = re.compile('^' + re.escape(nodePattern).replace('\\*', '.*') + '$')
+                    matches = [n for n in scene.nodes if pattern.match(n) and scene.attrExists(scene.nodes[n], attr)]
+                    if not _flag(kwargs, 'objectsOnly', 'o'):
+                        matches = ['%s.%s' % (n, attr) for n in matches]
+                    names.extend(matches)
+                elif '*' in a:
+                    pattern = re.compile('^' + re.escape(a).replace('\\*', '.*') + '$')
+                    names.extend(n for n in scene.nodes if pattern.match(n))
+                elif UUID.match(a):
+                    names.extend(n.name for n in scene.nodes.values() if n.uuid == a)
+                elif scene.node(a, quiet=True) is not None:
+                    names.append(a)
+        else:
+            names = list(scene.nodes)
+        nodeType = _flag(kwargs, 'type', 'typ')
+        if nodeType:
+            types = nodeType if isinstance(nodeType, (list, tuple)) else [nodeType]
+            names = [n for n in names if any(scene.isType(scene.node(n), t) for t in types)]
+        if _flag(kwargs, 'uuid', 'uid'):
+            return [scene.node(n).uuid for n in names]
+        if _flag(kwargs, 'long', 'l'):
+            names = [scene.longName(scene.node(n)) if scene.node(n).isDag() else n for n in names]
+        return names
+
+    def listRelatives(self, *args, **kwargs):
+        scene = self.scene
+        objects = _flatten(args) or list(scene.selection)
+        nodeType = _flag(kwargs, 'type', None)
+        fullPath = _flag(kwargs, 'fullPath', 'f', False)
+        result = []
+        for o in objects:
+            node = scene.node(o)
+            if _flag(kwargs, 'parent', 'p'):
+                related = [node.parent] if node.parent is not None else []
+            elif _flag(kwargs, 'allDescendents', 'ad'):
+                related = list(reversed(scene.descendants(node)))
+            else:
+                related = list(node.children)
+            if _flag(kwargs, 'shapes', 's'):
+                related = [r for r in related if r.type in SHAPE_TYPES]
+            if nodeType:
+                types = nodeType if isinstance(nodeType, (list, tuple)) else [nodeType]
+                related = [r for r in related if any(scene.isType(r, t) for t in types)]
+            result.extend(scene.longName(r) if fullPath else r.name for r in related)
+        return result or None
+
+    def nodeType(self, node, **kwargs):
+        return self.scene.node(node).type
+
+    def objExists(self, node):
+        try:
+            if '.' in str(node):
+                n, attr = self.scene.plug(node)
+                return self.scene.attrExists(n, attr)
+            return self.scene.node(node, quiet=True) is not None
+        except ValueError:
+            return False
+
+    def namespace(self, *args, **kwargs):
+        name = _flag(kwargs, 'exists', 'ex')
+        if name:
+            name = name.strip(':')
+            return any(n.startswith(name + ':') for n in self.scene.nodes)
+        return None
+
+    def namespaceInfo(self, *args, **kwargs):
+        if _flag(kwargs, 'listOnlyNamespaces', 'lon'):
+            namespaces = set()
+            for n in self.scene.nodes:
+                parts = n.split(':')[:-1]
+                for i in range(len(parts)):
+                    namespaces.add(':'.join(parts[:i + 1]))
+            return sorted(namespaces) or None
+        return None
+
+    def currentTime(self, *args, **kwargs):
+        if _flag(kwargs, 'query', 'q'):
+            return self.scene.currentTime
+        if args:
+            # setting the time re-evaluates anim curves even when it doesn't change, dropping values set over keys
+            self.scene.held.clear()
+            self.scene.currentTime = float(args[0])
+        return self.scene.currentTime
+
+    # UI and undo - nothing to do headless #######################################################
+    def confirmDialog(self, *args, **kwargs):
+        return ''
+
+    def undoInfo(self, *args, **kwargs):
+        return None
+
+    def refresh(self, *args, **kwargs):
+        return None
+
+    def window(self, *args, **kwargs):
+        return False
+
+    def setDrivenKeyframe(self, *args, **kwargs):
+        return None
+
+    def setKeyframe(self, *args, **kwargs):
+        scene = self.scene
+        time = _flag(kwargs, 'time', 't', scene.currentTime)
+        if isinstance(time, (list, tuple)):
+            time = time[0]
+        value = _flag(kwargs, 'value', 'v')
+        attrs = _flag(kwargs, 'attribute', 'at')
+        count = 0
+        for o in _flatten(args) or list(scene.selection):
+            if '.' in str(o):
+                plugs = [scene.plug(o)]
+            else:
+                node = scene.node(o)
+                names = attrs if isinstance(attrs, (list, tuple)) else [attrs] if attrs else KEYABLE_TRANSFORM_ATTRS
+                plugs = [scene.plug('%s.%s' % (node.name, a)) for a in names]
+            for node, attr in plugs:
+                scene.setKey(node, attr, time, scene.getValue(node, attr) if value is None else value)
+                count += 1
+        return count
+
+    def warning(self, *args, **kwargs):
+        return None
+
+
+######################################################################################################################################################
+# OpenMaya stand-ins
+
+class MVector(object):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        if isinstance(x, MVector):
+            x, y, z = x.x, x.y, x.z
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __add__(self, other):
+        return MVector(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        return MVector(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __neg__(self):
+        return MVector(-self.x, -self.y, -self.z)
+
+    def __mul__(self, other):
+        if isinstance(other, MVector):
+            return self.x * other.x + self.y * other.y + self.z * other.z
+        return MVector(self.x * other, self.y * other, self.z * other)
+
+    __rmul__ = __mul__
+
+    def __xor__(self, other):
+        return MVector(self.y * other.z - self.z * other.y, self.z * other.x - self.x * other.z, self.x * other.y - self.y * other.x)
+
+    def length(self):
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def normal(self):
+        l = self.length()
+        return MVector(self.x / l, self.y / l, self.z / l) if l else MVector()
+
+    def normalize(self):
+        n = self.normal()
+        self.x, self.y, self.z = n.x, n.y, n.z
+        return self
+
+    def angle(self, other):
+        l = self.length() * other.length()
+        if not l:
+            return 0.0
+        return math.acos(max(-1.0, min(1.0, (self * other) / l)))
+
+    def __repr__(self):
+        return 'MVector(%s, %s, %s)' % (self.x, self.y, self.z)
+
+
+class MMatrix(object):
+    def __init__(self):
+        self.values = identity()
+
+    def __call__(self, row, col):
+        return self.values[row * 4 + col]
+
+
+class MScriptUtil(object):
+    @staticmethod
+    def createMatrixFromList(values, matrix):
+        matrix.values = [float(v) for v in values]
+
+
+# Callbacks are recorded by id. Scene messages are sent by Scene.reset as kAfterNew - node and event callbacks never fire
+_callbacks = {}
+
+def _addCallback(message, fn, clientData=None):
+    callbackId = len(_callbacks) + 1
+    while callbackId in _callbacks:
+        callbackId += 1
+    _callbacks[callbackId] = (message, fn, clientData)
+    return callbackId
+
+def _sendMessage(message):
+    for callbackId, (m, fn, clientData) in list(_callbacks.items()):
+        if m == message:
+            fn(clientData)
+
+
+class MMessage(object):
+    @staticmethod
+    def removeCallback(callbackId):
+        _callbacks.pop(callbackId, None)
+
+
+class MSceneMessage(MMessage):
+    kAfterNew, kAfterImport, kAfterOpen, kAfterCreateReference, kAfterRemoveReference, kAfterLoadReference, \
+        kAfterUnloadReference = range(7)
+
+    @staticmethod
+    def addCallback(message, fn, clientData=None):
+        return _addCallback(message, fn, clientData)
+
+
+class MDGMessage(MMessage):
+    @staticmethod
+    def addNodeAddedCallback(fn, nodeType='dependNode', clientData=None):
+        return _addCallback(('nodeAdded', nodeType), fn, clientData)
+
+    @staticmethod
+    def addNodeRemovedCallback(fn, nodeType='dependNode', clientData=None):
+        return _addCallback(('nodeRemoved', nodeType), fn, clientData)
+
+
+class MNodeMessage(MMessage):
+    @staticmethod
+    def addNameChangedCallback(node, fn, clientData=None):
+        return _addCallback('nameChanged', fn, clientData)
+
+
+class MEventMessage(MMessage):
+    @staticmethod
+    def addEventCallback(event, fn, clientData=None):
+        return _addCallback(('event', event), fn, clientData)
+
+
+class MObject(object):
+    pass
+
+
+######################################################################################################################################################
+# pymel stand-ins
+
+class Vector(tuple):
+    '''
+    pymel.core.datatypes.Vector
+    '''
+    def __new__(cls, *values):
+        if len(values) == 1:
+            values = values[0]
+        return tuple.__new__(cls, [float(v) for v in values])
+
+    @property
+    def x(self):
+        return self[0]
+
+    @property
+    def y(self):
+        return self[1]
+
+    @property
+    def z(self):
+        return self[2]
+
+
+class Attribute(object):
+    '''
+    pymel.core.general.Attribute
+    '''
+    def __init__(self, pynode, attr):
+        self._node = pynode
+        self._attr = attr
+
+    def name(self):
+        return '%s.%s' % (self._node.name(), self._attr)
+
+    def __str__(self):
+        return self.name()
+
+    def __repr__(self):
+        return 'Attribute(%r)' % self.name()
+
+    def __eq__(self, other):
+        return str(self) == str(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.name())
+
+    def node(self):
+        return self._node
+
+    def attrName(self, longName=False):
+        return self._attr
+
+    def __getitem__(self, index):
+        return Attribute(self._node, '%s[%s]' % (self._attr, index))
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return Attribute(self._node, '%s.%s' % (self._attr, attr))
+
+    def get(self, **kwargs):
+        pm = self._node._pm
+        pm.scene.count('pmc.getAttr')
+        value = pm.cmds.getAttr(self.name())
+        if isinstance(value, list) and len(value) == 1 and isinstance(value[0], tuple):
+            return Vector(value[0])
+        return value
+
+    def set(self, *values, **kwargs):
+        pm = self._node._pm
+        pm.scene.count('pmc.setAttr')
+        if len(values) == 1 and isinstance(values[0], (list, tuple)):
+            values = tuple(values[0])
+        pm.cmds.setAttr(self.name(), *values, **kwargs)
+
+    def connect(self, other, force=False, f=False):
+        pm = self._node._pm
+        pm.scene.count('pmc.connectAttr')
+        pm.cmds.connectAttr(self.name(), str(other), force=force or f)
+
+    __rshift__ = connect
+
+    def disconnect(self, other=None):
+        pm = self._node._pm
+        pm.scene.count('pmc.disconnectAttr')
+        if other is not None:
+            pm.cmds.disconnectAttr(self.name(), str(other))
+        else:
+            pm.scene.disconnect(pm.scene.plug(self.name()))
+
+    def exists(self):
+        return self._node._pm.cmds.objExists(self.name())
+
+    def lock(self):
+        self._node._pm.cmds.setAttr(self.name(), lock=True)
+
+    def unlock(self):
+        self._node._pm.cmds.setAttr(self.name(), lock=False)
+
+    def inputs(self, **kwargs):
+        return self._node._pm.listConnections(self.name(), s=1, d=0, **kwargs)
+
+    def outputs(self, **kwargs):
+        return self._node._pm.listConnections(self.name(), s=0, d=1, **kwargs)
+
+
+class Component(object):
+    '''
+    A single curve cv - node.cv[i]
+    '''
+    def __init__(self, pynode, index):
+        self._node = pynode
+        self.index = index
+
+    def __str__(self):
+        return '%s.cv[%s]' % (self._node.name(), self.index)
+
+    __repr__ = __str__
+
+
+class ComponentList(object):
+    def __init__(self, pynode):
+        self._node = pynode
+
+    def _shape(self):
+        node = self._node._pm.scene.node(self._node.name())
+        return node if node.cvs is not None else self._node._pm.scene.shapes(node)[0]
+
+    def __getitem__(self, index):
+        shape = self._shape()
+        pynode = self._node._pm.PyNode(shape.name)
+        if isinstance(index, slice):
+            return [Component(pynode, i) for i in range(len(shape.cvs))[index]]
+        return Component(pynode, index)
+
+    def __len__(self):
+        return len(self._shape().cvs)
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+class PyNode(object):
+    '''
+    pymel.core.PyNode - wraps a scene node and, like pymel, proxies string methods onto its name
+    '''
+    _pm = None
+
+    def __init__(self, node):
+        if isinstance(node, PyNode):
+            node = node._n
+        elif not isinstance(node, Node):
+            node = self._pm.scene.node(node)
+        self._n = node
+
+    def name(self, long=False):
+        return self._n.name
+
+    nodeName = name
+
+    def longName(self):
+        return self._pm.scene.longName(self._n)
+
+    def __str__(self):
+        return self._n.name
+
+    def __unicode__(self):
+        return self._n.name
+
+    def __repr__(self):
+        return "nt.%s(%r)" % (self._n.type[0].upper() + self._n.type[1:], self._n.name)
+
+    def __eq__(self, other):
+        if isinstance(other, PyNode):
+            return self._n is other._n
+        return self._n.name == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return id(self._n)
+
+    # proxied string methods
+    def __add__(self, other):
+        return self._n.name + other
+
+    def __radd__(self, other):
+        return other + self._n.name
+
+    def __getitem__(self, index):
+        return self._n.name[index]
+
+    def __len__(self):
+        return len(self._n.name)
+
+    def replace(self, *args):
+        return self._n.name.replace(*args)
+
+    def endswith(self, *args):
+        return self._n.name.endswith(*args)
+
+    def startswith(self, *args):
+        return self._n.name.startswith(*args)
+
+    def split(self, *args):
+        return self._n.name.split(*args)
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        if attr == 'cv':
+            return ComponentList(self)
+        return Attribute(self, attr)
+
+    def attr(self, attr):
+        return Attribute(self, attr)
+
+    def hasAttr(self, attr):
+        return self._pm.scene.attrExists(self._n, attr)
+
+    def type(self):
+        return self._n.type
+
+    nodeType = type
+
+    def exists(self):
+        return self._n.name in self._pm.scene.nodes
+
+    def getParent(self):
+        return self._pm.PyNode(self._n.parent) if self._n.parent is not None else None
+
+    def setParent(self, parent, **kwargs):
+        self._pm.scene.count('pmc.parent')
+        if parent is None:
+            self._pm.cmds.parent(self._n.name, world=True)
+        else:
+            self._pm.cmds.parent(self._n.name, str(parent), **kwargs)
+
+    def getChildren(self, **kwargs):
+        return self._pm.listRelatives(self, c=1, **kwargs)
+
+    def getShape(self):
+        shapes = self._pm.scene.shapes(self._n)
+        return self._pm.PyNode(shapes[0]) if shapes else None
+
+    def getShapes(self):
+        return [self._pm.PyNode(s) for s in self._pm.scene.shapes(self._n)]
+
+    # nurbsCurve / nurbsSurface shape methods
+    def _geometryShape(self):
+        return self._n if self._n.cvs is not None else self._pm.scene.shapes(self._n)[0]
+
+    def getCVs(self, space='preTransform'):
+        self._pm.scene.count('pmc.getCVs')
+        shape = self._geometryShape()
+        cvs = shape.cvs if shape.type == 'nurbsCurve' else [p for row in shape.cvs for p in row]
+        if space == 'world':
+            m = self._pm.scene.worldMatrix(shape.parent)
+            return [Vector(transformPoint(p, m)) for p in cvs]
+        return [Vector(p) for p in cvs]
+
+    def getKnots(self):
+        return [float(k) for k in self._geometryShape().knots]
+
+    def degree(self):
+        return self._geometryShape().degree
+
+    def form(self):
+        return self._geometryShape().form
+
+    # nurbsSurface shape methods - the fake surfaces are degree 3 in both directions
+    def numCVsInU(self):
+        return len(self._geometryShape().cvs)
+
+    def numCVsInV(self):
+        return len(self._geometryShape().cvs[0])
+
+    def getKnotsInU(self):
+        return [float(k) for k in self._geometryShape().knots[0]]
+
+    def getKnotsInV(self):
+        return [float(k) for k in self._geometryShape().knots[1]]
+
+    def degreeU(self):
+        return self._geometryShape().degree
+
+    degreeV = degreeU
+
+    def rename(self, name):
+        self._pm.scene.count('pmc.rename')
+        self._pm.cmds.rename(self._n.name, name)
+        return self
+
+    def getMatrix(self, worldSpace=False, ws=False):
+        return self._pm.cmds.xform(self._n.name, q=1, m=1, ws=worldSpace or ws)
+
+    def getTranslation(self, space='object'):
+        return Vector(self._pm.cmds.xform(self._n.name, q=1, t=1, ws=(space == 'world')))
+
+
+class FakePymel(object):
+    '''
+    Implementation of the pymel.core functions used by rooftops, built on FakeCmds
+    '''
+    def __init__(self, scene, cmds):
+        self.scene = scene
+        self.cmds = cmds
+        self.PyNode = type('PyNode', (PyNode,), {'_pm':self})
+
+    def _wrap(self, result):
+        if result is None:
+            return []
+        if isinstance(result, (list, tuple)):
+            return [self.PyNode(r) for r in result]
+        return self.PyNode(result)
+
+    def _args(self, args):
+        return [str(a) for a in _flatten(args)]
+
+    def createNode(self, nodeType, **kwargs):
+        return self._wrap(self.cmds.createNode(nodeType, **kwargs))
+
+    def group(self, *args, **kwargs):
+        return self._wrap(self.cmds.group(*self._args(args), **kwargs))
+
+    def spaceLocator(self, **kwargs):
+        return self._wrap(self.cmds.spaceLocator(**kwargs)[0])
+
+    def joint(self, *args, **kwargs):
+        return self._wrap(self.cmds.joint(*self._args(args), **kwargs))
+
+    def circle(self, **kwargs):
+        return self._wrap(self.cmds.circle(**kwargs))
+
+    def curve(self, **kwargs):
+        return self._wrap(self.cmds.curve(**kwargs))
+
+    def ls(self, *args, **kwargs):
+        return self._wrap(self.cmds.ls(*self._args(args), **kwargs))
+
+    def selected(self, **kwargs):
+        return self._wrap(self.cmds.ls(sl=1, **kwargs))
+
+    def select(self, *args, **kwargs):
+        return self.cmds.select(*self._args(args), **kwargs)
+
+    def listRelatives(self, *args, **kwargs):
+        return self._wrap(self.cmds.listRelatives(*self._args(args), **kwargs))
+
+    def listConnections(self, *args, **kwargs):
+        return self._wrap(self.cmds.listConnections(*self._args(args), **kwargs))
+
+    def parent(self, *args, **kwargs):
+        return self._wrap(self.cmds.parent(*self._args(args), **kwargs))
+
+    def rename(self, node, name, **kwargs):
+        return self._wrap(self.cmds.rename(str(node), name))
+
+    def delete(self, *args, **kwargs):
+        return self.cmds.delete(*self._args(args), **kwargs)
+
+    def move(self, *args, **kwargs):
+        return self.cmds.move(*[a if isinstance(a, (int, float)) else str(a) for a in _flatten(args)], **kwargs)
+
+    def rotate(self, *args, **kwargs):
+        return self.cmds.rotate(*[a if isinstance(a, (int, float)) else str(a) for a in _flatten(args)], **kwargs)
+
+    def pointPosition(self, component, **kwargs):
+        return Vector(self.cmds.pointPosition(str(component)))
+
+    def xform(self, *args, **kwargs):
+        return self.cmds.xform(*self._args(args), **kwargs)
+
+    def addAttr(self, *args, **kwargs):
+        return self.cmds.addAttr(*self._args(args), **kwargs)
+
+    def setAttr(self, plug, *values, **kwargs):
+        if len(values) == 1 and isinstance(values[0], (list, tuple)):
+            values = tuple(values[0])
+        return self.cmds.setAttr(str(plug), *values, **kwargs)
+
+    def getAttr(self, plug, **kwargs):
+        return self.cmds.getAttr(str(plug), **kwargs)
+
+    def connectAttr(self, src, dst, **kwargs):
+        return self.cmds.connectAttr(str(src), str(dst), **kwargs)
+
+    def disconnectAttr(self, src, dst, **kwargs):
+        return self.cmds.disconnectAttr(str(src), str(dst), **kwargs)
+
+    def objExists(self, node):
+        return self.cmds.objExists(str(node))
+
+    def nodeType(self, node, **kwargs):
+        return self.cmds.nodeType(str(node))
+
+    def _constraint(self, command, args, kwargs):
+        result = getattr(self.cmds, command)(*self._args(args), **kwargs)
+        if _flag(kwargs, 'query', 'q'):
+            return result
+        return self._wrap(result[0]) if result else None
+
+    def parentConstraint(self, *args, **kwargs):
+        return self._constraint('parentConstraint', args, kwargs)
+
+    def pointConstraint(self, *args, **kwargs):
+        return self._constraint('pointConstraint', args, kwargs)
+
+    def orientConstraint(self, *args, **kwargs):
+        return self._constraint('orientConstraint', args, kwargs)
+
+    def aimConstraint(self, *args, **kwargs):
+        return self._constraint('aimConstraint', args, kwargs)
+
+    def poleVectorConstraint(self, *args, **kwargs):
+        return self._constraint('poleVectorConstraint', args, kwargs)
+
+    def ikHandle(self, *args, **kwargs):
+        for key in ('startJoint', 'sj', 'endEffector', 'ee'):
+            if key in kwargs:
+                kwargs[key] = str(kwargs[key])
+        return self._wrap(self.cmds.ikHandle(*self._args(args), **kwargs))
+
+    def skinCluster(self, *args, **kwargs):
+        return self._wrap(self.cmds.skinCluster(*self._args(args), **kwargs))[0]
+
+    def duplicate(self, *args, **kwargs):
+        return self._wrap(self.cmds.duplicate(*self._args(args), **kwargs))
+
+    def undoInfo(self, *args, **kwargs):
+        return None
+
+
+######################################################################################################################################################
+
+CMDS_COMMANDS = ['createNode', 'group', 'spaceLocator', 'joint', 'curve', 'circle', 'nurbsPlane', 'nonLinear', 'ikHandle',
+                 'parentConstraint', 'pointConstraint', 'orientConstraint', 'aimConstraint', 'poleVectorConstraint',
+                 'pathAnimation', 'skinCluster', 'duplicate', 'rename', 'parent', 'delete', 'select', 'move', 'rotate',
+                 'pointPosition', 'addAttr', 'deleteAttr', 'attributeQuery', 'listAttr', 'setAttr', 'getAttr',
+                 'connectAttr', 'disconnectAttr', 'listConnections', 'xform', 'ls', 'listRelatives', 'nodeType',
+                 'objExists', 'namespace', 'namespaceInfo', 'currentTime', 'confirmDialog', 'undoInfo', 'refresh', 'window',
+                 'setDrivenKeyframe', 'setKeyframe', 'warning']
+
+PYMEL_COMMANDS = ['createNode', 'group', 'spaceLocator', 'joint', 'circle', 'curve', 'ls', 'selected', 'select',
+                  'listRelatives', 'listConnections', 'parent', 'rename', 'delete', 'move', 'rotate', 'pointPosition',
+                  'xform', 'addAttr', 'setAttr', 'getAttr', 'connectAttr', 'disconnectAttr', 'objExists', 'nodeType',
+                  'parentConstraint', 'pointConstraint', 'orientConstraint', 'aimConstraint', 'poleVectorConstraint',
+                  'ikHandle', 'skinCluster', 'duplicate', 'undoInfo']
+
+_scene = None
+_saved = {}
+
+def _counted(scene, prefix, name, fn):
+    key = '%s.%s' % (prefix, name)
+    def wrapper(*args, **kwargs):
+        scene.count(key)
+        return fn(*args, **kwargs)
+    wrapper.__name__ = name
+    return wrapper
+
+def _module(name, attrs):
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    return mod
+
+def install():
+    '''
+    Puts fake maya, maya.cmds, maya.OpenMaya and pymel.core modules into sys.modules and returns the shared Scene.
+    Calling install again returns the existing scene - use scene.reset() to start from an empty scene.
+    '''
+    global _scene
+    if _scene is not None:
+        return _scene
+
+    scene = Scene()
+    fakeCmds = FakeCmds(scene)
+    fakePymel = FakePymel(scene, fakeCmds)
+
+    cmdsModule = _module('maya.cmds', dict((c, _counted(scene, 'cmds', c, getattr(fakeCmds, c))) for c in CMDS_COMMANDS))
+    omModule = _module('maya.OpenMaya', {'MVector':MVector, 'MMatrix':MMatrix, 'MScriptUtil':MScriptUtil, 'MObject':MObject,
+                                         'MMessage':MMessage, 'MSceneMessage':MSceneMessage, 'MDGMessage':MDGMessage,
+                                         'MNodeMessage':MNodeMessage, 'MEventMessage':MEventMessage})
+    mayaModule = _module('maya', {'cmds':cmdsModule, 'OpenMaya':omModule})
+
+    general = _module('pymel.core.general', {'Attribute':Attribute, 'PyNode':fakePymel.PyNode})
+    datatypes = _module('pymel.core.datatypes', {'Vector':Vector, 'Matrix':list})
+    pmcAttrs = dict((c, _counted(scene, 'pmc', c, getattr(fakePymel, c))) for c in PYMEL_COMMANDS)
+    pmcAttrs.update({'general':general, 'datatypes':datatypes, 'dt':datatypes, 'PyNode':fakePymel.PyNode,
+                     'Attribute':Attribute})
+    pmcModule = _module('pymel.core', pmcAttrs)
+    pymelModule = _module('pymel', {'core':pmcModule})
+
+    modules = {'maya':mayaModule, 'maya.cmds':cmdsModule, 'maya.OpenMaya':omModule,
+               'pymel':pymelModule, 'pymel.core':pmcModule, 'pymel.core.general':general,
+               'pymel.core.datatypes':datatypes}
+    for name, mod in modules.items():
+        _saved[name] = sys.modules.get(name)
+        sys.modules[name] = mod
+
+    scene.cmds = fakeCmds
+    scene.pmc = fakePymel
+    _scene = scene
+    return scene
+
+def uninstall():
+    '''
+    Restores whatever maya / pymel modules were present before install
+    '''
+    global _scene
+    for name, mod in _saved.items():
+        if mod is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = mod
+    _saved.clear()
+    _scene = None
+
+def getScene():
+    return _scene
@@ -0,0 +1,280 @@
+# Opt-in profiler for rig builds.
+# enable() wraps the maya.cmds and pymel.core entry points, plus the helper functions in rooftops.core and rooftops.systems,
+# so that every call is counted and timed against the builder, section and helper that made it.
+# Builders mark themselves with the builder decorator and mark their sections with section(). Both are no-ops while disabled.
+#
+# Usage:
+#     from rooftops.utils import profiler
+#     profiler.enable()
+#     arm.build(...)
+#     profiler.disable()
+#     profiler.writeJson('arm_profile.json')
+#     profiler.writeStacks('arm_profile.folded')   # feed to flamegraph.pl or speedscope
+import sys, time, json, functools
+
+# Commands which are wrapped when present on maya.cmds / pymel.core
+COMMANDS = ['createNode', 'group', 'spaceLocator', 'joint', 'curve', 'circle', 'nurbsPlane', 'nonLinear', 'ikHandle',
+            'parentConstraint', 'pointConstraint', 'orientConstraint', 'aimConstraint', 'poleVectorConstraint',
+            'pathAnimation', 'skinCluster', 'duplicate', 'rename', 'parent', 'delete', 'select', 'move', 'rotate',
+            'pointPosition', 'addAttr', 'deleteAttr', 'attributeQuery', 'listAttr', 'setAttr', 'getAttr',
+            'connectAttr', 'disconnectAttr', 'listConnections', 'xform', 'ls', 'selected', 'listRelatives',
+            'nodeType', 'objExists']
+
+# Modules whose functions and class methods become frames in the profile
+HELPER_MODULES = ['rooftops.core.common', 'rooftops.systems.controls', 'rooftops.systems.curve', 'rooftops.systems.measure',
+                  'rooftops.systems.nonRoll', 'rooftops.systems.rivet']
+
+BUILDER, SECTION, FUNCTION, COMMAND = 'builder', 'section', 'function', 'command'
+
+_enabled = False
+_patched = []
+_stack = []
+_stats = {}
+_started = None
+_elapsed = 0.0
+
+######################################################################################################################################################
+# Frames
+
+class _Frame(object):
+    __slots__ = ('kind', 'name', 'start', 'childTime')
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.start = time.time()
+        self.childTime = 0.0
+
+def _push(kind, name):
+    _stack.append(_Frame(kind, name))
+
+def _pop():
+    '''
+    closes the top frame and records its self time against the current stack
+    '''
+    frame = _stack[-1]
+    elapsed = time.time() - frame.start
+    key = tuple((f.kind, f.name) for f in _stack)
+    stat = _stats.get(key)
+    if stat is None:
+        stat = _stats[key] = [0, 0.0]
+    if frame.kind != SECTION:
+        stat[0] += 1
+    stat[1] += elapsed - frame.childTime
+    _stack.pop()
+    if _stack:
+        _stack[-1].childTime += elapsed
+
+def _timed(kind, name, fn):
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return fn(*args, **kwargs)
+        _push(kind, name)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _pop()
+    wrapper.__name__ = getattr(fn, '__name__', name)
+    wrapper.__doc__ = getattr(fn, '__doc__', None)
+    wrapper._profiled = fn
+    return wrapper
+
+######################################################################################################################################################
+# Markers used by the builders
+
+def builder(name):
+    '''
+    decorator for a build function - calls are profiled as a top level frame named name
+    '''
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            _push(BUILDER, name)
+            depth = len(_stack)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                # close any section left open by the builder
+                while len(_stack) > depth:
+                    _pop()
+                _pop()
+        return wrapper
+    return decorator
+
+def section(name):
+    '''
+    marks the start of a named section within the current builder. The section lasts until the next call or the end of the builder
+    '''
+    if not _enabled or not _stack:
+        return
+    if _stack[-1].kind == SECTION:
+        _pop()
+    if _stack and _stack[-1].kind == BUILDER:
+        _push(SECTION, name)
+
+######################################################################################################################################################
+# Enable / disable
+
+def _patch(owner, attr, kind, name):
+    original = owner.__dict__[attr] if isinstance(owner, type) else getattr(owner, attr)
+    if isinstance(original, (staticmethod, classmethod)):
+        return
+    if getattr(original, '_profiled', None) is not None:
+        return
+    _patched.append((owner, attr, original))
+    setattr(owner, attr, _timed(kind, name, original))
+
+def _patchCommands(module, prefix):
+    for command in COMMANDS:
+        if callable(getattr(module, command, None)):
+            _patch(module, command, COMMAND, '%s.%s' % (prefix, command))
+
+def _patchModule(module):
+    short = module.__name__.split('.')[-1]
+    for attr, value in list(vars(module).items()):
+        if attr.startswith('_'):
+            continue
+        if isinstance(value, type) and value.__module__ == module.__name__:
+            for method, fn in list(vars(value).items()):
+                if callable(fn) and not isinstance(fn, type) and (not method.startswith('_') or method == '__init__'):
+                    _patch(value, method, FUNCTION, '%s.%s.%s' % (short, attr, method))
+        elif callable(value) and getattr(value, '__module__', None) == module.__name__:
+            _patch(module, attr, FUNCTION, '%s.%s' % (short, attr))
+
+def enable(helperModules=None):
+    '''
+    starts profiling. Wraps maya.cmds, pymel.core and the functions in helperModules (defaults to HELPER_MODULES).
+    maya / pymel must already be importable - inside Maya or after rooftops.utils.headless.install()
+    '''
+    global _enabled, _started
+    if _enabled:
+        return
+    import maya.cmds
+    _patchCommands(maya.cmds, 'cmds')
+    try:
+        import pymel.core
+        _patchCommands(pymel.core, 'pmc')
+    except ImportError:
+        pass
+    for name in HELPER_MODULES if helperModules is None else helperModules:
+        __import__(name)
+        _patchModule(sys.modules[name])
+    _enabled = True
+    _started = time.time()
+
+def disable():
+    '''
+    stops profiling and restores every wrapped function. Collected stats are kept until reset()
+    '''
+    global _enabled, _elapsed
+    if not _enabled:
+        return
+    while _stack:
+        _pop()
+    for owner, attr, original in reversed(_patched):
+        setattr(owner, attr, original)
+    del _patched[:]
+    _enabled = False
+    _elapsed += time.time() - _started
+
+def reset():
+    global _elapsed
+    _stats.clear()
+    _elapsed = 0.0
+
+def isEnabled():
+    return _enabled
+
+######################################################################################################################################################
+# Reporting
+
+def _addStat(d, name, calls, t):
+    entry = d.get(name)
+    if entry is None:
+        entry = d[name] = {'calls':0, 'time':0.0}
+    entry['calls'] += calls
+    entry['time'] += t
+
+def report():
+    '''
+    returns the collected stats as a dict:
+        commands - calls and self time of every wrapped command
+        functions - calls, inclusive time and the commands issued by each helper
+        builders - calls and time for each builder, broken down into sections with the commands issued in each
+    '''
+    commands, functions, builders = {}, {}, {}
+    inclusive = {}
+    for key, (calls, selfTime) in _stats.items():
+        kind, name = key[-1]
+        # inclusive time - count each frame once per stack, even if it recurses
+        for frame in set(key):
+            inclusive[frame] = inclusive.get(frame, 0.0) + selfTime
+
+        if kind == COMMAND:
+            _addStat(commands, name, calls, selfTime)
+            for frameKind, frameName in set(key[:-1]):
+                if frameKind == FUNCTION:
+                    _addStat(functions.setdefault(frameName, {'calls':0, 'time':0.0, 'commands':{}})['commands'], name, calls, selfTime)
+        elif kind == FUNCTION:
+            functions.setdefault(name, {'calls':0, 'time':0.0, 'commands':{}})['calls'] += calls
+        elif kind == BUILDER:
+            builders.setdefault(name, {'calls':0, 'time':0.0, 'sections':{}})['calls'] += calls
+
+        # attribute commands to the outermost builder / section on the stack
+        for i, (frameKind, frameName) in enumerate(key):
+            if frameKind != BUILDER:
+                continue
+            sectionName = key[i + 1][1] if len(key) > i + 1 and key[i + 1][0] == SECTION else '(none)'
+            b = builders.setdefault(frameName, {'calls':0, 'time':0.0, 'sections':{}})
+            s = b['sections'].setdefault(sectionName, {'time':0.0, 'commands':{}})
+            s['time'] += selfTime
+            if kind == COMMAND:
+                _addStat(s['commands'], name, calls, selfTime)
+            break
+
+    for (kind, name), t in inclusive.items():
+        if kind == FUNCTION:
+            functions[name]['time'] = t
+        elif kind == BUILDER:
+            builders[name]['time'] = t
+
+    elapsed = _elapsed + (time.time() - _started if _enabled else 0.0)
+    return {'elapsed':elapsed, 'commands':commands, 'functions':functions, 'builders':builders}
+
+def stacks():
+    '''
+    returns the profile in collapsed stack format - one 'frame;frame;frame microseconds' line per stack
+    '''
+    lines = []
+    for key, (calls, selfTime) in sorted(_stats.items()):
+        micro = int(round(selfTime * 1000000))
+        if micro:
+            lines.append('%s %d' % (';'.join(name for kind, name in key), micro))
+    return '\n'.join(lines)
+
+def writeJson(path):
+    with open(path, 'w') as f:
+        json.dump(report(), f, indent=4, sort_keys=True)
+
+def writeStacks(path):
+    with open(path, 'w') as f:
+        f.write(stacks() + '\n')
+
+def summary(top=10):
+    '''
+    returns a short text summary of the busiest commands and helpers
+    '''
+    r = report()
+    lines = ['elapsed %.2fms' % (r['elapsed'] * 1000)]
+    for title, data in (('commands', r['commands']), ('functions', r['functions'])):
+        lines.append(title)
+        for name, entry in sorted(data.items(), key=lambda item: -item[1]['time'])[:top]:
+            lines.append('    %-40s calls %6d  time %8.2fms' % (name, entry['calls'], entry['time'] * 1000))
+    for name, b in sorted(r['builders'].items()):
+        lines.append('builder %s  calls %d  time %.2fms' % (name, b['calls'], b['time'] * 1000))
+        for sectionName, s in sorted(b['sections'].items(), key=lambda item: -item[1]['time']):
+            calls = sum(c['calls'] for c in s['commands'].values())
+            lines.append('    %-30s commands %6d  time %8.2fms' % (sectionName, calls, s['time'] * 1000))
+    return '\n'.join(lines)